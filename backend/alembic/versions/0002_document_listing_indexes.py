@@ -0,0 +1,57 @@
+"""Index documents for keyset listing and full-text search
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18 09:30:00
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0002"
+down_revision: Union[str, None] = "0001"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Must stay identical to app.models.document.SEARCH_VECTOR
+SEARCH_VECTOR = (
+    "to_tsvector('english'::regconfig, "
+    "coalesce(title, '') || ' ' || coalesce(summary, ''))"
+)
+
+
+def upgrade() -> None:
+    # Keyset pagination needs a total order on (created_at, id)
+    op.execute("UPDATE documents SET created_at = now() WHERE created_at IS NULL")
+    op.alter_column("documents", "created_at", nullable=False)
+
+    # CONCURRENTLY keeps the table writable while the indexes build; it cannot
+    # run inside the migration transaction
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_documents_owner_created_id",
+            "documents",
+            ["owner_id", "created_at", "id"],
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_documents_search "
+            f"ON documents USING gin ({SEARCH_VECTOR})"
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_documents_search")
+        op.drop_index(
+            "ix_documents_owner_created_id",
+            table_name="documents",
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
+    op.alter_column("documents", "created_at", nullable=True)
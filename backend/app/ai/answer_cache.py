@@ -0,0 +1,293 @@
+"""
+Semantic cache of RAG answers.
+
+Answers are kept per process and dropped when a document they were built from
+changes. Ingestion usually runs in Celery workers, so with
+ANSWER_CACHE_REDIS_ENABLED every invalidation is also published on Redis and
+each API worker drops its copies, as the auth cache does for users.
+"""
+
+import asyncio
+import json
+import time
+from dataclasses import dataclass, field
+from typing import List, Dict, Any, Optional, Set, Iterable
+
+import numpy as np
+
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.ai.vector_store import SearchFilter
+
+CACHE_REQUESTS = metrics.counter(
+    "rag_answer_cache_requests_total", "Semantic answer cache lookups", ["result"]
+)
+CACHE_LATENCY_SAVED = metrics.counter(
+    "rag_answer_cache_latency_saved_seconds_total",
+    "Retrieval and generation time avoided by answer cache hits",
+)
+CACHE_INVALIDATIONS = metrics.counter(
+    "rag_answer_cache_invalidations_total",
+    "Cached answers dropped after document changes",
+)
+CACHE_ENTRIES = metrics.gauge(
+    "rag_answer_cache_entries", "Cached answers held in memory"
+)
+
+# Redis channel carrying invalidations to every process's cache
+INVALIDATION_CHANNEL = "answer_cache:invalidate"
+
+
+@dataclass
+class CachedAnswer:
+    question: str
+    answer: str
+    sources: List[Dict[str, Any]]
+    vector_ids: Set[str] = field(default_factory=set)
+    document_ids: Set[Any] = field(default_factory=set)
+    compute_seconds: float = 0.0
+    created_at: float = field(default_factory=time.monotonic)
+
+
+class _Scope:
+    """Cached answers for one tenant / document set, with their question embeddings"""
+
+    def __init__(self):
+        self.vectors: Optional[np.ndarray] = None
+        self.entries: List[CachedAnswer] = []
+
+    def remove(self, rows: List[int]) -> None:
+        drop = set(rows)
+        keep = [i for i in range(len(self.entries)) if i not in drop]
+        self.entries = [self.entries[i] for i in keep]
+        self.vectors = self.vectors[keep] if keep else None
+
+
+class SemanticAnswerCache:
+    """
+    In-process cache of RAG answers looked up by question-embedding similarity.
+
+    Entries are partitioned by scope (tenant, document set, k) so an answer is
+    only reused for the same retrieval universe. Entries remember which vectors
+    and documents they were built from and are dropped when any of them change,
+    in every process when `redis_url` is given.
+    """
+
+    def __init__(
+        self,
+        threshold: Optional[float] = None,
+        ttl: Optional[int] = None,
+        max_entries_per_scope: Optional[int] = None,
+        redis_url: Optional[str] = None,
+    ):
+        self.threshold = (
+            threshold if threshold is not None else settings.ANSWER_CACHE_THRESHOLD
+        )
+        self.ttl = ttl if ttl is not None else settings.ANSWER_CACHE_TTL
+        self.max_entries_per_scope = (
+            max_entries_per_scope or settings.ANSWER_CACHE_MAX_ENTRIES_PER_SCOPE
+        )
+        self._scopes: Dict[str, _Scope] = {}
+        self._epoch = 0  # Bumped by every invalidation
+        self._redis = None
+        self._listener: Optional[asyncio.Task] = None
+        if redis_url:
+            import redis.asyncio as aioredis
+
+            self._redis = aioredis.from_url(redis_url)
+
+    @property
+    def epoch(self) -> int:
+        """Pass to store(): an answer computed across an invalidation is not cached"""
+        return self._epoch
+
+    @staticmethod
+    def scope_key(search_filter: Optional[SearchFilter], k: int) -> str:
+        """Tenant and document-set partition for a query"""
+        if search_filter is None:
+            return f"all|k={k}"
+
+        def ordered(values):
+            return sorted(values) if values is not None else None
+
+        return "|".join(
+            [
+                f"owner={search_filter.owner_id}",
+                f"docs={ordered(search_filter.document_ids)}",
+                f"types={ordered(search_filter.file_types)}",
+                f"after={search_filter.created_after}",
+                f"before={search_filter.created_before}",
+                f"k={k}",
+            ]
+        )
+
+    @staticmethod
+    def _unit(embedding: List[float]) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def lookup(self, scope_key: str, embedding: List[float]) -> Optional[CachedAnswer]:
+        """Return the most similar cached answer above the threshold"""
+        scope = self._scopes.get(scope_key)
+        if scope is None or scope.vectors is None:
+            CACHE_REQUESTS.inc(result="miss")
+            return None
+
+        expired = [
+            i
+            for i, e in enumerate(scope.entries)
+            if time.monotonic() - e.created_at > self.ttl
+        ]
+        if expired:
+            scope.remove(expired)
+            self._update_size()
+            if scope.vectors is None:
+                CACHE_REQUESTS.inc(result="miss")
+                return None
+
+        scores = scope.vectors @ self._unit(embedding)
+        best = int(np.argmax(scores))
+        if scores[best] < self.threshold:
+            CACHE_REQUESTS.inc(result="miss")
+            return None
+
+        entry = scope.entries[best]
+        CACHE_REQUESTS.inc(result="hit")
+        CACHE_LATENCY_SAVED.inc(entry.compute_seconds)
+        return entry
+
+    def store(
+        self,
+        scope_key: str,
+        embedding: List[float],
+        question: str,
+        answer: str,
+        sources: List[Dict[str, Any]],
+        relevant_docs: List[Dict[str, Any]],
+        compute_seconds: float,
+        epoch: Optional[int] = None,
+    ) -> None:
+        """Cache an answer along with the vectors and documents it depends on"""
+        # Its sources may have changed since retrieval
+        if epoch is not None and epoch != self._epoch:
+            return
+        entry = CachedAnswer(
+            question=question,
+            answer=answer,
+            sources=sources,
+            vector_ids={
+                str(doc["id"]) for doc in relevant_docs if doc.get("id") is not None
+            },
+            document_ids={
+                doc.get("metadata", {}).get("document_id")
+                for doc in relevant_docs
+                if doc.get("metadata", {}).get("document_id") is not None
+            },
+            compute_seconds=compute_seconds,
+        )
+        scope = self._scopes.setdefault(scope_key, _Scope())
+        vector = self._unit(embedding)[None, :]
+        scope.vectors = (
+            vector if scope.vectors is None else np.vstack([scope.vectors, vector])
+        )
+        scope.entries.append(entry)
+        if len(scope.entries) > self.max_entries_per_scope:
+            scope.remove(list(range(len(scope.entries) - self.max_entries_per_scope)))
+        self._update_size()
+
+    async def invalidate(
+        self,
+        vector_ids: Optional[Iterable[str]] = None,
+        document_ids: Optional[Iterable[Any]] = None,
+        unsourced: bool = False,
+    ) -> int:
+        """
+        Drop answers built from the given vectors or documents, in every process
+        if Redis is on. With unsourced=True, also drop answers that found no
+        sources, since new content may answer them. Returns how many this
+        process dropped.
+        """
+        vector_ids = [str(v) for v in vector_ids or ()]
+        document_ids = [d for d in document_ids or () if d is not None]
+        removed = self._drop(vector_ids, document_ids, unsourced)
+        if self._redis is not None:
+            message = {
+                "vector_ids": vector_ids,
+                "document_ids": document_ids,
+                "unsourced": unsourced,
+            }
+            try:
+                await self._redis.publish(INVALIDATION_CHANNEL, json.dumps(message))
+            except Exception as e:
+                print(f"Warning: could not publish answer cache invalidation: {e}")
+        return removed
+
+    def _drop(
+        self, vector_ids: Iterable[str], document_ids: Iterable[Any], unsourced: bool
+    ) -> int:
+        vector_ids = set(vector_ids)
+        document_ids = set(document_ids)
+        self._epoch += 1
+        removed = 0
+        for key in list(self._scopes):
+            scope = self._scopes[key]
+            rows = [
+                i
+                for i, entry in enumerate(scope.entries)
+                if entry.vector_ids & vector_ids
+                or entry.document_ids & document_ids
+                or (unsourced and not entry.sources)
+            ]
+            if rows:
+                scope.remove(rows)
+                removed += len(rows)
+            if not scope.entries:
+                del self._scopes[key]
+        if removed:
+            CACHE_INVALIDATIONS.inc(removed)
+            self._update_size()
+        return removed
+
+    def clear(self) -> None:
+        self._scopes.clear()
+        self._epoch += 1
+        self._update_size()
+
+    async def start(self) -> None:
+        """Subscribe to invalidations from other processes"""
+        if self._redis is not None and self._listener is None:
+            self._listener = asyncio.create_task(self._listen())
+
+    async def _listen(self) -> None:
+        while True:
+            try:
+                async with self._redis.pubsub() as pubsub:
+                    await pubsub.subscribe(INVALIDATION_CHANNEL)
+                    # Answers cached while disconnected may have missed an invalidation
+                    self.clear()
+                    async for message in pubsub.listen():
+                        if message["type"] == "message":
+                            data = json.loads(message["data"])
+                            self._drop(
+                                data["vector_ids"],
+                                data["document_ids"],
+                                data["unsourced"],
+                            )
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Warning: answer cache invalidation listener failed: {e}")
+                await asyncio.sleep(1)
+
+    async def close(self) -> None:
+        if self._listener is not None:
+            self._listener.cancel()
+            await asyncio.gather(self._listener, return_exceptions=True)
+            self._listener = None
+        if self._redis is not None:
+            await self._redis.aclose()
+            self._redis = None
+
+    def _update_size(self) -> None:
+        CACHE_ENTRIES.set(sum(len(scope.entries) for scope in self._scopes.values()))
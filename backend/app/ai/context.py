@@ -0,0 +1,220 @@
+import asyncio
+import re
+from dataclasses import dataclass, field
+from typing import List, Dict, Any, Optional, Set
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.ai.ingestion import count_tokens, truncate_tokens
+
+CONTEXT_TOKENS = metrics.counter(
+    "rag_context_tokens_total", "Context tokens sent to the LLM"
+)
+CONTEXT_TOKENS_SAVED = metrics.counter(
+    "rag_context_tokens_saved_total",
+    "Prompt tokens saved versus joining every retrieved chunk",
+)
+
+# Context windows by model name prefix (longest prefix wins)
+MODEL_CONTEXT_WINDOWS = {
+    "gpt-4o": 128000,
+    "gpt-4-turbo": 128000,
+    "gpt-4-32k": 32768,
+    "gpt-4": 8192,
+    "gpt-3.5-turbo": 16385,
+}
+
+_WORD = re.compile(r"\w+")
+
+
+def context_window(model: str) -> int:
+    for prefix in sorted(MODEL_CONTEXT_WINDOWS, key=len, reverse=True):
+        if model.startswith(prefix):
+            return MODEL_CONTEXT_WINDOWS[prefix]
+    return 8192
+
+
+def _overlap(left: str, right: str, max_overlap: int) -> int:
+    """Length of the longest suffix of `left` that is a prefix of `right`"""
+    for size in range(min(len(left), len(right), max_overlap), 0, -1):
+        if left.endswith(right[:size]):
+            return size
+    return 0
+
+
+def _shingles(text: str, size: int = 5) -> Set[int]:
+    words = _WORD.findall(text.lower())
+    if len(words) <= size:
+        return {hash(tuple(words))}
+    return {hash(tuple(words[i : i + size])) for i in range(len(words) - size + 1)}
+
+
+@dataclass
+class Passage:
+    """One or more retrieved chunks merged into a contiguous piece of text"""
+
+    text: str
+    score: float
+    docs: List[Dict[str, Any]] = field(default_factory=list)
+
+
+@dataclass
+class ContextResult:
+    text: str
+    docs: List[Dict[str, Any]]  # Retrieved chunks that made it into the prompt
+    tokens: int
+    naive_tokens: int  # Tokens if every retrieved chunk were joined as-is
+
+    @property
+    def tokens_saved(self) -> int:
+        return max(0, self.naive_tokens - self.tokens)
+
+
+class ContextBuilder:
+    """
+    Turns retrieved chunks into a compact, token-budgeted prompt context.
+
+    Adjacent or overlapping chunks from the same document are merged into one
+    passage (removing the splitter's overlap), near-duplicate passages are
+    dropped, passages are optionally reranked with a local cross-encoder, and
+    the best ones are packed into a tiktoken-measured budget for OPENAI_MODEL.
+    """
+
+    def __init__(
+        self,
+        model: Optional[str] = None,
+        max_tokens: Optional[int] = None,
+        reserved_tokens: Optional[int] = None,
+        dedup_threshold: Optional[float] = None,
+        rerank: Optional[bool] = None,
+        rerank_model: Optional[str] = None,
+        max_overlap: int = 400,
+    ):
+        self.model = model or settings.OPENAI_MODEL
+        max_tokens = max_tokens or settings.CONTEXT_MAX_TOKENS
+        reserved = reserved_tokens or settings.CONTEXT_RESERVED_TOKENS
+        # Never exceed what the model can take alongside question and answer
+        self.budget = max(0, min(max_tokens, context_window(self.model) - reserved))
+        self.dedup_threshold = dedup_threshold or settings.CONTEXT_DEDUP_THRESHOLD
+        self.rerank = settings.CONTEXT_RERANK_ENABLED if rerank is None else rerank
+        self.rerank_model = rerank_model or settings.CONTEXT_RERANK_MODEL
+        self.max_overlap = max_overlap
+        self._cross_encoder = None
+
+    def count_tokens(self, text: str) -> int:
+        return count_tokens(text, self.model)
+
+    def merge(self, docs: List[Dict[str, Any]]) -> List[Passage]:
+        """Merge consecutive chunks of the same document into passages"""
+        passages: List[Passage] = []
+        by_document: Dict[Any, List[Dict[str, Any]]] = {}
+        for doc in docs:
+            metadata = doc.get("metadata", {})
+            if (
+                metadata.get("document_id") is None
+                or metadata.get("chunk_index") is None
+            ):
+                passages.append(Passage(doc["text"], doc.get("score", 0.0), [doc]))
+            else:
+                by_document.setdefault(metadata["document_id"], []).append(doc)
+
+        for chunks in by_document.values():
+            chunks.sort(key=lambda d: d["metadata"]["chunk_index"])
+            current: Optional[Passage] = None
+            last_index = None
+            for doc in chunks:
+                index = doc["metadata"]["chunk_index"]
+                if current is not None and index == last_index:
+                    continue  # Same chunk returned twice
+                if current is not None and index == last_index + 1:
+                    size = _overlap(current.text, doc["text"], self.max_overlap)
+                    joiner = "" if size else "\n"
+                    current.text += joiner + doc["text"][size:]
+                    current.score = max(current.score, doc.get("score", 0.0))
+                    current.docs.append(doc)
+                else:
+                    current = Passage(doc["text"], doc.get("score", 0.0), [doc])
+                    passages.append(current)
+                last_index = index
+
+        passages.sort(key=lambda p: p.score, reverse=True)
+        return passages
+
+    def deduplicate(self, passages: List[Passage]) -> List[Passage]:
+        """Drop passages mostly contained in a higher-ranked one"""
+        kept: List[Passage] = []
+        kept_shingles: List[Set[int]] = []
+        for passage in passages:
+            shingles = _shingles(passage.text)
+            duplicate = any(
+                len(shingles & other) / len(shingles) >= self.dedup_threshold
+                for other in kept_shingles
+            )
+            if not duplicate:
+                kept.append(passage)
+                kept_shingles.append(shingles)
+        return kept
+
+    def _get_cross_encoder(self):
+        if self._cross_encoder is None:
+            from sentence_transformers import CrossEncoder
+
+            self._cross_encoder = CrossEncoder(self.rerank_model)
+        return self._cross_encoder
+
+    async def rerank_passages(
+        self, question: str, passages: List[Passage]
+    ) -> List[Passage]:
+        """Reorder passages by cross-encoder relevance (runs off the event loop)"""
+        if len(passages) < 2:
+            return passages
+
+        def score() -> List[float]:
+            model = self._get_cross_encoder()
+            return model.predict([(question, p.text) for p in passages]).tolist()
+
+        scores = await asyncio.to_thread(score)
+        for passage, value in zip(passages, scores):
+            passage.score = float(value)
+        return sorted(passages, key=lambda p: p.score, reverse=True)
+
+    def pack(
+        self, passages: List[Passage], budget: Optional[int] = None
+    ) -> List[Passage]:
+        """Greedily fill the token budget (at most self.budget) in rank order"""
+        packed: List[Passage] = []
+        remaining = self.budget if budget is None else max(0, min(budget, self.budget))
+        for passage in passages:
+            tokens = self.count_tokens(passage.text) + 2  # Separator
+            if tokens <= remaining:
+                packed.append(passage)
+                remaining -= tokens
+            elif remaining >= settings.CONTEXT_MIN_PASSAGE_TOKENS:
+                # Keep the start of a passage that almost fits
+                text = truncate_tokens(passage.text, remaining - 2, self.model)
+                packed.append(Passage(text, passage.score, passage.docs))
+                remaining = 0
+            if remaining < settings.CONTEXT_MIN_PASSAGE_TOKENS:
+                break
+        return packed
+
+    async def build(
+        self, question: str, docs: List[Dict[str, Any]], budget: Optional[int] = None
+    ) -> ContextResult:
+        """`budget` lowers the context budget, e.g. to leave room for chat history"""
+        passages = self.deduplicate(self.merge(docs))
+        if self.rerank:
+            passages = await self.rerank_passages(question, passages)
+        packed = self.pack(passages, budget)
+
+        text = "\n\n".join(p.text for p in packed)
+        result = ContextResult(
+            text=text,
+            docs=[doc for passage in packed for doc in passage.docs],
+            tokens=self.count_tokens(text) if text else 0,
+            naive_tokens=(
+                self.count_tokens("\n\n".join(d["text"] for d in docs)) if docs else 0
+            ),
+        )
+        CONTEXT_TOKENS.inc(result.tokens)
+        CONTEXT_TOKENS_SAVED.inc(result.tokens_saved)
+        return result
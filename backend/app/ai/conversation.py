@@ -0,0 +1,224 @@
+"""
+Conversation memory for chat sessions.
+
+Each prompt carries a rolling summary of older turns plus the most recent
+messages that fit CHAT_HISTORY_MAX_TOKENS, so its size stays bounded however
+long a session runs. Once the messages after the summary outgrow that
+budget or reach CHAT_HISTORY_MAX_MESSAGES, the oldest are folded into the
+summary with one background LLM call (capped at CHAT_SUMMARY_MAX_TOKENS).
+Follow-up questions are rewritten into standalone queries for retrieval.
+"""
+
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.ai.ingestion import count_tokens, truncate_tokens
+
+SUMMARY_UPDATES = metrics.counter(
+    "chat_summary_updates_total", "Rolling conversation summary updates"
+)
+QUERY_REWRITES = metrics.counter(
+    "chat_query_rewrites_total", "Follow-up questions rewritten for retrieval"
+)
+
+MESSAGE_OVERHEAD_TOKENS = 4  # Role and separators per chat message
+
+PROMPT_MESSAGES = {
+    "rewrite": [
+        (
+            "system",
+            "Rewrite the user's latest question as a standalone question that can be "
+            "understood without the conversation, resolving pronouns and references. "
+            "Reply with the question only.",
+        ),
+        ("human", "Conversation:\n{transcript}\n\nLatest question: {question}"),
+    ],
+    "summary": [
+        (
+            "system",
+            "You keep a running summary of a conversation between a user and an "
+            "AI assistant answering questions about company documents. Update the "
+            "summary with the new messages, keeping names, numbers, decisions and "
+            "open questions the user may refer back to. Reply with the updated "
+            "summary only, in at most {words} words.",
+        ),
+        ("human", "Current summary:\n{summary}\n\nNew messages:\n{transcript}"),
+    ],
+}
+
+
+@lru_cache(maxsize=None)
+def prompt_template(name: str):
+    from langchain.prompts import ChatPromptTemplate
+
+    return ChatPromptTemplate.from_messages(PROMPT_MESSAGES[name])
+
+
+@dataclass
+class ConversationContext:
+    """What of a conversation goes into one prompt"""
+
+    summary: Optional[str] = None
+    messages: List[Dict[str, Any]] = field(default_factory=list)  # Oldest first
+    summary_tokens: int = 0
+    history_tokens: int = 0
+
+    @property
+    def tokens(self) -> int:
+        return self.summary_tokens + self.history_tokens
+
+    def __bool__(self) -> bool:
+        return bool(self.summary or self.messages)
+
+
+class ConversationMemory:
+    """
+    Fits session history into a fixed token budget, rewrites follow-up
+    questions and folds old messages into the rolling summary.
+
+    Messages are dicts with "role" ("user" or "assistant"), "content" and,
+    when loaded from the database, their stored "tokens".
+    """
+
+    def __init__(
+        self,
+        llm,
+        summary_llm=None,
+        history_tokens: Optional[int] = None,
+        summary_tokens: Optional[int] = None,
+        rewrite: Optional[bool] = None,
+        rewrite_history_tokens: Optional[int] = None,
+        model: Optional[str] = None,
+        max_messages: Optional[int] = None,
+    ):
+        self.llm = llm
+        self.summary_llm = summary_llm or llm
+        self.history_tokens = history_tokens or settings.CHAT_HISTORY_MAX_TOKENS
+        self.summary_tokens = summary_tokens or settings.CHAT_SUMMARY_MAX_TOKENS
+        self.rewrite = (
+            settings.CHAT_QUERY_REWRITE_ENABLED if rewrite is None else rewrite
+        )
+        self.rewrite_history_tokens = (
+            rewrite_history_tokens or settings.CHAT_REWRITE_HISTORY_TOKENS
+        )
+        self.model = model or settings.OPENAI_MODEL
+        self.max_messages = max_messages or settings.CHAT_HISTORY_MAX_MESSAGES
+
+    def count_tokens(self, text: str) -> int:
+        return count_tokens(text, self.model)
+
+    def message_tokens(self, message: Dict[str, Any]) -> int:
+        tokens = message.get("tokens")
+        if tokens is None:
+            tokens = self.count_tokens(message["content"])
+        return tokens + MESSAGE_OVERHEAD_TOKENS
+
+    def _recent(
+        self, messages: List[Dict[str, Any]], budget: int
+    ) -> Tuple[List[Dict[str, Any]], int]:
+        """Newest messages within `budget`, oldest first; a lone oversized one is cut"""
+        recent: List[Dict[str, Any]] = []
+        used = 0
+        for message in reversed(messages):
+            tokens = self.message_tokens(message)
+            if used + tokens > budget:
+                remaining = budget - used - MESSAGE_OVERHEAD_TOKENS
+                if not recent and remaining > 0:
+                    content = truncate_tokens(message["content"], remaining, self.model)
+                    recent.append({**message, "content": content, "tokens": remaining})
+                    used = budget
+                break
+            recent.append(message)
+            used += tokens
+        recent.reverse()
+        return recent, used
+
+    def fit(
+        self, summary: Optional[str], messages: Optional[List[Dict[str, Any]]]
+    ) -> ConversationContext:
+        """Summary plus the recent messages that fit the history budget"""
+        summary_tokens = 0
+        if summary:
+            summary_tokens = self.count_tokens(summary)
+            if summary_tokens > self.summary_tokens:
+                summary = truncate_tokens(summary, self.summary_tokens, self.model)
+                summary_tokens = self.summary_tokens
+        recent, used = self._recent(messages or [], self.history_tokens)
+        return ConversationContext(summary or None, recent, summary_tokens, used)
+
+    @staticmethod
+    def transcript(messages: List[Dict[str, Any]]) -> str:
+        return "\n".join(
+            f"{'User' if m['role'] == 'user' else 'Assistant'}: {m['content']}"
+            for m in messages
+        )
+
+    async def rewrite_query(
+        self, question: str, conversation: ConversationContext
+    ) -> Tuple[str, Optional[int]]:
+        """Standalone version of a follow-up question, and the rewrite's tokens"""
+        if not self.rewrite or not conversation:
+            return question, None
+        recent, _ = self._recent(conversation.messages, self.rewrite_history_tokens)
+        transcript = self.transcript(recent)
+        if conversation.summary:
+            transcript = f"(Earlier: {conversation.summary})\n{transcript}"
+        messages = prompt_template("rewrite").format_messages(
+            transcript=transcript, question=question
+        )
+        response = await self.llm.ainvoke(messages)
+        usage = getattr(response, "usage_metadata", None)
+        QUERY_REWRITES.inc()
+        rewritten = response.content.strip().strip('"').strip()
+        return rewritten or question, usage.get("total_tokens") if usage else None
+
+    def to_fold(self, messages: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Oldest messages to fold into the summary: none while everything after
+        the summary fits the history budget and the message limit, otherwise
+        enough to get back to half of both, so summarization does not run on
+        every turn. Without the count limit, many short turns would never be
+        folded and the oldest would drop out of prompts unsummarized.
+        """
+        total = sum(self.message_tokens(m) for m in messages)
+        remaining = len(messages)
+        if total <= self.history_tokens and remaining < self.max_messages:
+            return []
+        fold = []
+        for message in messages:
+            if (
+                total <= self.history_tokens // 2
+                and remaining <= self.max_messages // 2
+            ):
+                break
+            fold.append(message)
+            total -= self.message_tokens(message)
+            remaining -= 1
+        return fold
+
+    async def summarize(
+        self, summary: Optional[str], messages: List[Dict[str, Any]]
+    ) -> str:
+        """Rolling summary updated with `messages` (one LLM call)"""
+        # A single huge message must not blow up the summarization prompt
+        clipped = [
+            {
+                **m,
+                "content": truncate_tokens(
+                    m["content"], self.history_tokens, self.model
+                ),
+            }
+            for m in messages
+        ]
+        prompt = prompt_template("summary").format_messages(
+            summary=summary or "(none)",
+            transcript=self.transcript(clipped),
+            words=max(20, self.summary_tokens * 3 // 4),
+        )
+        response = await self.summary_llm.ainvoke(prompt)
+        SUMMARY_UPDATES.inc()
+        return truncate_tokens(
+            response.content.strip(), self.summary_tokens, self.model
+        )
@@ -0,0 +1,238 @@
+import hashlib
+import re
+import unicodedata
+from array import array
+from collections import OrderedDict
+from typing import List, Optional, Dict
+from app.core.config import settings
+from app.core.metrics import metrics
+
+CACHE_LOOKUPS = metrics.counter(
+    "embedding_cache_lookups_total",
+    "Embedding cache lookups by outcome (hit, redis_hit or miss)",
+    ["result"],
+)
+CACHE_EVICTIONS = metrics.counter(
+    "embedding_cache_evictions_total", "Vectors evicted from the in-process LRU"
+)
+CACHE_REDIS_ERRORS = metrics.counter(
+    "embedding_cache_redis_errors_total", "Failed Redis reads and writes"
+)
+CACHE_BYTES = metrics.gauge("embedding_cache_bytes", "Bytes held by the in-process LRU")
+
+
+def normalize_text(text: str) -> str:
+    """Normalize text so trivially different inputs share a cache entry"""
+    text = unicodedata.normalize("NFKC", text)
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def cache_key(namespace: str, text: str) -> str:
+    """
+    Content-addressed key: (provider, model and vector size, hash of normalized
+    text), so changing any of them never serves vectors of the old shape
+    """
+    digest = hashlib.sha256(normalize_text(text).encode("utf-8")).hexdigest()
+    return f"emb:{namespace}:{digest}"
+
+
+def pack_vector(vector: List[float]) -> bytes:
+    """Store vectors compactly as float32 bytes"""
+    return array("f", vector).tobytes()
+
+
+def unpack_vector(data: bytes) -> List[float]:
+    values = array("f")
+    values.frombytes(data)
+    return values.tolist()
+
+
+class EmbeddingCache:
+    """
+    Two-tier embedding cache.
+
+    An in-process LRU bounded by bytes sits in front of an optional Redis tier
+    so vectors survive restarts and are shared across workers.
+    """
+
+    def __init__(
+        self,
+        max_bytes: Optional[int] = None,
+        redis_url: Optional[str] = None,
+        redis_ttl: Optional[int] = None,
+    ):
+        self.max_bytes = (
+            max_bytes if max_bytes is not None else settings.EMBEDDING_CACHE_MAX_BYTES
+        )
+        self.redis_ttl = (
+            redis_ttl if redis_ttl is not None else settings.EMBEDDING_CACHE_REDIS_TTL
+        )
+        self._entries: "OrderedDict[str, bytes]" = OrderedDict()
+        self._bytes = 0
+        self._redis = None
+        if redis_url:
+            import redis.asyncio as aioredis
+
+            self._redis = aioredis.from_url(redis_url)
+
+        self.hits = 0
+        self.redis_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.redis_errors = 0
+
+    # In-process LRU tier
+
+    def _get_local(self, key: str) -> Optional[bytes]:
+        data = self._entries.get(key)
+        if data is not None:
+            self._entries.move_to_end(key)
+        return data
+
+    def _put_local(self, key: str, data: bytes) -> None:
+        if len(data) > self.max_bytes:
+            return
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self._bytes -= len(old)
+        self._entries[key] = data
+        self._bytes += len(data)
+        while self._bytes > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self._bytes -= len(evicted)
+            self.evictions += 1
+            CACHE_EVICTIONS.inc()
+        CACHE_BYTES.set(self._bytes)
+
+    # Public API
+
+    async def get_many(
+        self, namespace: str, texts: List[str]
+    ) -> List[Optional[List[float]]]:
+        """Look up vectors for texts, returning None for misses"""
+        keys = [cache_key(namespace, text) for text in texts]
+        results: List[Optional[bytes]] = [self._get_local(key) for key in keys]
+        hits = sum(1 for r in results if r is not None)
+        self.hits += hits
+        CACHE_LOOKUPS.inc(hits, result="hit")
+
+        missing = [i for i, r in enumerate(results) if r is None]
+        if missing and self._redis is not None:
+            try:
+                remote = await self._redis.mget([keys[i] for i in missing])
+            except Exception:
+                self.redis_errors += 1
+                CACHE_REDIS_ERRORS.inc()
+                remote = [None] * len(missing)
+            for i, data in zip(missing, remote):
+                if data is not None:
+                    results[i] = data
+                    self._put_local(keys[i], data)
+                    self.redis_hits += 1
+                    CACHE_LOOKUPS.inc(result="redis_hit")
+
+        misses = sum(1 for r in results if r is None)
+        self.misses += misses
+        CACHE_LOOKUPS.inc(misses, result="miss")
+        return [unpack_vector(r) if r is not None else None for r in results]
+
+    async def set_many(
+        self, namespace: str, texts: List[str], vectors: List[List[float]]
+    ) -> None:
+        """Store vectors for texts in both tiers"""
+        packed = {
+            cache_key(namespace, t): pack_vector(v) for t, v in zip(texts, vectors)
+        }
+        for key, data in packed.items():
+            self._put_local(key, data)
+        if self._redis is not None and packed:
+            try:
+                async with self._redis.pipeline(transaction=False) as pipe:
+                    for key, data in packed.items():
+                        pipe.set(key, data, ex=self.redis_ttl)
+                    await pipe.execute()
+            except Exception:
+                self.redis_errors += 1
+                CACHE_REDIS_ERRORS.inc()
+
+    async def get(self, namespace: str, text: str) -> Optional[List[float]]:
+        return (await self.get_many(namespace, [text]))[0]
+
+    async def set(self, namespace: str, text: str, vector: List[float]) -> None:
+        await self.set_many(namespace, [text], [vector])
+
+    def stats(self) -> Dict[str, int]:
+        """Hit/miss/eviction counters and current memory usage"""
+        return {
+            "hits": self.hits,
+            "redis_hits": self.redis_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "redis_errors": self.redis_errors,
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+        }
+
+    async def close(self) -> None:
+        if self._redis is not None:
+            await self._redis.aclose()
+
+
+class CachedEmbeddings:
+    """Wraps an embedding provider so only cache misses are embedded"""
+
+    def __init__(self, embeddings, cache: EmbeddingCache):
+        self.embeddings = embeddings
+        self.cache = cache
+        self.model = embeddings.model
+        self._namespace: Optional[str] = None
+
+    async def get_dimensions(self) -> int:
+        return await self.embeddings.get_dimensions()
+
+    async def namespace(self) -> str:
+        """Cache namespace: provider, model and vector size"""
+        if self._namespace is None:
+            dimensions = await self.embeddings.get_dimensions()
+            self._namespace = f"{self.embeddings.name}:{self.model}:{dimensions}"
+        return self._namespace
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        namespace = await self.namespace()
+        vectors = await self.cache.get_many(namespace, texts)
+        missing = [i for i, v in enumerate(vectors) if v is None]
+        if missing:
+            # Embed each distinct normalized text once
+            keys = {i: cache_key(namespace, texts[i]) for i in missing}
+            unique = {}
+            for i in missing:
+                unique.setdefault(keys[i], texts[i])
+            embedded = await self.embeddings.aembed_documents(list(unique.values()))
+            await self.cache.set_many(namespace, list(unique.values()), embedded)
+            by_key = dict(zip(unique.keys(), embedded))
+            for i in missing:
+                vectors[i] = by_key[keys[i]]
+        return vectors
+
+    async def aembed_query(self, text: str) -> List[float]:
+        namespace = await self.namespace()
+        vector = await self.cache.get(namespace, text)
+        if vector is None:
+            vector = await self.embeddings.aembed_query(text)
+            await self.cache.set(namespace, text, vector)
+        return vector
+
+
+_embedding_cache: Optional[EmbeddingCache] = None
+
+
+def get_embedding_cache() -> EmbeddingCache:
+    """Return the process-wide embedding cache shared by RAG and the vector stores"""
+    global _embedding_cache
+    if _embedding_cache is None:
+        _embedding_cache = EmbeddingCache(
+            redis_url=(
+                settings.REDIS_URL if settings.EMBEDDING_CACHE_REDIS_ENABLED else None
+            )
+        )
+    return _embedding_cache
@@ -0,0 +1,297 @@
+import asyncio
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Tuple
+from app.core.config import settings
+from app.ai.embedding_cache import CachedEmbeddings, get_embedding_cache
+
+# Native vector sizes of OpenAI embedding models
+OPENAI_EMBEDDING_DIMENSIONS = {
+    "text-embedding-3-small": 1536,
+    "text-embedding-3-large": 3072,
+    "text-embedding-ada-002": 1536,
+}
+
+
+class EmbeddingProvider(ABC):
+    """Async embedding backend selected by EMBEDDING_PROVIDER"""
+
+    name: str  # Provider id; with the model and vector size it namespaces the cache
+    model: str
+
+    @abstractmethod
+    async def get_dimensions(self) -> int:
+        """Length of the vectors this provider returns"""
+
+    @abstractmethod
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Embed a list of texts"""
+
+    async def aembed_query(self, text: str) -> List[float]:
+        """Embed a single query"""
+        return (await self.aembed_documents([text]))[0]
+
+    async def close(self) -> None:
+        pass
+
+
+class OpenAIEmbeddingProvider(EmbeddingProvider):
+    """
+    Long-lived async OpenAI embedding client.
+
+    One pooled HTTP client is shared by every caller, so embedding requests
+    never block the event loop and reuse keep-alive connections.
+    """
+
+    name = "openai"
+
+    def __init__(
+        self,
+        model: Optional[str] = None,
+        api_key: Optional[str] = None,
+        base_url: Optional[str] = None,
+        max_batch_size: int = 2048,
+        dimensions: Optional[int] = None,
+    ):
+        import httpx
+        from openai import AsyncOpenAI
+
+        self.model = model or settings.EMBEDDING_MODEL
+        self.max_batch_size = max_batch_size
+        self.dimensions, self._request_dimensions = self._resolve_dimensions(
+            self.model, dimensions or settings.EMBEDDING_DIMENSIONS
+        )
+        self.http_client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=settings.EMBEDDING_HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.EMBEDDING_HTTP_MAX_CONNECTIONS,
+            ),
+            timeout=settings.EMBEDDING_HTTP_TIMEOUT,
+        )
+        self.client = AsyncOpenAI(
+            api_key=api_key or settings.OPENAI_API_KEY,
+            base_url=base_url or settings.OPENAI_BASE_URL,
+            http_client=self.http_client,
+        )
+
+    @staticmethod
+    def _resolve_dimensions(
+        model: str, requested: Optional[int]
+    ) -> Tuple[int, Optional[int]]:
+        """(vector size, `dimensions` to send or None) for EMBEDDING_DIMENSIONS"""
+        native = OPENAI_EMBEDDING_DIMENSIONS.get(model)
+        if requested is None:
+            if native is None:
+                raise ValueError(
+                    f"Set EMBEDDING_DIMENSIONS for embedding model {model}"
+                )
+            return native, None
+        if model.startswith("text-embedding-ada") and requested != native:
+            raise ValueError(f"{model} only returns {native}-dimensional vectors")
+        # text-embedding-3 models (and compatible endpoints) shorten vectors on request
+        return requested, None if requested == native else requested
+
+    async def get_dimensions(self) -> int:
+        return self.dimensions
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Embed a list of texts, splitting into API-sized requests"""
+        options = {}
+        if self._request_dimensions is not None:
+            options["dimensions"] = self._request_dimensions
+        vectors: List[List[float]] = []
+        for start in range(0, len(texts), self.max_batch_size):
+            batch = texts[start : start + self.max_batch_size]
+            response = await self.client.embeddings.create(
+                input=batch, model=self.model, **options
+            )
+            vectors.extend(
+                item.embedding for item in sorted(response.data, key=lambda d: d.index)
+            )
+        return vectors
+
+    async def close(self) -> None:
+        await self.client.close()
+
+
+class LocalEmbeddingProvider(EmbeddingProvider):
+    """
+    sentence-transformers model running on CPU in a dedicated thread.
+
+    Concurrent callers are batched dynamically: requests queued while the
+    model is busy, or arriving within LOCAL_EMBEDDING_MAX_WAIT_MS, are encoded
+    together (up to LOCAL_EMBEDDING_BATCH_SIZE texts), so throughput grows
+    with load while a lone query pays at most the wait. The model can run on
+    the ONNX or OpenVINO backends, or be dynamically quantized to int8.
+    """
+
+    name = "local"
+
+    def __init__(
+        self,
+        model: Optional[str] = None,
+        device: Optional[str] = None,
+        backend: Optional[str] = None,
+        batch_size: Optional[int] = None,
+        max_wait_ms: Optional[float] = None,
+        quantize: Optional[bool] = None,
+    ):
+        self.model = model or settings.LOCAL_EMBEDDING_MODEL
+        self.device = device or settings.LOCAL_EMBEDDING_DEVICE
+        self.backend = backend or settings.LOCAL_EMBEDDING_BACKEND
+        self.batch_size = batch_size or settings.LOCAL_EMBEDDING_BATCH_SIZE
+        self.max_wait = (
+            max_wait_ms
+            if max_wait_ms is not None
+            else settings.LOCAL_EMBEDDING_MAX_WAIT_MS
+        ) / 1000
+        self.quantize = (
+            settings.LOCAL_EMBEDDING_QUANTIZE if quantize is None else quantize
+        )
+        # One thread owns the model; torch parallelises inside each batch
+        self._executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="embedding"
+        )
+        self._encoder = None
+        self._dimensions: Optional[int] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._batcher: Optional[asyncio.Task] = None
+
+    def _load(self):
+        if self._encoder is None:
+            from sentence_transformers import SentenceTransformer
+
+            kwargs = {"device": self.device}
+            if self.backend != "torch":
+                kwargs["backend"] = self.backend
+                if settings.LOCAL_EMBEDDING_MODEL_FILE:
+                    kwargs["model_kwargs"] = {
+                        "file_name": settings.LOCAL_EMBEDDING_MODEL_FILE
+                    }
+            encoder = SentenceTransformer(self.model, **kwargs)
+            if self.quantize and self.backend == "torch":
+                import torch
+
+                encoder = torch.quantization.quantize_dynamic(
+                    encoder, {torch.nn.Linear}, dtype=torch.qint8
+                )
+            if settings.LOCAL_EMBEDDING_THREADS > 0:
+                import torch
+
+                torch.set_num_threads(settings.LOCAL_EMBEDDING_THREADS)
+            self._encoder = encoder
+        return self._encoder
+
+    def _encode(self, texts: List[str]) -> List[List[float]]:
+        vectors = self._load().encode(
+            texts,
+            batch_size=self.batch_size,
+            normalize_embeddings=True,
+            convert_to_numpy=True,
+            show_progress_bar=False,
+        )
+        return vectors.tolist()
+
+    async def get_dimensions(self) -> int:
+        # Loads the model on first use, on the model thread, off the event loop
+        if self._dimensions is None:
+            self._dimensions = await asyncio.get_running_loop().run_in_executor(
+                self._executor, lambda: self._load().get_sentence_embedding_dimension()
+            )
+        return self._dimensions
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        if self._batcher is None or self._batcher.done():
+            self._queue = asyncio.Queue()
+            self._batcher = asyncio.create_task(self._run_batches())
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((texts, future))
+        return await future
+
+    async def _next_batch(self) -> List[Tuple[List[str], asyncio.Future]]:
+        loop = asyncio.get_running_loop()
+        requests = [await self._queue.get()]
+        size = len(requests[0][0])
+        deadline = loop.time() + self.max_wait
+        while size < self.batch_size:
+            try:
+                request = self._queue.get_nowait()
+            except asyncio.QueueEmpty:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    request = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+            requests.append(request)
+            size += len(request[0])
+        # Callers that gave up while queued are skipped
+        return [request for request in requests if not request[1].done()]
+
+    async def _run_batches(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            requests = await self._next_batch()
+            if not requests:
+                continue
+            texts = [text for batch, _ in requests for text in batch]
+            try:
+                vectors = await loop.run_in_executor(
+                    self._executor, self._encode, texts
+                )
+            except Exception as e:
+                for _, future in requests:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            offset = 0
+            for batch, future in requests:
+                if not future.done():
+                    future.set_result(vectors[offset : offset + len(batch)])
+                offset += len(batch)
+
+    async def close(self) -> None:
+        if self._batcher is not None:
+            self._batcher.cancel()
+            await asyncio.gather(self._batcher, return_exceptions=True)
+        self._executor.shutdown(wait=False)
+
+
+def create_embedding_provider() -> EmbeddingProvider:
+    """Instantiate the provider configured by EMBEDDING_PROVIDER"""
+    if settings.EMBEDDING_PROVIDER == "openai":
+        return OpenAIEmbeddingProvider()
+    elif settings.EMBEDDING_PROVIDER == "local":
+        return LocalEmbeddingProvider()
+    else:
+        raise ValueError(f"Unknown embedding provider: {settings.EMBEDDING_PROVIDER}")
+
+
+_provider: Optional[EmbeddingProvider] = None
+_embeddings: Optional[CachedEmbeddings] = None
+
+
+def init_embedding_provider() -> CachedEmbeddings:
+    """Create the shared embedding provider (called once from the app lifespan)"""
+    global _provider, _embeddings
+    if _embeddings is None:
+        _provider = create_embedding_provider()
+        _embeddings = CachedEmbeddings(_provider, get_embedding_cache())
+    return _embeddings
+
+
+def get_embedding_provider() -> CachedEmbeddings:
+    """Return the shared, cache-backed embedding provider"""
+    return init_embedding_provider()
+
+
+async def close_embedding_provider() -> None:
+    """Close pooled connections held by the shared provider"""
+    global _provider, _embeddings
+    if _provider is not None:
+        await _provider.close()
+    _provider = None
+    _embeddings = None
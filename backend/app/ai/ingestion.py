@@ -0,0 +1,213 @@
+import asyncio
+import hashlib
+import random
+from functools import lru_cache
+from typing import List, Dict, Any, Optional, Callable
+from app.core.config import settings
+from app.core.tracing import span
+from app.ai.vector_store import assign_vector_ids
+
+
+@lru_cache(maxsize=None)
+def _get_encoding(model: str):
+    """Tokenizer for the model, or None if it cannot be loaded (e.g. offline)"""
+    try:
+        import tiktoken
+
+        try:
+            return tiktoken.encoding_for_model(model)
+        except KeyError:
+            return tiktoken.get_encoding("cl100k_base")
+    except Exception:
+        # Cached too, so a missing encoding file is not re-fetched on every call
+        return None
+
+
+def count_tokens(text: str, model: Optional[str] = None) -> int:
+    """Count tokens for the given model, estimating when tiktoken is unavailable"""
+    encoding = _get_encoding(model or settings.EMBEDDING_MODEL)
+    if encoding is None:
+        # Rough estimate (~4 characters per token)
+        return max(1, len(text) // 4)
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def truncate_tokens(text: str, max_tokens: int, model: Optional[str] = None) -> str:
+    """Cut text to at most max_tokens tokens for the given model"""
+    encoding = _get_encoding(model or settings.EMBEDDING_MODEL)
+    if encoding is None:
+        return text[: max_tokens * 4]
+    return encoding.decode(encoding.encode(text, disallowed_special=())[:max_tokens])
+
+
+def chunk_hash(text: str) -> str:
+    """Content hash stored with each chunk for incremental re-ingestion"""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class ChunkMatcher:
+    """
+    Matches a document's new chunks to its stored chunks by content hash.
+
+    Each stored chunk is reused at most once, so repeated chunk texts are
+    matched one to one. Stored chunks without a hash (ingested before hashes
+    were recorded) are never matched and end up removed and re-embedded.
+    """
+
+    def __init__(self, existing: List[Dict[str, Any]]):
+        self._by_hash: Dict[str, List[Dict[str, Any]]] = {}
+        self._unhashed: List[Dict[str, Any]] = []
+        ordered = sorted(existing, key=lambda c: c["metadata"].get("chunk_index", 0))
+        for chunk in ordered:
+            digest = chunk["metadata"].get("chunk_hash")
+            if digest is None:
+                self._unhashed.append(chunk)
+            else:
+                self._by_hash.setdefault(digest, []).append(chunk)
+
+    def match(self, digest: str) -> Optional[Dict[str, Any]]:
+        """Claim a stored chunk with this hash, if one is left"""
+        candidates = self._by_hash.get(digest)
+        return candidates.pop(0) if candidates else None
+
+    def unmatched(self) -> List[Dict[str, Any]]:
+        """Stored chunks not claimed by any new chunk"""
+        return self._unhashed + [c for chunks in self._by_hash.values() for c in chunks]
+
+
+class EmbeddingPipeline:
+    """
+    Batched, concurrent embedding pipeline for document ingestion.
+
+    Chunks are grouped into `aembed_documents` calls sized by a token budget,
+    a bounded number of batches are embedded concurrently, and each finished
+    batch is written to the vector store while later batches are still embedding.
+    """
+
+    def __init__(
+        self,
+        embeddings,
+        vector_store,
+        max_batch_tokens: Optional[int] = None,
+        max_batch_size: Optional[int] = None,
+        max_concurrency: Optional[int] = None,
+        max_retries: Optional[int] = None,
+        retry_base_delay: Optional[float] = None,
+        token_counter: Optional[Callable[[str], int]] = None,
+    ):
+        self.embeddings = embeddings
+        self.vector_store = vector_store
+        self.max_batch_tokens = max_batch_tokens or settings.EMBEDDING_BATCH_MAX_TOKENS
+        self.max_batch_size = max_batch_size or settings.EMBEDDING_BATCH_MAX_SIZE
+        self.max_concurrency = max_concurrency or settings.EMBEDDING_MAX_CONCURRENCY
+        self.max_retries = (
+            max_retries if max_retries is not None else settings.EMBEDDING_MAX_RETRIES
+        )
+        self.retry_base_delay = (
+            retry_base_delay
+            if retry_base_delay is not None
+            else settings.EMBEDDING_RETRY_BASE_DELAY
+        )
+        self.count_tokens = token_counter or count_tokens
+
+    def make_batches(self, chunks: List[str]) -> List[List[int]]:
+        """Group chunk indices into batches that fit the token budget"""
+        batches: List[List[int]] = []
+        current: List[int] = []
+        current_tokens = 0
+        for i, chunk in enumerate(chunks):
+            tokens = self.count_tokens(chunk)
+            if current and (
+                current_tokens + tokens > self.max_batch_tokens
+                or len(current) >= self.max_batch_size
+            ):
+                batches.append(current)
+                current, current_tokens = [], 0
+            current.append(i)
+            current_tokens += tokens
+        if current:
+            batches.append(current)
+        return batches
+
+    async def _embed_with_retry(self, texts: List[str]) -> List[List[float]]:
+        """Embed one batch, retrying with exponential backoff and jitter"""
+        attempt = 0
+        with span("embedding.batch", texts=len(texts)) as current:
+            while True:
+                try:
+                    return await self.embeddings.aembed_documents(texts)
+                except asyncio.CancelledError:
+                    raise
+                except Exception:
+                    if attempt >= self.max_retries:
+                        raise
+                    delay = self.retry_base_delay * (2**attempt)
+                    await asyncio.sleep(
+                        delay + random.uniform(0, self.retry_base_delay)
+                    )
+                    attempt += 1
+                    current.set(retries=attempt)
+
+    async def embed(self, chunks: List[str]) -> List[List[float]]:
+        """
+        Embed chunks in concurrent token-budgeted batches without storing them
+        """
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def embed_batch(indices: List[int]) -> List[List[float]]:
+            async with semaphore:
+                return await self._embed_with_retry([chunks[i] for i in indices])
+
+        batches = self.make_batches(chunks)
+        results = await asyncio.gather(*(embed_batch(indices) for indices in batches))
+        return [vector for vectors in results for vector in vectors]
+
+    async def run(self, chunks: List[str], metadata: Dict[str, Any]) -> List[str]:
+        """
+        Embed and store all chunks, returning vector IDs in chunk order
+        """
+        if not chunks:
+            return []
+
+        batches = self.make_batches(chunks)
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        total_chunks = len(chunks)
+        # Deterministic IDs make a retried ingestion overwrite its partial writes
+        ids = None
+        if metadata.get("document_id") is not None:
+            ids = assign_vector_ids(
+                metadata["document_id"], [chunk_hash(text) for text in chunks]
+            )
+
+        async def process_batch(indices: List[int]) -> List[str]:
+            texts = [chunks[i] for i in indices]
+            async with semaphore:
+                embeddings = await self._embed_with_retry(texts)
+
+            # Write outside the semaphore so the next batch can start embedding
+            documents = [
+                {
+                    "text": text,
+                    "embedding": embedding,
+                    "metadata": {
+                        **metadata,
+                        "chunk_index": i,
+                        "total_chunks": total_chunks,
+                        "chunk_hash": chunk_hash(text),
+                    },
+                    **({"id": ids[i]} if ids else {}),
+                }
+                for i, text, embedding in zip(indices, texts, embeddings)
+            ]
+            return await self.vector_store.add_documents(documents)
+
+        tasks = [asyncio.create_task(process_batch(indices)) for indices in batches]
+        try:
+            batch_ids = await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+
+        return [vector_id for ids in batch_ids for vector_id in ids]
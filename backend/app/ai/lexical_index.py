@@ -0,0 +1,524 @@
+import asyncio
+import fcntl
+import json
+import math
+import os
+import re
+from array import array
+from collections import Counter
+from contextlib import contextmanager
+from datetime import timezone
+from typing import List, Dict, Any, Optional, Tuple
+
+import numpy as np
+
+from app.core.config import settings
+from app.ai.vector_store import VectorStore, SearchFilter, parse_datetime
+from app.ai.local_vector_store import top_k
+
+# Identifiers such as POL-2023-0042, SKU_88-A or v1.2 are kept as one token
+_TOKEN = re.compile(r"\w+(?:[-./:]\w+)*")
+_SEPARATORS = re.compile(r"[-./:_]")
+
+STOPWORDS = frozenset(
+    "a an and are as at be by can do does for from has have how i in is it its "
+    "of on or our that the their this to was we were what when where which who "
+    "why will with you your".split()
+)
+
+# (generation, log offset, entries, reset) read from the shared log
+_LogBatch = Tuple[int, int, List[Dict[str, Any]], bool]
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased terms; compound identifiers also yield their parts"""
+    terms = []
+    for match in _TOKEN.finditer(text.lower()):
+        token = match.group()
+        if token in STOPWORDS:
+            continue
+        terms.append(token)
+        if not token.isalnum():
+            terms.extend(
+                part
+                for part in _SEPARATORS.split(token)
+                if part and part not in STOPWORDS
+            )
+    return terms
+
+
+def _timestamp(value: Any) -> float:
+    dt = parse_datetime(value)
+    if dt is None:
+        return math.nan
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt.timestamp()
+
+
+def _int_column(value: Any) -> int:
+    return -1 if value is None else int(value)
+
+
+def reciprocal_rank_fusion(
+    result_lists: List[List[Dict[str, Any]]], limit: int, k: Optional[int] = None
+) -> List[Dict[str, Any]]:
+    """
+    Fuse ranked result lists by summing 1 / (k + rank) per document ID.
+    Ranks are used instead of scores, so BM25 and cosine scores need no
+    calibration against each other.
+    """
+    k = k or settings.HYBRID_RRF_K
+    fused: Dict[str, Dict[str, Any]] = {}
+    for results in result_lists:
+        for rank, doc in enumerate(results, start=1):
+            entry = fused.get(doc["id"])
+            if entry is None:
+                entry = fused[doc["id"]] = {**doc, "score": 0.0}
+            entry["score"] += 1.0 / (k + rank)
+    return sorted(fused.values(), key=lambda doc: doc["score"], reverse=True)[:limit]
+
+
+class BM25Index:
+    """
+    Okapi BM25 inverted index with array-backed postings.
+
+    Each term's postings are two typed arrays (row ids and term frequencies)
+    that only grow by appending, so adds are incremental and scoring reads them
+    as numpy views without copying. Deletes clear a row's live flag; dead rows
+    are dropped by compaction once they exceed `compact_ratio`.
+
+    The index is persisted as an append-only JSONL log shared by every process
+    on the host: writers append under an exclusive file lock, and each process
+    applies entries it has not seen yet before searching, so chunks ingested
+    by Celery workers are searchable in the API without a restart.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        k1: Optional[float] = None,
+        b: Optional[float] = None,
+        compact_ratio: float = 0.2,
+    ):
+        self.path = path or settings.LEXICAL_INDEX_DIR
+        self.k1 = k1 or settings.BM25_K1
+        self.b = settings.BM25_B if b is None else b
+        self.compact_ratio = compact_ratio
+        os.makedirs(self.path, exist_ok=True)
+
+        self._lock = asyncio.Lock()
+        self._background: Optional[asyncio.Task] = None
+        self._generation: Optional[int] = None
+        self._offset = 0
+        self._reset()
+        with self._file_lock(fcntl.LOCK_SH):
+            self._apply(self._read_new())
+
+    def _reset(self) -> None:
+        self._postings: Dict[str, Tuple[array, array]] = {}
+        self._ids: List[str] = []
+        self._rows: Dict[str, int] = {}
+        self._texts: List[Optional[str]] = []
+        self._metadata: List[Optional[Dict[str, Any]]] = []
+        self._lengths = array("I")
+        self._alive = bytearray()
+        self._owner_ids = array("q")
+        self._document_ids = array("q")
+        self._created_at = array("d")
+        self._live = 0
+        self._total_length = 0
+
+    def __len__(self) -> int:
+        return self._live
+
+    # Shared log
+
+    def _log_path(self, generation: int) -> str:
+        return os.path.join(self.path, f"log.{generation}.jsonl")
+
+    def _read_generation(self) -> int:
+        try:
+            with open(os.path.join(self.path, "meta.json")) as f:
+                return json.load(f)["generation"]
+        except FileNotFoundError:
+            return 0
+
+    @contextmanager
+    def _file_lock(self, mode: int):
+        with open(os.path.join(self.path, "lock"), "a") as f:
+            fcntl.flock(f.fileno(), mode)
+            try:
+                yield
+            finally:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+    def _read_new(self) -> _LogBatch:
+        """Log entries past our offset, tokenized (caller holds the file lock)"""
+        generation = self._read_generation()
+        reset = generation != self._generation
+        offset = 0 if reset else self._offset
+        entries = []
+        try:
+            with open(self._log_path(generation), "rb") as f:
+                f.seek(offset)
+                data = f.read()
+        except FileNotFoundError:
+            data = b""
+        end = data.rfind(b"\n") + 1  # A torn final line is not consumed
+        for line in data[:end].splitlines():
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if entry["op"] == "add":
+                entry["terms"] = Counter(tokenize(entry["text"]))
+            entries.append(entry)
+        return generation, offset + end, entries, reset
+
+    def _write(self, entries: List[Dict[str, Any]]) -> _LogBatch:
+        with self._file_lock(fcntl.LOCK_EX):
+            generation, offset, pending, reset = self._read_new()
+            path = self._log_path(generation)
+            with open(path, "ab") as f:
+                f.truncate(offset)  # Drop a torn line left by a crashed writer
+                f.write(
+                    "".join(json.dumps(e, default=str) + "\n" for e in entries).encode()
+                )
+                f.flush()
+                os.fsync(f.fileno())
+                offset = f.tell()
+        for entry in entries:
+            if entry["op"] == "add":
+                entry = dict(entry, terms=Counter(tokenize(entry["text"])))
+            pending.append(entry)
+        return generation, offset, pending, reset
+
+    def _apply(self, batch: _LogBatch) -> None:
+        generation, offset, entries, reset = batch
+        if reset:
+            self._reset()
+        self._generation, self._offset = generation, offset
+        for entry in entries:
+            if entry["op"] == "add":
+                self._add(entry["id"], entry["text"], entry["metadata"], entry["terms"])
+            elif entry["op"] == "del":
+                self._delete(entry["id"])
+            elif entry["op"] == "meta":
+                self._update(entry["id"], entry["metadata"])
+
+    # In-memory index
+
+    def _add(
+        self, id: str, text: str, metadata: Dict[str, Any], terms: Counter
+    ) -> None:
+        if id in self._rows:
+            self._delete(id)
+        row = len(self._ids)
+        for term, tf in terms.items():
+            postings = self._postings.get(term)
+            if postings is None:
+                postings = self._postings[term] = (array("I"), array("H"))
+            postings[0].append(row)
+            postings[1].append(min(tf, 65535))
+        length = sum(terms.values())
+        self._rows[id] = row
+        self._ids.append(id)
+        self._texts.append(text)
+        self._metadata.append(metadata)
+        self._lengths.append(length)
+        self._alive.append(1)
+        self._owner_ids.append(_int_column(metadata.get("owner_id")))
+        self._document_ids.append(_int_column(metadata.get("document_id")))
+        self._created_at.append(_timestamp(metadata.get("created_at")))
+        self._live += 1
+        self._total_length += length
+
+    def _delete(self, id: str) -> None:
+        row = self._rows.pop(id, None)
+        if row is None:
+            return
+        self._alive[row] = 0
+        self._texts[row] = None
+        self._metadata[row] = None
+        self._live -= 1
+        self._total_length -= self._lengths[row]
+
+    def _update(self, id: str, fields: Dict[str, Any]) -> None:
+        row = self._rows.get(id)
+        if row is None:
+            return
+        self._metadata[row].update(fields)
+        if "owner_id" in fields:
+            self._owner_ids[row] = _int_column(fields["owner_id"])
+        if "document_id" in fields:
+            self._document_ids[row] = _int_column(fields["document_id"])
+        if "created_at" in fields:
+            self._created_at[row] = _timestamp(fields["created_at"])
+
+    def _filter_mask(
+        self, rows: np.ndarray, search_filter: Optional[SearchFilter]
+    ) -> Optional[np.ndarray]:
+        if search_filter is None or search_filter.is_empty():
+            return None
+        mask = np.ones(len(rows), dtype=bool)
+        if search_filter.owner_id is not None:
+            mask &= (
+                np.frombuffer(self._owner_ids, dtype=np.int64)[rows]
+                == search_filter.owner_id
+            )
+        if search_filter.document_ids is not None:
+            document_ids = np.frombuffer(self._document_ids, dtype=np.int64)[rows]
+            mask &= np.isin(document_ids, search_filter.document_ids)
+        if search_filter.file_types is not None:
+            file_types = set(search_filter.file_types)
+            mask &= np.array(
+                [self._metadata[row].get("file_type") in file_types for row in rows],
+                dtype=bool,
+            )
+        created_at = np.frombuffer(self._created_at, dtype=np.float64)[rows]
+        if search_filter.created_after is not None:
+            mask &= created_at >= _timestamp(search_filter.created_after)
+        if search_filter.created_before is not None:
+            mask &= created_at <= _timestamp(search_filter.created_before)
+        return mask
+
+    def _search(
+        self, terms: List[str], k: int, search_filter: Optional[SearchFilter]
+    ) -> List[Dict[str, Any]]:
+        # Views over the growing arrays must not outlive this call: appends
+        # fail while a buffer is exported, and no await happens in between
+        if not self._live:
+            return []
+        alive = np.frombuffer(self._alive, dtype=bool)
+        lengths = np.frombuffer(self._lengths, dtype=np.uint32)
+        avgdl = self._total_length / self._live
+
+        row_parts, score_parts = [], []
+        for term in terms:
+            postings = self._postings.get(term)
+            if postings is None:
+                continue
+            rows = np.frombuffer(postings[0], dtype=np.uint32)
+            live = alive[rows]
+            df = int(live.sum())
+            if df == 0:
+                continue
+            rows = rows[live]
+            tfs = np.frombuffer(postings[1], dtype=np.uint16)[live].astype(np.float32)
+            idf = math.log(1 + (self._live - df + 0.5) / (df + 0.5))
+            norm = self.k1 * (1 - self.b + self.b * lengths[rows] / avgdl)
+            row_parts.append(rows)
+            score_parts.append(idf * tfs * (self.k1 + 1) / (tfs + norm))
+        if not row_parts:
+            return []
+
+        rows = np.concatenate(row_parts)
+        scores = np.concatenate(score_parts)
+        if len(row_parts) > 1:
+            rows, inverse = np.unique(rows, return_inverse=True)
+            scores = np.bincount(inverse, weights=scores)
+        mask = self._filter_mask(rows, search_filter)
+        if mask is not None:
+            rows, scores = rows[mask], scores[mask]
+
+        results = []
+        for i in top_k(scores, k):
+            row = int(rows[i])
+            results.append(
+                {
+                    "id": self._ids[row],
+                    "text": self._texts[row],
+                    "metadata": self._metadata[row],
+                    "score": float(scores[i]),
+                }
+            )
+        return results
+
+    # Public API
+
+    async def sync(self) -> None:
+        """Apply entries written by other processes since the last call"""
+        async with self._lock:
+
+            def read() -> _LogBatch:
+                with self._file_lock(fcntl.LOCK_SH):
+                    return self._read_new()
+
+            self._apply(await asyncio.to_thread(read))
+
+    async def search(
+        self, query: str, k: int = 5, search_filter: Optional[SearchFilter] = None
+    ) -> List[Dict[str, Any]]:
+        """BM25 top-k chunks for the query, restricted to search_filter"""
+        await self.sync()
+        return self._search(list(dict.fromkeys(tokenize(query))), k, search_filter)
+
+    async def add(self, documents: List[Dict[str, Any]]) -> None:
+        """Index chunks given as {id, text, metadata}"""
+        if not documents:
+            return
+        entries = [
+            {
+                "op": "add",
+                "id": doc["id"],
+                "text": doc["text"],
+                "metadata": json.loads(
+                    json.dumps(doc.get("metadata", {}), default=str)
+                ),
+            }
+            for doc in documents
+        ]
+        async with self._lock:
+            self._apply(await asyncio.to_thread(self._write, entries))
+
+    async def delete(self, ids: List[str]) -> None:
+        if not ids:
+            return
+        async with self._lock:
+            self._apply(
+                await asyncio.to_thread(
+                    self._write, [{"op": "del", "id": id} for id in ids]
+                )
+            )
+        dead = len(self._ids) - self._live
+        if dead > self.compact_ratio * len(self._ids):
+            if self._background is None or self._background.done():
+                self._background = asyncio.create_task(self.compact())
+
+    async def update_metadata(self, updates: Dict[str, Dict[str, Any]]) -> None:
+        entries = [
+            {
+                "op": "meta",
+                "id": id,
+                "metadata": json.loads(json.dumps(fields, default=str)),
+            }
+            for id, fields in updates.items()
+        ]
+        if not entries:
+            return
+        async with self._lock:
+            self._apply(await asyncio.to_thread(self._write, entries))
+
+    def _compact_sync(self) -> None:
+        with self._file_lock(fcntl.LOCK_EX):
+            generation = self._read_generation()
+            records: Dict[str, Dict[str, Any]] = {}
+            try:
+                with open(self._log_path(generation), "rb") as f:
+                    for line in f:
+                        try:
+                            entry = json.loads(line)
+                        except json.JSONDecodeError:
+                            continue
+                        if entry["op"] == "add":
+                            records.pop(entry["id"], None)
+                            records[entry["id"]] = entry
+                        elif entry["op"] == "del":
+                            records.pop(entry["id"], None)
+                        elif entry["op"] == "meta" and entry["id"] in records:
+                            records[entry["id"]]["metadata"].update(entry["metadata"])
+            except FileNotFoundError:
+                return
+
+            with open(self._log_path(generation + 1), "w") as f:
+                f.write("".join(json.dumps(entry) + "\n" for entry in records.values()))
+                f.flush()
+                os.fsync(f.fileno())
+            # Switching meta.json is the commit point for every process
+            tmp = os.path.join(self.path, "meta.json.tmp")
+            with open(tmp, "w") as f:
+                json.dump({"generation": generation + 1}, f)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, os.path.join(self.path, "meta.json"))
+            os.remove(self._log_path(generation))
+
+    async def compact(self) -> None:
+        """Rewrite the log without deleted chunks; all processes reload it"""
+        await asyncio.to_thread(self._compact_sync)
+        await self.sync()
+
+    async def close(self) -> None:
+        if self._background is not None:
+            await asyncio.gather(self._background, return_exceptions=True)
+
+
+class LexicalIndexedStore(VectorStore):
+    """
+    Vector store wrapper that mirrors every write into a BM25Index, so the
+    lexical index is built during ingestion by whichever code path writes
+    vectors. Reads and store-specific attributes pass through unchanged.
+    """
+
+    def __init__(self, store: VectorStore, lexical_index: BM25Index):
+        self.store = store
+        self.lexical_index = lexical_index
+
+    def __getattr__(self, name: str) -> Any:
+        if name == "store":
+            raise AttributeError(name)
+        return getattr(self.store, name)
+
+    @property
+    def embeddings(self):
+        return self.store.embeddings
+
+    async def add_documents(self, documents: List[Dict[str, Any]]) -> List[str]:
+        ids = await self.store.add_documents(documents)
+        await self.lexical_index.add(
+            [
+                {"id": id, "text": doc["text"], "metadata": doc.get("metadata", {})}
+                for id, doc in zip(ids, documents)
+            ]
+        )
+        return ids
+
+    async def similarity_search(
+        self,
+        query: str,
+        k: int = 5,
+        query_embedding: Optional[List[float]] = None,
+        search_filter: Optional[SearchFilter] = None,
+    ) -> List[Dict[str, Any]]:
+        return await self.store.similarity_search(
+            query, k, query_embedding, search_filter
+        )
+
+    async def delete_documents(self, ids: List[str]) -> bool:
+        deleted = await self.store.delete_documents(ids)
+        await self.lexical_index.delete(ids)
+        return deleted
+
+    async def delete_by_document(self, document_id: int) -> int:
+        chunks = await self.store.get_document_chunks(document_id)
+        deleted = await self.store.delete_by_document(document_id)
+        await self.lexical_index.delete([chunk["id"] for chunk in chunks])
+        return deleted
+
+    async def get_document_chunks(self, document_id: int) -> List[Dict[str, Any]]:
+        return await self.store.get_document_chunks(document_id)
+
+    async def update_metadata(self, updates: Dict[str, Dict[str, Any]]) -> None:
+        await self.store.update_metadata(updates)
+        await self.lexical_index.update_metadata(updates)
+
+    async def ensure_indexes(self) -> None:
+        await self.store.ensure_indexes()
+
+    async def close(self) -> None:
+        await self.store.close()
+        await self.lexical_index.close()
+
+
+_lexical_index: Optional[BM25Index] = None
+
+
+def get_lexical_index() -> Optional[BM25Index]:
+    """The shared BM25 index, or None when LEXICAL_INDEX_ENABLED is off"""
+    global _lexical_index
+    if not settings.LEXICAL_INDEX_ENABLED:
+        return None
+    if _lexical_index is None:
+        _lexical_index = BM25Index()
+    return _lexical_index
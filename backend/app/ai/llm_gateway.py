@@ -0,0 +1,421 @@
+"""
+Admission control for LLM calls.
+
+Every chat model call goes through an LLMGateway, which:
+- rate limits per model with token buckets for requests and tokens per minute
+  (LLM_REQUESTS_PER_MINUTE, LLM_TOKENS_PER_MINUTE), charging an estimate up
+  front and settling with the reported usage afterwards
+- bounds calls in flight (LLM_MAX_CONCURRENCY) and serves interactive chat
+  before background summarization, which may hold at most
+  LLM_BACKGROUND_MAX_CONCURRENCY of the slots
+- coalesces identical in-flight prompts into a single call
+- sheds load with LLMOverloadedError (HTTP 503 + Retry-After) when a queue is
+  full or a call waited longer than its priority's queue timeout
+- pauses a model after the provider answers 429, instead of letting every
+  queued call hit the same limit
+
+Limits apply per process: divide the provider's limits by the number of API
+and worker processes.
+"""
+
+import asyncio
+import hashlib
+import json
+import math
+import time
+from collections import deque
+from typing import Any, AsyncIterator, Deque, Dict, List, Optional
+
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.core.tracing import current_span
+from app.ai.ingestion import count_tokens
+
+INTERACTIVE = "interactive"
+BACKGROUND = "background"
+PRIORITIES = (INTERACTIVE, BACKGROUND)  # Dispatch order
+
+LLM_QUEUE_DEPTH = metrics.gauge(
+    "llm_gateway_queue_depth", "LLM calls waiting for admission", ["priority"]
+)
+LLM_QUEUE_WAIT = metrics.histogram(
+    "llm_gateway_wait_seconds", "Time LLM calls waited for admission", ["priority"]
+)
+LLM_IN_FLIGHT = metrics.gauge(
+    "llm_gateway_in_flight", "LLM calls in progress", ["priority"]
+)
+LLM_REJECTED = metrics.counter(
+    "llm_gateway_rejected_total",
+    "LLM calls shed by the gateway",
+    ["priority", "reason"],
+)
+LLM_COALESCED = metrics.counter(
+    "llm_gateway_coalesced_total", "LLM calls served by an identical in-flight call"
+)
+LLM_PROVIDER_RATE_LIMITED = metrics.counter(
+    "llm_gateway_provider_rate_limited_total",
+    "429 responses from the LLM provider",
+    ["model"],
+)
+
+
+class LLMOverloadedError(Exception):
+    """The gateway shed a call; the client should retry after `retry_after` seconds"""
+
+    def __init__(self, priority: str, reason: str, retry_after: int):
+        super().__init__(
+            f"LLM capacity exhausted ({priority} {reason}), retry in {retry_after}s"
+        )
+        self.priority = priority
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    """Refills continuously at `per_minute`; holds at most one minute's worth"""
+
+    def __init__(self, per_minute: float):
+        self.rate = per_minute / 60
+        self.capacity = per_minute
+        self.tokens = float(per_minute)
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self, amount: float, now: float) -> float:
+        """Seconds until `amount` can be taken (0 when the bucket is disabled)"""
+        if self.rate <= 0:
+            return 0.0
+        self._refill(now)
+        # A request larger than the bucket goes through once the bucket is full
+        amount = min(amount, self.capacity)
+        wait = (amount - self.tokens) / self.rate if self.tokens < amount else 0.0
+        return max(wait, self.blocked_until - now)
+
+    def take(self, amount: float) -> None:
+        if self.rate > 0:
+            self.tokens -= min(amount, self.capacity)
+
+    def refund(self, amount: float) -> None:
+        """Return over-estimated tokens (a negative amount charges more)"""
+        if self.rate > 0:
+            self.tokens = min(self.capacity, self.tokens + amount)
+
+    def pause(self, seconds: float) -> None:
+        self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+
+
+class ModelLimits:
+    def __init__(self, requests_per_minute: int, tokens_per_minute: int):
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+
+    def delay(self, tokens: int, now: float) -> float:
+        return max(self.requests.delay(1, now), self.tokens.delay(tokens, now))
+
+    def take(self, tokens: int) -> None:
+        self.requests.take(1)
+        self.tokens.take(tokens)
+
+
+class _Waiter:
+    __slots__ = ("limits", "tokens", "future")
+
+    def __init__(self, limits: ModelLimits, tokens: int, future: asyncio.Future):
+        self.limits = limits
+        self.tokens = tokens
+        self.future = future
+
+
+class _SharedCall:
+    """An in-flight call and how many callers are still waiting for it"""
+
+    __slots__ = ("task", "callers")
+
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.callers = 0
+
+
+def _usage_tokens(message: Any) -> Optional[int]:
+    usage = getattr(message, "usage_metadata", None)
+    return usage.get("total_tokens") if usage else None
+
+
+def _rate_limit_delay(error: Exception) -> Optional[float]:
+    """Pause requested by a provider 429 (Retry-After when present), else None"""
+    if getattr(error, "status_code", None) != 429:
+        return None
+    response = getattr(error, "response", None)
+    header = response.headers.get("retry-after") if response is not None else None
+    try:
+        return float(header) if header else settings.LLM_RATE_LIMIT_BACKOFF
+    except ValueError:
+        return settings.LLM_RATE_LIMIT_BACKOFF
+
+
+class LLMGateway:
+    """Rate limits, prioritizes, coalesces and sheds calls to chat models"""
+
+    def __init__(
+        self,
+        requests_per_minute: Optional[int] = None,
+        tokens_per_minute: Optional[int] = None,
+        max_concurrency: Optional[int] = None,
+        background_max_concurrency: Optional[int] = None,
+        max_queue: Optional[Dict[str, int]] = None,
+        queue_timeout: Optional[Dict[str, float]] = None,
+        coalesce: Optional[bool] = None,
+    ):
+        def pick(value, default):
+            return default if value is None else value
+
+        self.requests_per_minute = pick(
+            requests_per_minute, settings.LLM_REQUESTS_PER_MINUTE
+        )
+        self.tokens_per_minute = pick(tokens_per_minute, settings.LLM_TOKENS_PER_MINUTE)
+        self.max_concurrency = pick(max_concurrency, settings.LLM_MAX_CONCURRENCY)
+        self.background_max_concurrency = pick(
+            background_max_concurrency, settings.LLM_BACKGROUND_MAX_CONCURRENCY
+        )
+        self.max_queue = max_queue or {
+            INTERACTIVE: settings.LLM_MAX_QUEUE_INTERACTIVE,
+            BACKGROUND: settings.LLM_MAX_QUEUE_BACKGROUND,
+        }
+        self.queue_timeout = queue_timeout or {
+            INTERACTIVE: settings.LLM_QUEUE_TIMEOUT_INTERACTIVE,
+            BACKGROUND: settings.LLM_QUEUE_TIMEOUT_BACKGROUND,
+        }
+        self.coalesce = settings.LLM_COALESCE_ENABLED if coalesce is None else coalesce
+        self._limits: Dict[str, ModelLimits] = {}
+        self._waiting: Dict[str, Deque[_Waiter]] = {
+            priority: deque() for priority in PRIORITIES
+        }
+        self._in_flight: Dict[str, int] = {priority: 0 for priority in PRIORITIES}
+        self._shared: Dict[str, _SharedCall] = {}
+        self._timer: Optional[asyncio.TimerHandle] = None
+
+    def model(self, llm, priority: str) -> "GatewayModel":
+        """Chat model facade whose calls go through this gateway at `priority`"""
+        return GatewayModel(self, llm, priority)
+
+    def _limits_for(self, llm) -> ModelLimits:
+        name = (
+            getattr(llm, "model_name", None) or getattr(llm, "model", None) or "default"
+        )
+        if name not in self._limits:
+            self._limits[name] = ModelLimits(
+                self.requests_per_minute, self.tokens_per_minute
+            )
+        return self._limits[name]
+
+    @staticmethod
+    def estimate_tokens(llm, messages: List[Any]) -> int:
+        """Prompt tokens plus the expected completion, charged before the call"""
+        prompt = sum(
+            count_tokens(str(getattr(message, "content", message)))
+            for message in messages
+        )
+        completion = (
+            getattr(llm, "max_tokens", None) or settings.LLM_ESTIMATED_OUTPUT_TOKENS
+        )
+        return prompt + completion
+
+    def retry_after(self, priority: str) -> int:
+        """Rough seconds until the queue ahead of a new call drains"""
+        waiting = sum(
+            len(self._waiting[p]) for p in PRIORITIES[: PRIORITIES.index(priority) + 1]
+        )
+        rate = self.requests_per_minute / 60 if self.requests_per_minute > 0 else None
+        seconds = (waiting + 1) / rate if rate else self.queue_timeout[priority] / 2
+        return max(1, min(60, math.ceil(seconds)))
+
+    def check_capacity(self, priority: str = INTERACTIVE) -> None:
+        """Raise LLMOverloadedError now if a new call would be rejected as queue_full"""
+        if len(self._waiting[priority]) >= self.max_queue[priority]:
+            LLM_REJECTED.inc(priority=priority, reason="queue_full")
+            raise LLMOverloadedError(priority, "queue_full", self.retry_after(priority))
+
+    def _report(self) -> None:
+        for priority in PRIORITIES:
+            LLM_QUEUE_DEPTH.set(len(self._waiting[priority]), priority=priority)
+            LLM_IN_FLIGHT.set(self._in_flight[priority], priority=priority)
+
+    def _dispatch(self) -> None:
+        """Admit queued calls in priority order while slots and rate limits allow"""
+        self._timer = None
+        now = time.monotonic()
+        try:
+            for priority in PRIORITIES:
+                queue = self._waiting[priority]
+                while queue:
+                    if sum(self._in_flight.values()) >= self.max_concurrency:
+                        return
+                    if (
+                        priority == BACKGROUND
+                        and self._in_flight[BACKGROUND]
+                        >= self.background_max_concurrency
+                    ):
+                        break
+                    waiter = queue[0]
+                    delay = waiter.limits.delay(waiter.tokens, now)
+                    if delay > 0:
+                        # Nothing may overtake a rate-limited call: it would use
+                        # its budget
+                        self._schedule(delay)
+                        return
+                    queue.popleft()
+                    waiter.limits.take(waiter.tokens)
+                    self._in_flight[priority] += 1
+                    waiter.future.set_result(None)
+        finally:
+            self._report()
+
+    def _schedule(self, delay: float) -> None:
+        if self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(delay, self._dispatch)
+
+    async def _acquire(self, priority: str, limits: ModelLimits, tokens: int) -> None:
+        self.check_capacity(priority)
+        waiter = _Waiter(limits, tokens, asyncio.get_running_loop().create_future())
+        self._waiting[priority].append(waiter)
+        self._dispatch()
+        start = time.perf_counter()
+        try:
+            await asyncio.wait_for(
+                asyncio.shield(waiter.future), self.queue_timeout[priority]
+            )
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if not waiter.future.done():
+                waiter.future.cancel()
+                self._waiting[priority].remove(waiter)
+                self._report()
+                if isinstance(e, asyncio.TimeoutError):
+                    LLM_REJECTED.inc(priority=priority, reason="timeout")
+                    raise LLMOverloadedError(
+                        priority, "timeout", self.retry_after(priority)
+                    ) from None
+                raise
+            if isinstance(e, asyncio.CancelledError):
+                # Admitted just as the caller went away: hand the slot back
+                self._release(priority, limits, tokens, 0)
+                raise
+        finally:
+            waited = time.perf_counter() - start
+            LLM_QUEUE_WAIT.observe(waited, priority=priority)
+            current_span().add("llm_queue_wait_ms", round(waited * 1000, 3))
+
+    def _release(
+        self, priority: str, limits: ModelLimits, reserved: int, used: Optional[int]
+    ) -> None:
+        self._in_flight[priority] -= 1
+        if used is not None:
+            limits.tokens.refund(reserved - used)
+        self._dispatch()
+
+    def _on_error(self, llm, limits: ModelLimits, error: Exception) -> None:
+        pause = _rate_limit_delay(error)
+        if pause is not None:
+            LLM_PROVIDER_RATE_LIMITED.inc(model=getattr(llm, "model_name", "default"))
+            limits.requests.pause(pause)
+
+    async def _invoke(self, llm, messages: List[Any], priority: str):
+        limits = self._limits_for(llm)
+        tokens = self.estimate_tokens(llm, messages)
+        await self._acquire(priority, limits, tokens)
+        used = None
+        try:
+            response = await llm.ainvoke(messages)
+            used = _usage_tokens(response)
+            return response
+        except Exception as e:
+            self._on_error(llm, limits, e)
+            raise
+        finally:
+            self._release(priority, limits, tokens, used)
+
+    @staticmethod
+    def _coalesce_key(llm, messages: List[Any]) -> str:
+        payload = [
+            getattr(llm, "model_name", None),
+            getattr(llm, "temperature", None),
+            [
+                [getattr(m, "type", None), str(getattr(m, "content", m))]
+                for m in messages
+            ],
+        ]
+        return hashlib.sha256(json.dumps(payload, default=str).encode()).hexdigest()
+
+    async def ainvoke(self, llm, messages: List[Any], priority: str = INTERACTIVE):
+        """Admitted, coalesced `llm.ainvoke(messages)`"""
+        if not self.coalesce:
+            return await self._invoke(llm, messages, priority)
+
+        key = self._coalesce_key(llm, messages)
+        shared = self._shared.get(key)
+        if shared is None:
+            shared = _SharedCall(
+                asyncio.ensure_future(self._invoke(llm, messages, priority))
+            )
+            self._shared[key] = shared
+            shared.task.add_done_callback(lambda task: self._forget(key, shared))
+        else:
+            LLM_COALESCED.inc()
+        shared.callers += 1
+        try:
+            return await asyncio.shield(shared.task)
+        finally:
+            shared.callers -= 1
+            # The call is only cancelled once every caller has gone away
+            if shared.callers == 0 and not shared.task.done():
+                shared.task.cancel()
+
+    def _forget(self, key: str, shared: _SharedCall) -> None:
+        if self._shared.get(key) is shared:
+            del self._shared[key]
+        if not shared.task.cancelled():
+            shared.task.exception()  # Retrieved, so an unawaited failure isn't logged
+
+    async def astream(
+        self, llm, messages: List[Any], priority: str = INTERACTIVE
+    ) -> AsyncIterator[Any]:
+        """Admitted `llm.astream(messages)`; the slot is held until the stream ends"""
+        limits = self._limits_for(llm)
+        tokens = self.estimate_tokens(llm, messages)
+        await self._acquire(priority, limits, tokens)
+        used = None
+        try:
+            async for chunk in llm.astream(messages):
+                used = _usage_tokens(chunk) or used
+                yield chunk
+        except Exception as e:
+            self._on_error(llm, limits, e)
+            raise
+        finally:
+            self._release(priority, limits, tokens, used)
+
+
+class GatewayModel:
+    """
+    Stand-in for a chat model whose `ainvoke` and `astream` go through an
+    LLMGateway at a fixed priority; other attributes pass through
+    """
+
+    def __init__(self, gateway: LLMGateway, llm, priority: str):
+        self.gateway = gateway
+        self.llm = llm
+        self.priority = priority
+
+    def __getattr__(self, name: str) -> Any:
+        if name == "llm":
+            raise AttributeError(name)
+        return getattr(self.llm, name)
+
+    async def ainvoke(self, messages: List[Any]):
+        return await self.gateway.ainvoke(self.llm, messages, self.priority)
+
+    def astream(self, messages: List[Any]) -> AsyncIterator[Any]:
+        return self.gateway.astream(self.llm, messages, self.priority)
@@ -0,0 +1,720 @@
+import asyncio
+import fcntl
+import json
+import os
+import uuid
+from contextlib import contextmanager
+from datetime import timezone
+from typing import List, Dict, Any, Optional, Tuple
+
+import numpy as np
+
+from app.core.config import settings
+from app.ai.vector_store import (
+    VectorStore,
+    SearchFilter,
+    FILTER_FIELDS,
+    check_dimensions,
+    parse_datetime,
+)
+
+# (dim, generation, log offset, entries, reset, log reader) read from the shared log
+_LogBatch = Tuple[Optional[int], int, int, List[Dict[str, Any]], bool, Optional[Any]]
+
+
+def normalize_rows(vectors: np.ndarray) -> np.ndarray:
+    """Scale rows to unit length so cosine similarity is a dot product"""
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return (vectors / norms).astype(np.float32)
+
+
+def top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the k highest scores, best first"""
+    if k <= 0 or len(scores) == 0:
+        return np.empty(0, dtype=np.int64)
+    if len(scores) > k:
+        idx = np.argpartition(-scores, k - 1)[:k]
+    else:
+        idx = np.arange(len(scores))
+    return idx[np.argsort(-scores[idx], kind="stable")]
+
+
+def _timestamp(value: Any) -> float:
+    dt = parse_datetime(value)
+    if dt is None:
+        return np.nan
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt.timestamp()
+
+
+class IVFIndex:
+    """
+    Inverted-file ANN index over unit vectors.
+
+    Rows are clustered with spherical k-means; a query only scores the rows in
+    the `nprobe` closest clusters. Posting lists are stored as one sorted row
+    array plus offsets, so the index costs 8 bytes per vector.
+    """
+
+    def __init__(
+        self, centroids: np.ndarray, offsets: np.ndarray, rows: np.ndarray, size: int
+    ):
+        self.centroids = centroids
+        self.offsets = offsets
+        self.rows = rows
+        self.size = size  # Rows [0, size) are covered by the index
+
+    @classmethod
+    def build(
+        cls,
+        matrix: np.ndarray,
+        nlist: Optional[int] = None,
+        iterations: int = 10,
+        block_size: int = 65536,
+        seed: int = 0,
+    ) -> "IVFIndex":
+        n = matrix.shape[0]
+        nlist = nlist or int(np.clip(np.sqrt(n), 16, 4096))
+        nlist = min(nlist, n)
+        rng = np.random.default_rng(seed)
+
+        sample_size = min(n, nlist * 64)
+        sample = np.asarray(matrix[np.sort(rng.choice(n, sample_size, replace=False))])
+        centroids = sample[rng.choice(sample_size, nlist, replace=False)].copy()
+
+        for _ in range(iterations):
+            assign = np.argmax(sample @ centroids.T, axis=1)
+            order = np.argsort(assign, kind="stable")
+            counts = np.bincount(assign, minlength=nlist)
+            present = np.flatnonzero(counts)
+            starts = np.concatenate([[0], np.cumsum(counts[present])[:-1]])
+            sums = np.add.reduceat(sample[order], starts, axis=0)
+            centroids[present] = normalize_rows(sums)
+
+        assign = np.empty(n, dtype=np.int32)
+        for start in range(0, n, block_size):
+            block = np.asarray(matrix[start : start + block_size])
+            assign[start : start + len(block)] = np.argmax(block @ centroids.T, axis=1)
+
+        rows = np.argsort(assign, kind="stable").astype(np.int64)
+        offsets = np.concatenate([[0], np.cumsum(np.bincount(assign, minlength=nlist))])
+        return cls(centroids.astype(np.float32), offsets, rows, n)
+
+    def candidates(self, query: np.ndarray, nprobe: int) -> np.ndarray:
+        """Row ids in the nprobe clusters closest to the query"""
+        probe = top_k(self.centroids @ query, min(nprobe, len(self.centroids)))
+        return np.concatenate(
+            [self.rows[self.offsets[c] : self.offsets[c + 1]] for c in probe]
+        )
+
+
+class LocalVectorStore(VectorStore):
+    """
+    Vector store backed by a memory-mapped float32 matrix, shared by every
+    process on the host.
+
+    Vectors are appended to `vectors.<gen>.f32` and records to an append-only
+    JSONL log (`log.<gen>.jsonl`); row i of the matrix belongs to the i-th
+    "add" entry of the log. As in BM25Index, writers catch up with the log and
+    append under an exclusive file lock, and every process applies entries it
+    has not seen before reading, so chunks ingested by Celery workers are
+    searchable in the API. Deletes append tombstones; compaction rewrites a
+    new generation under the lock, and other processes switch to it on their
+    next read. Only ids and metadata are kept in memory: chunk texts are read
+    back from the log for the rows a search returns.
+
+    Small collections are searched with exact vectorized cosine top-k; above
+    LOCAL_VECTOR_ANN_THRESHOLD an IVF index is built in the background and rows
+    appended since the last build are scanned exactly. Filterable metadata is
+    kept in columnar arrays so filters become row masks.
+    """
+
+    def __init__(self, embeddings=None, path: Optional[str] = None):
+        self.embeddings = embeddings
+        self.path = path or settings.LOCAL_VECTOR_DIR
+        self.ann_threshold = settings.LOCAL_VECTOR_ANN_THRESHOLD
+        self.nprobe = settings.LOCAL_VECTOR_IVF_NPROBE
+        self.compact_ratio = settings.LOCAL_VECTOR_COMPACT_RATIO
+        os.makedirs(self.path, exist_ok=True)
+
+        self._lock = asyncio.Lock()
+        self._background: Optional[asyncio.Task] = None
+        self._index_task: Optional[asyncio.Task] = None
+
+        self._dim: Optional[int] = None
+        self._generation: Optional[int] = None
+        self._offset = 0
+        self._reader = None
+        # Log files replaced while a search may still read them
+        self._retired_readers: List[Any] = []
+        self._searches = 0
+        self._reset()
+        with self._file_lock(fcntl.LOCK_SH):
+            self._apply(self._read_new())
+
+    def _reset(self) -> None:
+        self._ids: List[str] = []
+        self._rows: Dict[str, int] = {}
+        self._metadata: List[Optional[Dict[str, Any]]] = []
+        # Where each row's log line is, to read its text back
+        self._line_offsets = np.empty(0, dtype=np.int64)
+        self._line_lengths = np.empty(0, dtype=np.int64)
+        self._alive = np.empty(0, dtype=bool)
+        self._deleted = 0
+        self._file_type_codes: Dict[str, int] = {}
+        self._columns = self._build_columns([])
+        self._index: Optional[IVFIndex] = None
+        self._matrix = np.empty((0, self._dim or 0), dtype=np.float32)
+
+    # Shared files
+
+    def _file(self, kind: str, generation: Optional[int] = None) -> str:
+        gen = self._generation if generation is None else generation
+        ext = "f32" if kind == "vectors" else "jsonl"
+        return os.path.join(self.path, f"{kind}.{gen}.{ext}")
+
+    def _read_meta(self) -> Dict[str, Any]:
+        try:
+            with open(os.path.join(self.path, "meta.json")) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {"dim": None, "generation": 0}
+
+    def _write_meta(self, dim: Optional[int], generation: int) -> None:
+        """Replace meta.json (caller holds the exclusive file lock)"""
+        tmp = os.path.join(self.path, "meta.json.tmp")
+        with open(tmp, "w") as f:
+            json.dump({"dim": dim, "generation": generation}, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, os.path.join(self.path, "meta.json"))
+
+    @contextmanager
+    def _file_lock(self, mode: int):
+        with open(os.path.join(self.path, "lock"), "a") as f:
+            fcntl.flock(f.fileno(), mode)
+            try:
+                yield
+            finally:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+    def _read_new(self) -> _LogBatch:
+        """Log entries past our offset, without texts (caller holds the file lock)"""
+        meta = self._read_meta()
+        generation = meta["generation"]
+        reset = generation != self._generation
+        offset = 0 if reset else self._offset
+        log_path = self._file("log", generation)
+        reader = None
+        if reset or self._reader is None:
+            # Opened under the lock, before a compaction could remove the file
+            try:
+                reader = open(log_path, "rb")
+            except FileNotFoundError:
+                pass
+
+        entries = []
+        try:
+            with open(log_path, "rb") as f:
+                f.seek(offset)
+                for line in f:
+                    if not line.endswith(b"\n"):
+                        break  # A torn final line is not consumed
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        entry = None
+                    if entry is not None:
+                        if entry["op"] == "add":
+                            del entry["text"]
+                            entry["line"] = (offset, len(line))
+                        entries.append(entry)
+                    offset += len(line)
+        except FileNotFoundError:
+            pass
+        return meta["dim"], generation, offset, entries, reset, reader
+
+    def _write(
+        self, entries: List[Dict[str, Any]], vectors: Optional[np.ndarray] = None
+    ) -> _LogBatch:
+        """Catch up with the log, then append `vectors` and `entries` to it"""
+        with self._file_lock(fcntl.LOCK_EX):
+            dim, generation, offset, pending, reset, reader = self._read_new()
+            if vectors is not None:
+                if dim is None:
+                    dim = vectors.shape[1]
+                    self._write_meta(dim, generation)
+                elif vectors.shape[1] != dim:
+                    raise ValueError(
+                        f"Expected {dim}-dim vectors, got {vectors.shape[1]}"
+                    )
+                rows = (0 if reset else len(self._ids)) + sum(
+                    e["op"] == "add" for e in pending
+                )
+                # Vectors first: rows past the log's add entries are ignored and
+                # cut off here, after a writer crashed between the two files
+                with open(self._file("vectors", generation), "ab") as f:
+                    f.truncate(rows * dim * 4)
+                    f.write(vectors.tobytes())
+                    f.flush()
+                    os.fsync(f.fileno())
+
+            lines = [(json.dumps(e, default=str) + "\n").encode() for e in entries]
+            with open(self._file("log", generation), "ab") as f:
+                f.truncate(offset)  # Drop a torn line left by a crashed writer
+                f.write(b"".join(lines))
+                f.flush()
+                os.fsync(f.fileno())
+            if reader is None and (reset or self._reader is None):
+                reader = open(self._file("log", generation), "rb")
+
+        for entry, line in zip(entries, lines):
+            if entry["op"] == "add":
+                entry = {key: value for key, value in entry.items() if key != "text"}
+                entry["line"] = (offset, len(line))
+            pending.append(entry)
+            offset += len(line)
+        return dim, generation, offset, pending, reset, reader
+
+    def _apply(self, batch: _LogBatch) -> int:
+        """Apply a batch read from the log; returns how many rows its deletes removed"""
+        dim, generation, offset, entries, reset, reader = batch
+        if reset:
+            self._reset()
+        if reader is not None or reset:
+            self._replace_reader(reader)
+        self._dim = dim
+        self._generation, self._offset = generation, offset
+        if not entries:
+            if reset:
+                self._remap()
+            return 0
+
+        first = len(self._ids)
+        deleted = 0
+        dead: List[int] = []
+        changed: List[int] = []
+        lines: List[Tuple[int, int]] = []
+        for entry in entries:
+            if entry["op"] == "add":
+                if entry["id"] in self._rows:
+                    # Re-added ID (upsert): the older row is dead
+                    dead.append(self._rows[entry["id"]])
+                    self._metadata[self._rows[entry["id"]]] = None
+                self._rows[entry["id"]] = len(self._ids)
+                self._ids.append(entry["id"])
+                self._metadata.append(entry["metadata"])
+                lines.append(entry["line"])
+            elif entry["op"] == "del" and entry["id"] in self._rows:
+                row = self._rows.pop(entry["id"])
+                self._metadata[row] = None
+                dead.append(row)
+                deleted += 1
+            elif entry["op"] == "meta" and entry["id"] in self._rows:
+                row = self._rows[entry["id"]]
+                self._metadata[row].update(entry["metadata"])
+                if row < first and any(
+                    field in FILTER_FIELDS for field in entry["metadata"]
+                ):
+                    changed.append(row)
+
+        if lines:
+            added = self._build_columns([m or {} for m in self._metadata[first:]])
+            self._columns = {
+                field: np.concatenate([column, added[field]])
+                for field, column in self._columns.items()
+            }
+            self._alive = np.concatenate([self._alive, np.ones(len(lines), dtype=bool)])
+            positions = np.array(lines, dtype=np.int64)
+            self._line_offsets = np.concatenate([self._line_offsets, positions[:, 0]])
+            self._line_lengths = np.concatenate([self._line_lengths, positions[:, 1]])
+        for row in changed:
+            if self._metadata[row] is not None:
+                updated = self._build_columns([self._metadata[row]])
+                for field, column in self._columns.items():
+                    column[row] = updated[field][0]
+        if dead:
+            self._alive[dead] = False
+        self._deleted = len(self._ids) - int(self._alive.sum())
+        if lines or reset:
+            self._remap()
+        return deleted
+
+    def _replace_reader(self, reader) -> None:
+        """Switch the log file texts are read from, closing the old one when unused"""
+        if self._reader is not None and self._reader is not reader:
+            self._retired_readers.append(self._reader)
+        self._reader = reader
+        self._close_retired_readers()
+
+    def _close_retired_readers(self) -> None:
+        if self._searches == 0:
+            for reader in self._retired_readers:
+                reader.close()
+            self._retired_readers = []
+
+    def _build_columns(self, metadatas: List[Dict[str, Any]]) -> Dict[str, np.ndarray]:
+        """Columnar copies of the filterable metadata fields"""
+        file_types = []
+        for metadata in metadatas:
+            file_type = metadata.get("file_type")
+            if file_type is None:
+                file_types.append(-1)
+            else:
+                file_types.append(
+                    self._file_type_codes.setdefault(
+                        file_type, len(self._file_type_codes)
+                    )
+                )
+        return {
+            "owner_id": np.array(
+                [m.get("owner_id", -1) for m in metadatas], dtype=np.int64
+            ),
+            "document_id": np.array(
+                [m.get("document_id", -1) for m in metadatas], dtype=np.int64
+            ),
+            "file_type": np.array(file_types, dtype=np.int32),
+            "created_at": np.array(
+                [_timestamp(m.get("created_at")) for m in metadatas], dtype=np.float64
+            ),
+        }
+
+    def _filter_mask(
+        self,
+        columns: Dict[str, np.ndarray],
+        search_filter: Optional[SearchFilter],
+        count: int,
+    ) -> Optional[np.ndarray]:
+        if search_filter is None or search_filter.is_empty():
+            return None
+        mask = np.ones(count, dtype=bool)
+        if search_filter.owner_id is not None:
+            mask &= columns["owner_id"][:count] == search_filter.owner_id
+        if search_filter.document_ids is not None:
+            mask &= np.isin(columns["document_id"][:count], search_filter.document_ids)
+        if search_filter.file_types is not None:
+            codes = [self._file_type_codes.get(t, -2) for t in search_filter.file_types]
+            mask &= np.isin(columns["file_type"][:count], codes)
+        if search_filter.created_after is not None:
+            mask &= columns["created_at"][:count] >= _timestamp(
+                search_filter.created_after
+            )
+        if search_filter.created_before is not None:
+            mask &= columns["created_at"][:count] <= _timestamp(
+                search_filter.created_before
+            )
+        return mask
+
+    def _remap(self) -> None:
+        count = len(self._ids)
+        if count == 0 or not self._dim:
+            self._matrix = np.empty((0, self._dim or 0), dtype=np.float32)
+        else:
+            self._matrix = np.memmap(
+                self._file("vectors"),
+                dtype=np.float32,
+                mode="r",
+                shape=(count, self._dim),
+            )
+
+    async def sync(self) -> None:
+        """Apply entries written by other processes since the last call"""
+        async with self._lock:
+
+            def read() -> _LogBatch:
+                with self._file_lock(fcntl.LOCK_SH):
+                    return self._read_new()
+
+            self._apply(await asyncio.to_thread(read))
+
+    def _maybe_compact(self) -> None:
+        if self._deleted > self.compact_ratio * len(self._ids):
+            self._schedule(self.compact())
+
+    # VectorStore API
+
+    async def add_documents(self, documents: List[Dict[str, Any]]) -> List[str]:
+        """
+        Append documents durably; returns their IDs. A document whose "id" is
+        already stored replaces it (the old row becomes a tombstone).
+        """
+        if not documents:
+            return []
+        vectors = normalize_rows(
+            np.asarray([doc["embedding"] for doc in documents], dtype=np.float32)
+        )
+        ids = [doc.get("id") or uuid.uuid4().hex for doc in documents]
+        entries = [
+            {
+                "op": "add",
+                "id": id,
+                "text": doc["text"],
+                "metadata": doc.get("metadata", {}),
+            }
+            for id, doc in zip(ids, documents)
+        ]
+
+        async with self._lock:
+            self._apply(await asyncio.to_thread(self._write, entries, vectors))
+
+        self._maybe_rebuild_index()
+        self._maybe_compact()
+        return ids
+
+    def _search_sync(
+        self, snapshot, query: np.ndarray, k: int, search_filter: Optional[SearchFilter]
+    ) -> List[Tuple[int, float, str]]:
+        matrix, alive, columns, index, count, line_offsets, line_lengths, reader = (
+            snapshot
+        )
+        mask = alive[:count]
+        filter_mask = self._filter_mask(columns, search_filter, count)
+        if filter_mask is not None:
+            mask = mask & filter_mask
+
+        hits = None
+        if index is not None:
+            # Highly selective filters are cheaper to scan exactly than to probe
+            probe_budget = self.nprobe * index.size // len(index.centroids)
+            if filter_mask is None or int(mask.sum()) > probe_budget:
+                candidates = np.concatenate(
+                    [index.candidates(query, self.nprobe), np.arange(index.size, count)]
+                )
+                candidates = candidates[mask[candidates]]
+                if len(candidates) >= k:
+                    scores = np.asarray(matrix[candidates]) @ query
+                    hits = [
+                        (int(candidates[i]), float(scores[i])) for i in top_k(scores, k)
+                    ]
+
+        if hits is None:
+            rows = np.flatnonzero(mask)
+            if len(rows) == count:
+                scores = np.asarray(matrix[:count]) @ query
+            else:
+                scores = np.asarray(matrix[rows]) @ query
+            hits = [(int(rows[i]), float(scores[i])) for i in top_k(scores, k)]
+
+        results = []
+        for row, score in hits:
+            line = os.pread(
+                reader.fileno(), int(line_lengths[row]), int(line_offsets[row])
+            )
+            results.append((row, score, json.loads(line)["text"]))
+        return results
+
+    async def similarity_search(
+        self,
+        query: str,
+        k: int = 5,
+        query_embedding: Optional[List[float]] = None,
+        search_filter: Optional[SearchFilter] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Cosine top-k over live rows matching the filter (exact, or IVF above the
+        size threshold)
+        """
+        query_embedding = await self.embed_query(query, query_embedding)
+        await self.sync()
+        if not self._ids:
+            return []
+        self._maybe_rebuild_index()  # Reloaded large collections start without an index
+        q = normalize_rows(np.asarray(query_embedding, dtype=np.float32))
+
+        # Snapshot state so a concurrent sync or compaction can swap it safely
+        ids, metadata = self._ids, self._metadata
+        snapshot = (
+            self._matrix,
+            self._alive,
+            self._columns,
+            self._index,
+            len(ids),
+            self._line_offsets,
+            self._line_lengths,
+            self._reader,
+        )
+        self._searches += 1
+        try:
+            hits = await asyncio.to_thread(
+                self._search_sync, snapshot, q, k, search_filter
+            )
+        finally:
+            self._searches -= 1
+            self._close_retired_readers()
+
+        results = []
+        for row, score, text in hits:
+            if metadata[row] is None:
+                continue
+            results.append(
+                {
+                    "id": ids[row],
+                    "text": text,
+                    "metadata": metadata[row],
+                    "score": score,
+                }
+            )
+        return results
+
+    async def delete_documents(self, ids: List[str]) -> bool:
+        """Tombstone documents; space is reclaimed by background compaction"""
+        if not ids:
+            return False
+        async with self._lock:
+            deleted = self._apply(
+                await asyncio.to_thread(
+                    self._write, [{"op": "del", "id": id} for id in ids]
+                )
+            )
+
+        self._maybe_compact()
+        return deleted > 0
+
+    async def delete_by_document(self, document_id: int) -> int:
+        await self.sync()
+        rows = np.flatnonzero(
+            (self._columns["document_id"] == document_id) & self._alive
+        )
+        ids = [self._ids[row] for row in rows]
+        if ids:
+            await self.delete_documents(ids)
+        return len(ids)
+
+    async def get_document_chunks(self, document_id: int) -> List[Dict[str, Any]]:
+        await self.sync()
+        rows = np.flatnonzero(
+            (self._columns["document_id"] == document_id) & self._alive
+        )
+        return [
+            {"id": self._ids[row], "metadata": self._metadata[row]}
+            for row in rows
+            if self._metadata[row] is not None
+        ]
+
+    async def update_metadata(self, updates: Dict[str, Dict[str, Any]]) -> None:
+        """Log metadata changes and apply them to records and filter columns"""
+        entries = [
+            {"op": "meta", "id": id, "metadata": fields}
+            for id, fields in updates.items()
+        ]
+        if not entries:
+            return
+        async with self._lock:
+            self._apply(await asyncio.to_thread(self._write, entries))
+
+    async def ensure_indexes(self) -> None:
+        """Check stored vectors match the embedding provider's dimensions"""
+        dimensions = await self.embedding_provider().get_dimensions()
+        check_dimensions(self.path, self._dim, dimensions)
+
+    # Background maintenance
+
+    def _schedule(self, coro) -> None:
+        if self._background is None or self._background.done():
+            self._background = asyncio.create_task(coro)
+        else:
+            coro.close()
+
+    def _maybe_rebuild_index(self) -> None:
+        count = len(self._ids)
+        if count < self.ann_threshold:
+            return
+        stale = self._index is None or count - self._index.size > 0.2 * self._index.size
+        if stale and (self._index_task is None or self._index_task.done()):
+            self._index_task = asyncio.create_task(self._rebuild_index())
+
+    async def _rebuild_index(self) -> None:
+        generation, matrix = self._generation, self._matrix
+        index = await asyncio.to_thread(IVFIndex.build, matrix)
+        # Row numbers change on compaction; discard an index built on old rows
+        if generation == self._generation:
+            self._index = index
+
+    def _compact_sync(self) -> bool:
+        """
+        Rewrite the current generation's live rows into the next one. Works
+        from the files rather than this process's state, which may be behind.
+        """
+        with self._file_lock(fcntl.LOCK_EX):
+            meta = self._read_meta()
+            old, dim = meta["generation"], meta["dim"]
+            # id -> (row, log line offset, line length, metadata updates)
+            live: Dict[str, Tuple[int, int, int, Dict[str, Any]]] = {}
+            rows = 0
+            try:
+                with open(self._file("log", old), "rb") as f:
+                    offset = 0
+                    for line in f:
+                        if not line.endswith(b"\n"):
+                            break
+                        try:
+                            entry = json.loads(line)
+                        except json.JSONDecodeError:
+                            entry = None
+                        if entry is None:
+                            pass
+                        elif entry["op"] == "add":
+                            live.pop(entry["id"], None)
+                            live[entry["id"]] = (rows, offset, len(line), {})
+                            rows += 1
+                        elif entry["op"] == "del":
+                            live.pop(entry["id"], None)
+                        elif entry["op"] == "meta" and entry["id"] in live:
+                            live[entry["id"]][3].update(entry["metadata"])
+                        offset += len(line)
+            except FileNotFoundError:
+                return False
+            # Another process compacted first
+            if not dim or rows - len(live) <= self.compact_ratio * rows:
+                return False
+
+            matrix = np.memmap(
+                self._file("vectors", old),
+                dtype=np.float32,
+                mode="r",
+                shape=(rows, dim),
+            )
+            order = np.array([row for row, _, _, _ in live.values()], dtype=np.int64)
+            with open(self._file("vectors", old + 1), "wb") as f:
+                for start in range(0, len(order), 65536):
+                    f.write(np.asarray(matrix[order[start : start + 65536]]).tobytes())
+                f.flush()
+                os.fsync(f.fileno())
+            del matrix
+
+            with open(self._file("log", old), "rb") as src, open(
+                self._file("log", old + 1), "wb"
+            ) as f:
+                for _, offset, length, updates in live.values():
+                    entry = json.loads(os.pread(src.fileno(), length, offset))
+                    entry["metadata"].update(updates)
+                    f.write((json.dumps(entry, default=str) + "\n").encode())
+                f.flush()
+                os.fsync(f.fileno())
+
+            # Switching meta.json is the commit point for every process. Old
+            # files stay readable to processes that still have them open.
+            self._write_meta(dim, old + 1)
+            for kind in ("vectors", "log"):
+                try:
+                    os.remove(self._file(kind, old))
+                except FileNotFoundError:
+                    pass
+        return True
+
+    async def compact(self) -> None:
+        """Rewrite live rows into a new generation; all processes reload it"""
+        if await asyncio.to_thread(self._compact_sync):
+            await self.sync()
+            self._maybe_rebuild_index()
+
+    async def close(self) -> None:
+        """Wait for background compaction and index builds, then close the log"""
+        for task in (self._background, self._index_task):
+            if task is not None:
+                await asyncio.gather(task, return_exceptions=True)
+        async with self._lock:
+            # The next sync reopens it if the store is used again
+            self._replace_reader(None)
@@ -0,0 +1,118 @@
+import math
+import struct
+from typing import List, Dict, Any, Optional, Sequence, Union
+
+import numpy as np
+
+from app.core.config import settings
+
+# Stored-vector quantization modes (VECTOR_QUANTIZATION)
+QUANTIZATION_MODES = ("none", "int8", "binary")
+
+# BSON binary subtype 9 ("vector") dtype bytes
+BSON_VECTOR_SUBTYPE = 9
+BSON_INT8 = 0x03
+BSON_FLOAT32 = 0x27
+BSON_PACKED_BIT = 0x10
+
+
+def quantization_mode() -> str:
+    mode = settings.VECTOR_QUANTIZATION
+    if mode not in QUANTIZATION_MODES:
+        raise ValueError(f"Unknown vector quantization: {mode}")
+    return mode
+
+
+def oversampled_limit(k: int) -> int:
+    """Candidates to fetch so rescoring with full vectors can restore recall"""
+    if quantization_mode() == "none":
+        return k
+    return max(k, math.ceil(k * settings.VECTOR_QUANTIZATION_OVERSAMPLING))
+
+
+def pack_bson_vector(vector: Sequence[float]):
+    """
+    Pack a vector as a BSON binary float32 vector (subtype 9): 4 bytes per
+    dimension instead of the ~13-17 bytes of a BSON array of doubles
+    """
+    from bson.binary import Binary
+
+    data = np.asarray(vector, dtype="<f4").tobytes()
+    return Binary(
+        struct.pack("<BB", BSON_FLOAT32, 0) + data, subtype=BSON_VECTOR_SUBTYPE
+    )
+
+
+def unpack_bson_vector(value: Union[bytes, List[float]]) -> np.ndarray:
+    """Decode a stored embedding (BSON binary vector or plain array) to float32"""
+    if isinstance(value, (list, tuple)):
+        return np.asarray(value, dtype=np.float32)
+    data = bytes(value)
+    dtype, padding = data[0], data[1]
+    if dtype == BSON_FLOAT32:
+        return np.frombuffer(data, dtype="<f4", offset=2).astype(np.float32)
+    if dtype == BSON_INT8:
+        return np.frombuffer(data, dtype=np.int8, offset=2).astype(np.float32)
+    if dtype == BSON_PACKED_BIT:
+        bits = np.unpackbits(np.frombuffer(data, dtype=np.uint8, offset=2))
+        if padding:
+            bits = bits[:-padding]
+        return bits.astype(np.float32) * 2 - 1
+    raise ValueError(f"Unknown BSON vector dtype: {dtype:#x}")
+
+
+def rescore(
+    results: List[Dict[str, Any]],
+    query_embedding: Sequence[float],
+    k: int,
+    vector_key: str = "embedding",
+) -> List[Dict[str, Any]]:
+    """
+    Re-rank oversampled candidates by exact cosine against their full
+    vectors and keep the top k. Scores use the (1 + cos) / 2 scale of Atlas
+    vectorSearchScore so they stay comparable with unquantized results.
+    """
+    if not results:
+        return results
+    query = np.asarray(query_embedding, dtype=np.float32)
+    query /= np.linalg.norm(query) or 1.0
+    vectors = np.stack([unpack_bson_vector(doc.pop(vector_key)) for doc in results])
+    norms = np.linalg.norm(vectors, axis=1)
+    norms[norms == 0] = 1.0
+    cosine = (vectors @ query) / norms
+    for doc, value in zip(results, cosine):
+        doc["score"] = float((1 + value) / 2)
+    return sorted(results, key=lambda doc: doc["score"], reverse=True)[:k]
+
+
+def qdrant_quantization_config(mode: Optional[str] = None):
+    """Qdrant quantization config for the mode, kept in RAM; None for "none" """
+    from qdrant_client import models
+
+    mode = mode or quantization_mode()
+    if mode == "int8":
+        return models.ScalarQuantization(
+            scalar=models.ScalarQuantizationConfig(
+                type=models.ScalarType.INT8, quantile=0.99, always_ram=True
+            )
+        )
+    if mode == "binary":
+        return models.BinaryQuantization(
+            binary=models.BinaryQuantizationConfig(always_ram=True)
+        )
+    return None
+
+
+def qdrant_search_params():
+    """Search with quantized vectors, then rescore oversampled hits with originals"""
+    from qdrant_client import models
+
+    if quantization_mode() == "none":
+        return None
+    return models.SearchParams(
+        quantization=models.QuantizationSearchParams(
+            ignore=False,
+            rescore=settings.VECTOR_QUANTIZATION_RESCORE,
+            oversampling=settings.VECTOR_QUANTIZATION_OVERSAMPLING,
+        )
+    )
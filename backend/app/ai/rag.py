@@ -1,117 +1,631 @@
-from typing import List, Dict, Any
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain_openai import ChatOpenAI, OpenAIEmbeddings
-from langchain.prompts import ChatPromptTemplate
+import asyncio
+import time
+from typing import List, Dict, Any, Optional, AsyncIterator, Tuple
 from app.core.config import settings
-from app.ai.vector_store import get_vector_store
+from app.ai.vector_store import get_vector_store, assign_vector_ids, SearchFilter
+from app.ai.ingestion import EmbeddingPipeline, ChunkMatcher, chunk_hash
+from app.ai.embeddings import get_embedding_provider
+from app.ai.answer_cache import SemanticAnswerCache
+from app.ai.summarizer import MapReduceSummarizer, get_summary_cache
+from app.ai.context import ContextBuilder, context_window
+from app.ai.conversation import ConversationContext, ConversationMemory
+from app.ai.lexical_index import get_lexical_index, reciprocal_rank_fusion
+from app.ai.llm_gateway import BACKGROUND, INTERACTIVE, LLMGateway
+from app.core.metrics import metrics
+from app.core.tracing import current_span, span, traced
+
+RETRIEVAL_LATENCY = metrics.histogram(
+    "rag_retrieval_seconds", "Query embedding plus vector search latency"
+)
+TIME_TO_FIRST_TOKEN = metrics.histogram(
+    "rag_time_to_first_token_seconds", "Request start to first streamed LLM token"
+)
+GENERATION_LATENCY = metrics.histogram(
+    "rag_generation_seconds", "LLM generation latency after retrieval", ["mode"]
+)
+LLM_TOKENS = metrics.counter(
+    "llm_tokens_total", "LLM tokens used by RAG answers", ["kind"]
+)
+PROMPT_TOKENS = metrics.histogram(
+    "rag_prompt_tokens",
+    "Estimated prompt tokens per answer",
+    buckets=(250, 500, 1000, 2000, 4000, 8000, 16000, 32000),
+)
+
+
+def record_token_usage(current, usage: Optional[Dict[str, Any]]) -> None:
+    """Count an LLM response's token usage and attach it to the span"""
+    if not usage:
+        return
+    LLM_TOKENS.inc(usage.get("input_tokens", 0), kind="input")
+    LLM_TOKENS.inc(usage.get("output_tokens", 0), kind="output")
+    current.set(
+        input_tokens=usage.get("input_tokens"), output_tokens=usage.get("output_tokens")
+    )
 
 
 class RAGService:
-    """Service for Retrieval Augmented Generation"""
+    """
+    Service for Retrieval Augmented Generation. Created in the app lifespan
+    (see app.api.deps.get_rag_service) or once per worker process, never at
+    import time: langchain and the vector store clients are slow to load.
+    """
 
     def __init__(self):
+        from langchain.text_splitter import RecursiveCharacterTextSplitter
+        from langchain_openai import ChatOpenAI
+
         self.llm = ChatOpenAI(
             model=settings.OPENAI_MODEL,
             api_key=settings.OPENAI_API_KEY,
+            base_url=settings.OPENAI_BASE_URL,
             temperature=0.7,
+            stream_usage=True,  # Token counts on streamed answers too
         )
-        self.embeddings = OpenAIEmbeddings(
-            model=settings.EMBEDDING_MODEL, api_key=settings.OPENAI_API_KEY
-        )
+        # Chat answers and summaries share one gateway; chat is served first
+        self.gateway = LLMGateway()
+        self.chat_llm = self.gateway.model(self.llm, INTERACTIVE)
+        background_llm = self.gateway.model(self.llm, BACKGROUND)
         self.vector_store = get_vector_store()
+        self.lexical_index = get_lexical_index()
+        self.answer_cache = None
+        if settings.ANSWER_CACHE_ENABLED:
+            redis_url = (
+                settings.REDIS_URL if settings.ANSWER_CACHE_REDIS_ENABLED else None
+            )
+            self.answer_cache = SemanticAnswerCache(redis_url=redis_url)
         self.text_splitter = RecursiveCharacterTextSplitter(
             chunk_size=1000, chunk_overlap=200, length_function=len
         )
+        self.summarizer = MapReduceSummarizer(background_llm, cache=get_summary_cache())
+        self.context_builder = ContextBuilder()
+        # Follow-up rewrites are on the answer's critical path; summaries are not
+        self.memory = ConversationMemory(self.chat_llm, background_llm)
 
-    async def process_document(
-        self, text: str, metadata: Dict[str, Any]
-    ) -> List[str]:
+    @property
+    def embeddings(self):
+        """Shared async embedding provider, created in the app lifespan"""
+        return get_embedding_provider()
+
+    @traced("rag.process_document")
+    async def process_document(self, text: str, metadata: Dict[str, Any]) -> List[str]:
         """
         Process a document: split into chunks, create embeddings, store in vector DB
+        metadata should carry owner_id, document_id, file_type and created_at so
+        retrieval can be filtered inside the index
         """
         # Split text into chunks
+        with span("rag.split", characters=len(text)) as current:
+            chunks = self.text_splitter.split_text(text)
+            current.set(chunks=len(chunks))
+
+        # Embed in token-budgeted batches and stream them into the vector store
+        pipeline = EmbeddingPipeline(self.embeddings, self.vector_store)
+        with span("rag.embed_and_store", chunks=len(chunks)):
+            ids = await pipeline.run(chunks, metadata)
+
+        # Re-ingested content may change cached answers; new content may answer
+        # questions that previously found nothing
+        if self.answer_cache is not None:
+            document_id = metadata.get("document_id")
+            await self.answer_cache.invalidate(
+                document_ids=[document_id] if document_id is not None else None,
+                unsourced=True,
+            )
+        return ids
+
+    @traced("rag.reingest_document")
+    async def reingest_document(
+        self, text: str, metadata: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """
+        Re-ingest a changed document, embedding only new or changed chunks.
+        Chunks whose content hash is already stored for metadata["document_id"]
+        are reused (with chunk_index/total_chunks corrected) and chunks that no
+        longer exist are deleted. Returns the new vector IDs and diff counts.
+        """
+        document_id = metadata["document_id"]
         chunks = self.text_splitter.split_text(text)
+        total_chunks = len(chunks)
+        stored_chunks = await self.vector_store.get_document_chunks(document_id)
+        matcher = ChunkMatcher(stored_chunks)
 
-        # Create embeddings for each chunk
-        documents = []
+        ids: List[Optional[str]] = [None] * total_chunks
+        reindexed: Dict[str, Dict[str, Any]] = {}
+        added: List[int] = []
         for i, chunk in enumerate(chunks):
-            embedding = await self.embeddings.aembed_query(chunk)
-            documents.append(
-                {
-                    "text": chunk,
-                    "embedding": embedding,
-                    "metadata": {**metadata, "chunk_index": i, "total_chunks": len(chunks)},
-                }
+            stored = matcher.match(chunk_hash(chunk))
+            if stored is None:
+                added.append(i)
+                continue
+            ids[i] = stored["id"]
+            position = {"chunk_index": i, "total_chunks": total_chunks}
+            if any(
+                stored["metadata"].get(key) != value for key, value in position.items()
+            ):
+                reindexed[stored["id"]] = position
+        removed = [chunk["id"] for chunk in matcher.unmatched()]
+        current_span().set(
+            chunks=total_chunks,
+            added=len(added),
+            removed=len(removed),
+            reindexed=len(reindexed),
+        )
+
+        # Add first and delete last so the document stays searchable throughout
+        pipeline = EmbeddingPipeline(self.embeddings, self.vector_store)
+        added_texts = [chunks[i] for i in added]
+        if added:
+            embeddings = await pipeline.embed(added_texts)
+            # Skip IDs still held by stored chunks, which are deleted only at the end
+            new_ids = assign_vector_ids(
+                document_id,
+                [chunk_hash(text) for text in added_texts],
+                taken={chunk["id"] for chunk in stored_chunks},
+            )
+            await self.vector_store.add_documents(
+                [
+                    {
+                        "id": vector_id,
+                        "text": chunks[i],
+                        "embedding": embedding,
+                        "metadata": {
+                            **metadata,
+                            "chunk_index": i,
+                            "total_chunks": total_chunks,
+                            "chunk_hash": chunk_hash(chunks[i]),
+                        },
+                    }
+                    for i, vector_id, embedding in zip(added, new_ids, embeddings)
+                ]
             )
+            for i, vector_id in zip(added, new_ids):
+                ids[i] = vector_id
+        await self.vector_store.update_metadata(reindexed)
+        if removed:
+            await self.vector_store.delete_documents(removed)
 
-        # Store in vector database
-        ids = await self.vector_store.add_documents(documents)
-        return ids
+        if self.answer_cache is not None:
+            await self.answer_cache.invalidate(
+                vector_ids=removed, document_ids=[document_id], unsourced=True
+            )
 
-    async def query(
-        self, question: str, k: int = 5, conversation_history: List[Dict] = None
-    ) -> Dict[str, Any]:
+        return {
+            "ids": ids,
+            "reused": total_chunks - len(added),
+            "added": len(added),
+            "removed": len(removed),
+            "reindexed": len(reindexed),
+            "embedding_requests_saved": len(pipeline.make_batches(chunks))
+            - len(pipeline.make_batches(added_texts)),
+        }
+
+    async def retrieve(
+        self,
+        question: str,
+        k: int = 5,
+        search_filter: Optional[SearchFilter] = None,
+        query_embedding: Optional[List[float]] = None,
+        mode: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
         """
-        Answer a question using RAG
+        Embed the question (unless already embedded) and fetch the top-k chunks.
+        mode="hybrid" fuses vector and BM25 hits with reciprocal rank fusion;
+        it falls back to vector search when the lexical index is disabled.
         """
-        # Retrieve relevant documents
-        relevant_docs = await self.vector_store.similarity_search(question, k=k)
+        if query_embedding is None:
+            query_embedding = await self._embed_query(question)
+        if self._retrieval_mode(mode) != "hybrid":
+            return await self.vector_store.similarity_search(
+                question,
+                k=k,
+                query_embedding=query_embedding,
+                search_filter=search_filter,
+            )
+
+        depth = k * settings.HYBRID_CANDIDATE_MULTIPLIER
+        vector_hits, lexical_hits = await asyncio.gather(
+            self.vector_store.similarity_search(
+                question,
+                k=depth,
+                query_embedding=query_embedding,
+                search_filter=search_filter,
+            ),
+            self._lexical_search(question, depth, search_filter),
+        )
+        return reciprocal_rank_fusion([vector_hits, lexical_hits], limit=k)
 
-        # Build context from retrieved documents
-        context = "\n\n".join([doc["text"] for doc in relevant_docs])
+    async def _embed_query(self, question: str) -> List[float]:
+        with span("rag.embed_query"):
+            return await self.embeddings.aembed_query(question)
+
+    async def _lexical_search(
+        self, question: str, k: int, search_filter: Optional[SearchFilter]
+    ) -> List[Dict[str, Any]]:
+        with span("lexical.search", k=k) as current:
+            hits = await self.lexical_index.search(
+                question, k=k, search_filter=search_filter
+            )
+            current.set(results=len(hits))
+            return hits
+
+    async def _retrieve_traced(
+        self,
+        question: str,
+        k: int,
+        search_filter: Optional[SearchFilter],
+        query_embedding: List[float],
+        mode: Optional[str],
+    ) -> List[Dict[str, Any]]:
+        with span("rag.retrieve", k=k, mode=self._retrieval_mode(mode)) as current:
+            docs = await self.retrieve(
+                question, k, search_filter, query_embedding, mode
+            )
+            current.set(chunks=len(docs))
+            return docs
+
+    async def _standalone_question(
+        self, question: str, conversation: ConversationContext
+    ) -> Tuple[str, Optional[int]]:
+        """Follow-up question rewritten for retrieval, and the tokens that took"""
+        if not conversation:
+            return question, None
+        with span(
+            "rag.rewrite_query", history_messages=len(conversation.messages)
+        ) as current:
+            rewritten, tokens = await self.memory.rewrite_query(question, conversation)
+            current.set(rewrite_tokens=tokens)
+            return rewritten, tokens
+
+    async def _build_context(
+        self,
+        question: str,
+        relevant_docs: List[Dict[str, Any]],
+        conversation: Optional[ConversationContext] = None,
+    ):
+        budget = None
+        if conversation:
+            # Conversation memory shares the model's window with the context
+            window = context_window(self.context_builder.model)
+            budget = window - settings.CONTEXT_RESERVED_TOKENS - conversation.tokens
+        with span("rag.build_context", candidates=len(relevant_docs)) as current:
+            context = await self.context_builder.build(question, relevant_docs, budget)
+            current.set(
+                chunks=len(context.docs),
+                context_tokens=context.tokens,
+                context_tokens_saved=context.tokens_saved,
+            )
+            return context
+
+    def _lookup_cache(self, cache_scope: Optional[str], query_embedding: List[float]):
+        if cache_scope is None:
+            return None
+        with span("rag.answer_cache") as current:
+            cached = self.answer_cache.lookup(cache_scope, query_embedding)
+            current.set(hit=cached is not None)
+            return cached
+
+    def _retrieval_mode(self, mode: Optional[str]) -> str:
+        mode = mode or settings.RETRIEVAL_MODE
+        if mode == "hybrid" and self.lexical_index is None:
+            return "vector"
+        return mode
+
+    @staticmethod
+    def build_messages(
+        question: str, context: str, conversation: Optional[ConversationContext] = None
+    ):
+        """Build the chat prompt from the assembled context and conversation memory"""
+        from langchain.prompts import ChatPromptTemplate
+        from langchain_core.messages import AIMessage, HumanMessage
+
+        system = (
+            "You are an AI assistant helping employees find information from "
+            "company documents.\n"
+            "Use the following context to answer the question. If you cannot find "
+            "the answer in the context, say so.\n"
+            "Be concise and accurate.\n\n"
+            "Context:\n{context}"
+        )
+        summary = conversation.summary if conversation else None
+        if summary:
+            system += "\n\nSummary of the earlier conversation:\n{summary}"
 
         # Create prompt
         prompt_template = ChatPromptTemplate.from_messages(
-            [
+            [("system", system), ("human", "{question}")]
+        )
+        messages = prompt_template.format_messages(
+            context=context, question=question, summary=summary
+        )
+        if conversation:
+            # Inserted as messages, not template text: history may contain braces
+            messages[1:1] = [
                 (
-                    "system",
-                    """You are an AI assistant helping employees find information from company documents.
-Use the following context to answer the question. If you cannot find the answer in the context, say so.
-Be concise and accurate.
-
-Context:
-{context}""",
-                ),
-                ("human", "{question}"),
+                    HumanMessage(m["content"])
+                    if m["role"] == "user"
+                    else AIMessage(m["content"])
+                )
+                for m in conversation.messages
             ]
+        return messages
+
+    def _prompt_usage(
+        self,
+        messages,
+        context,
+        conversation: ConversationContext,
+        rewrite_tokens: Optional[int],
+        llm_usage: Optional[Dict[str, Any]],
+    ) -> Dict[str, Any]:
+        """Per-turn token report: what went into the prompt and what the LLM billed"""
+        prompt_tokens = sum(
+            self.memory.message_tokens({"content": message.content})
+            for message in messages
+        )
+        PROMPT_TOKENS.observe(prompt_tokens)
+        usage = {
+            "context_tokens": context.tokens,
+            "context_tokens_saved": context.tokens_saved,
+            "prompt_tokens": prompt_tokens,
+            "summary_tokens": conversation.summary_tokens,
+            "history_tokens": conversation.history_tokens,
+            "history_messages": len(conversation.messages),
+            "rewrite_tokens": rewrite_tokens,
+        }
+        if llm_usage:
+            usage["input_tokens"] = llm_usage.get("input_tokens")
+            usage["output_tokens"] = llm_usage.get("output_tokens")
+        return usage
+
+    @staticmethod
+    def format_sources(relevant_docs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        return [
+            {
+                "text": doc["text"][:200] + "...",
+                "metadata": doc.get("metadata", {}),
+                "score": doc.get("score", 0),
+            }
+            for doc in relevant_docs
+        ]
+
+    @traced("rag.query")
+    async def query(
+        self,
+        question: str,
+        k: int = 5,
+        conversation_history: List[Dict] = None,
+        search_filter: Optional[SearchFilter] = None,
+        mode: Optional[str] = None,
+        conversation_summary: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """
+        Answer a question using RAG, optionally scoped by search_filter (e.g. owner_id).
+        mode selects "vector" or "hybrid" retrieval (default RETRIEVAL_MODE).
+        conversation_history ({"role", "content"} dicts, oldest first) and
+        conversation_summary are fitted into CHAT_HISTORY_MAX_TOKENS and
+        CHAT_SUMMARY_MAX_TOKENS; follow-ups are retrieved with a standalone rewrite
+        """
+        start = time.perf_counter()
+        conversation = self.memory.fit(conversation_summary, conversation_history)
+        search_query, rewrite_tokens = await self._standalone_question(
+            question, conversation
         )
+        retrieval_start = time.perf_counter()
+        query_embedding = await self._embed_query(search_query)
+
+        # Answers to repeated questions are served from the semantic cache
+        cache_scope = self._cache_scope(search_filter, k, bool(conversation), mode)
+        cached = self._lookup_cache(cache_scope, query_embedding)
+        if cached is not None:
+            return {"answer": cached.answer, "sources": cached.sources, "cached": True}
+        epoch = self.answer_cache.epoch if cache_scope is not None else None
+
+        # Retrieve relevant documents
+        relevant_docs = await self._retrieve_traced(
+            search_query, k, search_filter, query_embedding, mode
+        )
+        retrieved = time.perf_counter()
+        RETRIEVAL_LATENCY.observe(retrieved - retrieval_start)
+
+        # Merge, deduplicate and pack retrieved chunks into the token budget
+        context = await self._build_context(search_query, relevant_docs, conversation)
 
         # Generate answer
-        messages = prompt_template.format_messages(context=context, question=question)
-        response = await self.llm.ainvoke(messages)
+        with span("rag.build_prompt"):
+            messages = self.build_messages(question, context.text, conversation)
+        with span("rag.llm", model=settings.OPENAI_MODEL, mode="blocking") as current:
+            response = await self.chat_llm.ainvoke(messages)
+            llm_usage = getattr(response, "usage_metadata", None)
+            record_token_usage(current, llm_usage)
+        finished = time.perf_counter()
+        GENERATION_LATENCY.observe(finished - retrieved, mode="blocking")
 
-        return {
+        sources = self.format_sources(context.docs)
+        if cache_scope is not None:
+            self.answer_cache.store(
+                cache_scope,
+                query_embedding,
+                question,
+                response.content,
+                sources,
+                relevant_docs,
+                finished - start,
+                epoch=epoch,
+            )
+
+        result = {
             "answer": response.content,
-            "sources": [
-                {
-                    "text": doc["text"][:200] + "...",
-                    "metadata": doc.get("metadata", {}),
-                    "score": doc.get("score", 0),
-                }
-                for doc in relevant_docs
-            ],
+            "sources": sources,
+            "cached": False,
+            "usage": self._prompt_usage(
+                messages, context, conversation, rewrite_tokens, llm_usage
+            ),
         }
+        if search_query != question:
+            result["search_query"] = search_query
+        return result
 
-    async def summarize_document(self, text: str, max_length: int = 500) -> str:
-        """Generate a summary of a document"""
-        prompt = ChatPromptTemplate.from_messages(
-            [
-                (
-                    "system",
-                    f"Summarize the following document in approximately {max_length} words. Be concise and capture the key points.",
-                ),
-                ("human", "{text}"),
-            ]
+    def _cache_scope(
+        self,
+        search_filter: Optional[SearchFilter],
+        k: int,
+        conversational: bool,
+        mode: Optional[str] = None,
+    ) -> Optional[str]:
+        """Cache scope for a query, or None when the answer must not be cached"""
+        if self.answer_cache is None or conversational:
+            return None
+        scope = SemanticAnswerCache.scope_key(search_filter, k)
+        # Hybrid retrieval can surface different chunks, so cache it separately
+        if self._retrieval_mode(mode) == "hybrid":
+            scope += "|hybrid"
+        return scope
+
+    async def stream_query(
+        self,
+        question: str,
+        k: int = 5,
+        conversation_history: List[Dict] = None,
+        search_filter: Optional[SearchFilter] = None,
+        mode: Optional[str] = None,
+        conversation_summary: Optional[str] = None,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Answer a question using RAG, yielding events as they become available:
+        `sources` once retrieval finishes, one `token` per LLM chunk, then `done`
+        with per-request latency metrics and token usage. Closing the generator
+        cancels the LLM call. Conversation arguments work as in query().
+        """
+        start = time.perf_counter()
+        conversation = self.memory.fit(conversation_summary, conversation_history)
+        search_query, rewrite_tokens = await self._standalone_question(
+            question, conversation
         )
+        retrieval_start = time.perf_counter()
+        query_embedding = await self._embed_query(search_query)
+
+        cache_scope = self._cache_scope(search_filter, k, bool(conversation), mode)
+        cached = self._lookup_cache(cache_scope, query_embedding)
+        if cached is not None:
+            elapsed_ms = round((time.perf_counter() - start) * 1000, 1)
+            yield {"type": "sources", "sources": cached.sources, "cached": True}
+            yield {"type": "token", "content": cached.answer}
+            yield {
+                "type": "done",
+                "cached": True,
+                "metrics": {
+                    "time_to_first_token_ms": elapsed_ms,
+                    "total_ms": elapsed_ms,
+                },
+            }
+            return
+        epoch = self.answer_cache.epoch if cache_scope is not None else None
 
-        messages = prompt.format_messages(text=text)
-        response = await self.llm.ainvoke(messages)
-        return response.content
+        relevant_docs = await self._retrieve_traced(
+            search_query, k, search_filter, query_embedding, mode
+        )
+        retrieved = time.perf_counter()
+        retrieval_seconds = retrieved - retrieval_start
+        RETRIEVAL_LATENCY.observe(retrieval_seconds)
+
+        context = await self._build_context(search_query, relevant_docs, conversation)
+        sources = self.format_sources(context.docs)
+        event = {
+            "type": "sources",
+            "sources": sources,
+            "retrieval_ms": round(retrieval_seconds * 1000, 1),
+        }
+        if search_query != question:
+            event["search_query"] = search_query
+        yield event
+
+        with span("rag.build_prompt"):
+            messages = self.build_messages(question, context.text, conversation)
+        first_token: Optional[float] = None
+        answer_parts: List[str] = []
+        llm_usage: Optional[Dict[str, Any]] = None
+        with span("rag.llm", model=settings.OPENAI_MODEL, mode="stream") as current:
+            async for chunk in self.chat_llm.astream(messages):
+                # With stream_usage the token counts arrive on a final empty chunk
+                if getattr(chunk, "usage_metadata", None):
+                    llm_usage = chunk.usage_metadata
+                    record_token_usage(current, llm_usage)
+                if not chunk.content:
+                    continue
+                if first_token is None:
+                    first_token = time.perf_counter()
+                    TIME_TO_FIRST_TOKEN.observe(first_token - start)
+                    current.set(
+                        time_to_first_token_ms=round((first_token - start) * 1000, 1)
+                    )
+                answer_parts.append(chunk.content)
+                yield {"type": "token", "content": chunk.content}
+
+        finished = time.perf_counter()
+        GENERATION_LATENCY.observe(finished - retrieved, mode="stream")
+
+        # Only complete answers are cached; a cancelled stream never gets here
+        if cache_scope is not None:
+            self.answer_cache.store(
+                cache_scope,
+                query_embedding,
+                question,
+                "".join(answer_parts),
+                sources,
+                relevant_docs,
+                finished - start,
+                epoch=epoch,
+            )
+
+        yield {
+            "type": "done",
+            "cached": False,
+            "metrics": {
+                "rewrite_ms": round((retrieval_start - start) * 1000, 1),
+                "retrieval_ms": round(retrieval_seconds * 1000, 1),
+                "time_to_first_token_ms": (
+                    round((first_token - start) * 1000, 1)
+                    if first_token is not None
+                    else None
+                ),
+                "generation_ms": round((finished - retrieved) * 1000, 1),
+                "total_ms": round((finished - start) * 1000, 1),
+            },
+            "usage": self._prompt_usage(
+                messages, context, conversation, rewrite_tokens, llm_usage
+            ),
+        }
+
+    @traced("rag.summarize_document")
+    async def summarize_document(self, text: str, max_length: int = 500) -> str:
+        """Generate a summary of a document (map-reduce for long documents)"""
+        return await self.summarizer.summarize(text, max_length)
 
     async def delete_document_embeddings(self, vector_ids: List[str]) -> bool:
         """Delete document embeddings from vector store"""
-        return await self.vector_store.delete_documents(vector_ids)
+        deleted = await self.vector_store.delete_documents(vector_ids)
+        # After the delete, so no answer built from these vectors is cached again
+        if self.answer_cache is not None:
+            await self.answer_cache.invalidate(vector_ids=vector_ids)
+        return deleted
+
+    async def delete_document(self, document_id: int) -> int:
+        """Delete every chunk of a document; returns how many were deleted"""
+        deleted = await self.vector_store.delete_by_document(document_id)
+        if self.answer_cache is not None:
+            await self.answer_cache.invalidate(document_ids=[document_id])
+        return deleted
 
+    async def start(self) -> None:
+        """Listen for answer cache invalidations published by ingestion workers"""
+        if self.answer_cache is not None:
+            await self.answer_cache.start()
 
-# Singleton instance
-rag_service = RAGService()
+    async def close(self) -> None:
+        """Close the vector store, answer cache and LLM HTTP clients"""
+        await self.vector_store.close()
+        if self.answer_cache is not None:
+            await self.answer_cache.close()
+        await self.llm.root_async_client.close()
+        await asyncio.to_thread(self.llm.root_client.close)
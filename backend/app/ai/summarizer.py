@@ -0,0 +1,285 @@
+import asyncio
+import hashlib
+from collections import OrderedDict
+from functools import lru_cache
+from typing import List, Dict, Any, Optional, AsyncIterator, Callable, Awaitable
+from app.core.config import settings
+from app.ai.ingestion import count_tokens
+
+ProgressCallback = Callable[[Dict[str, Any]], Awaitable[None]]
+
+# Prompt messages by name; templates are built on first use (langchain imports
+# slowly)
+PROMPT_MESSAGES = {
+    "document": [
+        (
+            "system",
+            "Summarize the following document in approximately {words} words. "
+            "Be concise and capture the key points.",
+        ),
+        ("human", "{text}"),
+    ],
+    "section": [
+        (
+            "system",
+            "Summarize the following section of a longer document in approximately "
+            "{words} words. Keep names, numbers and key facts.",
+        ),
+        ("human", "{text}"),
+    ],
+    "merge": [
+        (
+            "system",
+            "The following are summaries of consecutive sections of one document. "
+            "Combine them into a single summary of approximately {words} words. "
+            "Be concise and capture the key points.",
+        ),
+        ("human", "{text}"),
+    ],
+}
+
+
+@lru_cache(maxsize=None)
+def prompt_template(name: str):
+    from langchain.prompts import ChatPromptTemplate
+
+    return ChatPromptTemplate.from_messages(PROMPT_MESSAGES[name])
+
+
+class SummaryCache:
+    """
+    Summaries keyed by a hash of (model, prompt, target length, input text).
+
+    In-process LRU with an optional Redis tier shared by API and workers, so
+    re-summarizing an edited document only calls the LLM for changed sections.
+    """
+
+    def __init__(
+        self,
+        max_entries: Optional[int] = None,
+        redis_url: Optional[str] = None,
+        redis_ttl: Optional[int] = None,
+    ):
+        self.max_entries = max_entries or settings.SUMMARY_CACHE_MAX_ENTRIES
+        self.redis_ttl = redis_ttl or settings.SUMMARY_CACHE_TTL
+        self._entries: "OrderedDict[str, str]" = OrderedDict()
+        self._redis = None
+        if redis_url:
+            import redis.asyncio as aioredis
+
+            self._redis = aioredis.from_url(redis_url)
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(model: str, kind: str, words: int, text: str) -> str:
+        digest = hashlib.sha256(text.encode("utf-8")).hexdigest()
+        return f"sum:{model}:{kind}:{words}:{digest}"
+
+    async def get(self, key: str) -> Optional[str]:
+        summary = self._entries.get(key)
+        if summary is not None:
+            self._entries.move_to_end(key)
+        elif self._redis is not None:
+            try:
+                data = await self._redis.get(key)
+            except Exception:
+                data = None
+            if data is not None:
+                summary = data.decode("utf-8")
+                self._put_local(key, summary)
+        if summary is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return summary
+
+    async def set(self, key: str, summary: str) -> None:
+        self._put_local(key, summary)
+        if self._redis is not None:
+            try:
+                await self._redis.set(key, summary, ex=self.redis_ttl)
+            except Exception:
+                pass
+
+    def _put_local(self, key: str, summary: str) -> None:
+        self._entries[key] = summary
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def close(self) -> None:
+        if self._redis is not None:
+            await self._redis.aclose()
+
+
+class MapReduceSummarizer:
+    """
+    Hierarchical summarizer for documents larger than one prompt.
+
+    The text is split into sections that fit SUMMARY_CHUNK_TOKENS, sections are
+    summarized concurrently (bounded by SUMMARY_MAX_CONCURRENCY), and partial
+    summaries are merged in a tree, grouping as many as fit one prompt per
+    merge, until a single summary of about `max_length` words remains. Every
+    LLM result is cached by content hash.
+    """
+
+    def __init__(
+        self,
+        llm,
+        cache: Optional[SummaryCache] = None,
+        chunk_tokens: Optional[int] = None,
+        max_concurrency: Optional[int] = None,
+        section_words: Optional[int] = None,
+        model: Optional[str] = None,
+    ):
+        self.llm = llm
+        self.cache = cache
+        self.chunk_tokens = chunk_tokens or settings.SUMMARY_CHUNK_TOKENS
+        self.max_concurrency = max_concurrency or settings.SUMMARY_MAX_CONCURRENCY
+        self.section_words = section_words or settings.SUMMARY_SECTION_WORDS
+        self.model = model or settings.OPENAI_MODEL
+        from langchain.text_splitter import RecursiveCharacterTextSplitter
+
+        self.text_splitter = RecursiveCharacterTextSplitter(
+            chunk_size=self.chunk_tokens,
+            chunk_overlap=0,
+            length_function=self.count_tokens,
+        )
+
+    def count_tokens(self, text: str) -> int:
+        return count_tokens(text, self.model)
+
+    async def _summarize(
+        self, prompt: str, kind: str, text: str, words: int, semaphore
+    ) -> str:
+        key = SummaryCache.key(self.model, kind, words, text)
+        if self.cache is not None:
+            cached = await self.cache.get(key)
+            if cached is not None:
+                return cached
+        async with semaphore:
+            messages = prompt_template(prompt).format_messages(text=text, words=words)
+            response = await self.llm.ainvoke(messages)
+        summary = response.content
+        if self.cache is not None:
+            await self.cache.set(key, summary)
+        return summary
+
+    def _groups(self, summaries: List[str]) -> List[List[str]]:
+        """Consecutive summaries packed into groups that fit one merge prompt"""
+        groups: List[List[str]] = []
+        current: List[str] = []
+        current_tokens = 0
+        for summary in summaries:
+            tokens = self.count_tokens(summary)
+            if current and current_tokens + tokens > self.chunk_tokens:
+                groups.append(current)
+                current, current_tokens = [], 0
+            current.append(summary)
+            current_tokens += tokens
+        if current:
+            groups.append(current)
+        # Always reduce by at least half so the tree terminates
+        if len(groups) == len(summaries) and len(summaries) > 1:
+            groups = [summaries[i : i + 2] for i in range(0, len(summaries), 2)]
+        return groups
+
+    async def summarize(
+        self,
+        text: str,
+        max_length: int = 500,
+        on_progress: Optional[ProgressCallback] = None,
+    ) -> str:
+        """Summarize text of any length to about max_length words"""
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def report(**event: Any) -> None:
+            if on_progress is not None:
+                await on_progress({"type": "progress", **event})
+
+        sections = self.text_splitter.split_text(text)
+        if len(sections) <= 1:
+            await report(stage="map", done=0, total=1)
+            summary = await self._summarize(
+                "document", "document", text, max_length, semaphore
+            )
+            await report(stage="map", done=1, total=1)
+            return summary
+
+        async def run_level(
+            stage: str, level: int, inputs: List[str], kind: str
+        ) -> List[str]:
+            done = 0
+            await report(stage=stage, level=level, done=0, total=len(inputs))
+            prompt = "section" if kind == "section" else "merge"
+
+            async def one(text: str) -> str:
+                nonlocal done
+                summary = await self._summarize(
+                    prompt, kind, text, self.section_words, semaphore
+                )
+                done += 1
+                await report(stage=stage, level=level, done=done, total=len(inputs))
+                return summary
+
+            return await asyncio.gather(*(one(text) for text in inputs))
+
+        summaries = await run_level("map", 0, sections, "section")
+        level = 1
+        while True:
+            groups = self._groups(summaries)
+            if len(groups) == 1:
+                break
+            summaries = await run_level(
+                "reduce", level, ["\n\n".join(group) for group in groups], "merge"
+            )
+            level += 1
+
+        await report(stage="final", level=level, done=0, total=1)
+        summary = await self._summarize(
+            "merge", "final", "\n\n".join(summaries), max_length, semaphore
+        )
+        await report(stage="final", level=level, done=1, total=1)
+        return summary
+
+    async def stream(
+        self, text: str, max_length: int = 500
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Yield progress events, then {"type": "summary"} or {"type": "error"}
+        """
+        queue: asyncio.Queue = asyncio.Queue()
+
+        async def run() -> None:
+            try:
+                summary = await self.summarize(text, max_length, on_progress=queue.put)
+                await queue.put({"type": "summary", "summary": summary})
+            except Exception as e:
+                await queue.put({"type": "error", "detail": str(e)})
+
+        task = asyncio.create_task(run())
+        try:
+            while True:
+                event = await queue.get()
+                yield event
+                if event["type"] in ("summary", "error"):
+                    return
+        finally:
+            # Stops outstanding LLM calls when the client goes away
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+
+_summary_cache: Optional[SummaryCache] = None
+
+
+def get_summary_cache() -> SummaryCache:
+    global _summary_cache
+    if _summary_cache is None:
+        _summary_cache = SummaryCache(
+            redis_url=(
+                settings.REDIS_URL if settings.SUMMARY_CACHE_REDIS_ENABLED else None
+            )
+        )
+    return _summary_cache
@@ -1,19 +1,192 @@
-from typing import List, Dict, Any
+import asyncio
+import random
+import uuid
+from typing import (
+    List,
+    Dict,
+    Any,
+    Optional,
+    Callable,
+    Awaitable,
+    Sequence,
+    Set,
+    TypeVar,
+)
 from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from datetime import datetime
 from app.core.config import settings
+from app.core.tracing import span
+from app.ai.embeddings import get_embedding_provider
+from app.ai.quantization import (
+    oversampled_limit,
+    pack_bson_vector,
+    quantization_mode,
+    qdrant_quantization_config,
+    qdrant_search_params,
+    rescore,
+)
+
+# Metadata fields that can be filtered inside the index
+FILTER_FIELDS = ("owner_id", "document_id", "file_type", "created_at")
+
+# Namespace for deterministic vector IDs (uuid5 of document ID and chunk hash)
+VECTOR_ID_NAMESPACE = uuid.UUID("8f6c2a4e-1d3b-5c7e-9a0f-2b4d6e8a1c3f")
+
+T = TypeVar("T")
+
+
+def parse_datetime(value: Any) -> Optional[datetime]:
+    """Accept datetimes or ISO-8601 strings stored in chunk metadata"""
+    if value is None or isinstance(value, datetime):
+        return value
+    return datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+
+
+def check_dimensions(collection: str, stored: Optional[int], expected: int) -> None:
+    """Refuse to mix vectors of different sizes in one collection"""
+    if stored is not None and stored != expected:
+        raise ValueError(
+            f"Collection '{collection}' holds {stored}-dim vectors but the embedding "
+            f"provider returns {expected}-dim vectors; use a new collection for this "
+            "model"
+        )
+
+
+def vector_id(document_id: Any, chunk_hash: str, occurrence: int = 0) -> str:
+    """Deterministic ID for the nth chunk with this content in a document"""
+    return str(
+        uuid.uuid5(VECTOR_ID_NAMESPACE, f"{document_id}:{chunk_hash}:{occurrence}")
+    )
+
+
+def assign_vector_ids(
+    document_id: Any, chunk_hashes: Sequence[str], taken: Optional[Set[str]] = None
+) -> List[str]:
+    """
+    Deterministic IDs for a document's chunks, so a retried write overwrites
+    instead of duplicating. Repeated chunk texts get increasing occurrence
+    numbers, skipping IDs in `taken` (vectors the document already has);
+    `taken` is updated in place so chunks can be assigned group by group.
+    """
+    used = taken if taken is not None else set()
+    occurrences: Dict[str, int] = {}
+    ids = []
+    for digest in chunk_hashes:
+        while True:
+            occurrence = occurrences.get(digest, 0)
+            occurrences[digest] = occurrence + 1
+            id = vector_id(document_id, digest, occurrence)
+            if id not in used:
+                break
+        used.add(id)
+        ids.append(id)
+    return ids
+
+
+async def write_batches(
+    items: Sequence[T],
+    write: Callable[[Sequence[T]], Awaitable[Any]],
+    batch_size: Optional[int] = None,
+    ordered: Optional[bool] = None,
+) -> None:
+    """
+    Send items in batches of VECTOR_WRITE_BATCH_SIZE, retrying failed batches
+    with exponential backoff. Unordered writes run VECTOR_WRITE_CONCURRENCY
+    batches at once; ordered writes go one batch at a time and stop at the
+    first batch that still fails. Writes must be idempotent (upserts by ID).
+    """
+    batch_size = batch_size or settings.VECTOR_WRITE_BATCH_SIZE
+    ordered = settings.VECTOR_WRITE_ORDERED if ordered is None else ordered
+    batches = [items[i : i + batch_size] for i in range(0, len(items), batch_size)]
+
+    async def write_with_retry(batch: Sequence[T]) -> None:
+        attempt = 0
+        while True:
+            try:
+                await write(batch)
+                return
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                if attempt >= settings.VECTOR_WRITE_MAX_RETRIES:
+                    raise
+                delay = settings.VECTOR_WRITE_RETRY_BASE_DELAY * (2**attempt)
+                await asyncio.sleep(delay + random.uniform(0, delay))
+                attempt += 1
+
+    if ordered:
+        for batch in batches:
+            await write_with_retry(batch)
+        return
+
+    semaphore = asyncio.Semaphore(settings.VECTOR_WRITE_CONCURRENCY)
+
+    async def bounded(batch: Sequence[T]) -> None:
+        async with semaphore:
+            await write_with_retry(batch)
+
+    tasks = [asyncio.create_task(bounded(batch)) for batch in batches]
+    try:
+        await asyncio.gather(*tasks)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
+
+
+@dataclass
+class SearchFilter:
+    """
+    Structured filter pushed down to the vector index.
+    Matches chunk metadata keys: owner_id, document_id, file_type, created_at.
+    """
+
+    owner_id: Optional[int] = None
+    document_ids: Optional[List[int]] = None
+    file_types: Optional[List[str]] = None
+    created_after: Optional[datetime] = None
+    created_before: Optional[datetime] = None
+
+    def is_empty(self) -> bool:
+        return all(
+            value is None
+            for value in (
+                self.owner_id,
+                self.document_ids,
+                self.file_types,
+                self.created_after,
+                self.created_before,
+            )
+        )
 
 
 class VectorStore(ABC):
     """Abstract base class for vector store implementations"""
 
+    embeddings = None  # Shared embedding provider; resolved lazily when unset
+
     @abstractmethod
     async def add_documents(self, documents: List[Dict[str, Any]]) -> List[str]:
-        """Add documents to the vector store"""
+        """
+        Upsert documents; a document's optional "id" (see assign_vector_ids)
+        makes the write idempotent, otherwise a random ID is generated
+        """
         pass
 
     @abstractmethod
-    async def similarity_search(self, query: str, k: int = 5) -> List[Dict[str, Any]]:
-        """Search for similar documents"""
+    async def similarity_search(
+        self,
+        query: str,
+        k: int = 5,
+        query_embedding: Optional[List[float]] = None,
+        search_filter: Optional[SearchFilter] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Search for similar documents, reusing query_embedding when given.
+        search_filter is applied inside the index, not after retrieval.
+        """
         pass
 
     @abstractmethod
@@ -21,122 +194,432 @@ class VectorStore(ABC):
         """Delete documents from the vector store"""
         pass
 
+    @abstractmethod
+    async def delete_by_document(self, document_id: int) -> int:
+        """Delete every chunk of a document; returns how many were deleted"""
+        pass
+
+    @abstractmethod
+    async def get_document_chunks(self, document_id: int) -> List[Dict[str, Any]]:
+        """Stored chunks of a document as {id, metadata}, without text or vectors"""
+        pass
+
+    @abstractmethod
+    async def update_metadata(self, updates: Dict[str, Dict[str, Any]]) -> None:
+        """Merge the given fields into the metadata of each vector ID"""
+        pass
+
+    def embedding_provider(self):
+        """The store's embeddings, or the shared provider when unset"""
+        return self.embeddings or get_embedding_provider()
+
+    async def embed_query(
+        self, query: str, query_embedding: Optional[List[float]] = None
+    ) -> List[float]:
+        """Return the precomputed query embedding or embed via the shared provider"""
+        if query_embedding is not None:
+            return query_embedding
+        return await self.embedding_provider().aembed_query(query)
+
+    async def ensure_indexes(self) -> None:
+        """Create collections and filter indexes on startup (no-op by default)"""
+        pass
+
+    async def close(self) -> None:
+        """Close client connections on shutdown (no-op by default)"""
+        pass
+
 
 class MongoDBVectorStore(VectorStore):
     """MongoDB Atlas Vector Search implementation"""
 
-    def __init__(self):
+    def __init__(self, embeddings=None):
         from motor.motor_asyncio import AsyncIOMotorClient
-        from pymongo import MongoClient
 
+        self.embeddings = embeddings
         self.client = AsyncIOMotorClient(settings.MONGODB_URL)
         self.db = self.client[settings.MONGODB_DB_NAME]
-        self.collection = self.db["embeddings"]
+        self.collection = self.db[settings.MONGODB_COLLECTION_NAME]
+        # Embedding model and vector size recorded per collection
+        self.collections_info = self.db["vector_collections"]
+        self.index_name = "vector_index"
+
+    @staticmethod
+    def _to_mongo(doc: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Stored form of a document, built as a copy: callers (e.g. the lexical
+        index) keep using the original dicts
+        """
+        stored = {key: value for key, value in doc.items() if key != "id"}
+        metadata = doc.get("metadata", {})
+        if "created_at" in metadata:
+            # Atlas filters support range queries on BSON dates, not strings
+            stored["metadata"] = {
+                **metadata,
+                "created_at": parse_datetime(metadata["created_at"]),
+            }
+        if settings.MONGODB_BINARY_VECTORS:
+            stored["embedding"] = pack_bson_vector(doc["embedding"])
+        return stored
 
     async def add_documents(self, documents: List[Dict[str, Any]]) -> List[str]:
         """
-        Add documents with embeddings to MongoDB
-        Each document should have: {text, metadata, embedding}
+        Upsert documents with embeddings into MongoDB in concurrent bulk writes
+        Each document should have: {text, metadata, embedding} and optionally id
         """
-        result = await self.collection.insert_many(documents)
-        return [str(id) for id in result.inserted_ids]
+        from pymongo import ReplaceOne
+
+        # Replace-by-ID upserts make a retried batch overwrite instead of duplicate
+        ids = [doc.get("id") or str(uuid.uuid4()) for doc in documents]
+        operations = [
+            ReplaceOne({"_id": id}, {"_id": id, **self._to_mongo(doc)}, upsert=True)
+            for id, doc in zip(ids, documents)
+        ]
+
+        async def write(batch) -> None:
+            await self.collection.bulk_write(
+                batch, ordered=settings.VECTOR_WRITE_ORDERED
+            )
+
+        await write_batches(operations, write)
+        return ids
 
-    async def similarity_search(self, query: str, k: int = 5) -> List[Dict[str, Any]]:
+    async def ensure_indexes(self) -> None:
+        """Create or update the Atlas vector index with the filterable fields"""
+        from pymongo.operations import SearchIndexModel
+
+        provider = self.embedding_provider()
+        dimensions = await provider.get_dimensions()
+        info = await self.collections_info.find_one({"_id": self.collection.name})
+        check_dimensions(self.collection.name, info and info["dimensions"], dimensions)
+        if info is None:
+            await self.collections_info.insert_one(
+                {
+                    "_id": self.collection.name,
+                    "model": provider.model,
+                    "dimensions": dimensions,
+                }
+            )
+
+        definition = {
+            "fields": [
+                {
+                    "type": "vector",
+                    "path": "embedding",
+                    "numDimensions": dimensions,
+                    "similarity": "cosine",
+                    # Atlas keeps quantized vectors in the index, full ones on disk
+                    "quantization": {
+                        "none": "none",
+                        "int8": "scalar",
+                        "binary": "binary",
+                    }[quantization_mode()],
+                },
+                *(
+                    {"type": "filter", "path": f"metadata.{field}"}
+                    for field in FILTER_FIELDS
+                ),
+            ]
+        }
+        # Regular index for per-document lookups (re-ingestion, deletes)
+        await self.collection.create_index("metadata.document_id")
+
+        existing = [
+            index["name"] async for index in self.collection.list_search_indexes()
+        ]
+        if self.index_name in existing:
+            await self.collection.update_search_index(self.index_name, definition)
+        else:
+            await self.collection.create_search_index(
+                SearchIndexModel(
+                    definition=definition, name=self.index_name, type="vectorSearch"
+                )
+            )
+
+    @staticmethod
+    def build_filter(search_filter: Optional[SearchFilter]) -> Optional[Dict[str, Any]]:
+        """Translate a SearchFilter into an Atlas $vectorSearch.filter document"""
+        if search_filter is None or search_filter.is_empty():
+            return None
+        clauses: List[Dict[str, Any]] = []
+        if search_filter.owner_id is not None:
+            clauses.append({"metadata.owner_id": {"$eq": search_filter.owner_id}})
+        if search_filter.document_ids is not None:
+            clauses.append(
+                {"metadata.document_id": {"$in": search_filter.document_ids}}
+            )
+        if search_filter.file_types is not None:
+            clauses.append({"metadata.file_type": {"$in": search_filter.file_types}})
+        if search_filter.created_after is not None:
+            clauses.append(
+                {"metadata.created_at": {"$gte": search_filter.created_after}}
+            )
+        if search_filter.created_before is not None:
+            clauses.append(
+                {"metadata.created_at": {"$lte": search_filter.created_before}}
+            )
+        return clauses[0] if len(clauses) == 1 else {"$and": clauses}
+
+    async def similarity_search(
+        self,
+        query: str,
+        k: int = 5,
+        query_embedding: Optional[List[float]] = None,
+        search_filter: Optional[SearchFilter] = None,
+    ) -> List[Dict[str, Any]]:
         """
         Perform vector similarity search using MongoDB Atlas Vector Search
         Requires Atlas Search index configured on the collection
         """
-        from openai import OpenAI
-
         # Generate embedding for query
-        client = OpenAI(api_key=settings.OPENAI_API_KEY)
-        response = client.embeddings.create(
-            input=query, model=settings.EMBEDDING_MODEL
+        query_embedding = await self.embed_query(query, query_embedding)
+
+        # Quantized indexes return oversampled candidates that are rescored below
+        rescoring = (
+            quantization_mode() != "none" and settings.VECTOR_QUANTIZATION_RESCORE
         )
-        query_embedding = response.data[0].embedding
+        limit = oversampled_limit(k) if rescoring else k
 
         # Vector search pipeline
+        vector_search = {
+            "index": self.index_name,
+            "path": "embedding",
+            "queryVector": query_embedding,
+            "numCandidates": limit * 10,
+            "limit": limit,
+        }
+        mongo_filter = self.build_filter(search_filter)
+        if mongo_filter is not None:
+            vector_search["filter"] = mongo_filter
+
         pipeline = [
-            {
-                "$vectorSearch": {
-                    "index": "vector_index",
-                    "path": "embedding",
-                    "queryVector": query_embedding,
-                    "numCandidates": k * 10,
-                    "limit": k,
-                }
-            },
+            {"$vectorSearch": vector_search},
             {
                 "$project": {
                     "text": 1,
                     "metadata": 1,
                     "score": {"$meta": "vectorSearchScore"},
+                    **({"embedding": 1} if rescoring else {}),
                 }
             },
         ]
 
         results = []
         async for doc in self.collection.aggregate(pipeline):
+            # Expose the ObjectId as a string "id", like the other stores
+            doc["id"] = str(doc.pop("_id"))
             results.append(doc)
 
+        if rescoring:
+            results = await asyncio.to_thread(rescore, results, query_embedding, k)
         return results
 
     async def delete_documents(self, ids: List[str]) -> bool:
-        """Delete documents by IDs"""
-        from bson import ObjectId
+        """Delete documents by IDs, in batches"""
+        deleted = 0
+
+        async def write(batch) -> None:
+            nonlocal deleted
+            result = await self.collection.delete_many({"_id": {"$in": list(batch)}})
+            deleted += result.deleted_count
 
-        object_ids = [ObjectId(id) for id in ids]
-        result = await self.collection.delete_many({"_id": {"$in": object_ids}})
-        return result.deleted_count > 0
+        await write_batches([_mongo_id(id) for id in ids], write)
+        return deleted > 0
+
+    async def delete_by_document(self, document_id: int) -> int:
+        result = await self.collection.delete_many(
+            {"metadata.document_id": document_id}
+        )
+        return result.deleted_count
+
+    async def get_document_chunks(self, document_id: int) -> List[Dict[str, Any]]:
+        cursor = self.collection.find(
+            {"metadata.document_id": document_id}, {"metadata": 1}
+        )
+        return [
+            {"id": str(doc["_id"]), "metadata": doc.get("metadata", {})}
+            async for doc in cursor
+        ]
+
+    async def update_metadata(self, updates: Dict[str, Dict[str, Any]]) -> None:
+        from pymongo import UpdateOne
+
+        operations = [
+            UpdateOne(
+                {"_id": _mongo_id(id)},
+                {"$set": {f"metadata.{key}": value for key, value in fields.items()}},
+            )
+            for id, fields in updates.items()
+        ]
+
+        async def write(batch) -> None:
+            await self.collection.bulk_write(batch, ordered=False)
+
+        await write_batches(operations, write)
+
+    async def close(self) -> None:
+        self.client.close()
+
+
+def _mongo_id(id: str) -> Any:
+    """Chunks stored before deterministic IDs have ObjectId keys"""
+    from bson import ObjectId
+
+    return ObjectId(id) if ObjectId.is_valid(id) else id
 
 
 class QdrantVectorStore(VectorStore):
     """Qdrant vector store implementation"""
 
-    def __init__(self):
+    def __init__(self, embeddings=None):
         from qdrant_client import AsyncQdrantClient
-        from qdrant_client.models import Distance, VectorParams
 
+        self.embeddings = embeddings
         self.client = AsyncQdrantClient(
             url=settings.QDRANT_URL, api_key=settings.QDRANT_API_KEY
         )
         self.collection_name = settings.QDRANT_COLLECTION_NAME
 
     async def add_documents(self, documents: List[Dict[str, Any]]) -> List[str]:
-        """Add documents to Qdrant"""
-        from qdrant_client.models import PointStruct
-        import uuid
-
-        points = []
-        ids = []
-        for doc in documents:
-            point_id = str(uuid.uuid4())
-            ids.append(point_id)
-            points.append(
-                PointStruct(
-                    id=point_id,
+        """Upsert documents into Qdrant in concurrent batches"""
+        from qdrant_client import models
+
+        ids = [doc.get("id") or str(uuid.uuid4()) for doc in documents]
+
+        async def write(batch) -> None:
+            # Points are built per batch so a large import never holds them all
+            points = [
+                models.PointStruct(
+                    id=id,
                     vector=doc["embedding"],
                     payload={"text": doc["text"], "metadata": doc.get("metadata", {})},
                 )
+                for id, doc in batch
+            ]
+            await self.client.upsert(
+                collection_name=self.collection_name,
+                points=points,
+                wait=True,
+                ordering=(
+                    models.WriteOrdering.STRONG
+                    if settings.VECTOR_WRITE_ORDERED
+                    else None
+                ),
             )
 
-        await self.client.upsert(collection_name=self.collection_name, points=points)
+        await write_batches(list(zip(ids, documents)), write)
         return ids
 
-    async def similarity_search(self, query: str, k: int = 5) -> List[Dict[str, Any]]:
-        """Search for similar documents in Qdrant"""
-        from openai import OpenAI
+    async def ensure_indexes(self) -> None:
+        """Create the collection if needed and payload indexes for filtered fields"""
+        from qdrant_client import models
 
+        dimensions = await self.embedding_provider().get_dimensions()
+        quantization = qdrant_quantization_config()
+        if not await self.client.collection_exists(self.collection_name):
+            await self.client.create_collection(
+                collection_name=self.collection_name,
+                vectors_config=models.VectorParams(
+                    size=dimensions,
+                    distance=models.Distance.COSINE,
+                    # Quantized vectors are searched in RAM, originals only rescore
+                    on_disk=quantization is not None,
+                ),
+                quantization_config=quantization,
+            )
+        else:
+            info = await self.client.get_collection(self.collection_name)
+            check_dimensions(
+                self.collection_name, info.config.params.vectors.size, dimensions
+            )
+            if (
+                quantization is not None
+                and info.config.quantization_config != quantization
+            ):
+                await self.client.update_collection(
+                    collection_name=self.collection_name,
+                    quantization_config=quantization,
+                )
+
+        schemas = {
+            "owner_id": models.IntegerIndexParams(
+                type=models.IntegerIndexType.INTEGER, lookup=True, range=False
+            ),
+            "document_id": models.IntegerIndexParams(
+                type=models.IntegerIndexType.INTEGER, lookup=True, range=False
+            ),
+            "file_type": models.PayloadSchemaType.KEYWORD,
+            "created_at": models.PayloadSchemaType.DATETIME,
+        }
+        for field, schema in schemas.items():
+            await self.client.create_payload_index(
+                collection_name=self.collection_name,
+                field_name=f"metadata.{field}",
+                field_schema=schema,
+            )
+
+    @staticmethod
+    def build_filter(search_filter: Optional[SearchFilter]):
+        """Translate a SearchFilter into a Qdrant payload filter"""
+        from qdrant_client import models
+
+        if search_filter is None or search_filter.is_empty():
+            return None
+        must = []
+        if search_filter.owner_id is not None:
+            must.append(
+                models.FieldCondition(
+                    key="metadata.owner_id",
+                    match=models.MatchValue(value=search_filter.owner_id),
+                )
+            )
+        if search_filter.document_ids is not None:
+            must.append(
+                models.FieldCondition(
+                    key="metadata.document_id",
+                    match=models.MatchAny(any=search_filter.document_ids),
+                )
+            )
+        if search_filter.file_types is not None:
+            must.append(
+                models.FieldCondition(
+                    key="metadata.file_type",
+                    match=models.MatchAny(any=search_filter.file_types),
+                )
+            )
+        if (
+            search_filter.created_after is not None
+            or search_filter.created_before is not None
+        ):
+            must.append(
+                models.FieldCondition(
+                    key="metadata.created_at",
+                    range=models.DatetimeRange(
+                        gte=search_filter.created_after,
+                        lte=search_filter.created_before,
+                    ),
+                )
+            )
+        return models.Filter(must=must)
+
+    async def similarity_search(
+        self,
+        query: str,
+        k: int = 5,
+        query_embedding: Optional[List[float]] = None,
+        search_filter: Optional[SearchFilter] = None,
+    ) -> List[Dict[str, Any]]:
+        """Search for similar documents in Qdrant"""
         # Generate embedding for query
-        client = OpenAI(api_key=settings.OPENAI_API_KEY)
-        response = client.embeddings.create(
-            input=query, model=settings.EMBEDDING_MODEL
-        )
-        query_embedding = response.data[0].embedding
+        query_embedding = await self.embed_query(query, query_embedding)
 
         # Search
         results = await self.client.search(
-            collection_name=self.collection_name, query_vector=query_embedding, limit=k
+            collection_name=self.collection_name,
+            query_vector=query_embedding,
+            query_filter=self.build_filter(search_filter),
+            search_params=qdrant_search_params(),
+            limit=k,
         )
 
         return [
@@ -150,16 +633,184 @@ class QdrantVectorStore(VectorStore):
         ]
 
     async def delete_documents(self, ids: List[str]) -> bool:
-        """Delete documents from Qdrant"""
-        await self.client.delete(collection_name=self.collection_name, points_selector=ids)
+        """Delete documents from Qdrant, in batches"""
+        from qdrant_client import models
+
+        async def write(batch) -> None:
+            await self.client.delete(
+                collection_name=self.collection_name,
+                points_selector=models.PointIdsList(points=list(batch)),
+            )
+
+        await write_batches(ids, write)
         return True
 
+    async def delete_by_document(self, document_id: int) -> int:
+        from qdrant_client import models
+
+        document_filter = models.Filter(
+            must=[
+                models.FieldCondition(
+                    key="metadata.document_id",
+                    match=models.MatchValue(value=document_id),
+                )
+            ]
+        )
+        count = await self.client.count(
+            collection_name=self.collection_name,
+            count_filter=document_filter,
+            exact=True,
+        )
+        await self.client.delete(
+            collection_name=self.collection_name,
+            points_selector=models.FilterSelector(filter=document_filter),
+        )
+        return count.count
+
+    async def get_document_chunks(self, document_id: int) -> List[Dict[str, Any]]:
+        from qdrant_client import models
+
+        document_filter = models.Filter(
+            must=[
+                models.FieldCondition(
+                    key="metadata.document_id",
+                    match=models.MatchValue(value=document_id),
+                )
+            ]
+        )
+        chunks = []
+        offset = None
+        while True:
+            points, offset = await self.client.scroll(
+                collection_name=self.collection_name,
+                scroll_filter=document_filter,
+                limit=1000,
+                offset=offset,
+                with_payload=["metadata"],
+                with_vectors=False,
+            )
+            chunks.extend(
+                {"id": str(point.id), "metadata": point.payload.get("metadata", {})}
+                for point in points
+            )
+            if offset is None:
+                return chunks
+
+    async def update_metadata(self, updates: Dict[str, Dict[str, Any]]) -> None:
+        from qdrant_client import models
+
+        operations = [
+            models.SetPayloadOperation(
+                set_payload=models.SetPayload(
+                    payload=fields, points=[id], key="metadata"
+                )
+            )
+            for id, fields in updates.items()
+        ]
+
+        async def write(batch) -> None:
+            await self.client.batch_update_points(
+                collection_name=self.collection_name, update_operations=list(batch)
+            )
+
+        await write_batches(operations, write)
+
+    async def close(self) -> None:
+        await self.client.close()
+
 
-def get_vector_store() -> VectorStore:
-    """Factory function to get the configured vector store"""
+class TracedVectorStore(VectorStore):
+    """Vector store wrapper that times every call as a vector_store.* span"""
+
+    def __init__(self, store: VectorStore):
+        self.store = store
+        self.backend = settings.VECTOR_DB_TYPE
+
+    def __getattr__(self, name: str) -> Any:
+        if name == "store":
+            raise AttributeError(name)
+        return getattr(self.store, name)
+
+    @property
+    def embeddings(self):
+        return self.store.embeddings
+
+    async def add_documents(self, documents: List[Dict[str, Any]]) -> List[str]:
+        with span(
+            "vector_store.add_documents", backend=self.backend, documents=len(documents)
+        ):
+            return await self.store.add_documents(documents)
+
+    async def similarity_search(
+        self,
+        query: str,
+        k: int = 5,
+        query_embedding: Optional[List[float]] = None,
+        search_filter: Optional[SearchFilter] = None,
+    ) -> List[Dict[str, Any]]:
+        with span(
+            "vector_store.similarity_search",
+            backend=self.backend,
+            k=k,
+            filtered=search_filter is not None and not search_filter.is_empty(),
+        ) as current:
+            results = await self.store.similarity_search(
+                query, k, query_embedding, search_filter
+            )
+            current.set(results=len(results))
+            return results
+
+    async def delete_documents(self, ids: List[str]) -> bool:
+        with span("vector_store.delete_documents", backend=self.backend, ids=len(ids)):
+            return await self.store.delete_documents(ids)
+
+    async def delete_by_document(self, document_id: int) -> int:
+        with span("vector_store.delete_by_document", backend=self.backend) as current:
+            deleted = await self.store.delete_by_document(document_id)
+            current.set(deleted=deleted)
+            return deleted
+
+    async def get_document_chunks(self, document_id: int) -> List[Dict[str, Any]]:
+        with span("vector_store.get_document_chunks", backend=self.backend) as current:
+            chunks = await self.store.get_document_chunks(document_id)
+            current.set(chunks=len(chunks))
+            return chunks
+
+    async def update_metadata(self, updates: Dict[str, Dict[str, Any]]) -> None:
+        if not updates:
+            return await self.store.update_metadata(updates)
+        with span(
+            "vector_store.update_metadata", backend=self.backend, updates=len(updates)
+        ):
+            await self.store.update_metadata(updates)
+
+    async def ensure_indexes(self) -> None:
+        await self.store.ensure_indexes()
+
+    async def close(self) -> None:
+        await self.store.close()
+
+
+def get_vector_store(embeddings=None) -> VectorStore:
+    """
+    Factory function to get the configured vector store, wrapped so writes
+    also update the BM25 index when LEXICAL_INDEX_ENABLED is set, and so every
+    call is traced
+    """
     if settings.VECTOR_DB_TYPE == "mongodb":
-        return MongoDBVectorStore()
+        store = MongoDBVectorStore(embeddings)
     elif settings.VECTOR_DB_TYPE == "qdrant":
-        return QdrantVectorStore()
+        store = QdrantVectorStore(embeddings)
+    elif settings.VECTOR_DB_TYPE == "local":
+        from app.ai.local_vector_store import LocalVectorStore
+
+        store = LocalVectorStore(embeddings)
     else:
         raise ValueError(f"Unknown vector DB type: {settings.VECTOR_DB_TYPE}")
+
+    from app.ai.lexical_index import LexicalIndexedStore, get_lexical_index
+
+    lexical_index = get_lexical_index()
+    if lexical_index is not None:
+        store = LexicalIndexedStore(store, lexical_index)
+    return TracedVectorStore(store)
@@ -0,0 +1,10 @@
+from typing import TYPE_CHECKING
+from starlette.requests import HTTPConnection
+
+if TYPE_CHECKING:
+    from app.ai.rag import RAGService
+
+
+def get_rag_service(connection: HTTPConnection) -> "RAGService":
+    """RAG service created in the app lifespan (works for HTTP and WebSocket routes)"""
+    return connection.app.state.rag_service
@@ -1,34 +1,62 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
-from datetime import timedelta
 
-from app.core.config import settings
-from app.core.security import create_access_token, verify_password, get_password_hash
+from app.core.security import create_access_token, averify_password, aget_password_hash
 from app.db.session import get_db
+from app.models.user import User
+from app.schemas.user import Token, UserCreate, UserResponse
 
 router = APIRouter()
 
 
-@router.post("/login")
+@router.post("/login", response_model=Token)
 async def login(
     form_data: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(get_db)
 ):
     """Login endpoint - returns JWT token"""
-    # TODO: Implement user authentication
-    # This is a placeholder implementation
-    return {
-        "access_token": "placeholder_token",
-        "token_type": "bearer",
-        "message": "Authentication endpoint - to be implemented",
-    }
+    user = (
+        await db.execute(select(User).where(User.email == form_data.username))
+    ).scalar_one_or_none()
+    # bcrypt runs in a thread pool so a burst of logins doesn't stall other requests
+    if user is None or not await averify_password(
+        form_data.password, user.hashed_password
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Incorrect email or password",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    if not user.is_active:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN, detail="Inactive user"
+        )
+    return Token(access_token=create_access_token(user.id))
 
 
-@router.post("/register")
-async def register(db: AsyncSession = Depends(get_db)):
+@router.post(
+    "/register", response_model=UserResponse, status_code=status.HTTP_201_CREATED
+)
+async def register(body: UserCreate, db: AsyncSession = Depends(get_db)):
     """User registration endpoint"""
-    # TODO: Implement user registration
-    return {"message": "Registration endpoint - to be implemented"}
+    user = User(
+        email=body.email,
+        hashed_password=await aget_password_hash(body.password),
+        full_name=body.full_name,
+        is_active=True,
+    )
+    db.add(user)
+    try:
+        await db.commit()
+    except IntegrityError:
+        await db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT, detail="Email already registered"
+        )
+    await db.refresh(user)
+    return user
 
 
 @router.post("/refresh")
@@ -1,46 +1,388 @@
-from fastapi import APIRouter, Depends, WebSocket, WebSocketDisconnect
+import asyncio
+import json
+from fastapi import (
+    APIRouter,
+    BackgroundTasks,
+    Depends,
+    HTTPException,
+    Query,
+    Request,
+    WebSocket,
+    WebSocketDisconnect,
+    status,
+)
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
 from sqlalchemy.ext.asyncio import AsyncSession
-from typing import List
-from app.db.session import get_db
-from app.ai.rag import rag_service
+from typing import Any, Dict, List, Optional, AsyncIterator
+from app.core.auth import (
+    AuthCache,
+    CurrentUser,
+    UserLoader,
+    authenticate,
+    get_auth_cache,
+    get_current_user,
+    get_user_loader,
+)
+from app.core.config import settings
+from app.db.session import get_db, get_read_db, AsyncSessionLocal
+from app.ai.rag import RAGService
+from app.ai.llm_gateway import INTERACTIVE, LLMOverloadedError
+from app.api.deps import get_rag_service
+from app.ai.vector_store import SearchFilter
+from app.models.chat import ChatSession
+from app.schemas.chat import (
+    ChatQueryRequest,
+    ChatQueryResponse,
+    ChatSessionCreate,
+    ChatSessionDetail,
+    ChatSessionItem,
+    ChatSessionPage,
+)
+from app.services import chat_sessions
 
 router = APIRouter()
 
 
-@router.post("/query")
-async def chat_query(db: AsyncSession = Depends(get_db)):
-    """Send a query to the AI assistant using RAG"""
-    # TODO: Implement chat query with RAG
-    return {"message": "Chat query endpoint - to be implemented"}
+def _search_filter(request: ChatQueryRequest, user: CurrentUser) -> SearchFilter:
+    """Only the user's own chunks; also keeps cached answers per user"""
+    return SearchFilter(owner_id=user.id, document_ids=request.document_ids or None)
 
 
-@router.get("/sessions")
-async def list_chat_sessions(db: AsyncSession = Depends(get_db)):
-    """List all chat sessions for the current user"""
-    # TODO: Implement list chat sessions
-    return {"message": "List chat sessions endpoint - to be implemented"}
+async def _sse_events(
+    request: Request, events: AsyncIterator[Dict[str, Any]]
+) -> AsyncIterator[str]:
+    """Format RAG stream events as Server-Sent Events"""
+    try:
+        async for event in events:
+            if await request.is_disconnected():
+                break
+            payload = json.dumps(jsonable_encoder(event))
+            yield f"event: {event['type']}\ndata: {payload}\n\n"
+    except LLMOverloadedError as e:
+        # Headers are already sent, so the 503 becomes an error event
+        payload = json.dumps(
+            {"type": "error", "detail": str(e), "retry_after": e.retry_after}
+        )
+        yield f"event: error\ndata: {payload}\n\n"
+    finally:
+        # Stops the upstream LLM stream when the client goes away
+        await events.aclose()
+
+
+@router.post("/query", response_model=ChatQueryResponse)
+async def chat_query(
+    body: ChatQueryRequest,
+    request: Request,
+    current_user: CurrentUser = Depends(get_current_user),
+    rag_service: RAGService = Depends(get_rag_service),
+):
+    """Send a query to the AI assistant using RAG (set stream=true for SSE)"""
+    search_filter = _search_filter(body, current_user)
+    if body.stream:
+        # Shed load with a 503 while that is still possible
+        rag_service.gateway.check_capacity(INTERACTIVE)
+        events = rag_service.stream_query(
+            body.question, k=body.k, search_filter=search_filter, mode=body.mode
+        )
+        return _sse_response(request, events)
+    return await rag_service.query(
+        body.question, k=body.k, search_filter=search_filter, mode=body.mode
+    )
+
+
+def _sse_response(
+    request: Request, events: AsyncIterator[Dict[str, Any]]
+) -> StreamingResponse:
+    return StreamingResponse(
+        _sse_events(request, events),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+async def _owned_session(
+    db: AsyncSession, session_id: int, user: CurrentUser
+) -> ChatSession:
+    session = await chat_sessions.get_session(db, session_id, user.id)
+    if session is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Chat session not found"
+        )
+    return session
+
+
+@router.post(
+    "/sessions", status_code=status.HTTP_201_CREATED, response_model=ChatSessionItem
+)
+async def create_chat_session(
+    body: ChatSessionCreate,
+    db: AsyncSession = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user),
+):
+    """Start a chat session; its title defaults to the first question"""
+    return await chat_sessions.create_session(db, current_user.id, body.title)
+
+
+@router.get("/sessions", response_model=ChatSessionPage)
+async def list_chat_sessions(
+    cursor: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=100),
+    db: AsyncSession = Depends(get_read_db),
+    current_user: CurrentUser = Depends(get_current_user),
+):
+    """
+    List the current user's chat sessions, most recently active first
+    (keyset-paginated)
+    """
+    try:
+        return await chat_sessions.list_sessions(db, current_user.id, limit, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+
+@router.get("/sessions/{session_id}", response_model=ChatSessionDetail)
+async def get_chat_session(
+    session_id: int,
+    before: Optional[int] = None,
+    limit: int = Query(50, ge=1, le=200),
+    db: AsyncSession = Depends(get_read_db),
+    current_user: CurrentUser = Depends(get_current_user),
+):
+    """
+    Get a chat session with its newest messages. Pass the returned next_before
+    as ?before= to page back through older messages.
+    """
+    session = await _owned_session(db, session_id, current_user)
+    messages, next_before = await chat_sessions.list_messages(
+        db, session.id, limit, before
+    )
+    return ChatSessionDetail.model_validate(
+        {
+            **ChatSessionItem.model_validate(session).model_dump(),
+            "summary": session.summary,
+            "messages": messages,
+            "next_before": next_before,
+        }
+    )
+
+
+@router.delete("/sessions/{session_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_chat_session(
+    session_id: int,
+    db: AsyncSession = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user),
+):
+    """Delete a chat session and its messages"""
+    session = await _owned_session(db, session_id, current_user)
+    await chat_sessions.delete_session(db, session)
+
+
+async def _record_streamed_turn(
+    events: AsyncIterator[Dict[str, Any]],
+    session_id: int,
+    question: str,
+    rag_service: RAGService,
+) -> AsyncIterator[Dict[str, Any]]:
+    """Pass stream events through, storing the turn once the answer is complete"""
+    sources: List[Dict[str, Any]] = []
+    answer: List[str] = []
+    try:
+        async for event in events:
+            if event["type"] == "sources":
+                sources = event["sources"]
+            elif event["type"] == "token":
+                answer.append(event["content"])
+            elif event["type"] == "done":
+                # The request's session is already closed while the body streams
+                async with AsyncSessionLocal() as db:
+                    await chat_sessions.append_turn(
+                        db,
+                        session_id,
+                        question,
+                        "".join(answer),
+                        sources,
+                        rag_service.memory,
+                    )
+                event = {**event, "session_id": session_id}
+            yield event
+    finally:
+        await events.aclose()
+
+
+@router.post("/sessions/{session_id}/messages", response_model=ChatQueryResponse)
+async def send_chat_message(
+    session_id: int,
+    body: ChatQueryRequest,
+    request: Request,
+    background_tasks: BackgroundTasks,
+    db: AsyncSession = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user),
+    rag_service: RAGService = Depends(get_rag_service),
+):
+    """
+    Ask a question within a chat session (set stream=true for SSE). The prompt
+    carries the session's rolling summary and recent messages within a fixed
+    token budget, retrieval uses a standalone rewrite of the question, and the
+    summary is updated after the answer is sent.
+    """
+    session = await _owned_session(db, session_id, current_user)
+    history = await chat_sessions.load_history(db, session)
+    background_tasks.add_task(
+        chat_sessions.refresh_summary, session.id, rag_service.memory
+    )
+    arguments = dict(
+        k=body.k,
+        conversation_history=history,
+        conversation_summary=session.summary,
+        search_filter=_search_filter(body, current_user),
+        mode=body.mode,
+    )
+    if body.stream:
+        rag_service.gateway.check_capacity(INTERACTIVE)
+        events = rag_service.stream_query(body.question, **arguments)
+        return _sse_response(
+            request,
+            _record_streamed_turn(events, session.id, body.question, rag_service),
+        )
+
+    result = await rag_service.query(body.question, **arguments)
+    await chat_sessions.append_turn(
+        db,
+        session.id,
+        body.question,
+        result["answer"],
+        result["sources"],
+        rag_service.memory,
+    )
+    return {**result, "session_id": session.id}
+
+
+def _parse_ws_message(data: str) -> ChatQueryRequest:
+    """Accept either a JSON ChatQueryRequest or a bare question string"""
+    try:
+        payload = json.loads(data)
+    except json.JSONDecodeError:
+        payload = None
+    if isinstance(payload, dict):
+        return ChatQueryRequest(**payload)
+    return ChatQueryRequest(question=data)
+
+
+async def _stream_to_websocket(
+    websocket: WebSocket,
+    body: ChatQueryRequest,
+    user: CurrentUser,
+    rag_service: RAGService,
+) -> None:
+    """
+    Stream one answer to the client.
 
+    A bounded queue sits between the LLM stream and the socket, so a slow client
+    pauses generation instead of buffering the whole answer. A client message of
+    {"type": "cancel"} or a disconnect cancels generation immediately; any other
+    message is answered with a "busy" error and dropped.
+    """
+    queue: asyncio.Queue = asyncio.Queue(maxsize=settings.CHAT_STREAM_QUEUE_SIZE)
 
-@router.get("/sessions/{session_id}")
-async def get_chat_session(session_id: int, db: AsyncSession = Depends(get_db)):
-    """Get a specific chat session with message history"""
-    # TODO: Implement get chat session
-    return {"message": f"Get chat session {session_id} endpoint - to be implemented"}
+    async def produce() -> None:
+        try:
+            async for event in rag_service.stream_query(
+                body.question,
+                k=body.k,
+                search_filter=_search_filter(body, user),
+                mode=body.mode,
+            ):
+                await queue.put(event)
+        except LLMOverloadedError as e:
+            await queue.put(
+                {"type": "error", "detail": str(e), "retry_after": e.retry_after}
+            )
+        except Exception as e:
+            await queue.put({"type": "error", "detail": str(e)})
+        await queue.put(None)
+
+    async def watch() -> None:
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                raise WebSocketDisconnect(message.get("code", 1000))
+            try:
+                if json.loads(message.get("text") or "{}").get("type") == "cancel":
+                    return
+            except (json.JSONDecodeError, AttributeError):
+                pass
+            # One answer at a time; the client resends once this one is done
+            await websocket.send_json({"type": "error", "detail": "busy"})
+
+    producer = asyncio.create_task(produce())
+    watcher = asyncio.create_task(watch())
+    try:
+        while True:
+            getter = asyncio.create_task(queue.get())
+            done, _ = await asyncio.wait(
+                {getter, watcher}, return_when=asyncio.FIRST_COMPLETED
+            )
+            if watcher in done:
+                getter.cancel()
+                watcher.result()  # Re-raises WebSocketDisconnect
+                await websocket.send_json({"type": "cancelled"})
+                break
+            event = getter.result()
+            if event is None:
+                break
+            await websocket.send_json(jsonable_encoder(event))
+    finally:
+        producer.cancel()
+        watcher.cancel()
+        await asyncio.gather(producer, watcher, return_exceptions=True)
+
+
+def _websocket_token(websocket: WebSocket, token: Optional[str]) -> Optional[str]:
+    """
+    Bearer token from ?token= (browsers cannot set headers) or the Authorization
+    header
+    """
+    if token:
+        return token
+    scheme, _, credentials = websocket.headers.get("authorization", "").partition(" ")
+    return credentials if scheme.lower() == "bearer" and credentials else None
 
 
 @router.websocket("/ws")
-async def websocket_chat(websocket: WebSocket):
-    """WebSocket endpoint for real-time chat"""
+async def websocket_chat(
+    websocket: WebSocket,
+    token: Optional[str] = None,
+    loader: UserLoader = Depends(get_user_loader),
+    cache: AuthCache = Depends(get_auth_cache),
+    rag_service: RAGService = Depends(get_rag_service),
+):
+    """
+    WebSocket endpoint for real-time chat with streamed RAG answers. Pass the
+    access token as ?token= or in the Authorization header.
+    """
+    token = _websocket_token(websocket, token)
+    try:
+        if token is None:
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED)
+        current_user = await authenticate(token, loader, cache)
+    except HTTPException:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
     await websocket.accept()
     try:
         while True:
             # Receive message from client
             data = await websocket.receive_text()
+            try:
+                body = _parse_ws_message(data)
+            except ValidationError as e:
+                await websocket.send_json(
+                    {"type": "error", "detail": jsonable_encoder(e.errors())}
+                )
+                continue
 
-            # TODO: Process with RAG and stream response
-            response = f"Echo: {data} (WebSocket RAG to be implemented)"
-
-            # Send response
-            await websocket.send_text(response)
+            await _stream_to_websocket(websocket, body, current_user, rag_service)
     except WebSocketDisconnect:
         print("Client disconnected")
@@ -1,45 +1,312 @@
-from fastapi import APIRouter, Depends, UploadFile, File
+import asyncio
+import json
+import os
+import uuid
+from typing import AsyncIterator, Optional
+import aiofiles
+from fastapi import (
+    APIRouter,
+    Depends,
+    UploadFile,
+    File,
+    Form,
+    HTTPException,
+    Query,
+    Request,
+    status,
+)
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from app.db.session import get_db
+from sqlalchemy.orm import undefer
+from app.core.auth import CurrentUser, get_current_user
+from app.core.config import settings
+from app.db.session import get_db, get_read_db, AsyncSessionLocal
+from app.ai.rag import RAGService
+from app.api.deps import get_rag_service
+from app.services.extraction import extract_text
+from app.services.extraction_pool import ExtractionTimeout, get_extraction_pool
+from app.models.document import Document, DocumentType
+from app.schemas.document import (
+    DocumentDetail,
+    DocumentPage,
+    DocumentUploadResponse,
+    IngestionJobStatus,
+)
+from app.services import documents as document_service
+from app.services.ingestion import submit_ingestion, get_job_status
 
 router = APIRouter()
 
+UPLOAD_CHUNK_SIZE = 1024 * 1024  # 1MB
 
-@router.post("/upload")
+
+async def _save_upload(file: UploadFile, path: str) -> int:
+    """Stream an upload to disk, enforcing MAX_UPLOAD_SIZE; returns the size"""
+    size = 0
+    try:
+        async with aiofiles.open(path, "wb") as out:
+            while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+                size += len(chunk)
+                if size > settings.MAX_UPLOAD_SIZE:
+                    raise HTTPException(
+                        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                        detail=f"File exceeds {settings.MAX_UPLOAD_SIZE} bytes",
+                    )
+                await out.write(chunk)
+    except BaseException:
+        if os.path.exists(path):
+            os.remove(path)
+        raise
+    return size
+
+
+async def _owned_document(
+    db: AsyncSession, document_id: int, user: CurrentUser, **options
+) -> Document:
+    """The user's document; 404 for someone else's too, so IDs are not revealed"""
+    document = await db.get(Document, document_id, **options)
+    if document is None or document.owner_id != user.id:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Document not found"
+        )
+    return document
+
+
+def _check_extension(file: UploadFile) -> str:
+    extension = os.path.splitext(file.filename or "")[1].lower()
+    if extension not in settings.ALLOWED_EXTENSIONS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unsupported file type: {extension or 'unknown'}",
+        )
+    return extension
+
+
+async def _submit(
+    document: Document,
+    priority: str,
+    rag_service: RAGService,
+    superseded_path: Optional[str] = None,
+) -> DocumentUploadResponse:
+    job = await submit_ingestion(
+        file_path=document.file_path,
+        file_type=document.file_type.value,
+        owner_id=document.owner_id,
+        document_id=document.id,
+        title=document.title,
+        document_created_at=(
+            document.created_at.isoformat() if document.created_at else None
+        ),
+        priority=priority,
+        rag=rag_service,
+        superseded_path=superseded_path,
+    )
+    return DocumentUploadResponse(
+        document_id=document.id,
+        job_id=job["job_id"],
+        status=job["status"],
+        status_url=f"{settings.API_V1_STR}/documents/jobs/{job['job_id']}",
+    )
+
+
+@router.post(
+    "/upload",
+    status_code=status.HTTP_202_ACCEPTED,
+    response_model=DocumentUploadResponse,
+)
 async def upload_document(
-    file: UploadFile = File(...), db: AsyncSession = Depends(get_db)
+    file: UploadFile = File(...),
+    priority: str = Form("default", pattern="^(high|default|low)$"),
+    db: AsyncSession = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user),
+    rag_service: RAGService = Depends(get_rag_service),
+):
+    """Upload a document and queue it for background extraction and vectorization"""
+    extension = _check_extension(file)
+    os.makedirs(settings.UPLOAD_DIR, exist_ok=True)
+    path = os.path.join(settings.UPLOAD_DIR, f"{uuid.uuid4().hex}{extension}")
+    size = await _save_upload(file, path)
+
+    file_type = DocumentType(extension.lstrip("."))
+    document = Document(
+        title=os.path.splitext(file.filename)[0],
+        file_name=file.filename,
+        file_path=path,
+        file_type=file_type,
+        file_size=size,
+        owner_id=current_user.id,
+    )
+    db.add(document)
+    await db.commit()
+    await db.refresh(document)
+    return await _submit(document, priority, rag_service)
+
+
+@router.post(
+    "/{document_id}/upload",
+    status_code=status.HTTP_202_ACCEPTED,
+    response_model=DocumentUploadResponse,
+)
+async def upload_document_version(
+    document_id: int,
+    file: UploadFile = File(...),
+    priority: str = Form("default", pattern="^(high|default|low)$"),
+    db: AsyncSession = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user),
+    rag_service: RAGService = Depends(get_rag_service),
 ):
-    """Upload a document and process it for RAG"""
-    # TODO: Implement document upload, extraction, and vectorization
-    return {
-        "message": "Document upload endpoint - to be implemented",
-        "filename": file.filename,
-    }
+    """
+    Upload a new version of a document. Only chunks that changed are
+    re-embedded; unchanged chunks keep their vectors.
+    """
+    document = await _owned_document(db, document_id, current_user)
+    extension = _check_extension(file)
+    if extension.lstrip(".") != document.file_type.value:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Expected a .{document.file_type.value} file",
+        )
 
+    os.makedirs(settings.UPLOAD_DIR, exist_ok=True)
+    path = os.path.join(settings.UPLOAD_DIR, f"{uuid.uuid4().hex}{extension}")
+    size = await _save_upload(file, path)
+    previous_path = document.file_path
+    document.file_name = file.filename
+    document.file_path = path
+    document.file_size = size
+    await db.commit()
+    await db.refresh(document)
+    # A queued job for the previous version still reads its upload, so the
+    # new version's job removes it once it succeeds
+    return await _submit(document, priority, rag_service, superseded_path=previous_path)
 
-@router.get("/")
-async def list_documents(db: AsyncSession = Depends(get_db)):
-    """List all documents"""
-    # TODO: Implement list documents
-    return {"message": "List documents endpoint - to be implemented"}
 
+@router.get("/jobs/{job_id}", response_model=IngestionJobStatus)
+async def get_ingestion_job(
+    job_id: str, current_user: CurrentUser = Depends(get_current_user)
+):
+    """Get the status of a background ingestion job"""
+    job = await get_job_status(job_id)
+    if job is None or job.get("owner_id") != current_user.id:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Job not found"
+        )
+    return job
+
+
+@router.get("/", response_model=DocumentPage)
+async def list_documents(
+    cursor: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=100),
+    q: Optional[str] = Query(None, min_length=1, max_length=200),
+    db: AsyncSession = Depends(get_read_db),
+    current_user: CurrentUser = Depends(get_current_user),
+):
+    """
+    List the current user's documents, newest first. Pages are keyset-paginated: pass
+    the returned next_cursor to fetch the next page. `q` filters by full-text
+    search over title and summary.
+    """
+    try:
+        return await document_service.list_documents(
+            db, current_user.id, limit, cursor, q
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
 
-@router.get("/{document_id}")
-async def get_document(document_id: int, db: AsyncSession = Depends(get_db)):
+
+@router.get("/{document_id}", response_model=DocumentDetail)
+async def get_document(
+    document_id: int,
+    db: AsyncSession = Depends(get_read_db),
+    current_user: CurrentUser = Depends(get_current_user),
+):
     """Get document details"""
-    # TODO: Implement get document
-    return {"message": f"Get document {document_id} endpoint - to be implemented"}
+    return await _owned_document(
+        db, document_id, current_user, options=[undefer(Document.summary)]
+    )
 
 
 @router.delete("/{document_id}")
-async def delete_document(document_id: int, db: AsyncSession = Depends(get_db)):
-    """Delete a document"""
-    # TODO: Implement delete document and remove from vector store
-    return {"message": f"Delete document {document_id} endpoint - to be implemented"}
+async def delete_document(
+    document_id: int,
+    db: AsyncSession = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user),
+    rag_service: RAGService = Depends(get_rag_service),
+):
+    """Delete a document, its vectors and its uploaded file"""
+    document = await _owned_document(db, document_id, current_user)
+    # Vectors first: a failure here leaves the row in place so the delete can be retried
+    chunks_deleted = await rag_service.delete_document(document_id)
+    file_path = document.file_path
+    await db.delete(document)
+    await db.commit()
+    if os.path.exists(file_path):
+        await asyncio.to_thread(os.remove, file_path)
+    return {"document_id": document_id, "chunks_deleted": chunks_deleted}
 
 
 @router.post("/{document_id}/summarize")
-async def summarize_document(document_id: int, db: AsyncSession = Depends(get_db)):
-    """Generate AI summary for a document"""
-    # TODO: Implement document summarization
-    return {"message": f"Summarize document {document_id} endpoint - to be implemented"}
+async def summarize_document(
+    document_id: int,
+    request: Request,
+    max_length: int = Query(500, ge=50, le=2000),
+    stream: bool = False,
+    db: AsyncSession = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user),
+    rag_service: RAGService = Depends(get_rag_service),
+):
+    """
+    Generate an AI summary for a document. With stream=true, progress is sent
+    as Server-Sent Events ending in a "summary" (or "error") event.
+    """
+    document = await _owned_document(db, document_id, current_user)
+    pool = get_extraction_pool()
+    try:
+        if pool is not None:
+            text = await pool.extract_text(
+                document.file_path, document.file_type, settings.SUMMARY_MAX_INPUT_CHARS
+            )
+        else:
+            text = await asyncio.to_thread(
+                extract_text,
+                document.file_path,
+                document.file_type,
+                settings.SUMMARY_MAX_INPUT_CHARS,
+            )
+    except ExtractionTimeout as e:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=str(e)
+        )
+
+    if not stream:
+        summary = await rag_service.summarize_document(text, max_length)
+        await _save_summary(document_id, summary)
+        return {"document_id": document_id, "summary": summary}
+
+    async def events() -> AsyncIterator[str]:
+        summary_events = rag_service.summarizer.stream(text, max_length)
+        try:
+            async for event in summary_events:
+                if await request.is_disconnected():
+                    break
+                if event["type"] == "summary":
+                    await _save_summary(document_id, event["summary"])
+                yield f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+        finally:
+            await summary_events.aclose()
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+async def _save_summary(document_id: int, summary: str) -> None:
+    # Own session: the request's session is closed before a streamed body finishes
+    async with AsyncSessionLocal() as session:
+        document = await session.get(Document, document_id)
+        if document is not None:
+            document.summary = summary
+            await session.commit()
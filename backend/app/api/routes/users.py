@@ -1,26 +1,50 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.ext.asyncio import AsyncSession
-from app.db.session import get_db
+from app.core.auth import CurrentUser, get_auth_cache, get_current_user
+from app.db.session import get_db, get_read_db
+from app.models.user import User, UserRole
+from app.schemas.user import UserResponse, UserUpdate
 
 router = APIRouter()
 
 
-@router.get("/me")
-async def get_current_user(db: AsyncSession = Depends(get_db)):
+@router.get("/me", response_model=UserResponse)
+async def get_me(current_user: CurrentUser = Depends(get_current_user)):
     """Get current authenticated user"""
-    # TODO: Implement get current user
-    return {"message": "Get current user endpoint - to be implemented"}
+    return current_user
 
 
 @router.get("/")
-async def list_users(db: AsyncSession = Depends(get_db)):
+async def list_users(db: AsyncSession = Depends(get_read_db)):
     """List all users (admin only)"""
     # TODO: Implement list users
     return {"message": "List users endpoint - to be implemented"}
 
 
-@router.put("/{user_id}")
-async def update_user(user_id: int, db: AsyncSession = Depends(get_db)):
-    """Update user details"""
-    # TODO: Implement update user
-    return {"message": "Update user endpoint - to be implemented"}
+@router.put("/{user_id}", response_model=UserResponse)
+async def update_user(
+    user_id: int,
+    body: UserUpdate,
+    current_user: CurrentUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    """Update user details (role and activation are admin only)"""
+    is_admin = current_user.role == UserRole.ADMIN
+    changes = body.model_dump(exclude_unset=True)
+    if not is_admin and (
+        user_id != current_user.id or {"role", "is_active"} & changes.keys()
+    ):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not allowed")
+
+    user = await db.get(User, user_id)
+    if user is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="User not found"
+        )
+    for field, value in changes.items():
+        setattr(user, field, value)
+    await db.commit()
+    await db.refresh(user)
+    # Drop cached copies so a deactivation takes effect on the next request
+    await get_auth_cache().invalidate_user(user_id)
+    return user
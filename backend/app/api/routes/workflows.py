@@ -1,6 +1,6 @@
 from fastapi import APIRouter, Depends
 from sqlalchemy.ext.asyncio import AsyncSession
-from app.db.session import get_db
+from app.db.session import get_db, get_read_db
 
 router = APIRouter()
 
@@ -13,14 +13,14 @@ async def create_workflow(db: AsyncSession = Depends(get_db)):
 
 
 @router.get("/")
-async def list_workflows(db: AsyncSession = Depends(get_db)):
+async def list_workflows(db: AsyncSession = Depends(get_read_db)):
     """List all workflows"""
     # TODO: Implement list workflows
     return {"message": "List workflows endpoint - to be implemented"}
 
 
 @router.get("/{workflow_id}")
-async def get_workflow(workflow_id: int, db: AsyncSession = Depends(get_db)):
+async def get_workflow(workflow_id: int, db: AsyncSession = Depends(get_read_db)):
     """Get workflow details"""
     # TODO: Implement get workflow
     return {"message": f"Get workflow {workflow_id} endpoint - to be implemented"}
@@ -0,0 +1,267 @@
+"""
+Authentication dependency with cached token claims and user records.
+
+Verifying a JWT and reading the user row on every request costs a signature
+check and a database round trip. Both results are kept in a short-TTL
+in-process LRU: decoded claims until AUTH_CACHE_TTL or the token's expiry,
+whichever comes first, and user records for AUTH_CACHE_TTL. Updating or
+deactivating a user calls `invalidate_user`; with AUTH_CACHE_REDIS_ENABLED the
+invalidation is also published on Redis so every worker drops its copy.
+"""
+
+import asyncio
+import hashlib
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from fastapi import Depends, HTTPException, status
+from fastapi.security import OAuth2PasswordBearer
+from jose import JWTError, jwt
+
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.models.user import User, UserRole
+
+AUTH_CACHE_REQUESTS = metrics.counter(
+    "auth_cache_requests_total", "Authentication cache lookups", ["kind", "result"]
+)
+
+# Redis channel carrying user IDs to drop from every worker's cache
+INVALIDATION_CHANNEL = "auth:invalidate"
+
+oauth2_scheme = OAuth2PasswordBearer(tokenUrl=f"{settings.API_V1_STR}/auth/login")
+
+
+@dataclass(frozen=True)
+class CurrentUser:
+    """Detached snapshot of a user row, safe to share across requests"""
+
+    id: int
+    email: str
+    full_name: Optional[str]
+    role: UserRole
+    is_active: bool
+
+    @classmethod
+    def from_model(cls, user: User) -> "CurrentUser":
+        return cls(
+            id=user.id,
+            email=user.email,
+            full_name=user.full_name,
+            role=user.role,
+            is_active=bool(user.is_active),
+        )
+
+
+class TTLCache:
+    """LRU bounded by entry count where every entry also has an expiry time"""
+
+    def __init__(self, max_entries: int, ttl: float):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[Any, Tuple[float, Any]]" = OrderedDict()
+
+    def get(self, key: Any) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[0] <= time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry[1]
+
+    def set(self, key: Any, value: Any, ttl: Optional[float] = None) -> None:
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        if ttl <= 0 or self.max_entries <= 0:
+            return
+        self._entries[key] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def pop(self, key: Any) -> None:
+        self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+UserLoader = Callable[[int], Awaitable[Optional[CurrentUser]]]
+
+
+class AuthCache:
+    """Decoded token claims and user records, with optional Redis invalidation"""
+
+    def __init__(
+        self,
+        ttl: Optional[float] = None,
+        max_entries: Optional[int] = None,
+        redis_url: Optional[str] = None,
+    ):
+        ttl = settings.AUTH_CACHE_TTL if ttl is None else ttl
+        max_entries = (
+            settings.AUTH_CACHE_MAX_ENTRIES if max_entries is None else max_entries
+        )
+        self.claims = TTLCache(max_entries, ttl)
+        self.users = TTLCache(max_entries, ttl)
+        self._loading: Dict[int, asyncio.Task] = {}
+        self._epoch = 0  # Bumped by every invalidation
+        self._redis = None
+        self._listener: Optional[asyncio.Task] = None
+        if redis_url:
+            import redis.asyncio as aioredis
+
+            self._redis = aioredis.from_url(redis_url)
+
+    def decode(self, token: str) -> Dict[str, Any]:
+        """Verified claims of a token; raises JWTError for invalid or expired tokens"""
+        key = hashlib.sha256(token.encode()).digest()
+        claims = self.claims.get(key)
+        if claims is not None:
+            AUTH_CACHE_REQUESTS.inc(kind="claims", result="hit")
+            return claims
+        AUTH_CACHE_REQUESTS.inc(kind="claims", result="miss")
+        claims = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+        # Never serve claims past the token's own expiry
+        self.claims.set(key, claims, ttl=claims.get("exp", 0) - time.time())
+        return claims
+
+    async def get_user(self, user_id: int, loader: UserLoader) -> Optional[CurrentUser]:
+        user = self.users.get(user_id)
+        if user is not None:
+            AUTH_CACHE_REQUESTS.inc(kind="user", result="hit")
+            return user
+        AUTH_CACHE_REQUESTS.inc(kind="user", result="miss")
+
+        # One load per user at a time, so a burst of requests reads the row once.
+        # The load is its own task: a disconnecting client can't cancel it for the rest.
+        task = self._loading.get(user_id)
+        if task is None:
+            task = asyncio.ensure_future(self._load(user_id, loader))
+            task.add_done_callback(lambda t: t.cancelled() or t.exception())
+            self._loading[user_id] = task
+        return await asyncio.shield(task)
+
+    async def _load(self, user_id: int, loader: UserLoader) -> Optional[CurrentUser]:
+        epoch = self._epoch
+        try:
+            user = await loader(user_id)
+        finally:
+            if self._loading.get(user_id) is asyncio.current_task():
+                del self._loading[user_id]
+        # An invalidation during the load means the row read may already be stale
+        if user is not None and epoch == self._epoch:
+            self.users.set(user_id, user)
+        return user
+
+    def _drop(self, user_id: int) -> None:
+        self.users.pop(user_id)
+        self._loading.pop(user_id, None)
+        self._epoch += 1
+
+    async def invalidate_user(self, user_id: int) -> None:
+        """Drop a user after an update or deactivation (every worker with Redis)"""
+        self._drop(user_id)
+        if self._redis is not None:
+            try:
+                await self._redis.publish(INVALIDATION_CHANNEL, str(user_id))
+            except Exception as e:
+                print(f"Warning: could not publish auth cache invalidation: {e}")
+
+    async def start(self) -> None:
+        """Subscribe to invalidations from other workers"""
+        if self._redis is not None and self._listener is None:
+            self._listener = asyncio.create_task(self._listen())
+
+    async def _listen(self) -> None:
+        while True:
+            try:
+                async with self._redis.pubsub() as pubsub:
+                    await pubsub.subscribe(INVALIDATION_CHANNEL)
+                    # Entries cached while disconnected may have missed an invalidation
+                    self.users.clear()
+                    async for message in pubsub.listen():
+                        if message["type"] == "message":
+                            self._drop(int(message["data"]))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Warning: auth cache invalidation listener failed: {e}")
+                await asyncio.sleep(1)
+
+    async def close(self) -> None:
+        if self._listener is not None:
+            self._listener.cancel()
+            await asyncio.gather(self._listener, return_exceptions=True)
+            self._listener = None
+        if self._redis is not None:
+            await self._redis.aclose()
+
+
+_auth_cache: Optional[AuthCache] = None
+
+
+def get_auth_cache() -> AuthCache:
+    global _auth_cache
+    if _auth_cache is None:
+        enabled = settings.AUTH_CACHE_ENABLED
+        _auth_cache = AuthCache(
+            ttl=None if enabled else 0,
+            redis_url=(
+                settings.REDIS_URL
+                if enabled and settings.AUTH_CACHE_REDIS_ENABLED
+                else None
+            ),
+        )
+    return _auth_cache
+
+
+async def load_user(user_id: int) -> Optional[CurrentUser]:
+    # Primary, not the replica: a deactivation must be visible on the next read
+    from app.db.session import AsyncSessionLocal
+
+    async with AsyncSessionLocal() as session:
+        user = await session.get(User, user_id)
+        return CurrentUser.from_model(user) if user is not None else None
+
+
+def get_user_loader() -> UserLoader:
+    """Dependency so the user lookup can be swapped (e.g. in benchmarks)"""
+    return load_user
+
+
+async def authenticate(token: str, loader: UserLoader, cache: AuthCache) -> CurrentUser:
+    """Active user for a bearer token; raises 401 or 403 HTTPException otherwise"""
+    credentials_error = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Could not validate credentials",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+    try:
+        user_id = int(cache.decode(token)["sub"])
+    except (JWTError, KeyError, ValueError):
+        raise credentials_error
+
+    user = await cache.get_user(user_id, loader)
+    if user is None:
+        raise credentials_error
+    if not user.is_active:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN, detail="Inactive user"
+        )
+    return user
+
+
+async def get_current_user(
+    token: str = Depends(oauth2_scheme),
+    loader: UserLoader = Depends(get_user_loader),
+    cache: AuthCache = Depends(get_auth_cache),
+) -> CurrentUser:
+    """Authenticated, active user for the request's bearer token"""
+    return await authenticate(token, loader, cache)
@@ -12,6 +12,22 @@ class Settings(BaseSettings):
     SECRET_KEY: str = "your-secret-key-change-in-production"
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 60 * 24 * 7  # 7 days
+    PASSWORD_HASH_THREADS: int = 4  # bcrypt runs here, off the event loop
+
+    # Authentication cache (decoded tokens and user records, per process)
+    AUTH_CACHE_ENABLED: bool = True
+    AUTH_CACHE_TTL: int = 60  # Seconds a user record is trusted without a DB read
+    AUTH_CACHE_MAX_ENTRIES: int = 10000
+    AUTH_CACHE_REDIS_ENABLED: bool = False  # Broadcast invalidations to all workers
+
+    # Tracing (span latency histograms on /metrics; sampled traces exported)
+    TRACING_ENABLED: bool = True
+    TRACING_SAMPLE_RATE: float = (
+        0.0  # Fraction of new traces that keep attributes and export
+    )
+    TRACING_EXPORTER: str = "none"  # Options: "none", "log" (JSON lines) or "otlp"
+    TRACING_OTLP_ENDPOINT: str = "http://localhost:4318/v1/traces"
+    TRACING_SERVICE_NAME: str = "ai-knowledge-api"
 
     # CORS
     ALLOWED_ORIGINS: List[str] = [
@@ -26,47 +42,231 @@ class Settings(BaseSettings):
     POSTGRES_PORT: int = 5432
     POSTGRES_DB: str = "ai_knowledge_db"
 
+    POSTGRES_READ_HOST: str | None = None  # Read replica for list/read endpoints
+    POSTGRES_READ_PORT: int | None = None  # Defaults to POSTGRES_PORT
+    # Full SQLAlchemy URL used instead of the POSTGRES_* parts, e.g.
+    # sqlite+aiosqlite:///bench.db for the local load benchmark
+    DATABASE_URL_OVERRIDE: str | None = None
+
     @property
     def DATABASE_URL(self) -> str:
-        return f"postgresql+asyncpg://{self.POSTGRES_USER}:{self.POSTGRES_PASSWORD}@{self.POSTGRES_HOST}:{self.POSTGRES_PORT}/{self.POSTGRES_DB}"
+        if self.DATABASE_URL_OVERRIDE:
+            return self.DATABASE_URL_OVERRIDE
+        return (
+            f"postgresql+asyncpg://{self.POSTGRES_USER}:{self.POSTGRES_PASSWORD}"
+            f"@{self.POSTGRES_HOST}:{self.POSTGRES_PORT}/{self.POSTGRES_DB}"
+        )
+
+    @property
+    def DATABASE_READ_URL(self) -> str | None:
+        if not self.POSTGRES_READ_HOST:
+            return None
+        port = self.POSTGRES_READ_PORT or self.POSTGRES_PORT
+        return (
+            f"postgresql+asyncpg://{self.POSTGRES_USER}:{self.POSTGRES_PASSWORD}"
+            f"@{self.POSTGRES_READ_HOST}:{port}/{self.POSTGRES_DB}"
+        )
+
+    # Database connection pool (per process; size for workers x pool <= max_connections)
+    DB_ECHO: bool = False  # Log every SQL statement (debugging only)
+    DB_POOL_SIZE: int = 10  # Connections kept open
+    DB_MAX_OVERFLOW: int = 10  # Extra connections opened under burst load
+    DB_POOL_TIMEOUT: float = 10.0  # Seconds to wait for a free connection
+    DB_POOL_RECYCLE: int = 1800  # Seconds before a connection is replaced
+    DB_POOL_PRE_PING: bool = True  # Check connections on checkout (drops stale ones)
+    DB_STATEMENT_TIMEOUT_MS: int = 30000  # Server-side statement_timeout, 0 disables
+    DB_PREPARED_STATEMENT_CACHE_SIZE: int = (
+        100  # asyncpg prepared statements per connection, 0 for PgBouncer
+    )
 
     # Vector Database - MongoDB Atlas or Qdrant
-    VECTOR_DB_TYPE: str = "mongodb"  # Options: "mongodb" or "qdrant"
+    VECTOR_DB_TYPE: str = "mongodb"  # Options: "mongodb", "qdrant" or "local"
 
     # MongoDB Configuration (for Atlas Vector Search)
     MONGODB_URL: str = "mongodb://localhost:27017"
     MONGODB_DB_NAME: str = "ai_knowledge_vectors"
+    MONGODB_COLLECTION_NAME: str = "embeddings"
 
     # Qdrant Configuration (alternative)
     QDRANT_URL: str = "http://localhost:6333"
     QDRANT_API_KEY: str | None = None
     QDRANT_COLLECTION_NAME: str = "documents"
 
+    # Local vector store shared by the processes on one host (dev boxes, tests,
+    # small tenants)
+    LOCAL_VECTOR_DIR: str = "vector_data"
+    LOCAL_VECTOR_ANN_THRESHOLD: int = 20000  # Switch from exact search to IVF
+    LOCAL_VECTOR_IVF_NPROBE: int = 16  # Clusters scanned per IVF query
+    LOCAL_VECTOR_COMPACT_RATIO: float = 0.2  # Compact when this fraction is deleted
+
+    # Vector quantization (Qdrant and Atlas indexes)
+    VECTOR_QUANTIZATION: str = (
+        "none"  # Options: "none", "int8" or "binary" (1024+ dims)
+    )
+    VECTOR_QUANTIZATION_OVERSAMPLING: float = (
+        3.0  # Candidates fetched per result for rescoring
+    )
+    VECTOR_QUANTIZATION_RESCORE: bool = True  # Re-rank candidates with full vectors
+    MONGODB_BINARY_VECTORS: bool = False  # Store embeddings as BSON float32 vectors
+
+    # Vector store bulk writes
+    VECTOR_WRITE_BATCH_SIZE: int = 500  # Points per upsert/delete request
+    VECTOR_WRITE_CONCURRENCY: int = 4  # Batches in flight for unordered writes
+    VECTOR_WRITE_ORDERED: bool = False  # Write batches one at a time, in order
+    VECTOR_WRITE_MAX_RETRIES: int = 3  # Retries per failed batch
+    VECTOR_WRITE_RETRY_BASE_DELAY: float = 0.5  # Seconds, doubled per retry
+
     # Redis
     REDIS_URL: str = "redis://localhost:6379/0"
 
     # OpenAI
     OPENAI_API_KEY: str = "your-openai-api-key"
+    OPENAI_BASE_URL: str | None = (
+        None  # OpenAI-compatible endpoint (proxy, local stand-in)
+    )
     OPENAI_MODEL: str = "gpt-4"
     EMBEDDING_MODEL: str = "text-embedding-3-small"
+    # Vector size; unset uses the model's native size. text-embedding-3 models
+    # return shortened vectors when it is set lower
+    EMBEDDING_DIMENSIONS: int | None = None
+
+    # LLM gateway (per process: divide provider limits by API + worker processes)
+    LLM_REQUESTS_PER_MINUTE: int = 500  # Per model; 0 disables the limit
+    LLM_TOKENS_PER_MINUTE: int = 200000  # Per model; 0 disables the limit
+    LLM_MAX_CONCURRENCY: int = 16  # Calls in flight across all priorities
+    LLM_BACKGROUND_MAX_CONCURRENCY: int = 8  # Slots summarization may hold
+    LLM_MAX_QUEUE_INTERACTIVE: int = 100  # Waiting chat calls before 503s
+    LLM_MAX_QUEUE_BACKGROUND: int = 1000
+    LLM_QUEUE_TIMEOUT_INTERACTIVE: float = 30.0  # Seconds a chat call may wait
+    LLM_QUEUE_TIMEOUT_BACKGROUND: float = 600.0
+    LLM_ESTIMATED_OUTPUT_TOKENS: int = 500  # Charged up front when max_tokens is unset
+    LLM_RATE_LIMIT_BACKOFF: float = (
+        5.0  # Pause after a provider 429 without Retry-After
+    )
+    LLM_COALESCE_ENABLED: bool = (
+        True  # Share one call between identical in-flight prompts
+    )
+
+    # Embedding provider
+    EMBEDDING_PROVIDER: str = "openai"  # Options: "openai" or "local"
+    LOCAL_EMBEDDING_MODEL: str = "sentence-transformers/all-MiniLM-L6-v2"
+    LOCAL_EMBEDDING_DEVICE: str = "cpu"
+    LOCAL_EMBEDDING_BACKEND: str = (
+        "torch"  # "torch", "onnx" or "openvino" (needs optimum)
+    )
+    LOCAL_EMBEDDING_MODEL_FILE: str | None = (
+        None  # e.g. "onnx/model_qint8_avx512_vnni.onnx"
+    )
+    LOCAL_EMBEDDING_QUANTIZE: bool = False  # Dynamic int8 quantization (torch backend)
+    LOCAL_EMBEDDING_BATCH_SIZE: int = 64  # Max texts encoded together
+    LOCAL_EMBEDDING_MAX_WAIT_MS: float = 2.0  # Time to wait for a batch to fill
+    LOCAL_EMBEDDING_THREADS: int = 0  # torch intra-op threads; 0 keeps the default
+
+    # Shared embedding client connection pool
+    EMBEDDING_HTTP_MAX_CONNECTIONS: int = 20
+    EMBEDDING_HTTP_TIMEOUT: float = 30.0  # seconds
+
+    # Embedding ingestion pipeline
+    EMBEDDING_BATCH_MAX_TOKENS: int = 20000  # Token budget per embedding request
+    EMBEDDING_BATCH_MAX_SIZE: int = 512  # Max chunks per embedding request
+    EMBEDDING_MAX_CONCURRENCY: int = 4  # Batches embedded in parallel
+    EMBEDDING_MAX_RETRIES: int = 3
+    EMBEDDING_RETRY_BASE_DELAY: float = 0.5  # seconds
+
+    # Embedding cache (in-process LRU + optional Redis tier on REDIS_URL)
+    EMBEDDING_CACHE_MAX_BYTES: int = 64 * 1024 * 1024  # 64MB
+    EMBEDDING_CACHE_REDIS_ENABLED: bool = False
+    EMBEDDING_CACHE_REDIS_TTL: int = 60 * 60 * 24 * 30  # 30 days
 
     # LangChain
     LANGCHAIN_TRACING_V2: bool = False
     LANGCHAIN_API_KEY: str | None = None
 
+    # Semantic answer cache
+    ANSWER_CACHE_ENABLED: bool = True
+    ANSWER_CACHE_THRESHOLD: float = 0.95  # Min cosine similarity between questions
+    ANSWER_CACHE_TTL: int = 60 * 60 * 24  # 1 day
+    ANSWER_CACHE_MAX_ENTRIES_PER_SCOPE: int = 1000
+    # Publish invalidations so API processes drop answers when workers re-ingest
+    ANSWER_CACHE_REDIS_ENABLED: bool = True
+
+    # Hybrid lexical + vector retrieval
+    RETRIEVAL_MODE: str = "vector"  # Default for queries: "vector" or "hybrid"
+    LEXICAL_INDEX_ENABLED: bool = False  # Mirror vector store writes into a BM25 index
+    LEXICAL_INDEX_DIR: str = "lexical_index"  # Shared by API and workers on one host
+    BM25_K1: float = 1.2
+    BM25_B: float = 0.75
+    HYBRID_RRF_K: int = 60  # Reciprocal rank fusion constant
+    HYBRID_CANDIDATE_MULTIPLIER: int = (
+        4  # Each retriever returns k * this before fusion
+    )
+
+    # RAG context assembly
+    CONTEXT_MAX_TOKENS: int = 3000  # Context budget, capped by the model's window
+    CONTEXT_RESERVED_TOKENS: int = (
+        1500  # Window left for instructions, question and answer
+    )
+    CONTEXT_MIN_PASSAGE_TOKENS: int = 100  # Smallest truncated passage worth including
+    CONTEXT_DEDUP_THRESHOLD: float = (
+        0.9  # Share of a passage's shingles already in context
+    )
+    CONTEXT_RERANK_ENABLED: bool = False  # Rerank with a local cross-encoder
+    CONTEXT_RERANK_MODEL: str = "cross-encoder/ms-marco-MiniLM-L-6-v2"
+
+    # Map-reduce summarization
+    SUMMARY_CHUNK_TOKENS: int = 3000  # Max tokens per section / merge prompt
+    SUMMARY_MAX_CONCURRENCY: int = 4  # LLM calls in flight per summary
+    SUMMARY_SECTION_WORDS: int = 150  # Target length of partial summaries
+    SUMMARY_MAX_INPUT_CHARS: int = (
+        2_000_000  # Longer documents are summarized from their start
+    )
+    SUMMARY_CACHE_MAX_ENTRIES: int = 10000
+    SUMMARY_CACHE_REDIS_ENABLED: bool = False
+    SUMMARY_CACHE_TTL: int = 60 * 60 * 24 * 30  # 30 days
+
+    # Chat streaming
+    CHAT_STREAM_QUEUE_SIZE: int = 64  # Buffered events before generation pauses
+
+    # Chat sessions (conversation memory)
+    CHAT_HISTORY_MAX_TOKENS: int = 1000  # Recent messages kept verbatim in each prompt
+    CHAT_HISTORY_MAX_MESSAGES: int = 50  # Messages after the summary read per turn
+    CHAT_SUMMARY_MAX_TOKENS: int = 300  # Rolling summary of older messages
+    CHAT_QUERY_REWRITE_ENABLED: bool = (
+        True  # Retrieve with a standalone rewrite of follow-ups
+    )
+    CHAT_REWRITE_HISTORY_TOKENS: int = 500  # Recent history shown to the rewrite prompt
+
     # File Upload
     MAX_UPLOAD_SIZE: int = 10 * 1024 * 1024  # 10MB
     ALLOWED_EXTENSIONS: List[str] = [".pdf", ".docx", ".txt", ".md", ".csv", ".xlsx"]
     UPLOAD_DIR: str = "uploads"
 
+    # Text extraction process pool
+    EXTRACTION_WORKERS: int = 2  # 0 extracts inline in a thread
+    EXTRACTION_TIMEOUT: int = 300  # seconds per document before workers are killed
+    EXTRACTION_PDF_PAGES_PER_TASK: int = 50  # Smallest PDF page range per worker
+    EXTRACTION_MAX_TASKS_PER_WORKER: int = 100  # Recycle workers after this many tasks
+
     # Celery
     CELERY_BROKER_URL: str = "redis://localhost:6379/0"
     CELERY_RESULT_BACKEND: str = "redis://localhost:6379/0"
+    # Per ingestion stage; keep the hard limit under INGESTION_STAGE_LEASE_SECONDS
+    CELERY_TASK_SOFT_TIME_LIMIT: int = 1200  # Stage fails and is retried
+    CELERY_TASK_TIME_LIMIT: int = 1500  # Worker child is killed
+
+    # Background ingestion
+    INGESTION_EAGER: bool = (
+        False  # Run jobs in-process with in-memory state (dev/tests)
+    )
+    INGESTION_JOB_TTL: int = 60 * 60 * 24 * 7  # Job status retention, 7 days
+    INGESTION_TENANT_CONCURRENCY: int = 2  # Stages running at once per tenant
+    INGESTION_STAGE_LEASE_SECONDS: int = 1800  # Reclaim slots held by dead workers
+    INGESTION_TENANT_RETRY_DELAY: int = (
+        5  # seconds before re-queueing a throttled stage
+    )
 
     model_config = SettingsConfigDict(
-        env_file=".env",
-        case_sensitive=True,
-        extra="allow"
+        env_file=".env", case_sensitive=True, extra="allow"
     )
 
 
@@ -0,0 +1,339 @@
+"""
+Request tracing with nested spans propagated through contextvars.
+
+Every span's duration is recorded in the trace_span_seconds histogram on
+/metrics. Whether a trace is sampled is decided once, at its root span
+(TRACING_SAMPLE_RATE, or the sampled flag of an incoming W3C traceparent
+header). Sampled spans also keep attributes such as token counts, chunk
+counts and pool waits, and are exported as JSON lines (TRACING_EXPORTER="log")
+or to an OpenTelemetry collector over OTLP (TRACING_EXPORTER="otlp", needs
+the optional opentelemetry-sdk and opentelemetry-exporter-otlp-proto-http
+packages). An unsampled span costs two clock reads and a histogram update.
+"""
+
+import functools
+import json
+import random
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+from app.core.config import settings
+from app.core.metrics import metrics
+
+SPAN_LATENCY = metrics.histogram(
+    "trace_span_seconds", "Duration of traced operations", ["span"]
+)
+REQUEST_LATENCY = metrics.histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency",
+    ["method", "route", "status"],
+)
+
+_current_span: ContextVar[Optional["Span"]] = ContextVar("current_span", default=None)
+
+
+class Span:
+    """One timed operation; attributes are only kept when the trace is sampled"""
+
+    __slots__ = (
+        "name",
+        "trace_id",
+        "span_id",
+        "parent_id",
+        "sampled",
+        "attributes",
+        "start",
+        "start_ns",
+        "duration",
+        "error",
+        "exported",
+    )
+
+    def __init__(
+        self,
+        name: str,
+        sampled: bool,
+        trace_id: Optional[str] = None,
+        parent_id: Optional[str] = None,
+    ):
+        self.name = name
+        self.sampled = sampled
+        self.trace_id = trace_id
+        self.parent_id = parent_id
+        self.span_id = f"{random.getrandbits(64):016x}" if sampled else None
+        self.attributes: Dict[str, Any] = {}
+        self.start = time.perf_counter()
+        self.start_ns = time.time_ns() if sampled else 0
+        self.duration = 0.0
+        self.error: Optional[str] = None
+        self.exported: Any = None  # Exporter's own span object (OpenTelemetry)
+
+    def set(self, **attributes: Any) -> None:
+        if self.sampled:
+            self.attributes.update(attributes)
+
+    def add(self, key: str, amount: float) -> None:
+        """Accumulate a numeric attribute, e.g. time spent waiting for a pool"""
+        if self.sampled:
+            self.attributes[key] = self.attributes.get(key, 0) + amount
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "start_ns": self.start_ns,
+            "duration_ms": round(self.duration * 1000, 3),
+            "attributes": self.attributes,
+            "error": self.error,
+        }
+
+
+class _NoopSpan:
+    """Stands in for the current span outside any trace"""
+
+    sampled = False
+    trace_id = None
+
+    def set(self, **attributes: Any) -> None:
+        pass
+
+    def add(self, key: str, amount: float) -> None:
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+class LogSpanExporter:
+    """Prints each finished sampled span as one JSON line"""
+
+    def start(self, span: Span, parent: Optional[Span]) -> None:
+        pass
+
+    def end(self, span: Span) -> None:
+        print(json.dumps(span.to_dict(), default=str))
+
+    def shutdown(self) -> None:
+        pass
+
+
+class OTLPSpanExporter:
+    """Mirrors sampled spans into OpenTelemetry spans sent over OTLP/HTTP"""
+
+    def __init__(self, endpoint: str, service_name: str):
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import (
+            OTLPSpanExporter as HTTPExporter,
+        )
+        from opentelemetry.sdk.resources import Resource
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export import BatchSpanProcessor
+
+        self.provider = TracerProvider(
+            resource=Resource.create({"service.name": service_name})
+        )
+        self.provider.add_span_processor(
+            BatchSpanProcessor(HTTPExporter(endpoint=endpoint))
+        )
+        self.tracer = self.provider.get_tracer("app")
+
+    def start(self, span: Span, parent: Optional[Span]) -> None:
+        from opentelemetry import trace
+
+        context = None
+        if parent is not None and parent.exported is not None:
+            context = trace.set_span_in_context(parent.exported)
+        elif span.parent_id is not None:
+            # Remote parent from an incoming traceparent header
+            remote = trace.SpanContext(
+                trace_id=int(span.trace_id, 16),
+                span_id=int(span.parent_id, 16),
+                is_remote=True,
+                trace_flags=trace.TraceFlags(trace.TraceFlags.SAMPLED),
+            )
+            context = trace.set_span_in_context(trace.NonRecordingSpan(remote))
+        span.exported = self.tracer.start_span(
+            span.name, context=context, start_time=span.start_ns
+        )
+        # Use OpenTelemetry's IDs so logs and the collector agree
+        span_context = span.exported.get_span_context()
+        span.trace_id = f"{span_context.trace_id:032x}"
+        span.span_id = f"{span_context.span_id:016x}"
+
+    def end(self, span: Span) -> None:
+        from opentelemetry.trace import Status, StatusCode
+
+        span.exported.set_attributes(
+            {key: value for key, value in span.attributes.items() if value is not None}
+        )
+        if span.error is not None:
+            span.exported.set_status(Status(StatusCode.ERROR, span.error))
+        span.exported.end(end_time=span.start_ns + int(span.duration * 1e9))
+
+    def shutdown(self) -> None:
+        self.provider.shutdown()
+
+
+_exporter: Any = None
+_exporter_loaded = False
+
+
+def get_span_exporter():
+    """Exporter for sampled spans, or None when TRACING_EXPORTER is "none" """
+    global _exporter, _exporter_loaded
+    if not _exporter_loaded:
+        _exporter_loaded = True
+        if settings.TRACING_EXPORTER == "log":
+            _exporter = LogSpanExporter()
+        elif settings.TRACING_EXPORTER == "otlp":
+            try:
+                _exporter = OTLPSpanExporter(
+                    settings.TRACING_OTLP_ENDPOINT, settings.TRACING_SERVICE_NAME
+                )
+            except ImportError as e:
+                print(
+                    "Warning: OpenTelemetry is not installed, spans are not "
+                    f"exported: {e}"
+                )
+        elif settings.TRACING_EXPORTER != "none":
+            raise ValueError(f"Unknown tracing exporter: {settings.TRACING_EXPORTER}")
+    return _exporter
+
+
+def shutdown_tracing() -> None:
+    """Flush spans still buffered by the exporter"""
+    if _exporter is not None:
+        _exporter.shutdown()
+
+
+def current_span():
+    """Innermost active span, or a no-op span outside any trace"""
+    return _current_span.get() or NOOP_SPAN
+
+
+@contextmanager
+def span(
+    name: str, remote_parent: Optional[Tuple[str, str, bool]] = None, **attributes: Any
+) -> Iterator[Any]:
+    """
+    Time a block as a child of the current span (or as a new trace's root).
+    remote_parent is (trace_id, span_id, sampled) from an incoming request.
+    """
+    if not settings.TRACING_ENABLED:
+        yield NOOP_SPAN
+        return
+
+    parent = _current_span.get()
+    if parent is not None:
+        current = Span(name, parent.sampled, parent.trace_id, parent.span_id)
+    elif remote_parent is not None:
+        trace_id, parent_id, sampled = remote_parent
+        current = Span(name, sampled, trace_id, parent_id)
+    else:
+        sampled = random.random() < settings.TRACING_SAMPLE_RATE
+        current = Span(
+            name, sampled, f"{random.getrandbits(128):032x}" if sampled else None
+        )
+
+    exporter = get_span_exporter() if current.sampled else None
+    if exporter is not None:
+        exporter.start(current, parent)
+    current.set(**attributes)
+    token = _current_span.set(current)
+    try:
+        yield current
+    except Exception as e:
+        current.error = type(e).__name__
+        raise
+    finally:
+        current.duration = time.perf_counter() - current.start
+        try:
+            _current_span.reset(token)
+        except ValueError:
+            # Closed from another context (e.g. an abandoned async generator)
+            pass
+        SPAN_LATENCY.observe(current.duration, span=name)
+        if exporter is not None:
+            exporter.end(current)
+
+
+def traced(name: str):
+    """Decorator running every call of a coroutine function in a span"""
+
+    def decorator(fn):
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            with span(name):
+                return await fn(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def parse_traceparent(header: Optional[str]) -> Optional[Tuple[str, str, bool]]:
+    """(trace_id, parent span_id, sampled) from a W3C traceparent header"""
+    if not header:
+        return None
+    parts = header.strip().split("-")
+    if len(parts) != 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+        return None
+    try:
+        sampled = bool(int(parts[3], 16) & 1)
+        int(parts[1], 16), int(parts[2], 16)
+    except ValueError:
+        return None
+    return parts[1], parts[2], sampled
+
+
+class TracingMiddleware:
+    """
+    ASGI middleware opening the root span of every HTTP request and recording
+    http_request_duration_seconds by route template. Sampled responses carry
+    a traceparent header so clients can find the trace.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http" or not settings.TRACING_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope.get("headers") or ())
+        remote_parent = parse_traceparent(
+            headers.get(b"traceparent", b"").decode("latin-1")
+        )
+        status = 500
+
+        with span("http.request", remote_parent, method=scope["method"]) as root:
+
+            async def send_with_trace(message) -> None:
+                nonlocal status
+                if message["type"] == "http.response.start":
+                    status = message["status"]
+                    if root.sampled:
+                        traceparent = f"00-{root.trace_id}-{root.span_id}-01"
+                        message["headers"] = [
+                            *message.get("headers", []),
+                            (b"traceparent", traceparent.encode()),
+                        ]
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_with_trace)
+            finally:
+                # Route template, not the raw path, to keep label cardinality bounded
+                route = scope.get("route")
+                path = getattr(route, "path", "unmatched")
+                root.set(route=path, status=status)
+                REQUEST_LATENCY.observe(
+                    time.perf_counter() - root.start,
+                    method=scope["method"],
+                    route=path,
+                    status=str(status),
+                )
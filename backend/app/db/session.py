@@ -1,15 +1,110 @@
+import time
+from typing import Any, Dict
+from sqlalchemy import exc
+from sqlalchemy.engine import URL, make_url
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
 from sqlalchemy.orm import declarative_base
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from app.core.config import settings
+from app.core.metrics import metrics
+from app.core.tracing import current_span
 
-# Create async engine
-engine = create_async_engine(
-    settings.DATABASE_URL,
-    echo=True,
-    future=True,
+POOL_CHECKED_OUT = metrics.gauge(
+    "db_pool_checked_out", "Connections currently checked out of the pool", ["pool"]
 )
+POOL_OVERFLOW = metrics.gauge(
+    "db_pool_overflow", "Connections open beyond DB_POOL_SIZE", ["pool"]
+)
+POOL_WAIT = metrics.histogram(
+    "db_pool_wait_seconds", "Time spent waiting for a pooled connection", ["pool"]
+)
+POOL_OVERFLOW_CONNECTIONS = metrics.counter(
+    "db_pool_overflow_connections_total",
+    "Connections opened beyond DB_POOL_SIZE",
+    ["pool"],
+)
+POOL_TIMEOUTS = metrics.counter(
+    "db_pool_timeouts_total", "Checkouts that gave up after DB_POOL_TIMEOUT", ["pool"]
+)
+
+
+class InstrumentedPool(AsyncAdaptedQueuePool):
+    """Queue pool that reports checkouts, wait time and overflow to /metrics"""
+
+    def _do_get(self):
+        name = self.logging_name or "primary"
+        overflow = self._overflow
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except exc.TimeoutError:
+            POOL_TIMEOUTS.inc(pool=name)
+            raise
+        finally:
+            waited = time.perf_counter() - start
+            POOL_WAIT.observe(waited, pool=name)
+            # Runs in the caller's context (SQLAlchemy copies it into its greenlet)
+            current_span().add("db_pool_wait_ms", round(waited * 1000, 3))
+        if self._overflow > overflow and self._overflow > 0:
+            POOL_OVERFLOW_CONNECTIONS.inc(pool=name)
+        self._report(name)
+        return connection
+
+    def _do_return_conn(self, record) -> None:
+        super()._do_return_conn(record)
+        self._report(self.logging_name or "primary")
+
+    def _report(self, name: str) -> None:
+        POOL_CHECKED_OUT.set(self.checkedout(), pool=name)
+        POOL_OVERFLOW.set(max(self.overflow(), 0), pool=name)
+
+
+def _engine_options(name: str, url: URL) -> Dict[str, Any]:
+    options = {
+        "echo": settings.DB_ECHO,
+        "poolclass": InstrumentedPool,
+        "pool_logging_name": name,
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+    }
+    if url.get_driver_name() == "asyncpg":
+        server_settings = {}
+        if settings.DB_STATEMENT_TIMEOUT_MS:
+            server_settings["statement_timeout"] = str(settings.DB_STATEMENT_TIMEOUT_MS)
+        options["connect_args"] = {"server_settings": server_settings}
+    elif url.get_backend_name() == "sqlite":
+        # Local stand-in (DATABASE_URL_OVERRIDE): wait for the writer lock
+        # instead of failing
+        options["connect_args"] = {"timeout": settings.DB_POOL_TIMEOUT}
+    return options
+
+
+def _create_engine(url: str, name: str):
+    url = make_url(url)
+    if url.get_driver_name() == "asyncpg":
+        # The asyncpg dialect reads its prepared statement cache size from the URL
+        url = url.update_query_dict(
+            {
+                "prepared_statement_cache_size": str(
+                    settings.DB_PREPARED_STATEMENT_CACHE_SIZE
+                )
+            }
+        )
+    return create_async_engine(url, **_engine_options(name, url))
+
 
-# Create async session factory
+# Create async engines; reads go to the replica when one is configured
+engine = _create_engine(settings.DATABASE_URL, "primary")
+read_engine = (
+    _create_engine(settings.DATABASE_READ_URL, "replica")
+    if settings.DATABASE_READ_URL
+    else engine
+)
+
+# Create async session factories
 AsyncSessionLocal = async_sessionmaker(
     engine,
     class_=AsyncSession,
@@ -17,6 +112,13 @@ AsyncSessionLocal = async_sessionmaker(
     autocommit=False,
     autoflush=False,
 )
+ReadSessionLocal = async_sessionmaker(
+    read_engine,
+    class_=AsyncSession,
+    expire_on_commit=False,
+    autocommit=False,
+    autoflush=False,
+)
 
 # Base class for models
 Base = declarative_base()
@@ -33,3 +135,19 @@ async def get_db() -> AsyncSession:
             raise
         finally:
             await session.close()
+
+
+# Dependency for read-only endpoints; replica data may lag the primary slightly
+async def get_read_db() -> AsyncSession:
+    async with ReadSessionLocal() as session:
+        try:
+            yield session
+        finally:
+            await session.rollback()
+            await session.close()
+
+
+async def close_engines() -> None:
+    await engine.dispose()
+    if read_engine is not engine:
+        await read_engine.dispose()
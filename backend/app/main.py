@@ -1,26 +1,60 @@
-from fastapi import FastAPI
+import asyncio
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse
 from contextlib import asynccontextmanager
 
 from app.core.config import settings
+from app.core.metrics import metrics
+from app.core.auth import get_auth_cache
+from app.core.security import close_hash_executor
+from app.core.tracing import TracingMiddleware, shutdown_tracing
+from app.db.session import close_engines
+from app.ai.embedding_cache import get_embedding_cache
+from app.ai.embeddings import init_embedding_provider, close_embedding_provider
+from app.ai.llm_gateway import LLMOverloadedError
+from app.services.extraction_pool import close_extraction_pool
+from app.services.ingestion import sweep_job_dirs
 from app.api.routes import auth, documents, chat, workflows, users
 
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
     print("Starting up...")
     # Initialize database connections, vector store, etc.
+    init_embedding_provider()
+    await get_auth_cache().start()
+    # Built here rather than at import time; routes get it through app.api.deps
+    from app.ai.rag import RAGService
+
+    app.state.rag_service = RAGService()
+    await app.state.rag_service.start()
+    try:
+        await app.state.rag_service.vector_store.ensure_indexes()
+    except Exception as e:
+        print(f"Warning: could not ensure vector store indexes: {e}")
+    # Workers sweep hourly; eager mode has no worker, so sweep here as well
+    await asyncio.to_thread(sweep_job_dirs)
     yield
     # Shutdown
     print("Shutting down...")
     # Close connections
+    await app.state.rag_service.close()
+    await close_embedding_provider()
+    await get_embedding_cache().close()
+    close_extraction_pool()
+    await get_auth_cache().close()
+    close_hash_executor()
+    await close_engines()
+    shutdown_tracing()
+
 
 app = FastAPI(
     title=settings.PROJECT_NAME,
     version=settings.VERSION,
     description="AI Knowledge Workflow Assistant API",
-    lifespan=lifespan
+    lifespan=lifespan,
 )
 
 # CORS middleware
@@ -32,11 +66,32 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Root span and latency histogram per request (outermost, so it covers CORS too)
+app.add_middleware(TracingMiddleware)
+
+
+# LLM gateway load shedding
+@app.exception_handler(LLMOverloadedError)
+async def llm_overloaded_handler(request: Request, exc: LLMOverloadedError):
+    return JSONResponse(
+        {"detail": str(exc), "retry_after": exc.retry_after},
+        status_code=503,
+        headers={"Retry-After": str(exc.retry_after)},
+    )
+
+
 # Health check
 @app.get("/health")
 async def health_check():
     return JSONResponse({"status": "healthy", "version": settings.VERSION})
 
+
+# Prometheus metrics
+@app.get("/metrics", include_in_schema=False)
+async def prometheus_metrics():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+
 # Include routers
 app.include_router(auth.router, prefix="/api/auth", tags=["Authentication"])
 app.include_router(users.router, prefix="/api/users", tags=["Users"])
@@ -46,4 +101,5 @@ app.include_router(workflows.router, prefix="/api/workflows", tags=["Workflows"]
 
 if __name__ == "__main__":
     import uvicorn
+
     uvicorn.run("app.main:app", host="0.0.0.0", port=8000, reload=True)
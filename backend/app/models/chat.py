@@ -0,0 +1,49 @@
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Index, JSON
+from sqlalchemy.sql import func
+from app.db.session import Base
+
+
+class ChatSession(Base):
+    __tablename__ = "chat_sessions"
+    __table_args__ = (
+        # Keyset pagination by last activity:
+        # WHERE owner_id = ? AND (updated_at, id) < (?, ?)
+        Index("ix_chat_sessions_owner_updated_id", "owner_id", "updated_at", "id"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    owner_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    title = Column(String, nullable=True)  # First question, until renamed
+    # Rolling summary of every message up to and including summarized_through
+    summary = Column(Text, nullable=True)
+    summarized_through = Column(Integer, nullable=False, default=0)  # chat_messages.id
+    message_count = Column(Integer, nullable=False, default=0)
+    created_at = Column(
+        DateTime(timezone=True), server_default=func.now(), nullable=False
+    )
+    updated_at = Column(
+        DateTime(timezone=True), server_default=func.now(), nullable=False
+    )
+
+
+class ChatMessage(Base):
+    __tablename__ = "chat_messages"
+    __table_args__ = (
+        # A turn reads the newest messages after the summary:
+        # WHERE session_id = ? AND id > ?
+        Index("ix_chat_messages_session_id_id", "session_id", "id"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    session_id = Column(
+        Integer, ForeignKey("chat_sessions.id", ondelete="CASCADE"), nullable=False
+    )
+    role = Column(String(16), nullable=False)  # "user" or "assistant"
+    content = Column(Text, nullable=False)
+    tokens = Column(Integer, nullable=False)  # Counted once, on insert
+    sources = Column(
+        JSON, nullable=True
+    )  # Source metadata and scores, without chunk text
+    created_at = Column(
+        DateTime(timezone=True), server_default=func.now(), nullable=False
+    )
@@ -1,6 +1,16 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Enum
+from sqlalchemy import (
+    Column,
+    Integer,
+    String,
+    Text,
+    DateTime,
+    ForeignKey,
+    Enum,
+    Index,
+    literal_column,
+)
 from sqlalchemy.sql import func
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import relationship, deferred
 import enum
 from app.db.session import Base
 
@@ -14,8 +24,23 @@ class DocumentType(str, enum.Enum):
     XLSX = "xlsx"
 
 
+# Full-text search vector over title and summary. Queries must use this exact
+# expression (no bound parameters) for Postgres to match the GIN index.
+SEARCH_VECTOR = literal_column(
+    "to_tsvector('english'::regconfig, "
+    "coalesce(title, '') || ' ' || coalesce(summary, ''))"
+)
+
+
 class Document(Base):
     __tablename__ = "documents"
+    __table_args__ = (
+        # Keyset pagination: WHERE owner_id = ? AND (created_at, id) < (?, ?)
+        Index("ix_documents_owner_created_id", "owner_id", "created_at", "id"),
+        Index("ix_documents_search", SEARCH_VECTOR, postgresql_using="gin").ddl_if(
+            dialect="postgresql"
+        ),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String, nullable=False)
@@ -23,11 +48,14 @@ class Document(Base):
     file_path = Column(String, nullable=False)
     file_type = Column(Enum(DocumentType), nullable=False)
     file_size = Column(Integer)  # in bytes
-    content = Column(Text, nullable=True)  # Extracted text content
-    summary = Column(Text, nullable=True)  # AI-generated summary
+    # Large text columns are deferred: listings never load them, use undefer() to read
+    content = deferred(Column(Text, nullable=True))  # Extracted text content
+    summary = deferred(Column(Text, nullable=True))  # AI-generated summary
     vector_id = Column(String, nullable=True)  # Reference to vector DB
     owner_id = Column(Integer, ForeignKey("users.id"), nullable=False)
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    created_at = Column(
+        DateTime(timezone=True), server_default=func.now(), nullable=False
+    )
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
     # Relationships
@@ -0,0 +1,82 @@
+from datetime import datetime
+from pydantic import BaseModel, ConfigDict, Field
+from typing import List, Literal, Optional
+
+
+class ChatQueryRequest(BaseModel):
+    """Question sent to the RAG assistant over HTTP or WebSocket"""
+
+    question: str = Field(..., min_length=1)
+    k: int = Field(5, ge=1, le=50)
+    document_ids: Optional[List[int]] = None
+    stream: bool = False
+    mode: Optional[Literal["vector", "hybrid"]] = None  # Defaults to RETRIEVAL_MODE
+
+
+class ChatSource(BaseModel):
+    text: str
+    metadata: dict
+    score: float
+
+
+class ChatUsage(BaseModel):
+    """Tokens of one turn; the conversation fields are 0 outside sessions"""
+
+    context_tokens: int
+    context_tokens_saved: int
+    prompt_tokens: int  # Estimated, everything sent to the LLM
+    summary_tokens: int = 0
+    history_tokens: int = 0
+    history_messages: int = 0
+    rewrite_tokens: Optional[int] = None  # Standalone question rewrite
+    input_tokens: Optional[int] = None  # As reported by the LLM
+    output_tokens: Optional[int] = None
+
+
+class ChatQueryResponse(BaseModel):
+    answer: str
+    sources: List[ChatSource]
+    cached: bool = False
+    usage: Optional[ChatUsage] = None  # Not reported for cached answers
+    search_query: Optional[str] = None  # Standalone rewrite used for retrieval
+    session_id: Optional[int] = None
+
+
+class ChatSessionCreate(BaseModel):
+    title: Optional[str] = Field(None, max_length=200)
+
+
+class ChatSessionItem(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    title: Optional[str] = None
+    message_count: int
+    created_at: datetime
+    updated_at: datetime
+
+
+class ChatSessionPage(BaseModel):
+    items: List[ChatSessionItem]
+    next_cursor: Optional[str] = (
+        None  # Pass as ?cursor= for the next page; null on the last
+    )
+
+
+class ChatMessageItem(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    role: str
+    content: str
+    tokens: int
+    sources: Optional[List[dict]] = None
+    created_at: datetime
+
+
+class ChatSessionDetail(ChatSessionItem):
+    summary: Optional[str] = None
+    messages: List[ChatMessageItem]  # Oldest first
+    next_before: Optional[int] = (
+        None  # Pass as ?before= for older messages; null at the start
+    )
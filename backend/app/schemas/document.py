@@ -0,0 +1,55 @@
+from datetime import datetime
+from pydantic import BaseModel, ConfigDict
+from typing import Dict, List, Optional
+
+
+class IngestionJobStatus(BaseModel):
+    """State of a background ingestion job"""
+
+    job_id: str
+    status: str  # queued, running, succeeded, failed
+    stage: Optional[str] = None
+    progress: float
+    stages: Dict[str, str]
+    error: Optional[str] = None
+    document_id: Optional[int] = None
+    priority: str = "default"
+    total_chunks: Optional[int] = None
+    # Incremental re-ingestion report
+    chunks_added: Optional[int] = None
+    chunks_reused: Optional[int] = None
+    chunks_removed: Optional[int] = None
+    embedding_requests_saved: Optional[int] = None
+    created_at: float
+    updated_at: float
+
+
+class DocumentUploadResponse(BaseModel):
+    document_id: int
+    job_id: str
+    status: str
+    status_url: str
+
+
+class DocumentListItem(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    title: str
+    file_name: str
+    file_type: str
+    file_size: Optional[int] = None
+    owner_id: int
+    created_at: datetime
+    updated_at: Optional[datetime] = None
+
+
+class DocumentDetail(DocumentListItem):
+    summary: Optional[str] = None
+
+
+class DocumentPage(BaseModel):
+    items: List[DocumentListItem]
+    next_cursor: Optional[str] = (
+        None  # Pass as ?cursor= for the next page; null on the last
+    )
@@ -0,0 +1,38 @@
+from pydantic import BaseModel, ConfigDict, Field, field_validator
+from typing import Optional
+from app.models.user import UserRole
+
+
+class UserCreate(BaseModel):
+    email: str = Field(..., min_length=3, max_length=320, pattern=r"^[^@\s]+@[^@\s]+$")
+    password: str = Field(..., min_length=8, max_length=72)  # bcrypt uses 72 bytes
+    full_name: Optional[str] = None
+
+
+class UserUpdate(BaseModel):
+    full_name: Optional[str] = None
+    role: Optional[UserRole] = None  # Admin only
+    is_active: Optional[bool] = None  # Admin only
+
+    @field_validator("role", "is_active")
+    @classmethod
+    def not_null(cls, value):
+        # Omit the field to leave it unchanged; the columns are not nullable
+        if value is None:
+            raise ValueError("may be omitted but not null")
+        return value
+
+
+class UserResponse(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    email: str
+    full_name: Optional[str] = None
+    role: UserRole
+    is_active: bool
+
+
+class Token(BaseModel):
+    access_token: str
+    token_type: str = "bearer"
@@ -0,0 +1,192 @@
+"""
+Persisted chat sessions and their conversation memory.
+
+Messages are stored once, with their token counts. A turn reads only the
+session's rolling summary and the newest messages after it (at most
+CHAT_HISTORY_MAX_MESSAGES), so the reads and the prompt stay the same size
+however long a session runs. After each turn, refresh_summary folds the
+oldest messages into the summary once those after it no longer fit the
+history budget or reach the message limit. Sessions are
+listed by last activity with the same keyset cursors as documents.
+"""
+
+from typing import Any, Dict, List, Optional, Tuple
+from sqlalchemy import delete, func, select, tuple_, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.config import settings
+from app.db.session import AsyncSessionLocal
+from app.models.chat import ChatMessage, ChatSession
+from app.ai.conversation import ConversationMemory
+from app.services.documents import decode_cursor, encode_cursor
+
+TITLE_MAX_CHARS = 80
+
+
+async def create_session(
+    db: AsyncSession, owner_id: int, title: Optional[str] = None
+) -> ChatSession:
+    session = ChatSession(
+        owner_id=owner_id, title=title, summarized_through=0, message_count=0
+    )
+    db.add(session)
+    await db.commit()
+    await db.refresh(session)
+    return session
+
+
+async def get_session(
+    db: AsyncSession, session_id: int, owner_id: int
+) -> Optional[ChatSession]:
+    """The session, or None when it does not exist or belongs to someone else"""
+    session = await db.get(ChatSession, session_id)
+    if session is None or session.owner_id != owner_id:
+        return None
+    return session
+
+
+async def list_sessions(
+    db: AsyncSession, owner_id: int, limit: int, cursor: Optional[str] = None
+) -> Dict[str, Any]:
+    """One page of an owner's sessions, most recently active first"""
+    query = select(ChatSession).where(ChatSession.owner_id == owner_id)
+    if cursor is not None:
+        query = query.where(
+            tuple_(ChatSession.updated_at, ChatSession.id) < decode_cursor(cursor)
+        )
+    query = query.order_by(ChatSession.updated_at.desc(), ChatSession.id.desc()).limit(
+        limit + 1
+    )
+    sessions = (await db.execute(query)).scalars().all()
+    items = list(sessions[:limit])
+    next_cursor = None
+    if len(sessions) > limit:
+        next_cursor = encode_cursor(items[-1].updated_at, items[-1].id)
+    return {"items": items, "next_cursor": next_cursor}
+
+
+async def list_messages(
+    db: AsyncSession, session_id: int, limit: int, before: Optional[int] = None
+) -> Tuple[List[ChatMessage], Optional[int]]:
+    """The newest `limit` messages before message id `before`, oldest first"""
+    query = select(ChatMessage).where(ChatMessage.session_id == session_id)
+    if before is not None:
+        query = query.where(ChatMessage.id < before)
+    query = query.order_by(ChatMessage.id.desc()).limit(limit + 1)
+    messages = list((await db.execute(query)).scalars().all())
+    next_before = messages[limit - 1].id if len(messages) > limit else None
+    items = messages[:limit]
+    items.reverse()
+    return items, next_before
+
+
+async def delete_session(db: AsyncSession, session: ChatSession) -> None:
+    # Explicit rather than ON DELETE CASCADE alone, which SQLite ignores by default
+    await db.execute(delete(ChatMessage).where(ChatMessage.session_id == session.id))
+    await db.delete(session)
+    await db.commit()
+
+
+async def _unsummarized(
+    db: AsyncSession, session_id: int, through: int, newest: bool
+) -> List[Dict[str, Any]]:
+    """Up to CHAT_HISTORY_MAX_MESSAGES messages after the summary, oldest first"""
+    order = ChatMessage.id.desc() if newest else ChatMessage.id.asc()
+    result = await db.execute(
+        select(
+            ChatMessage.id, ChatMessage.role, ChatMessage.content, ChatMessage.tokens
+        )
+        .where(ChatMessage.session_id == session_id, ChatMessage.id > through)
+        .order_by(order)
+        .limit(settings.CHAT_HISTORY_MAX_MESSAGES)
+    )
+    messages = [dict(row._mapping) for row in result.all()]
+    if newest:
+        messages.reverse()
+    return messages
+
+
+async def load_history(db: AsyncSession, session: ChatSession) -> List[Dict[str, Any]]:
+    """Newest messages not yet folded into the session's summary, oldest first"""
+    return await _unsummarized(db, session.id, session.summarized_through, newest=True)
+
+
+def _compact_sources(sources: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    return [
+        {"metadata": s.get("metadata", {}), "score": s.get("score", 0)} for s in sources
+    ]
+
+
+async def append_turn(
+    db: AsyncSession,
+    session_id: int,
+    question: str,
+    answer: str,
+    sources: List[Dict[str, Any]],
+    memory: ConversationMemory,
+) -> None:
+    """Store a question and its answer and mark the session as active"""
+    db.add_all(
+        [
+            ChatMessage(
+                session_id=session_id,
+                role="user",
+                content=question,
+                tokens=memory.count_tokens(question),
+            ),
+            ChatMessage(
+                session_id=session_id,
+                role="assistant",
+                content=answer,
+                tokens=memory.count_tokens(answer),
+                sources=_compact_sources(sources),
+            ),
+        ]
+    )
+    await db.execute(
+        update(ChatSession)
+        .where(ChatSession.id == session_id)
+        .values(
+            message_count=ChatSession.message_count + 2,
+            updated_at=func.now(),
+            title=func.coalesce(ChatSession.title, question[:TITLE_MAX_CHARS]),
+        )
+    )
+    await db.commit()
+
+
+async def refresh_summary(session_id: int, memory: ConversationMemory) -> bool:
+    """
+    Fold the oldest messages into the rolling summary once the messages after
+    it outgrow the history budget or reach CHAT_HISTORY_MAX_MESSAGES. Runs
+    after the response, with its own database sessions so no connection is
+    held during the LLM call. Returns whether the summary changed.
+    """
+    try:
+        async with AsyncSessionLocal() as db:
+            session = await db.get(ChatSession, session_id)
+            if session is None:
+                return False
+            summary, through = session.summary, session.summarized_through
+            messages = await _unsummarized(db, session_id, through, newest=False)
+
+        fold = memory.to_fold(messages)
+        if not fold:
+            return False
+        summary = await memory.summarize(summary, fold)
+
+        async with AsyncSessionLocal() as db:
+            # A concurrent refresh that already moved summarized_through wins
+            result = await db.execute(
+                update(ChatSession)
+                .where(
+                    ChatSession.id == session_id,
+                    ChatSession.summarized_through == through,
+                )
+                .values(summary=summary, summarized_through=fold[-1]["id"])
+            )
+            await db.commit()
+            return result.rowcount == 1
+    except Exception as e:
+        # The next turn retries; until then prompts keep the newest messages that fit
+        print(f"Warning: could not update summary of chat session {session_id}: {e}")
+        return False
@@ -0,0 +1,76 @@
+"""
+Document listing with keyset (cursor) pagination.
+
+Pages are ordered newest first by (created_at, id) within an owner and the
+cursor carries the last row's key, so every page is a single range scan of
+ix_documents_owner_created_id no matter how deep the client has paged,
+unlike OFFSET which reads and discards every skipped row.
+"""
+
+import base64
+import json
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from sqlalchemy import Select, func, literal_column, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models.document import Document, SEARCH_VECTOR
+
+
+def encode_cursor(created_at: datetime, id: int) -> str:
+    payload = json.dumps([created_at.isoformat(), id]).encode()
+    return base64.urlsafe_b64encode(payload).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """Raises ValueError for a malformed cursor"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, id = json.loads(base64.urlsafe_b64decode(padded))
+        return datetime.fromisoformat(created_at), int(id)
+    except (TypeError, ValueError) as e:
+        raise ValueError("Invalid cursor") from e
+
+
+def document_page_query(
+    owner_id: int,
+    limit: int,
+    cursor: Optional[str] = None,
+    search: Optional[str] = None,
+) -> Select:
+    """One page of an owner's documents plus one extra row to detect a next page"""
+    query = select(Document).where(Document.owner_id == owner_id)
+    if cursor is not None:
+        query = query.where(
+            tuple_(Document.created_at, Document.id) < decode_cursor(cursor)
+        )
+    if search:
+        tsquery = func.websearch_to_tsquery(
+            literal_column("'english'::regconfig"), search
+        )
+        query = query.where(SEARCH_VECTOR.op("@@")(tsquery))
+    return query.order_by(Document.created_at.desc(), Document.id.desc()).limit(
+        limit + 1
+    )
+
+
+def page_results(
+    documents: Sequence[Document], limit: int
+) -> Tuple[List[Document], Optional[str]]:
+    """Trim the extra row and build the cursor for the next page"""
+    items = list(documents[:limit])
+    next_cursor = None
+    if len(documents) > limit:
+        next_cursor = encode_cursor(items[-1].created_at, items[-1].id)
+    return items, next_cursor
+
+
+async def list_documents(
+    db: AsyncSession,
+    owner_id: int,
+    limit: int,
+    cursor: Optional[str] = None,
+    search: Optional[str] = None,
+) -> Dict[str, Any]:
+    result = await db.execute(document_page_query(owner_id, limit, cursor, search))
+    items, next_cursor = page_results(result.scalars().all(), limit)
+    return {"items": items, "next_cursor": next_cursor}
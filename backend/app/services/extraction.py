@@ -0,0 +1,182 @@
+"""
+Streaming text extraction.
+
+Every format is parsed incrementally and yields text segments of roughly
+SEGMENT_CHARS characters, so memory stays flat regardless of file size.
+Segments are fed through `split_stream` into the text splitter without ever
+materialising the whole document.
+"""
+
+import csv
+import os
+import zipfile
+from typing import Iterator, Iterable, List, Optional, Tuple
+from xml.etree import ElementTree
+from app.models.document import DocumentType
+
+SEGMENT_CHARS = 64 * 1024  # Target size of each yielded segment
+READ_BLOCK_SIZE = 1024 * 1024  # Bytes read at a time from plain text files
+
+_WORD_NS = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+
+
+def _batched(lines: Iterable[str], joiner: str = "\n") -> Iterator[str]:
+    """Group small pieces (rows, paragraphs) into ~SEGMENT_CHARS segments"""
+    buffer: List[str] = []
+    size = 0
+    for line in lines:
+        buffer.append(line)
+        size += len(line) + 1
+        if size >= SEGMENT_CHARS:
+            yield joiner.join(buffer) + joiner
+            buffer, size = [], 0
+    if buffer:
+        yield joiner.join(buffer) + joiner
+
+
+def iter_pdf(path: str, pages: Optional[Tuple[int, int]] = None) -> Iterator[str]:
+    """One segment per page, optionally limited to the [start, stop) page range"""
+    from pypdf import PdfReader
+
+    with open(path, "rb") as f:
+        reader = PdfReader(f)
+        start, stop = pages or (0, len(reader.pages))
+        for number in range(start, min(stop, len(reader.pages))):
+            yield (reader.pages[number].extract_text() or "") + "\n\n"
+
+
+def pdf_page_count(path: str) -> int:
+    from pypdf import PdfReader
+
+    with open(path, "rb") as f:
+        return len(PdfReader(f).pages)
+
+
+def iter_docx(path: str) -> Iterator[str]:
+    """
+    Paragraphs from word/document.xml via iterparse. python-docx builds the whole
+    document tree in memory, so the XML is walked directly and each paragraph is
+    cleared once read.
+    """
+
+    def paragraphs() -> Iterator[str]:
+        with zipfile.ZipFile(path) as archive, archive.open("word/document.xml") as xml:
+            for _, element in ElementTree.iterparse(xml, events=("end",)):
+                if element.tag == f"{_WORD_NS}p":
+                    yield "".join(
+                        node.text or "" for node in element.iter(f"{_WORD_NS}t")
+                    )
+                    element.clear()
+
+    yield from _batched(paragraphs())
+
+
+def iter_xlsx(path: str) -> Iterator[str]:
+    """Rows from openpyxl's read-only (streaming) mode"""
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        for sheet in workbook.worksheets:
+            rows = (
+                ", ".join("" if value is None else str(value) for value in row)
+                for row in sheet.iter_rows(values_only=True)
+            )
+            yield f"# {sheet.title}\n"
+            yield from _batched(rows)
+    finally:
+        workbook.close()
+
+
+def iter_csv(path: str) -> Iterator[str]:
+    with open(path, newline="", encoding="utf-8", errors="replace") as f:
+        yield from _batched(", ".join(row) for row in csv.reader(f))
+
+
+def iter_text(path: str) -> Iterator[str]:
+    with open(path, encoding="utf-8", errors="replace") as f:
+        while block := f.read(READ_BLOCK_SIZE):
+            yield block
+
+
+EXTRACTORS = {
+    DocumentType.PDF: iter_pdf,
+    DocumentType.DOCX: iter_docx,
+    DocumentType.XLSX: iter_xlsx,
+    DocumentType.CSV: iter_csv,
+    DocumentType.TXT: iter_text,
+    DocumentType.MD: iter_text,
+}
+
+
+def iter_segments(
+    path: str, file_type: DocumentType, pages: Optional[Tuple[int, int]] = None
+) -> Iterator[str]:
+    """Stream text segments from an uploaded file (`pages` applies to PDFs only)"""
+    file_type = DocumentType(file_type)
+    if pages is not None and file_type == DocumentType.PDF:
+        return iter_pdf(path, pages)
+    return EXTRACTORS[file_type](path)
+
+
+def extract_to_file(
+    path: str,
+    file_type: DocumentType,
+    out_path: str,
+    pages: Optional[Tuple[int, int]] = None,
+) -> int:
+    """Stream extracted text to `out_path`; returns the character count"""
+    characters = 0
+    tmp = f"{out_path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as out:
+        for segment in iter_segments(path, file_type, pages):
+            out.write(segment)
+            characters += len(segment)
+    os.replace(tmp, out_path)
+    return characters
+
+
+def extract_text(
+    path: str, file_type: DocumentType, max_chars: Optional[int] = None
+) -> str:
+    """Extract the text of a file, stopping after max_chars when given"""
+    parts: List[str] = []
+    size = 0
+    for segment in iter_segments(path, file_type):
+        parts.append(segment)
+        size += len(segment)
+        if max_chars is not None and size >= max_chars:
+            break
+    text = "".join(parts)
+    return text[:max_chars] if max_chars is not None else text
+
+
+def split_stream(
+    segments: Iterable[str], text_splitter, window: int = 8
+) -> Iterator[str]:
+    """
+    Feed streamed segments through a text splitter.
+
+    Text is split once roughly `window` chunks' worth has accumulated. The last
+    chunk of each split is carried over into the next window so chunks are not
+    cut at segment boundaries, which keeps output close to splitting the whole
+    text at once while holding only one window in memory.
+    """
+    limit = text_splitter._chunk_size * window
+    buffer = ""
+    for segment in segments:
+        buffer += segment
+        if len(buffer) < limit:
+            continue
+        chunks = text_splitter.split_text(buffer)
+        if len(chunks) < 2:
+            # A single oversized piece the splitter could not break
+            yield from chunks
+            buffer = ""
+            continue
+        yield from chunks[:-1]
+        # Carry the raw tail (not the stripped chunk) so separators survive
+        start = buffer.rfind(chunks[-1])
+        buffer = buffer[start:] if start >= 0 else chunks[-1] + "\n"
+    if buffer.strip():
+        yield from text_splitter.split_text(buffer)
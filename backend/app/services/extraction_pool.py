@@ -0,0 +1,258 @@
+"""
+Process pool for CPU-bound text extraction.
+
+PDF and XLSX parsing is pure Python, so running it on the event loop (or a
+thread) serialises uploads behind the GIL. Extraction runs in long-lived
+worker processes instead; large PDFs are split into page ranges that are
+extracted in parallel and stitched back together in order. Every job has a
+deadline, and a worker that overruns it is killed and replaced.
+"""
+
+import asyncio
+import math
+import multiprocessing
+import os
+import shutil
+import time
+from typing import Any, Callable, List, Optional, Tuple
+
+from app.core.config import settings
+from app.models.document import DocumentType
+from app.services.extraction import extract_text, extract_to_file, pdf_page_count
+
+
+class ExtractionTimeout(Exception):
+    """Raised when an extraction job runs past its deadline"""
+
+
+class ExtractionError(Exception):
+    """Raised when a parser fails inside a worker process"""
+
+
+def _worker_main(conn) -> None:
+    """Worker loop: run (function, args) tasks until told to stop"""
+    while True:
+        try:
+            task = conn.recv()
+        except EOFError:
+            return
+        if task is None:
+            return
+        func, args = task
+        try:
+            conn.send(("ok", func(*args)))
+        except Exception as e:
+            conn.send(("error", f"{type(e).__name__}: {e}"))
+
+
+class _Worker:
+    def __init__(self, context):
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(
+            target=_worker_main, args=(child_conn,), daemon=True
+        )
+        self.process.start()
+        child_conn.close()
+        self.tasks = 0
+
+    def kill(self) -> None:
+        self.process.kill()
+        self.process.join()
+        self.conn.close()
+
+    def stop(self) -> None:
+        try:
+            self.conn.send(None)
+        except (BrokenPipeError, OSError):
+            pass
+        self.process.join(timeout=5)
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join()
+        self.conn.close()
+
+
+class ExtractionPool:
+    """Reusable extraction worker processes with per-job timeouts"""
+
+    def __init__(
+        self,
+        max_workers: Optional[int] = None,
+        timeout: Optional[float] = None,
+        pdf_pages_per_task: Optional[int] = None,
+        max_tasks_per_worker: Optional[int] = None,
+    ):
+        self.max_workers = max_workers or settings.EXTRACTION_WORKERS
+        self.timeout = timeout or settings.EXTRACTION_TIMEOUT
+        self.pdf_pages_per_task = (
+            pdf_pages_per_task or settings.EXTRACTION_PDF_PAGES_PER_TASK
+        )
+        self.max_tasks_per_worker = (
+            max_tasks_per_worker or settings.EXTRACTION_MAX_TASKS_PER_WORKER
+        )
+        # spawn: forking a process that runs an event loop and client pools is unsafe
+        self._context = multiprocessing.get_context("spawn")
+        self._idle: List[_Worker] = []
+        self._slots = asyncio.Semaphore(self.max_workers)
+        self._closed = False
+
+    async def _checkout(self) -> _Worker:
+        while self._idle:
+            worker = self._idle.pop()
+            if worker.process.is_alive():
+                return worker
+            worker.kill()
+        # Spawning starts a fresh interpreter, which takes long enough to stall the loop
+        return await asyncio.to_thread(_Worker, self._context)
+
+    def _checkin(self, worker: _Worker) -> None:
+        worker.tasks += 1
+        if self._closed or worker.tasks >= self.max_tasks_per_worker:
+            # Recycle workers periodically so parser caches cannot grow unbounded
+            worker.stop()
+        else:
+            self._idle.append(worker)
+
+    async def run(
+        self, func: Callable, *args: Any, timeout: Optional[float] = None
+    ) -> Any:
+        """Run a picklable top-level function in a worker process"""
+        if self._closed:
+            raise RuntimeError("Extraction pool is closed")
+        timeout = self.timeout if timeout is None else timeout
+
+        async with self._slots:
+            worker = await self._checkout()
+            loop = asyncio.get_running_loop()
+            ready = loop.create_future()
+            fd = worker.conn.fileno()
+            loop.add_reader(fd, lambda: ready.done() or ready.set_result(None))
+            try:
+                worker.conn.send((func, args))
+                await asyncio.wait_for(ready, max(timeout, 0))
+            except BaseException as e:
+                # Timed out or cancelled mid-task: the worker's state is unknown
+                loop.remove_reader(fd)
+                worker.kill()
+                if isinstance(e, asyncio.TimeoutError):
+                    raise ExtractionTimeout(
+                        f"Extraction exceeded {timeout:g}s"
+                    ) from None
+                raise
+            loop.remove_reader(fd)
+
+            try:
+                status, payload = worker.conn.recv()
+            except (EOFError, OSError):
+                worker.kill()
+                raise ExtractionError("Extraction worker exited unexpectedly") from None
+            self._checkin(worker)
+            if status == "error":
+                raise ExtractionError(payload)
+            return payload
+
+    def _page_ranges(self, pages: int) -> List[Tuple[int, int]]:
+        """Even ranges across workers, but never smaller than pdf_pages_per_task"""
+        size = max(self.pdf_pages_per_task, math.ceil(pages / self.max_workers))
+        return [(start, min(start + size, pages)) for start in range(0, pages, size)]
+
+    async def extract_text(
+        self, path: str, file_type: DocumentType, max_chars: Optional[int] = None
+    ) -> str:
+        """Text of a document, stopping after max_chars when given"""
+        return await self.run(extract_text, path, DocumentType(file_type), max_chars)
+
+    async def extract_to_file(
+        self, path: str, file_type: DocumentType, out_path: str
+    ) -> int:
+        """Extract a document to `out_path`, splitting large PDFs across workers"""
+        deadline = time.monotonic() + self.timeout
+        file_type = DocumentType(file_type)
+
+        if file_type != DocumentType.PDF:
+            return await self.run(extract_to_file, path, file_type, out_path)
+
+        pages = await self.run(
+            pdf_page_count, path, timeout=deadline - time.monotonic()
+        )
+        ranges = self._page_ranges(pages)
+        if len(ranges) <= 1:
+            return await self.run(
+                extract_to_file,
+                path,
+                file_type,
+                out_path,
+                timeout=deadline - time.monotonic(),
+            )
+
+        parts = [f"{out_path}.part{i}" for i in range(len(ranges))]
+        tasks = [
+            asyncio.create_task(
+                self.run(
+                    extract_to_file,
+                    path,
+                    file_type,
+                    part,
+                    page_range,
+                    timeout=deadline - time.monotonic(),
+                )
+            )
+            for part, page_range in zip(parts, ranges)
+        ]
+        try:
+            # Ranges may queue for a worker, so the deadline covers the whole job
+            counts = await asyncio.wait_for(
+                asyncio.gather(*tasks), max(deadline - time.monotonic(), 0)
+            )
+            await asyncio.to_thread(_concat, parts, out_path)
+        except asyncio.TimeoutError:
+            raise ExtractionTimeout(f"Extraction exceeded {self.timeout:g}s") from None
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+        finally:
+            for part in parts:
+                if os.path.exists(part):
+                    os.remove(part)
+        return sum(counts)
+
+    def close(self) -> None:
+        self._closed = True
+        while self._idle:
+            self._idle.pop().stop()
+
+
+def _concat(parts: List[str], out_path: str) -> None:
+    tmp = f"{out_path}.tmp"
+    with open(tmp, "wb") as out:
+        for part in parts:
+            with open(part, "rb") as f:
+                shutil.copyfileobj(f, out)
+    os.replace(tmp, out_path)
+
+
+_extraction_pool: Optional[ExtractionPool] = None
+
+
+def get_extraction_pool() -> Optional[ExtractionPool]:
+    """
+    The shared pool, or None when extraction should run inline: EXTRACTION_WORKERS
+    is 0, or this is a daemonic process such as a Celery prefork child, which
+    cannot start processes of its own (Celery's pool already provides parallelism
+    and its task time limits stop runaway parsers).
+    """
+    global _extraction_pool
+    if settings.EXTRACTION_WORKERS <= 0 or multiprocessing.current_process().daemon:
+        return None
+    if _extraction_pool is None:
+        _extraction_pool = ExtractionPool()
+    return _extraction_pool
+
+
+def close_extraction_pool() -> None:
+    global _extraction_pool
+    if _extraction_pool is not None:
+        _extraction_pool.close()
+        _extraction_pool = None
@@ -0,0 +1,417 @@
+import asyncio
+import json
+import multiprocessing
+import os
+import shutil
+import time
+from typing import TYPE_CHECKING, Dict, Any, Optional, List, Iterator
+
+import numpy as np
+
+from app.core.config import settings
+from app.core.tracing import span
+from app.services.jobs import get_job_store, get_tenant_limiter
+from app.services.extraction import extract_to_file, iter_text, split_stream
+from app.services.extraction_pool import get_extraction_pool
+
+if TYPE_CHECKING:
+    from app.ai.rag import RAGService
+
+# Stages run in this order; each one is idempotent and skipped once done
+STAGES = ("extract", "chunk", "embed", "upsert", "summarize")
+
+# Chunks embedded / upserted per step of the embed and upsert stages
+STAGE_GROUP_SIZE = 2048
+
+# Keeps eager-mode pipeline tasks referenced until they finish
+_eager_tasks: set = set()
+
+
+def _jobs_root() -> str:
+    return os.path.join(settings.UPLOAD_DIR, "jobs")
+
+
+def job_dir(job_id: str) -> str:
+    """Stage artifacts live on the shared upload volume so any worker can resume"""
+    path = os.path.join(_jobs_root(), job_id)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def remove_job_dir(job_id: str) -> None:
+    shutil.rmtree(os.path.join(_jobs_root(), job_id), ignore_errors=True)
+
+
+def remove_upload(path: str) -> None:
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def sweep_job_dirs(max_age: Optional[int] = None) -> int:
+    """
+    Delete artifacts of jobs untouched for `max_age` seconds (default
+    INGESTION_JOB_TTL, after which the job itself has expired and can no
+    longer be resumed). Succeeded jobs clean up after themselves, so this
+    catches failed and abandoned ones. Returns how many were removed.
+    """
+    max_age = settings.INGESTION_JOB_TTL if max_age is None else max_age
+    cutoff = time.time() - max_age
+    removed = 0
+    try:
+        entries = list(os.scandir(_jobs_root()))
+    except FileNotFoundError:
+        return 0
+    for entry in entries:
+        try:
+            if entry.is_dir() and entry.stat().st_mtime < cutoff:
+                shutil.rmtree(entry.path, ignore_errors=True)
+                removed += 1
+        except OSError:
+            continue
+    return removed
+
+
+def _write_atomic(path: str, data: bytes) -> None:
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+def _iter_chunks(job_id: str) -> Iterator[str]:
+    with open(os.path.join(job_dir(job_id), "chunks.jsonl"), encoding="utf-8") as f:
+        for line in f:
+            yield json.loads(line)
+
+
+def _iter_chunk_groups(job_id: str) -> Iterator[List[str]]:
+    """Chunks in groups of STAGE_GROUP_SIZE so large documents never sit in memory"""
+    group: List[str] = []
+    for chunk in _iter_chunks(job_id):
+        group.append(chunk)
+        if len(group) >= STAGE_GROUP_SIZE:
+            yield group
+            group = []
+    if group:
+        yield group
+
+
+def _chunk_to_file(text_path: str, text_splitter, out_path: str) -> int:
+    """Stream text through the splitter into a JSON-lines chunk file"""
+    total = 0
+    tmp = f"{out_path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as out:
+        for chunk in split_stream(iter_text(text_path), text_splitter):
+            out.write(json.dumps(chunk) + "\n")
+            total += 1
+    os.replace(tmp, out_path)
+    return total
+
+
+async def _extract(job: Dict[str, Any], rag_service: "RAGService") -> Dict[str, Any]:
+    out_path = os.path.join(job_dir(job["job_id"]), "text.txt")
+    pool = get_extraction_pool()
+    if pool is not None:
+        characters = await pool.extract_to_file(
+            job["file_path"], job["file_type"], out_path
+        )
+    elif multiprocessing.current_process().daemon:
+        # Celery worker child: parse on this thread so the task's soft time
+        # limit interrupts the parser (a thread could not be stopped)
+        characters = extract_to_file(job["file_path"], job["file_type"], out_path)
+    else:
+        characters = await asyncio.to_thread(
+            extract_to_file, job["file_path"], job["file_type"], out_path
+        )
+    return {"characters": characters}
+
+
+async def _chunk(job: Dict[str, Any], rag_service: "RAGService") -> Dict[str, Any]:
+    total = await asyncio.to_thread(
+        _chunk_to_file,
+        os.path.join(job_dir(job["job_id"]), "text.txt"),
+        rag_service.text_splitter,
+        os.path.join(job_dir(job["job_id"]), "chunks.jsonl"),
+    )
+    return {"total_chunks": total}
+
+
+def _chunk_metadata(job: Dict[str, Any]) -> Dict[str, Any]:
+    metadata = {
+        "document_id": job.get("document_id"),
+        "owner_id": job.get("owner_id"),
+        "file_type": job["file_type"],
+        "created_at": job.get("document_created_at"),
+        "title": job.get("title"),
+    }
+    return {key: value for key, value in metadata.items() if value is not None}
+
+
+async def _embed(job: Dict[str, Any], rag_service: "RAGService") -> Dict[str, Any]:
+    """
+    Embed only chunks the document does not already have. A plan line per chunk
+    records either the stored vector to reuse or the row of its new embedding.
+    """
+    from app.ai.ingestion import EmbeddingPipeline, ChunkMatcher, chunk_hash
+    from app.ai.vector_store import assign_vector_ids
+
+    existing = []
+    if job.get("document_id") is not None:
+        existing = await rag_service.vector_store.get_document_chunks(
+            job["document_id"]
+        )
+    matcher = ChunkMatcher(existing)
+    # New chunks get deterministic IDs now, so a retried upsert overwrites them
+    taken = {chunk["id"] for chunk in existing}
+
+    pipeline = EmbeddingPipeline(rag_service.embeddings, rag_service.vector_store)
+    directory = job_dir(job["job_id"])
+    vectors_path = os.path.join(directory, "embeddings.f32")
+    plan_path = os.path.join(directory, "plan.jsonl")
+    dimensions = None
+    rows = 0
+    requests_saved = 0
+    with open(f"{vectors_path}.tmp", "wb") as out, open(
+        f"{plan_path}.tmp", "w"
+    ) as plan:
+        for group in _iter_chunk_groups(job["job_id"]):
+            pending = []
+            for chunk in group:
+                digest = chunk_hash(chunk)
+                stored = matcher.match(digest)
+                if stored is None:
+                    step = {"row": rows + len(pending)}
+                    if job.get("document_id") is not None:
+                        step["id"] = assign_vector_ids(
+                            job["document_id"], [digest], taken
+                        )[0]
+                    plan.write(json.dumps(step) + "\n")
+                    pending.append(chunk)
+                else:
+                    position = {
+                        key: stored["metadata"].get(key)
+                        for key in ("chunk_index", "total_chunks")
+                    }
+                    plan.write(json.dumps({"reuse": stored["id"], **position}) + "\n")
+            if existing:
+                requests_saved += len(pipeline.make_batches(group)) - len(
+                    pipeline.make_batches(pending)
+                )
+            if pending:
+                vectors = np.asarray(await pipeline.embed(pending), dtype=np.float32)
+                dimensions = int(vectors.shape[1])
+                out.write(vectors.tobytes())
+                rows += len(pending)
+    removed = [chunk["id"] for chunk in matcher.unmatched()]
+    _write_atomic(os.path.join(directory, "removed.json"), json.dumps(removed).encode())
+    os.replace(f"{vectors_path}.tmp", vectors_path)
+    os.replace(f"{plan_path}.tmp", plan_path)
+
+    total = job.get("total_chunks") or 0
+    return {
+        "dimensions": dimensions,
+        "chunks_added": rows,
+        "chunks_reused": total - rows,
+        "chunks_removed": len(removed),
+        "embedding_requests_saved": requests_saved,
+    }
+
+
+async def _upsert(job: Dict[str, Any], rag_service: "RAGService") -> Dict[str, Any]:
+    """Add new chunks, fix positions of reused ones, then delete removed ones"""
+    from app.ai.ingestion import chunk_hash
+
+    directory = job_dir(job["job_id"])
+    total = job.get("total_chunks") or 0
+    metadata = _chunk_metadata(job)
+    with open(os.path.join(directory, "removed.json")) as f:
+        removed = json.load(f)
+
+    ids: List[str] = []
+    if total:
+        vectors = None
+        if job.get("chunks_added"):
+            vectors = np.memmap(
+                os.path.join(directory, "embeddings.f32"), dtype=np.float32, mode="r"
+            ).reshape(job["chunks_added"], -1)
+        with open(os.path.join(directory, "plan.jsonl")) as plan:
+            offset = 0
+            for group in _iter_chunk_groups(job["job_id"]):
+                steps = [json.loads(plan.readline()) for _ in group]
+                documents = []
+                reindexed = {}
+                for i, (chunk, step) in enumerate(zip(group, steps)):
+                    position = {"chunk_index": offset + i, "total_chunks": total}
+                    if "row" in step:
+                        documents.append(
+                            {
+                                "text": chunk,
+                                "embedding": vectors[step["row"]].tolist(),
+                                "metadata": {
+                                    **metadata,
+                                    **position,
+                                    "chunk_hash": chunk_hash(chunk),
+                                },
+                                **({"id": step["id"]} if "id" in step else {}),
+                            }
+                        )
+                    elif any(step.get(key) != value for key, value in position.items()):
+                        reindexed[step["reuse"]] = position
+
+                new_ids = iter(
+                    await rag_service.vector_store.add_documents(documents)
+                    if documents
+                    else []
+                )
+                ids.extend(
+                    step["reuse"] if "reuse" in step else next(new_ids)
+                    for step in steps
+                )
+                await rag_service.vector_store.update_metadata(reindexed)
+                offset += len(group)
+        del vectors
+
+    # Deleting last keeps the document searchable while it is re-ingested
+    if removed:
+        await rag_service.vector_store.delete_documents(removed)
+
+    if rag_service.answer_cache is not None:
+        await rag_service.answer_cache.invalidate(
+            vector_ids=removed, document_ids=[job.get("document_id")], unsourced=True
+        )
+    return {"vector_ids": ids}
+
+
+async def _summarize(job: Dict[str, Any], rag_service: "RAGService") -> Dict[str, Any]:
+    with open(os.path.join(job_dir(job["job_id"]), "text.txt"), encoding="utf-8") as f:
+        text = f.read(settings.SUMMARY_MAX_INPUT_CHARS)
+    summary = await rag_service.summarize_document(text) if text.strip() else ""
+
+    if job.get("document_id") is not None:
+        from app.db.session import AsyncSessionLocal
+        from app.models.document import Document
+
+        async with AsyncSessionLocal() as session:
+            document = await session.get(Document, job["document_id"])
+            if document is not None:
+                document.summary = summary
+                await session.commit()
+    return {"summary": summary}
+
+
+STAGE_HANDLERS = {
+    "extract": _extract,
+    "chunk": _chunk,
+    "embed": _embed,
+    "upsert": _upsert,
+    "summarize": _summarize,
+}
+
+
+async def run_stage(job_id: str, stage: str, rag_service: "RAGService") -> bool:
+    """
+    Run one stage of a job. Returns False without doing any work when the
+    job's tenant is already at INGESTION_TENANT_CONCURRENCY; the caller should
+    retry later. Raises if the stage fails (retrying is safe).
+    """
+    store = get_job_store()
+    job = await store.get(job_id)
+    if job is None:
+        raise KeyError(f"Unknown ingestion job: {job_id}")
+    if job["stages"].get(stage) == "done":
+        return True
+
+    limiter = get_tenant_limiter()
+    token = f"{job_id}:{stage}"
+    if not await limiter.acquire(job.get("owner_id"), token):
+        return False
+    try:
+        await store.update(job_id, status="running", stage=stage, error=None)
+        with span(
+            f"ingestion.{stage}", job_id=job_id, document_id=job.get("document_id")
+        ):
+            result = await STAGE_HANDLERS[stage](job, rag_service)
+        stages = {**job["stages"], stage: "done"}
+        done = all(stages.get(name) == "done" for name in STAGES)
+        await store.update(
+            job_id,
+            stages=stages,
+            progress=round(len(stages) / len(STAGES), 2),
+            status="succeeded" if done else "running",
+            **result,
+        )
+    except Exception as e:
+        await store.update(job_id, status="failed", error=str(e))
+        raise
+    finally:
+        await limiter.release(job.get("owner_id"), token)
+    if done:
+        # Failed jobs keep their artifacts for retries until sweep_job_dirs
+        await asyncio.to_thread(remove_job_dir, job_id)
+        if job.get("superseded_path") and job["superseded_path"] != job["file_path"]:
+            # A job for the previous version may have been reading it until now
+            await asyncio.to_thread(remove_upload, job["superseded_path"])
+    return True
+
+
+async def run_pipeline(job_id: str, rag_service: "RAGService") -> None:
+    """Run every stage in-process (eager mode)"""
+    for stage in STAGES:
+        while not await run_stage(job_id, stage, rag_service):
+            await asyncio.sleep(settings.INGESTION_TENANT_RETRY_DELAY)
+
+
+async def submit_ingestion(
+    file_path: str,
+    file_type: str,
+    owner_id: Optional[int] = None,
+    document_id: Optional[int] = None,
+    title: Optional[str] = None,
+    document_created_at: Optional[str] = None,
+    priority: str = "default",
+    rag: Optional["RAGService"] = None,
+    superseded_path: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    Create an ingestion job and hand it to Celery, or run it in-process with
+    `rag` (the app's RAG service) when INGESTION_EAGER is set. A new version's
+    job deletes `superseded_path`, the previous upload, once it succeeds.
+    """
+    if priority not in ("high", "default", "low"):
+        raise ValueError(f"Unknown ingestion priority: {priority}")
+
+    job = await get_job_store().create(
+        file_path=file_path,
+        file_type=file_type,
+        owner_id=owner_id,
+        document_id=document_id,
+        title=title,
+        document_created_at=document_created_at,
+        priority=priority,
+        superseded_path=superseded_path,
+    )
+
+    if settings.INGESTION_EAGER:
+        if rag is None:
+            raise ValueError("Eager ingestion needs the RAG service")
+        task = asyncio.create_task(run_pipeline(job["job_id"], rag))
+        _eager_tasks.add(task)
+        task.add_done_callback(_eager_tasks.discard)
+    else:
+        from app.worker.tasks import enqueue_ingestion
+
+        # Publishing to the broker is blocking network I/O
+        await asyncio.to_thread(enqueue_ingestion, job["job_id"], priority)
+    return job
+
+
+async def get_job_status(job_id: str) -> Optional[Dict[str, Any]]:
+    """Job state for the status endpoint (artifact paths and vector ids omitted)"""
+    job = await get_job_store().get(job_id)
+    if job is None:
+        return None
+    job.pop("vector_ids", None)
+    job.pop("file_path", None)
+    return job
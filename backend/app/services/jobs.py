@@ -0,0 +1,166 @@
+import json
+import time
+import uuid
+from abc import ABC, abstractmethod
+from typing import Dict, Any, Optional
+from app.core.config import settings
+
+
+class JobStore(ABC):
+    """Persists ingestion job state so any worker can resume or report a job"""
+
+    @abstractmethod
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        pass
+
+    @abstractmethod
+    async def save(self, job: Dict[str, Any]) -> None:
+        pass
+
+    async def create(self, **fields: Any) -> Dict[str, Any]:
+        now = time.time()
+        job = {
+            "job_id": uuid.uuid4().hex,
+            "status": "queued",
+            "stage": None,
+            "progress": 0.0,
+            "stages": {},  # stage name -> "done"
+            "error": None,
+            "created_at": now,
+            "updated_at": now,
+            **fields,
+        }
+        await self.save(job)
+        return job
+
+    async def update(self, job_id: str, **fields: Any) -> Dict[str, Any]:
+        job = await self.get(job_id)
+        if job is None:
+            raise KeyError(f"Unknown ingestion job: {job_id}")
+        job.update(fields, updated_at=time.time())
+        await self.save(job)
+        return job
+
+
+class InMemoryJobStore(JobStore):
+    """Job store for eager mode and tests"""
+
+    def __init__(self):
+        self._jobs: Dict[str, Dict[str, Any]] = {}
+
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        job = self._jobs.get(job_id)
+        return json.loads(json.dumps(job)) if job is not None else None
+
+    async def save(self, job: Dict[str, Any]) -> None:
+        self._jobs[job["job_id"]] = json.loads(json.dumps(job))
+
+
+class RedisJobStore(JobStore):
+    """Job store shared by the API and Celery workers"""
+
+    def __init__(self, redis_url: str, ttl: int):
+        import redis.asyncio as aioredis
+
+        self.redis = aioredis.from_url(redis_url)
+        self.ttl = ttl
+
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        data = await self.redis.get(f"ingest:job:{job_id}")
+        return json.loads(data) if data else None
+
+    async def save(self, job: Dict[str, Any]) -> None:
+        await self.redis.set(
+            f"ingest:job:{job['job_id']}", json.dumps(job), ex=self.ttl
+        )
+
+
+class TenantLimiter(ABC):
+    """Caps how many ingestion stages run at once for a single tenant"""
+
+    @abstractmethod
+    async def acquire(self, tenant: Any, token: str) -> bool:
+        """Try to take a slot; returns False when the tenant is at its limit"""
+        pass
+
+    @abstractmethod
+    async def release(self, tenant: Any, token: str) -> None:
+        pass
+
+
+class InMemoryTenantLimiter(TenantLimiter):
+    def __init__(self, limit: int):
+        self.limit = limit
+        self._active: Dict[Any, set] = {}
+
+    async def acquire(self, tenant: Any, token: str) -> bool:
+        active = self._active.setdefault(tenant, set())
+        if len(active) >= self.limit:
+            return False
+        active.add(token)
+        return True
+
+    async def release(self, tenant: Any, token: str) -> None:
+        self._active.get(tenant, set()).discard(token)
+
+
+class RedisTenantLimiter(TenantLimiter):
+    """
+    Slots live in a sorted set scored by acquisition time, so slots held by a
+    crashed worker expire after `lease_seconds` instead of leaking.
+    """
+
+    def __init__(self, redis_url: str, limit: int, lease_seconds: int):
+        import redis.asyncio as aioredis
+
+        self.redis = aioredis.from_url(redis_url)
+        self.limit = limit
+        self.lease_seconds = lease_seconds
+
+    async def acquire(self, tenant: Any, token: str) -> bool:
+        key = f"ingest:tenant:{tenant}:active"
+        now = time.time()
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.zremrangebyscore(key, 0, now - self.lease_seconds)
+            pipe.zadd(key, {token: now})
+            pipe.zrank(key, token)
+            pipe.expire(key, self.lease_seconds)
+            _, _, rank, _ = await pipe.execute()
+        if rank is not None and rank < self.limit:
+            return True
+        await self.redis.zrem(key, token)
+        return False
+
+    async def release(self, tenant: Any, token: str) -> None:
+        await self.redis.zrem(f"ingest:tenant:{tenant}:active", token)
+
+
+_job_store: Optional[JobStore] = None
+_tenant_limiter: Optional[TenantLimiter] = None
+
+
+def get_job_store() -> JobStore:
+    """Redis-backed in normal operation, in-memory when INGESTION_EAGER is set"""
+    global _job_store
+    if _job_store is None:
+        if settings.INGESTION_EAGER:
+            _job_store = InMemoryJobStore()
+        else:
+            _job_store = RedisJobStore(settings.REDIS_URL, settings.INGESTION_JOB_TTL)
+    return _job_store
+
+
+def get_tenant_limiter() -> TenantLimiter:
+    global _tenant_limiter
+    if _tenant_limiter is None:
+        if settings.INGESTION_EAGER:
+            _tenant_limiter = InMemoryTenantLimiter(
+                settings.INGESTION_TENANT_CONCURRENCY
+            )
+        else:
+            _tenant_limiter = RedisTenantLimiter(
+                settings.REDIS_URL,
+                settings.INGESTION_TENANT_CONCURRENCY,
+                settings.INGESTION_STAGE_LEASE_SECONDS,
+            )
+    return _tenant_limiter
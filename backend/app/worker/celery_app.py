@@ -0,0 +1,41 @@
+from celery import Celery
+from kombu import Queue
+from app.core.config import settings
+
+celery_app = Celery(
+    "ai_knowledge_worker",
+    broker=settings.CELERY_BROKER_URL,
+    backend=settings.CELERY_RESULT_BACKEND,
+    include=["app.worker.tasks"],
+)
+
+celery_app.conf.update(
+    task_queues=[
+        Queue("ingestion.high"),
+        Queue("ingestion.default"),
+        Queue("ingestion.low"),
+    ],
+    task_default_queue="ingestion.default",
+    # Workers drain queues in the order listed with -Q, so high goes first
+    broker_transport_options={"queue_order_strategy": "priority"},
+    # Ingestion stages are long; take one at a time and ack only when done so a
+    # crashed worker's stage is redelivered (stages are idempotent)
+    worker_prefetch_multiplier=1,
+    task_acks_late=True,
+    task_reject_on_worker_lost=True,
+    # Extraction runs inline in worker children, so these bound a hung parser.
+    # The soft limit fails the stage normally; the hard limit is the backstop.
+    task_soft_time_limit=settings.CELERY_TASK_SOFT_TIME_LIMIT,
+    task_time_limit=settings.CELERY_TASK_TIME_LIMIT,
+    task_ignore_result=True,
+    task_serializer="json",
+    accept_content=["json"],
+    # Run by the worker's embedded beat (-B); sweeping twice is harmless
+    beat_schedule={
+        "sweep-ingestion-job-dirs": {
+            "task": "ingestion.sweep_job_dirs",
+            "schedule": 3600.0,
+            "options": {"queue": "ingestion.low"},
+        },
+    },
+)
@@ -0,0 +1,82 @@
+import asyncio
+from typing import Any, Coroutine, Optional
+from celery import chain
+from app.core.config import settings
+from app.worker.celery_app import celery_app
+
+# One event loop per worker process, so pooled clients (embedding HTTP pool,
+# Redis, database engine) are created once and reused across tasks
+_loop: Optional[asyncio.AbstractEventLoop] = None
+# RAG service (LLM, embedding and vector store clients) for this worker process,
+# built on the first task so importing the task module stays cheap
+_rag_service = None
+
+
+def run_async(coro: Coroutine) -> Any:
+    global _loop
+    if _loop is None or _loop.is_closed():
+        _loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(_loop)
+    task = _loop.create_task(coro)
+    try:
+        return _loop.run_until_complete(task)
+    except BaseException:
+        # A soft time limit can fire while the loop waits on I/O; cancel the
+        # task so it does not resume during the next one
+        if not task.done():
+            task.cancel()
+            try:
+                _loop.run_until_complete(task)
+            except BaseException:
+                pass
+        raise
+
+
+def get_rag_service():
+    global _rag_service
+    if _rag_service is None:
+        from app.ai.rag import RAGService
+
+        _rag_service = RAGService()
+    return _rag_service
+
+
+@celery_app.task(
+    bind=True,
+    name="ingestion.run_stage",
+    autoretry_for=(Exception,),
+    retry_backoff=True,
+    retry_backoff_max=300,
+    retry_jitter=True,
+    max_retries=5,
+    # Unknown or expired job, or an upload a newer version has already replaced
+    dont_autoretry_for=(KeyError, FileNotFoundError),
+)
+def run_stage_task(self, job_id: str, stage: str) -> str:
+    """Run one ingestion stage; a throttled stage is re-queued, not failed"""
+    from app.services.ingestion import run_stage
+
+    if not run_async(run_stage(job_id, stage, get_rag_service())):
+        # Tenant is at its concurrency limit: try again later
+        raise self.retry(
+            countdown=settings.INGESTION_TENANT_RETRY_DELAY, max_retries=None
+        )
+    return job_id
+
+
+@celery_app.task(name="ingestion.sweep_job_dirs")
+def sweep_job_dirs_task() -> int:
+    """Delete artifacts left behind by failed or abandoned jobs"""
+    from app.services.ingestion import sweep_job_dirs
+
+    return sweep_job_dirs()
+
+
+def enqueue_ingestion(job_id: str, priority: str = "default") -> None:
+    """Queue every stage of a job as a chain on the priority's queue"""
+    from app.services.ingestion import STAGES
+
+    queue = f"ingestion.{priority}"
+    chain(
+        *(run_stage_task.si(job_id, stage).set(queue=queue) for stage in STAGES)
+    ).apply_async()
@@ -0,0 +1,157 @@
+"""
+Benchmark: authenticated request throughput with and without the auth cache.
+
+Serves the real GET /api/users/me route (get_current_user) in-process over
+ASGI and drives it with concurrent clients holding tokens for a pool of
+users. The user lookup is replaced through FastAPI dependency overrides by
+one that waits --db-latency-ms, standing in for a Postgres round trip, so the
+run needs no database. Reports requests/sec and latency percentiles with the
+cache enabled and disabled.
+
+Also measures event loop stalls during a burst of logins: bcrypt verification
+called inline vs through the password hashing thread pool.
+
+Usage (from backend/):
+    python -m benchmarks.auth_cache --requests 5000 --clients 32 --db-latency-ms 2
+"""
+
+import argparse
+import asyncio
+import random
+import time
+from typing import Any, Dict, List
+
+import httpx
+from fastapi import FastAPI
+
+from app.core.auth import AuthCache, CurrentUser, get_auth_cache, get_user_loader
+from app.core.security import (
+    averify_password,
+    create_access_token,
+    get_password_hash,
+    verify_password,
+)
+from app.models.user import UserRole
+from app.api.routes import users
+from benchmarks.local_vector_store import percentile
+
+
+def create_app(cache: AuthCache, db_latency: float) -> FastAPI:
+    app = FastAPI()
+    app.include_router(users.router, prefix="/api/users")
+
+    async def load_user(user_id: int) -> CurrentUser:
+        await asyncio.sleep(db_latency)
+        return CurrentUser(
+            id=user_id,
+            email=f"user{user_id}@example.com",
+            full_name=None,
+            role=UserRole.USER,
+            is_active=True,
+        )
+
+    app.dependency_overrides[get_user_loader] = lambda: load_user
+    app.dependency_overrides[get_auth_cache] = lambda: cache
+    return app
+
+
+async def measure(
+    name: str, cache: AuthCache, tokens: List[str], args: argparse.Namespace
+) -> Dict[str, Any]:
+    app = create_app(cache, args.db_latency_ms / 1000)
+    latencies: List[float] = []
+    per_client = args.requests // args.clients
+    rng = random.Random(0)
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(
+        transport=transport, base_url="http://bench"
+    ) as client:
+
+        async def worker() -> None:
+            for _ in range(per_client):
+                headers = {"Authorization": f"Bearer {rng.choice(tokens)}"}
+                t0 = time.perf_counter()
+                response = await client.get("/api/users/me", headers=headers)
+                latencies.append(time.perf_counter() - t0)
+                response.raise_for_status()
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(args.clients)))
+        elapsed = time.perf_counter() - start
+
+    result = {
+        "auth": name,
+        "requests_per_s": round(len(latencies) / elapsed, 1),
+        "p50_ms": percentile(latencies, 50),
+        "p95_ms": percentile(latencies, 95),
+        "p99_ms": percentile(latencies, 99),
+    }
+    print(result)
+    return result
+
+
+async def measure_login_burst(logins: int) -> Dict[str, Any]:
+    """Largest gap between 1ms heartbeats while `logins` passwords are verified"""
+    hashed = get_password_hash("correct horse battery staple")
+
+    async def heartbeat(stop: asyncio.Event, gaps: List[float]) -> None:
+        last = time.perf_counter()
+        while not stop.is_set():
+            await asyncio.sleep(0.001)
+            now = time.perf_counter()
+            gaps.append(now - last)
+            last = now
+
+    result: Dict[str, Any] = {"logins": logins}
+    for name in ("inline", "thread_pool"):
+        stop, gaps = asyncio.Event(), []
+        beat = asyncio.create_task(heartbeat(stop, gaps))
+        await asyncio.sleep(0.01)
+        start = time.perf_counter()
+        if name == "inline":
+            for _ in range(logins):
+                verify_password("correct horse battery staple", hashed)
+                await asyncio.sleep(0)
+        else:
+            await asyncio.gather(
+                *(
+                    averify_password("correct horse battery staple", hashed)
+                    for _ in range(logins)
+                )
+            )
+        result[f"{name}_s"] = round(time.perf_counter() - start, 2)
+        stop.set()
+        await beat
+        result[f"{name}_max_loop_stall_ms"] = round(max(gaps) * 1000, 1)
+    print(result)
+    return result
+
+
+async def run(args: argparse.Namespace) -> List[Dict[str, Any]]:
+    tokens = [create_access_token(user_id) for user_id in range(1, args.users + 1)]
+    results = [
+        await measure("cached", AuthCache(), tokens, args),
+        await measure("uncached", AuthCache(ttl=0), tokens, args),
+    ]
+    results.append(await measure_login_burst(args.logins))
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--clients", type=int, default=32)
+    parser.add_argument("--users", type=int, default=200, help="Distinct users/tokens")
+    parser.add_argument(
+        "--db-latency-ms", type=float, default=2.0, help="Simulated user lookup"
+    )
+    parser.add_argument(
+        "--logins", type=int, default=8, help="Concurrent logins in the burst"
+    )
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
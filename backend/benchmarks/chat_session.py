@@ -0,0 +1,236 @@
+"""
+Benchmark: prompt size and latency over a long chat session.
+
+Starts the real app against the same local stand-ins as benchmarks.e2e_load
+(fake OpenAI, SQLite, local vector store), uploads --documents documents,
+then asks --turns questions in one chat session. For each turn it records
+the reported token usage (prompt, rolling summary, recent history, context)
+and the latency, next to the prompt size the turn would have had if the full
+history were sent verbatim. With conversation memory the prompt size should
+level off after a few turns while the naive size keeps growing.
+
+Usage (from backend/):
+    python -m benchmarks.chat_session --turns 50
+    python -m benchmarks.chat_session --turns 100 --stream --answer-tokens 200
+    python -m benchmarks.chat_session --env CHAT_HISTORY_MAX_TOKENS=2000
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import tempfile
+import time
+from typing import Any, Dict, List
+
+import httpx
+from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+
+from app.ai.conversation import MESSAGE_OVERHEAD_TOKENS
+from app.ai.ingestion import count_tokens
+from app.core.security import create_access_token
+from app.db.session import Base
+from app.models.chat import ChatMessage, ChatSession
+from benchmarks.e2e_load import (
+    make_question,
+    make_text,
+    prepare_database,
+    run_api,
+    wait_for_ingestion,
+)
+from benchmarks.fake_openai import run_fake_server
+
+OWNER_ID = 1
+
+
+def prepare_chat_tables(url: str) -> None:
+    sync_url = make_url(url).set(drivername="sqlite")
+    engine = create_engine(sync_url)
+    tables = [ChatSession.__table__, ChatMessage.__table__]
+    Base.metadata.drop_all(engine, tables=tables)
+    Base.metadata.create_all(engine, tables=tables)
+    engine.dispose()
+
+
+async def _ask(
+    client: httpx.AsyncClient, session_id: int, question: str, stream: bool
+) -> Dict[str, Any]:
+    """One turn; returns the answer and the usage report"""
+    url = f"/api/chat/sessions/{session_id}/messages"
+    body = {"question": question, "stream": stream}
+    if not stream:
+        response = await client.post(url, json=body)
+        response.raise_for_status()
+        result = response.json()
+        return {"answer": result["answer"], "usage": result["usage"]}
+
+    answer: List[str] = []
+    usage: Dict[str, Any] = {}
+    event = None
+    async with client.stream("POST", url, json=body) as response:
+        response.raise_for_status()
+        async for line in response.aiter_lines():
+            if line.startswith("event: "):
+                event = line[len("event: ") :]
+            elif line.startswith("data: "):
+                data = json.loads(line[len("data: ") :])
+                if event == "token":
+                    answer.append(data["content"])
+                elif event == "done":
+                    usage = data.get("usage") or {}
+                elif event == "error":
+                    raise RuntimeError(data["detail"])
+    return {"answer": "".join(answer), "usage": usage}
+
+
+async def drive(base_url: str, args: argparse.Namespace) -> Dict[str, Any]:
+    rng = random.Random(args.seed)
+    headers = {"Authorization": f"Bearer {create_access_token(OWNER_ID)}"}
+    async with httpx.AsyncClient(
+        base_url=base_url, headers=headers, timeout=120
+    ) as client:
+        job_ids = []
+        for i in range(args.documents):
+            response = await client.post(
+                "/api/documents/upload",
+                files={
+                    "file": (
+                        f"doc{i}.txt",
+                        make_text(rng, args.doc_kb).encode(),
+                        "text/plain",
+                    )
+                },
+            )
+            response.raise_for_status()
+            job_ids.append(response.json()["job_id"])
+        await wait_for_ingestion(client, job_ids, timeout=300)
+
+        response = await client.post("/api/chat/sessions", json={})
+        response.raise_for_status()
+        session_id = response.json()["id"]
+
+        turns: List[Dict[str, Any]] = []
+        history_tokens = 0  # Every earlier message, as a naive prompt would carry it
+        for turn in range(1, args.turns + 1):
+            question = make_question(rng)
+            start = time.perf_counter()
+            result = await _ask(client, session_id, question, args.stream)
+            latency = time.perf_counter() - start
+            usage = result["usage"]
+            kept = usage.get("summary_tokens", 0) + usage.get("history_tokens", 0)
+            turns.append(
+                {
+                    "turn": turn,
+                    "latency_ms": round(latency * 1000, 1),
+                    "prompt_tokens": usage.get("prompt_tokens"),
+                    "naive_prompt_tokens": usage.get("prompt_tokens", 0)
+                    - kept
+                    + history_tokens,
+                    "summary_tokens": usage.get("summary_tokens"),
+                    "history_tokens": usage.get("history_tokens"),
+                    "history_messages": usage.get("history_messages"),
+                    "context_tokens": usage.get("context_tokens"),
+                    "rewrite_tokens": usage.get("rewrite_tokens"),
+                }
+            )
+            for text in (question, result["answer"]):
+                history_tokens += count_tokens(text) + MESSAGE_OVERHEAD_TOKENS
+            # Think time, which also lets the summary update land between turns
+            await asyncio.sleep(args.think_ms / 1000)
+
+        start = time.perf_counter()
+        response = await client.get(f"/api/chat/sessions/{session_id}")
+        response.raise_for_status()
+        detail = response.json()
+        detail_ms = (time.perf_counter() - start) * 1000
+
+    latencies = [t["latency_ms"] for t in turns]
+    checkpoints = sorted(
+        {1, 2, 5, 10, 25, 50, 100, 200, args.turns} & set(range(1, args.turns + 1))
+    )
+    return {
+        "turns": args.turns,
+        "max_prompt_tokens": max(t["prompt_tokens"] or 0 for t in turns),
+        "final_naive_prompt_tokens": turns[-1]["naive_prompt_tokens"],
+        "turn_latency_ms": {
+            "p50": round(statistics.median(latencies), 1),
+            "p95": round(sorted(latencies)[int(0.95 * (len(latencies) - 1))], 1),
+        },
+        "session": {
+            "message_count": detail["message_count"],
+            "summary_tokens": (
+                count_tokens(detail["summary"]) if detail["summary"] else 0
+            ),
+            "get_session_ms": round(detail_ms, 1),
+        },
+        "checkpoints": [t for t in turns if t["turn"] in checkpoints],
+    }
+
+
+def run(args: argparse.Namespace) -> Dict[str, Any]:
+    with tempfile.TemporaryDirectory() as tmp:
+        database_url = f"sqlite+aiosqlite:///{os.path.join(tmp, 'app.db')}"
+        prepare_database(database_url, owners=1, documents=0)
+        prepare_chat_tables(database_url)
+
+        with run_fake_server(
+            latency_ms=5,
+            dim=args.dim,
+            chat_latency_ms=args.chat_latency_ms,
+            token_ms=args.token_ms,
+            answer_tokens=args.answer_tokens,
+        ) as openai_url:
+            env = {
+                **os.environ,
+                "DATABASE_URL_OVERRIDE": database_url,
+                "OPENAI_BASE_URL": openai_url,
+                "OPENAI_API_KEY": "benchmark",
+                "EMBEDDING_PROVIDER": "openai",
+                "EMBEDDING_DIMENSIONS": str(args.dim),
+                "VECTOR_DB_TYPE": "local",
+                "LOCAL_VECTOR_DIR": os.path.join(tmp, "vectors"),
+                "UPLOAD_DIR": os.path.join(tmp, "uploads"),
+                "INGESTION_EAGER": "true",
+                "ANSWER_CACHE_REDIS_ENABLED": "false",
+            }
+            env.update(dict(item.split("=", 1) for item in args.env))
+            with run_api(env) as (base_url, _):
+                return asyncio.run(drive(base_url, args))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--turns", type=int, default=50)
+    parser.add_argument(
+        "--stream", action="store_true", help="Ask over SSE instead of blocking"
+    )
+    parser.add_argument("--documents", type=int, default=5)
+    parser.add_argument("--doc-kb", type=int, default=20)
+    parser.add_argument(
+        "--dim", type=int, default=256, help="Fake embedding dimensions"
+    )
+    parser.add_argument("--chat-latency-ms", type=float, default=50.0)
+    parser.add_argument("--token-ms", type=float, default=1.0)
+    parser.add_argument(
+        "--answer-tokens", type=int, default=120, help="Words per fake answer"
+    )
+    parser.add_argument(
+        "--think-ms", type=float, default=200.0, help="Pause between turns"
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--env",
+        nargs="*",
+        default=[],
+        metavar="KEY=VALUE",
+        help="Extra settings for the server",
+    )
+    args = parser.parse_args()
+    print(json.dumps(run(args), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+Benchmark: serial vs batched document embedding.
+
+Compares the old one-`aembed_query`-per-chunk loop with EmbeddingPipeline
+against a local fake embedding server and reports chunks/sec and peak memory.
+
+Usage (from backend/):
+    python -m benchmarks.embedding_pipeline --chunks 2000 --latency-ms 50
+"""
+
+import argparse
+import asyncio
+import time
+import tracemalloc
+from typing import List, Dict, Any
+
+from app.ai.embeddings import OpenAIEmbeddingProvider
+from app.ai.ingestion import EmbeddingPipeline
+from benchmarks.fake_openai import run_fake_server
+
+
+class NullVectorStore:
+    """Vector store that only counts what it receives"""
+
+    def __init__(self):
+        self.count = 0
+
+    async def add_documents(self, documents: List[Dict[str, Any]]) -> List[str]:
+        ids = [str(self.count + i) for i in range(len(documents))]
+        self.count += len(documents)
+        return ids
+
+
+def make_chunks(n: int) -> List[str]:
+    words = (
+        "policy employee benefits travel expense security onboarding handbook".split()
+    )
+    return [
+        " ".join(words[(i + j) % len(words)] for j in range(150)) + f" #{i}"
+        for i in range(n)
+    ]
+
+
+async def run_serial(embeddings, store, chunks: List[str]) -> None:
+    documents = []
+    for i, chunk in enumerate(chunks):
+        embedding = await embeddings.aembed_query(chunk)
+        documents.append(
+            {"text": chunk, "embedding": embedding, "metadata": {"chunk_index": i}}
+        )
+    await store.add_documents(documents)
+
+
+async def run_batched(embeddings, store, chunks: List[str], concurrency: int) -> None:
+    pipeline = EmbeddingPipeline(
+        embeddings,
+        store,
+        max_concurrency=concurrency,
+        token_counter=lambda text: max(1, len(text) // 4),
+    )
+    await pipeline.run(chunks, {})
+
+
+def measure(label: str, coro_factory, n_chunks: int) -> Dict[str, Any]:
+    tracemalloc.start()
+    start = time.perf_counter()
+    asyncio.run(coro_factory())
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    result = {
+        "path": label,
+        "chunks": n_chunks,
+        "seconds": round(elapsed, 3),
+        "chunks_per_sec": round(n_chunks / elapsed, 1),
+        "peak_mem_mb": round(peak / 1024 / 1024, 1),
+    }
+    print(
+        f"{label:<10} {result['chunks_per_sec']:>10} chunks/s "
+        f"{result['seconds']:>8}s  peak {result['peak_mem_mb']} MB"
+    )
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--chunks", type=int, default=1000)
+    parser.add_argument("--latency-ms", type=float, default=50.0)
+    parser.add_argument("--dim", type=int, default=1536)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--skip-serial", action="store_true")
+    args = parser.parse_args()
+
+    chunks = make_chunks(args.chunks)
+    with run_fake_server(latency_ms=args.latency_ms, dim=args.dim) as base_url:
+        embeddings = OpenAIEmbeddingProvider(api_key="bench", base_url=base_url)
+        if not args.skip_serial:
+            measure(
+                "serial",
+                lambda: run_serial(embeddings, NullVectorStore(), chunks),
+                len(chunks),
+            )
+        measure(
+            "batched",
+            lambda: run_batched(
+                embeddings, NullVectorStore(), chunks, args.concurrency
+            ),
+            len(chunks),
+        )
+
+
+if __name__ == "__main__":
+    main()
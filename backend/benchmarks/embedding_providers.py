@@ -0,0 +1,154 @@
+"""
+Benchmark: OpenAI embedding path vs the local sentence-transformers provider.
+
+The OpenAI provider talks to the local fake server (benchmarks.fake_openai)
+with a configurable per-request latency; the local provider runs the model
+on CPU, once with dynamic batching and once encoding every request alone.
+Reports document throughput (texts/sec) and query latency p50/p95/p99 with
+concurrent callers.
+
+Requires sentence-transformers for the local runs (skipped otherwise).
+
+Usage (from backend/):
+    python -m benchmarks.embedding_providers --chunks 2000 --clients 32 --latency-ms 50
+    python -m benchmarks.embedding_providers --backend onnx
+"""
+
+import argparse
+import asyncio
+import time
+from typing import Any, Dict, List
+
+import numpy as np
+
+from app.ai.embeddings import (
+    EmbeddingProvider,
+    LocalEmbeddingProvider,
+    OpenAIEmbeddingProvider,
+)
+from benchmarks.embedding_pipeline import make_chunks
+from benchmarks.fake_openai import run_fake_server
+
+
+async def measure(
+    name: str,
+    provider: EmbeddingProvider,
+    chunks: List[str],
+    clients: int,
+    queries_per_client: int,
+    batch_size: int,
+    concurrency: int,
+) -> Dict[str, Any]:
+    # Warm up (model load, connection pool)
+    await provider.aembed_query("warm up")
+
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def embed_batch(batch: List[str]) -> None:
+        async with semaphore:
+            await provider.aembed_documents(batch)
+
+    start = time.perf_counter()
+    await asyncio.gather(
+        *(
+            embed_batch(chunks[i : i + batch_size])
+            for i in range(0, len(chunks), batch_size)
+        )
+    )
+    ingest_seconds = time.perf_counter() - start
+
+    latencies: List[float] = []
+
+    async def client(c: int) -> None:
+        for q in range(queries_per_client):
+            t0 = time.perf_counter()
+            await provider.aembed_query(
+                f"what is the travel policy for team {c} question {q}?"
+            )
+            latencies.append(time.perf_counter() - t0)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client(c) for c in range(clients)))
+    query_seconds = time.perf_counter() - start
+
+    result = {
+        "provider": name,
+        "dimensions": await provider.get_dimensions(),
+        "ingest_texts_per_s": round(len(chunks) / ingest_seconds, 1),
+        "queries_per_s": round(len(latencies) / query_seconds, 1),
+        "query_p50_ms": round(float(np.percentile(latencies, 50)) * 1000, 2),
+        "query_p95_ms": round(float(np.percentile(latencies, 95)) * 1000, 2),
+        "query_p99_ms": round(float(np.percentile(latencies, 99)) * 1000, 2),
+    }
+    print(result)
+    return result
+
+
+async def run(args: argparse.Namespace) -> List[Dict[str, Any]]:
+    chunks = make_chunks(args.chunks)
+    options = dict(
+        chunks=chunks,
+        clients=args.clients,
+        queries_per_client=args.queries,
+        batch_size=args.batch_size,
+        concurrency=args.concurrency,
+    )
+    results = []
+
+    with run_fake_server(latency_ms=args.latency_ms, dim=args.openai_dim) as base_url:
+        provider = OpenAIEmbeddingProvider(api_key="test", base_url=base_url)
+        try:
+            results.append(await measure("openai (fake server)", provider, **options))
+        finally:
+            await provider.close()
+
+    try:
+        import sentence_transformers  # noqa: F401
+    except ImportError:
+        print("sentence-transformers is not installed; skipping local providers")
+        return results
+
+    variants = {
+        "local (dynamic batching)": {},
+        "local (one request per encode)": {"batch_size": 1, "max_wait_ms": 0},
+    }
+    for name, kwargs in variants.items():
+        provider = LocalEmbeddingProvider(
+            model=args.local_model,
+            backend=args.backend,
+            quantize=args.quantize,
+            **kwargs,
+        )
+        try:
+            results.append(await measure(name, provider, **options))
+        finally:
+            await provider.close()
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--chunks", type=int, default=2000)
+    parser.add_argument("--clients", type=int, default=32)
+    parser.add_argument("--queries", type=int, default=20, help="Queries per client")
+    parser.add_argument(
+        "--batch-size", type=int, default=64, help="Texts per ingestion call"
+    )
+    parser.add_argument(
+        "--concurrency", type=int, default=4, help="Ingestion calls in flight"
+    )
+    parser.add_argument(
+        "--latency-ms", type=float, default=50.0, help="Fake OpenAI latency"
+    )
+    parser.add_argument("--openai-dim", type=int, default=1536)
+    parser.add_argument("--local-model", default=None)
+    parser.add_argument(
+        "--backend", choices=["torch", "onnx", "openvino"], default=None
+    )
+    parser.add_argument("--quantize", action="store_true", default=None)
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
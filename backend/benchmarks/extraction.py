@@ -0,0 +1,249 @@
+"""
+Benchmark: streaming vs whole-file text extraction.
+
+Generates synthetic pdf/docx/xlsx/csv/txt files of roughly --size-mb each,
+then extracts and splits every file in a fresh process and reports
+throughput (pages, rows or paragraphs per second) and peak RSS above the
+post-import baseline. "stream" is the ingestion path (iter_segments ->
+split_stream); "full" materialises the text and splits it in one go.
+
+Usage (from backend/):
+    python -m benchmarks.extraction --size-mb 100
+    python -m benchmarks.extraction --size-mb 20 --formats pdf csv --modes stream
+"""
+
+import argparse
+import csv
+import multiprocessing
+import os
+import random
+import resource
+import tempfile
+import time
+import zipfile
+from typing import Dict, Any, List
+
+WORDS = (
+    "policy employee benefits travel expense security onboarding handbook "
+    "quarterly revenue forecast customer contract renewal compliance audit"
+).split()
+
+
+def sentence(rng: random.Random, n: int = 14) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(n)).capitalize() + "."
+
+
+def make_txt(path: str, size: int, rng: random.Random) -> int:
+    paragraphs = 0
+    with open(path, "w") as f:
+        while f.tell() < size:
+            f.write(" ".join(sentence(rng) for _ in range(6)) + "\n\n")
+            paragraphs += 1
+    return paragraphs
+
+
+def make_csv(path: str, size: int, rng: random.Random) -> int:
+    rows = 0
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["id", "name", "department", "notes", "amount"])
+        while f.tell() < size:
+            writer.writerow(
+                [
+                    rows,
+                    rng.choice(WORDS),
+                    rng.choice(WORDS),
+                    sentence(rng),
+                    rng.random(),
+                ]
+            )
+            rows += 1
+    return rows
+
+
+def make_docx(path: str, size: int, rng: random.Random) -> int:
+    """Minimal docx written as a stream (python-docx would hold it all in memory)"""
+    ns = "http://schemas.openxmlformats.org/wordprocessingml/2006/main"
+    paragraphs = 0
+    with open(path, "wb") as raw, zipfile.ZipFile(
+        raw, "w", zipfile.ZIP_DEFLATED
+    ) as archive:
+        archive.writestr(
+            "[Content_Types].xml",
+            '<?xml version="1.0" encoding="UTF-8"?>'
+            '<Types xmlns="http://schemas.openxmlformats.org/package/2006/'
+            'content-types">'
+            '<Default Extension="rels" ContentType="application/'
+            'vnd.openxmlformats-package.relationships+xml"/>'
+            '<Default Extension="xml" ContentType="application/xml"/>'
+            '<Override PartName="/word/document.xml" ContentType="application/'
+            'vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml"/>'
+            "</Types>",
+        )
+        archive.writestr(
+            "_rels/.rels",
+            '<?xml version="1.0" encoding="UTF-8"?>'
+            '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/'
+            'relationships">'
+            '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/'
+            'officeDocument/2006/relationships/officeDocument" '
+            'Target="word/document.xml"/>'
+            "</Relationships>",
+        )
+        with archive.open("word/document.xml", "w", force_zip64=True) as doc:
+            header = '<?xml version="1.0" encoding="UTF-8"?>'
+            doc.write(f'{header}<w:document xmlns:w="{ns}"><w:body>'.encode())
+            while raw.tell() < size:
+                body = "".join(
+                    "<w:p><w:r><w:t>"
+                    + " ".join(sentence(rng) for _ in range(4))
+                    + "</w:t></w:r></w:p>"
+                    for _ in range(200)
+                )
+                doc.write(body.encode())
+                paragraphs += 200
+            doc.write(b"</w:body></w:document>")
+    return paragraphs
+
+
+def make_xlsx(path: str, size: int, rng: random.Random) -> int:
+    """openpyxl write-only workbook; row count calibrated from a small sample"""
+    from openpyxl import Workbook
+
+    def write(target: str, rows: int) -> None:
+        workbook = Workbook(write_only=True)
+        sheet = workbook.create_sheet("data")
+        sheet.append(["id", "name", "department", "notes", "amount"])
+        for i in range(rows):
+            sheet.append(
+                [i, rng.choice(WORDS), rng.choice(WORDS), sentence(rng), rng.random()]
+            )
+        workbook.save(target)
+
+    sample_rows = 5000
+    write(path, sample_rows)
+    rows = max(sample_rows, int(sample_rows * size / os.path.getsize(path)))
+    write(path, rows)
+    return rows
+
+
+def make_pdf(path: str, size: int, rng: random.Random) -> int:
+    """Uncompressed text-only PDF written object by object"""
+    offsets: Dict[int, int] = {}
+    page_ids: List[int] = []
+    with open(path, "wb") as f:
+
+        def obj(number: int, body: bytes) -> None:
+            offsets[number] = f.tell()
+            f.write(f"{number} 0 obj\n".encode() + body + b"\nendobj\n")
+
+        f.write(b"%PDF-1.4\n")
+        obj(1, b"<< /Type /Catalog /Pages 2 0 R >>")
+        obj(3, b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+        number = 4
+        while f.tell() < size:
+            lines = " ".join(f"({sentence(rng, 12)}) '" for _ in range(60))
+            stream = f"BT /F1 9 Tf 12 TL 36 806 Td {lines} ET".encode()
+            obj(
+                number,
+                b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream",
+            )
+            obj(
+                number + 1,
+                b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+                b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % number,
+            )
+            page_ids.append(number + 1)
+            number += 2
+        kids = " ".join(f"{i} 0 R" for i in page_ids)
+        obj(2, f"<< /Type /Pages /Kids [{kids}] /Count {len(page_ids)} >>".encode())
+
+        xref = f.tell()
+        f.write(f"xref\n0 {number}\n0000000000 65535 f \n".encode())
+        for i in range(1, number):
+            f.write(f"{offsets[i]:010d} 00000 n \n".encode())
+        trailer = f"trailer\n<< /Size {number} /Root 1 0 R >>\n"
+        f.write(f"{trailer}startxref\n{xref}\n%%EOF\n".encode())
+    return len(page_ids)
+
+
+GENERATORS = {
+    "pdf": (make_pdf, "pages"),
+    "docx": (make_docx, "paragraphs"),
+    "xlsx": (make_xlsx, "rows"),
+    "csv": (make_csv, "rows"),
+    "txt": (make_txt, "paragraphs"),
+}
+
+
+def _rss_mb() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # KB on Linux
+
+
+def _extract(path: str, file_type: str, mode: str, queue) -> None:
+    """Runs in a fresh process so ru_maxrss reflects only this extraction"""
+    from langchain.text_splitter import RecursiveCharacterTextSplitter
+    from app.services.extraction import iter_segments, extract_text, split_stream
+
+    splitter = RecursiveCharacterTextSplitter(
+        chunk_size=1000, chunk_overlap=200, length_function=len
+    )
+    baseline = _rss_mb()
+    start = time.perf_counter()
+    if mode == "stream":
+        chunks = sum(1 for _ in split_stream(iter_segments(path, file_type), splitter))
+    else:
+        chunks = len(splitter.split_text(extract_text(path, file_type)))
+    queue.put(
+        {
+            "seconds": time.perf_counter() - start,
+            "chunks": chunks,
+            "peak_rss_mb": round(_rss_mb() - baseline, 1),
+        }
+    )
+
+
+def measure(path: str, file_type: str, mode: str) -> Dict[str, Any]:
+    context = multiprocessing.get_context("spawn")
+    queue = context.Queue()
+    process = context.Process(target=_extract, args=(path, file_type, mode, queue))
+    process.start()
+    result = queue.get()
+    process.join()
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--size-mb", type=float, default=100)
+    parser.add_argument(
+        "--formats", nargs="+", default=list(GENERATORS), choices=list(GENERATORS)
+    )
+    parser.add_argument(
+        "--modes", nargs="+", default=["stream", "full"], choices=["stream", "full"]
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    size = int(args.size_mb * 1024 * 1024)
+    rng = random.Random(args.seed)
+    with tempfile.TemporaryDirectory() as tmp:
+        for file_type in args.formats:
+            generate, unit = GENERATORS[file_type]
+            path = os.path.join(tmp, f"synthetic.{file_type}")
+            units = generate(path, size, rng)
+            file_mb = os.path.getsize(path) / 1024 / 1024
+            for mode in args.modes:
+                result = measure(path, file_type, mode)
+                rate = units / result["seconds"]
+                print(
+                    f"{file_type:<5} {mode:<7} {file_mb:>7.1f} MB  "
+                    f"{units:>9} {unit:<10} "
+                    f"{rate:>10.1f} {unit}/s  {result['chunks']:>8} chunks  "
+                    f"peak +{result['peak_rss_mb']} MB RSS"
+                )
+            os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+"""
+Local stand-in for the OpenAI API used by the benchmarks.
+
+Serves `/v1/embeddings` with deterministic vectors and
+`/v1/chat/completions` (blocking or streamed) with a canned answer, each
+with configurable latency, so benchmarks can run without network access or
+API keys.
+"""
+
+import asyncio
+import hashlib
+import json
+import multiprocessing
+import random
+import socket
+import struct
+import time
+from contextlib import contextmanager
+from typing import Any, AsyncIterator, Dict, Iterator, List
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+ANSWER_WORDS = (
+    "According to the documents the policy applies to every team and is reviewed "
+    "each quarter by the owners listed in the handbook"
+).split()
+
+
+def fake_embedding(text: str, dim: int) -> List[float]:
+    """Deterministic pseudo-embedding derived from the text hash"""
+    seed = struct.unpack("<Q", hashlib.sha256(text.encode()).digest()[:8])[0]
+    rng = random.Random(seed)
+    return [round(rng.uniform(-1.0, 1.0), 4) for _ in range(dim)]
+
+
+def create_fake_openai_app(
+    latency_ms: float = 50.0,
+    per_item_ms: float = 0.2,
+    dim: int = 1536,
+    chat_latency_ms: float = 300.0,
+    token_ms: float = 10.0,
+    answer_tokens: int = 60,
+) -> FastAPI:
+    """
+    Build a FastAPI app mimicking the OpenAI embeddings and chat endpoints.
+    Chat answers take chat_latency_ms to the first token, then token_ms per token.
+    """
+    app = FastAPI()
+
+    @app.post("/v1/embeddings")
+    async def embeddings(request: Request):
+        body = await request.json()
+        inputs = body["input"]
+        if isinstance(inputs, str):
+            inputs = [inputs]
+
+        await asyncio.sleep((latency_ms + per_item_ms * len(inputs)) / 1000)
+
+        data = [
+            {
+                "object": "embedding",
+                "index": i,
+                "embedding": fake_embedding(str(text), dim),
+            }
+            for i, text in enumerate(inputs)
+        ]
+        # JSONResponse skips FastAPI's slow jsonable_encoder pass over the vectors
+        return JSONResponse(
+            {
+                "object": "list",
+                "model": body.get("model", "text-embedding-3-small"),
+                "data": data,
+                "usage": {"prompt_tokens": 0, "total_tokens": 0},
+            }
+        )
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        prompt_tokens = (
+            sum(len(str(m.get("content", ""))) for m in body["messages"]) // 4
+        )
+        words = [ANSWER_WORDS[i % len(ANSWER_WORDS)] for i in range(answer_tokens)]
+        usage = {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": answer_tokens,
+            "total_tokens": prompt_tokens + answer_tokens,
+        }
+        base = {
+            "id": "chatcmpl-fake",
+            "created": int(time.time()),
+            "model": body["model"],
+        }
+
+        if not body.get("stream"):
+            await asyncio.sleep((chat_latency_ms + token_ms * answer_tokens) / 1000)
+            return JSONResponse(
+                {
+                    **base,
+                    "object": "chat.completion",
+                    "choices": [
+                        {
+                            "index": 0,
+                            "message": {
+                                "role": "assistant",
+                                "content": " ".join(words),
+                            },
+                            "finish_reason": "stop",
+                        }
+                    ],
+                    "usage": usage,
+                }
+            )
+
+        async def events() -> AsyncIterator[str]:
+            chunk = {**base, "object": "chat.completion.chunk"}
+            await asyncio.sleep(chat_latency_ms / 1000)
+            for i, word in enumerate(words):
+                if i:
+                    await asyncio.sleep(token_ms / 1000)
+                delta = {"content": word if i == 0 else f" {word}"}
+                choice = {"index": 0, "delta": delta, "finish_reason": None}
+                yield f"data: {json.dumps({**chunk, 'choices': [choice]})}\n\n"
+            done = {"index": 0, "delta": {}, "finish_reason": "stop"}
+            yield f"data: {json.dumps({**chunk, 'choices': [done]})}\n\n"
+            if body.get("stream_options", {}).get("include_usage"):
+                final = {**chunk, "choices": [], "usage": usage}
+                yield f"data: {json.dumps(final)}\n\n"
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    return app
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _serve(port: int, app_kwargs: Dict[str, Any]) -> None:
+    app = create_fake_openai_app(**app_kwargs)
+    uvicorn.run(app, host="127.0.0.1", port=port, log_level="warning")
+
+
+@contextmanager
+def run_fake_server(**app_kwargs) -> Iterator[str]:
+    """
+    Run the fake API in a separate process and yield its `/v1` base URL.
+    A separate process keeps the server out of the benchmark's CPU and memory figures.
+    """
+    port = _free_port()
+    process = multiprocessing.Process(
+        target=_serve, args=(port, app_kwargs), daemon=True
+    )
+    process.start()
+    deadline = time.monotonic() + 10
+    while True:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.2).close()
+            break
+        except OSError:
+            if time.monotonic() > deadline or not process.is_alive():
+                process.terminate()
+                raise RuntimeError("Fake OpenAI server failed to start")
+            time.sleep(0.05)
+    try:
+        yield f"http://127.0.0.1:{port}/v1"
+    finally:
+        process.terminate()
+        process.join(timeout=5)
@@ -0,0 +1,118 @@
+"""
+Benchmark: tenant-scoped similarity search as the tenant count grows.
+
+Loads a fixed number of vectors spread across N owners into LocalVectorStore
+and compares the owner_id filter pushed down into the index with post-filtering
+an unfiltered top-(k * oversample) result in Python. Reports p50/p95 latency
+and recall@k against exact filtered search.
+
+Usage (from backend/):
+    python -m benchmarks.filtered_search --vectors 200000 --tenants 1 10 100 1000
+"""
+
+import argparse
+import asyncio
+import tempfile
+import time
+from typing import Dict, Any
+
+import numpy as np
+
+from app.core.config import settings
+from app.ai.local_vector_store import IVFIndex, LocalVectorStore, top_k
+from app.ai.vector_store import SearchFilter
+from benchmarks.local_vector_store import make_vectors, percentile
+
+
+async def load_store(
+    path: str, matrix: np.ndarray, owners: np.ndarray
+) -> LocalVectorStore:
+    store = LocalVectorStore(path=path)
+    for start in range(0, len(matrix), 20000):
+        await store.add_documents(
+            [
+                {
+                    "text": "",
+                    "embedding": matrix[i],
+                    "metadata": {"owner_id": int(owners[i])},
+                }
+                for i in range(start, min(start + 20000, len(matrix)))
+            ]
+        )
+    await store.close()
+    # Build the IVF index up front so every query measures the indexed path
+    store._index = IVFIndex.build(store._matrix)
+    return store
+
+
+async def run(
+    n: int, tenants: int, dim: int, queries: int, k: int, oversample: int
+) -> Dict[str, Any]:
+    matrix = make_vectors(n, dim)
+    owners = np.random.default_rng(2).integers(0, tenants, n)
+    query_vectors = make_vectors(queries, dim, seed=1)
+
+    with tempfile.TemporaryDirectory() as path:
+        store = await load_store(path, matrix, owners)
+        row_of = {id: row for row, id in enumerate(store._ids)}
+
+        pushdown_times, post_times = [], []
+        pushdown_recall, post_recall = [], []
+        for i, q in enumerate(query_vectors):
+            owner = i % tenants
+            rows = np.flatnonzero(owners == owner)
+            truth = set(rows[top_k(matrix[rows] @ q, k)].tolist())
+
+            t0 = time.perf_counter()
+            hits = await store.similarity_search(
+                "", k=k, query_embedding=q, search_filter=SearchFilter(owner_id=owner)
+            )
+            pushdown_times.append(time.perf_counter() - t0)
+            pushdown_recall.append(
+                len(truth.intersection(row_of[h["id"]] for h in hits)) / k
+            )
+
+            t0 = time.perf_counter()
+            hits = await store.similarity_search(
+                "", k=k * oversample, query_embedding=q
+            )
+            hits = [h for h in hits if h["metadata"]["owner_id"] == owner][:k]
+            post_times.append(time.perf_counter() - t0)
+            post_recall.append(
+                len(truth.intersection(row_of[h["id"]] for h in hits)) / k
+            )
+
+    result = {
+        "vectors": n,
+        "tenants": tenants,
+        "pushdown_p50_ms": percentile(pushdown_times, 50),
+        "pushdown_p95_ms": percentile(pushdown_times, 95),
+        f"pushdown_recall@{k}": round(float(np.mean(pushdown_recall)), 4),
+        "postfilter_p50_ms": percentile(post_times, 50),
+        "postfilter_p95_ms": percentile(post_times, 95),
+        f"postfilter_recall@{k}": round(float(np.mean(post_recall)), 4),
+    }
+    print(result)
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--vectors", type=int, default=200000)
+    parser.add_argument("--tenants", type=int, nargs="+", default=[1, 10, 100, 1000])
+    parser.add_argument("--dim", type=int, default=128)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--oversample", type=int, default=4)
+    args = parser.parse_args()
+
+    # Index is built explicitly in load_store, not in the background
+    settings.LOCAL_VECTOR_ANN_THRESHOLD = args.vectors + 1
+    for tenants in args.tenants:
+        asyncio.run(
+            run(args.vectors, tenants, args.dim, args.queries, args.k, args.oversample)
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,234 @@
+"""
+Benchmark: hybrid (BM25 + vector, reciprocal rank fusion) vs vector-only retrieval.
+
+Relevance: indexes the labelled set in benchmarks/data/hybrid_relevance.json
+into LocalVectorStore plus BM25Index and reports recall@k for vector-only and
+hybrid retrieval, split into exact-term queries (policy numbers, SKUs, names)
+and paraphrased questions. By default vectors come from an offline surrogate
+model: hashed word vectors with a small synonym table, where identifiers are
+reduced to their shape (POL-2023-0042 -> aaa-9999-9999), mimicking how dense
+embeddings capture meaning but not exact codes. Pass --embeddings openai to
+use the configured embedding provider instead.
+
+Latency: builds a BM25Index over synthetic chunks and reports indexing
+throughput and p50/p95 lexical search and fusion latency.
+
+Usage (from backend/):
+    python -m benchmarks.hybrid_retrieval --k 1 3 5 --sizes 10000 100000
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import re
+import tempfile
+import time
+from typing import Dict, Any, List
+
+import numpy as np
+
+from app.core.config import settings
+from app.ai.lexical_index import BM25Index, reciprocal_rank_fusion
+from app.ai.local_vector_store import LocalVectorStore
+from benchmarks.local_vector_store import percentile
+
+DATA_PATH = os.path.join(os.path.dirname(__file__), "data", "hybrid_relevance.json")
+
+SYNONYMS = [
+    {"vacation", "holiday", "leave", "days"},
+    {"maternity", "parental"},
+    {"dinner", "meal", "meals"},
+    {"expense", "expenses", "claim", "reimbursed", "money", "spent"},
+    {"travelling", "travel", "trip", "business"},
+    {"screen", "monitor"},
+    {"home", "remote", "working", "work"},
+    {"notebook", "laptop", "laptops", "computer", "device"},
+    {"stolen", "lost"},
+    {"suspicious", "phishing"},
+    {"email", "emails", "mail", "login"},
+    {"salary", "payroll"},
+    {"new", "refreshed", "refresh"},
+]
+_CONCEPTS = {word: min(group) for group in SYNONYMS for word in group}
+_WORD = re.compile(r"\w+(?:[-./:]\w+)*")
+
+
+def _hashed_vector(key: str, dim: int) -> np.ndarray:
+    seed = int.from_bytes(hashlib.sha256(key.encode()).digest()[:8], "little")
+    return np.random.default_rng(seed).normal(size=dim).astype(np.float32)
+
+
+def surrogate_embedding(text: str, dim: int = 256) -> List[float]:
+    vector = np.zeros(dim, dtype=np.float32)
+    for word in _WORD.findall(text.lower()):
+        if any(ch.isdigit() for ch in word):
+            key = re.sub(r"[a-z]", "a", re.sub(r"\d", "9", word))
+        else:
+            key = _CONCEPTS.get(word, word)
+        vector += _hashed_vector(key, dim)
+    return vector.tolist()
+
+
+class SurrogateEmbeddings:
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [surrogate_embedding(text) for text in texts]
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return surrogate_embedding(text)
+
+
+def recall(results: List[Dict[str, Any]], relevant: List[str], k: int) -> float:
+    found = {doc["metadata"]["chunk_id"] for doc in results[:k]}
+    return len(found.intersection(relevant)) / min(len(relevant), k)
+
+
+async def run_relevance(ks: List[int], embeddings_kind: str) -> Dict[str, Any]:
+    with open(DATA_PATH) as f:
+        data = json.load(f)
+
+    if embeddings_kind == "openai":
+        from app.ai.embeddings import get_embedding_provider
+
+        embeddings = get_embedding_provider()
+    else:
+        embeddings = SurrogateEmbeddings()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = LocalVectorStore(embeddings, path=os.path.join(tmp, "vectors"))
+        lexical_index = BM25Index(os.path.join(tmp, "lexical"))
+        chunks = data["chunks"]
+        vectors = await embeddings.aembed_documents([chunk["text"] for chunk in chunks])
+        documents = [
+            {
+                "text": chunk["text"],
+                "embedding": vector,
+                "metadata": {
+                    "document_id": chunk["document_id"],
+                    "chunk_id": chunk["id"],
+                },
+            }
+            for chunk, vector in zip(chunks, vectors)
+        ]
+        ids = await store.add_documents(documents)
+        await lexical_index.add([{"id": id, **doc} for id, doc in zip(ids, documents)])
+
+        depth = max(ks) * settings.HYBRID_CANDIDATE_MULTIPLIER
+        scores: Dict[str, Dict[str, List[float]]] = {}
+        for item in data["queries"]:
+            query_embedding = await embeddings.aembed_query(item["query"])
+            vector_hits = await store.similarity_search(
+                item["query"], k=depth, query_embedding=query_embedding
+            )
+            lexical_hits = await lexical_index.search(item["query"], k=depth)
+            hybrid_hits = reciprocal_rank_fusion(
+                [vector_hits, lexical_hits], limit=depth
+            )
+            for kind in (item["kind"], "all"):
+                for k in ks:
+                    bucket = scores.setdefault(
+                        f"{kind}@{k}", {"vector": [], "hybrid": []}
+                    )
+                    bucket["vector"].append(recall(vector_hits, item["relevant"], k))
+                    bucket["hybrid"].append(recall(hybrid_hits, item["relevant"], k))
+        await store.close()
+
+    result = {
+        "embeddings": embeddings_kind,
+        "queries": len(data["queries"]),
+        "chunks": len(data["chunks"]),
+        "recall": {
+            key: {
+                mode: round(float(np.mean(values)), 3)
+                for mode, values in bucket.items()
+            }
+            for key, bucket in sorted(scores.items())
+        },
+    }
+    print(json.dumps(result, indent=2))
+    return result
+
+
+def make_chunks(
+    n: int, words_per_chunk: int, vocabulary: int, seed: int = 0
+) -> List[str]:
+    """Zipf-distributed words plus one identifier per chunk"""
+    rng = np.random.default_rng(seed)
+    ranks = np.minimum(rng.zipf(1.1, size=n * words_per_chunk), vocabulary)
+    words = ranks.reshape(n, words_per_chunk)
+    return [
+        " ".join(f"w{w}" for w in row) + f" ID-{i:07d}" for i, row in enumerate(words)
+    ]
+
+
+async def run_latency(n: int, queries: int, k: int) -> Dict[str, Any]:
+    chunks = make_chunks(n, words_per_chunk=150, vocabulary=50000)
+    rng = np.random.default_rng(1)
+    with tempfile.TemporaryDirectory() as tmp:
+        index = BM25Index(tmp)
+        start = time.perf_counter()
+        for batch_start in range(0, n, 2048):
+            await index.add(
+                [
+                    {"id": str(i), "text": chunks[i], "metadata": {"owner_id": i % 10}}
+                    for i in range(batch_start, min(batch_start + 2048, n))
+                ]
+            )
+        index_seconds = time.perf_counter() - start
+
+        query_sets = {
+            "identifier": [f"ID-{int(i):07d}" for i in rng.integers(0, n, queries)],
+            "common_terms": [
+                " ".join(f"w{int(w)}" for w in rng.integers(2, 50, 3))
+                for _ in range(queries)
+            ],
+            "rare_terms": [
+                " ".join(f"w{int(w)}" for w in rng.integers(1000, 50000, 3))
+                for _ in range(queries)
+            ],
+        }
+        result: Dict[str, Any] = {
+            "chunks": n,
+            "index_s": round(index_seconds, 2),
+            "chunks_per_s": round(n / index_seconds),
+        }
+        for name, texts in query_sets.items():
+            times = []
+            for text in texts:
+                t0 = time.perf_counter()
+                await index.search(text, k * settings.HYBRID_CANDIDATE_MULTIPLIER)
+                times.append(time.perf_counter() - t0)
+            result[f"{name}_p50_ms"] = percentile(times, 50)
+            result[f"{name}_p95_ms"] = percentile(times, 95)
+
+        depth = k * settings.HYBRID_CANDIDATE_MULTIPLIER
+        lists = [
+            [{"id": str(i), "score": 0.0} for i in rng.integers(0, n, depth)]
+            for _ in range(2)
+        ]
+        t0 = time.perf_counter()
+        for _ in range(1000):
+            reciprocal_rank_fusion(lists, limit=k)
+        result["fusion_us"] = round((time.perf_counter() - t0) * 1000, 2)
+    print(result)
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--k", type=int, nargs="+", default=[1, 3, 5])
+    parser.add_argument(
+        "--embeddings", choices=["surrogate", "openai"], default="surrogate"
+    )
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+
+    asyncio.run(run_relevance(args.k, args.embeddings))
+    for n in args.sizes:
+        asyncio.run(run_latency(n, args.queries, max(args.k)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,275 @@
+"""
+Benchmark: LLM gateway admission control.
+
+Runs against an in-process fake provider that answers after --latency-ms
+and returns 429 once more than --provider-rpm requests arrive in a minute
+(scaled down by --time-scale, so a "minute" lasts 60 / time-scale seconds).
+Each scenario runs direct (every call goes straight to the provider) and
+through an LLMGateway configured with the provider's limits:
+
+- rate limit: a burst of --calls distinct prompts; counts provider 429s
+- priority: a flood of background summarization calls with interactive chat
+  calls arriving during it; reports the interactive p50/p95 latency
+- coalescing: --calls identical prompts at once; counts provider calls
+- shedding: a burst larger than the interactive queue; counts 503s and how
+  quickly they were returned
+
+Usage (from backend/):
+    python -m benchmarks.llm_gateway --calls 200 --provider-rpm 120 --time-scale 20
+"""
+
+import argparse
+import asyncio
+import json
+import statistics
+import time
+from collections import deque
+from types import SimpleNamespace
+from typing import Any, Dict, List
+
+from app.ai.llm_gateway import BACKGROUND, INTERACTIVE, LLMGateway, LLMOverloadedError
+
+
+class ProviderRateLimitError(Exception):
+    status_code = 429
+
+    def __init__(self, retry_after: float):
+        super().__init__("rate limited")
+        self.response = SimpleNamespace(headers={"retry-after": str(retry_after)})
+
+
+class FakeChatModel:
+    """Chat model stand-in with a provider-side requests-per-minute limit"""
+
+    model_name = "fake-model"
+    temperature = 0.0
+    max_tokens = 200
+
+    def __init__(self, rpm: int, window: float, latency: float):
+        self.rpm = rpm
+        self.window = window
+        self.latency = latency
+        self.calls = 0
+        self.rate_limited = 0
+        self._recent: deque = deque()
+
+    async def ainvoke(self, messages: List[Any]):
+        now = time.monotonic()
+        while self._recent and now - self._recent[0] > self.window:
+            self._recent.popleft()
+        self.calls += 1
+        if len(self._recent) >= self.rpm:
+            self.rate_limited += 1
+            raise ProviderRateLimitError(
+                round(self.window - (now - self._recent[0]), 3)
+            )
+        self._recent.append(now)
+        await asyncio.sleep(self.latency)
+        return SimpleNamespace(content="answer", usage_metadata={"total_tokens": 250})
+
+
+def _gateway(args: argparse.Namespace, **overrides: Any) -> LLMGateway:
+    options = {
+        # The gateway's minute is scaled like the provider's
+        "requests_per_minute": int(args.provider_rpm * args.time_scale),
+        "tokens_per_minute": 0,
+        "max_concurrency": args.concurrency,
+        "background_max_concurrency": max(1, args.concurrency // 2),
+        "max_queue": {INTERACTIVE: args.calls, BACKGROUND: args.calls * 10},
+        "queue_timeout": {INTERACTIVE: 120.0, BACKGROUND: 600.0},
+        "coalesce": True,
+    }
+    options.update(overrides)
+    return LLMGateway(**options)
+
+
+def _model(args: argparse.Namespace) -> FakeChatModel:
+    return FakeChatModel(
+        args.provider_rpm, 60 / args.time_scale, args.latency_ms / 1000
+    )
+
+
+def _percentiles(latencies: List[float]) -> Dict[str, float]:
+    if not latencies:
+        return {"p50_ms": None, "p95_ms": None}
+    ordered = sorted(latencies)
+    return {
+        "p50_ms": round(statistics.median(ordered) * 1000, 1),
+        "p95_ms": round(ordered[int(0.95 * (len(ordered) - 1))] * 1000, 1),
+    }
+
+
+async def _call(
+    invoke, messages, priority: str, latencies: List[float], errors: Dict[str, int]
+):
+    start = time.perf_counter()
+    try:
+        await invoke(messages, priority)
+        latencies.append(time.perf_counter() - start)
+    except Exception as e:
+        name = type(e).__name__
+        errors[name] = errors.get(name, 0) + 1
+
+
+def _invokers(args: argparse.Namespace, llm: FakeChatModel, **overrides: Any):
+    gateway = _gateway(args, **overrides)
+
+    async def direct(messages, priority):
+        return await llm.ainvoke(messages)
+
+    async def gated(messages, priority):
+        return await gateway.ainvoke(llm, messages, priority)
+
+    return {"direct": direct, "gateway": gated}
+
+
+async def rate_limit(args: argparse.Namespace) -> Dict[str, Any]:
+    results = {}
+    for mode in ("direct", "gateway"):
+        llm = _model(args)
+        invoke = _invokers(args, llm)[mode]
+        latencies: List[float] = []
+        errors: Dict[str, int] = {}
+        start = time.perf_counter()
+        await asyncio.gather(
+            *(
+                _call(invoke, [f"question {i}"], INTERACTIVE, latencies, errors)
+                for i in range(args.calls)
+            )
+        )
+        results[mode] = {
+            "succeeded": len(latencies),
+            "provider_429s": llm.rate_limited,
+            "errors": errors,
+            "elapsed_s": round(time.perf_counter() - start, 2),
+        }
+    return results
+
+
+async def priority(args: argparse.Namespace) -> Dict[str, Any]:
+    results = {}
+    for mode in ("direct", "gateway"):
+        llm = _model(args)
+        invoke = _invokers(args, llm)[mode]
+        background: List[float] = []
+        interactive: List[float] = []
+        errors: Dict[str, int] = {}
+        flood = [
+            asyncio.create_task(
+                _call(invoke, [f"chunk {i}"], BACKGROUND, background, errors)
+            )
+            for i in range(args.calls)
+        ]
+        await asyncio.sleep(0.05)
+        chats = []
+        for i in range(args.interactive):
+            chats.append(
+                asyncio.create_task(
+                    _call(invoke, [f"chat {i}"], INTERACTIVE, interactive, errors)
+                )
+            )
+            await asyncio.sleep(args.interactive_interval_ms / 1000)
+        await asyncio.gather(*chats)
+        for task in flood:
+            task.cancel()
+        await asyncio.gather(*flood, return_exceptions=True)
+        results[mode] = {
+            "interactive": {**_percentiles(interactive), "succeeded": len(interactive)},
+            "background_finished_before_chats": len(background),
+            "provider_429s": llm.rate_limited,
+            "errors": errors,
+        }
+    return results
+
+
+async def coalescing(args: argparse.Namespace) -> Dict[str, Any]:
+    results = {}
+    for mode in ("direct", "gateway"):
+        llm = _model(args)
+        invoke = _invokers(args, llm)[mode]
+        latencies: List[float] = []
+        errors: Dict[str, int] = {}
+        await asyncio.gather(
+            *(
+                _call(
+                    invoke,
+                    ["what is our refund policy?"],
+                    INTERACTIVE,
+                    latencies,
+                    errors,
+                )
+                for _ in range(args.calls)
+            )
+        )
+        results[mode] = {
+            "callers": args.calls,
+            "provider_calls": llm.calls,
+            "errors": errors,
+        }
+    return results
+
+
+async def shedding(args: argparse.Namespace) -> Dict[str, Any]:
+    llm = _model(args)
+    queue = max(1, args.calls // 4)
+    gateway = _gateway(args, max_queue={INTERACTIVE: queue, BACKGROUND: queue})
+    shed: List[float] = []
+    retry_after: List[int] = []
+
+    async def call(i: int) -> None:
+        start = time.perf_counter()
+        try:
+            await gateway.ainvoke(llm, [f"burst {i}"], INTERACTIVE)
+        except LLMOverloadedError as e:
+            shed.append(time.perf_counter() - start)
+            retry_after.append(e.retry_after)
+
+    await asyncio.gather(*(call(i) for i in range(args.calls)))
+    return {
+        "calls": args.calls,
+        "queue_limit": queue,
+        "shed": len(shed),
+        "shed_response_ms": _percentiles(shed),
+        "retry_after_s": sorted(set(retry_after)),
+        "provider_429s": llm.rate_limited,
+    }
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    return {
+        "provider_rpm": args.provider_rpm,
+        "time_scale": args.time_scale,
+        "latency_ms": args.latency_ms,
+        "rate_limit": await rate_limit(args),
+        "priority": await priority(args),
+        "coalescing": await coalescing(args),
+        "shedding": await shedding(args),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--calls", type=int, default=200)
+    parser.add_argument(
+        "--provider-rpm", type=int, default=120, help="Provider limit per minute"
+    )
+    parser.add_argument(
+        "--time-scale",
+        type=float,
+        default=20.0,
+        help="How many times faster a minute passes",
+    )
+    parser.add_argument(
+        "--latency-ms", type=float, default=200.0, help="Provider response time"
+    )
+    parser.add_argument("--concurrency", type=int, default=16, help="Gateway slots")
+    parser.add_argument(
+        "--interactive", type=int, default=20, help="Chat calls during the flood"
+    )
+    parser.add_argument("--interactive-interval-ms", type=float, default=50.0)
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(run(args)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
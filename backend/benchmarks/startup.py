@@ -0,0 +1,173 @@
+"""
+Benchmark: API process startup.
+
+Measures, each in a fresh interpreter:
+
+- import: wall time of `import app.main` (interpreter start-up subtracted),
+  plus the slowest modules from `python -X importtime`
+- first request: time from launching uvicorn until GET /health answers,
+  which includes the lifespan (RAG service construction, index setup)
+
+Services are created in the lifespan rather than at import time, so the
+import figure should stay well below the first request figure. The server
+runs with VECTOR_DB_TYPE=local under a temporary directory by default so no
+database is needed; pass --env to override settings.
+
+Usage (from backend/):
+    python -m benchmarks.startup --runs 5
+    python -m benchmarks.startup --env VECTOR_DB_TYPE=qdrant
+"""
+
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List
+
+import httpx
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _wall_time(code: str, env: Dict[str, str]) -> float:
+    start = time.perf_counter()
+    subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=BACKEND_DIR,
+        env=env,
+        check=True,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    return time.perf_counter() - start
+
+
+def measure_import(runs: int, env: Dict[str, str]) -> Dict[str, Any]:
+    baseline = statistics.median(_wall_time("pass", env) for _ in range(runs))
+    totals = [_wall_time("import app.main", env) - baseline for _ in range(runs)]
+    return {
+        "interpreter_s": round(baseline, 3),
+        "import_p50_s": round(statistics.median(totals), 3),
+        "import_max_s": round(max(totals), 3),
+    }
+
+
+def slowest_imports(env: Dict[str, str], top: int) -> List[Dict[str, Any]]:
+    """Modules imported directly by app.main, by cumulative import time"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app.main"],
+        cwd=BACKEND_DIR,
+        env=env,
+        check=True,
+        capture_output=True,
+        text=True,
+    )
+    modules = []
+    for line in result.stderr.splitlines():
+        fields = line.split("|")
+        if len(fields) != 3 or not fields[1].strip().isdigit():
+            continue
+        # Nesting is shown by indentation: one level below app.main is 3 spaces
+        name = fields[2]
+        if len(name) - len(name.lstrip()) == 3:
+            modules.append(
+                {"module": name.strip(), "ms": round(int(fields[1]) / 1000, 1)}
+            )
+    return sorted(modules, key=lambda module: module["ms"], reverse=True)[:top]
+
+
+def measure_first_request(
+    runs: int, env: Dict[str, str], timeout: float
+) -> Dict[str, Any]:
+    times = []
+    for _ in range(runs):
+        port = _free_port()
+        start = time.perf_counter()
+        server = subprocess.Popen(
+            [
+                sys.executable,
+                "-m",
+                "uvicorn",
+                "app.main:app",
+                "--port",
+                str(port),
+                "--log-level",
+                "warning",
+            ],
+            cwd=BACKEND_DIR,
+            env=env,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.PIPE,
+        )
+        try:
+            while True:
+                if server.poll() is not None:
+                    raise RuntimeError(
+                        f"Server exited: {server.stderr.read().decode()}"
+                    )
+                if time.perf_counter() - start > timeout:
+                    raise TimeoutError(f"No response from /health within {timeout}s")
+                try:
+                    response = httpx.get(f"http://127.0.0.1:{port}/health", timeout=1)
+                    if response.status_code == 200:
+                        break
+                except httpx.TransportError:
+                    pass
+                time.sleep(0.01)
+            times.append(time.perf_counter() - start)
+        finally:
+            server.terminate()
+            server.wait()
+    return {
+        "first_request_p50_s": round(statistics.median(times), 3),
+        "first_request_max_s": round(max(times), 3),
+    }
+
+
+def run(args: argparse.Namespace) -> Dict[str, Any]:
+    with tempfile.TemporaryDirectory() as tmp:
+        env = {
+            **os.environ,
+            "VECTOR_DB_TYPE": "local",
+            "LOCAL_VECTOR_DIR": os.path.join(tmp, "vectors"),
+            "UPLOAD_DIR": os.path.join(tmp, "uploads"),
+        }
+        env.update(dict(item.split("=", 1) for item in args.env))
+        report: Dict[str, Any] = {"runs": args.runs}
+        report.update(measure_import(args.runs, env))
+        report["slowest_imports"] = slowest_imports(env, args.top)
+        report.update(measure_first_request(args.runs, env, args.timeout))
+    return report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=8, help="Slowest modules to list")
+    parser.add_argument(
+        "--timeout", type=float, default=60.0, help="Per start, in seconds"
+    )
+    parser.add_argument(
+        "--env",
+        nargs="*",
+        default=[],
+        metavar="KEY=VALUE",
+        help="Extra settings for the server",
+    )
+    args = parser.parse_args()
+    print(json.dumps(run(args), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""
+Benchmark: cost of request tracing.
+
+Serves a route that opens --spans nested spans (about what a RAG query
+opens) through TracingMiddleware, in-process over ASGI, and compares
+per-request time with tracing disabled, enabled with sampling off (latency
+histograms only) and enabled with every trace sampled (attributes kept,
+no exporter). Overhead is also shown as a share of a --request-ms request,
+since a real chat request spends milliseconds in the embedding API, vector
+search and the LLM.
+
+Usage (from backend/):
+    python -m benchmarks.tracing_overhead --requests 5000 --spans 10 --request-ms 50
+"""
+
+import argparse
+import asyncio
+import json
+import time
+from typing import Any, Dict, List
+
+import httpx
+from fastapi import FastAPI
+
+from app.core.config import settings
+from app.core.tracing import TracingMiddleware, span
+
+MODES = {
+    "disabled": {"TRACING_ENABLED": False, "TRACING_SAMPLE_RATE": 0.0},
+    "unsampled": {"TRACING_ENABLED": True, "TRACING_SAMPLE_RATE": 0.0},
+    "sampled": {"TRACING_ENABLED": True, "TRACING_SAMPLE_RATE": 1.0},
+}
+
+
+def create_app(spans: int) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/work/{item_id}")
+    async def work(item_id: int):
+        with span("bench.request", item_id=item_id):
+            for i in range(spans - 1):
+                with span("bench.stage") as current:
+                    current.set(index=i, chunks=5)
+        return {"item_id": item_id}
+
+    app.add_middleware(TracingMiddleware)
+    return app
+
+
+async def measure(app: FastAPI, requests: int) -> float:
+    """Mean seconds per request, sequential so the numbers are not queueing"""
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(
+        transport=transport, base_url="http://bench"
+    ) as client:
+        for i in range(200):  # Warm up
+            await client.get(f"/work/{i}")
+        start = time.perf_counter()
+        for i in range(requests):
+            response = await client.get(f"/work/{i}")
+            response.raise_for_status()
+        return (time.perf_counter() - start) / requests
+
+
+def measure_span_cost(count: int) -> Dict[str, float]:
+    """Microseconds per bare span in each mode"""
+    costs = {}
+    for mode, overrides in MODES.items():
+        for key, value in overrides.items():
+            setattr(settings, key, value)
+        with span("bench.root"):
+            start = time.perf_counter()
+            for _ in range(count):
+                with span("bench.span"):
+                    pass
+            costs[mode] = round((time.perf_counter() - start) / count * 1e6, 2)
+    return costs
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    settings.TRACING_EXPORTER = "none"
+    app = create_app(args.spans)
+    per_request: Dict[str, float] = {}
+    for mode, overrides in MODES.items():
+        for key, value in overrides.items():
+            setattr(settings, key, value)
+        # Best of a few rounds, to keep scheduler noise out of microsecond figures
+        per_request[mode] = min(
+            [await measure(app, args.requests) for _ in range(args.rounds)]
+        )
+
+    baseline = per_request["disabled"]
+    results: List[Dict[str, Any]] = []
+    for mode, seconds in per_request.items():
+        added = seconds - baseline
+        results.append(
+            {
+                "mode": mode,
+                "request_us": round(seconds * 1e6, 1),
+                "added_us": round(added * 1e6, 1),
+                "overhead_pct_of_request": round(
+                    added / (args.request_ms / 1000) * 100, 3
+                ),
+            }
+        )
+    return {
+        "spans_per_request": args.spans,
+        "request_ms": args.request_ms,
+        "per_span_us": measure_span_cost(args.requests * 10),
+        "results": results,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument(
+        "--spans", type=int, default=10, help="Spans opened per request"
+    )
+    parser.add_argument(
+        "--request-ms",
+        type=float,
+        default=50.0,
+        help="Typical request latency for the overhead share",
+    )
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(run(args)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
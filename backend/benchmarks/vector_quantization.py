@@ -0,0 +1,223 @@
+"""
+Benchmark: float32 vs int8 scalar vs binary quantized vector storage.
+
+Generates clustered synthetic unit vectors and, for each quantization mode,
+reports stored bytes per vector, RAM held by the quantized index, query
+latency and recall@k against exact float32 search, with and without the
+oversample-and-rescore step used by the Qdrant and Atlas stores
+(app.ai.quantization). Quantization mirrors those engines: int8 uses a
+symmetric scale from the 0.99 quantile, binary keeps the sign bit and ranks
+by Hamming distance.
+
+Latencies are brute-force numpy scans on one core. They show the relative
+cost of scanning each representation, not HNSW latency inside Qdrant/Atlas.
+
+Usage (from backend/):
+    python -m benchmarks.vector_quantization --vectors 1000000 --dim 256 --k 10
+"""
+
+import argparse
+import json
+import math
+import time
+from typing import Any, Callable, Dict, List
+
+import numpy as np
+
+from app.ai.local_vector_store import normalize_rows, top_k
+from app.ai.quantization import pack_bson_vector
+from benchmarks.local_vector_store import make_vectors, percentile
+
+BLOCK = 65536
+
+# Bits set per byte value, for Hamming distance over packed bits
+POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+def bson_array_bytes(dim: int) -> int:
+    import bson
+
+    vector = np.random.default_rng(0).normal(size=dim).tolist()
+    return len(bson.encode({"embedding": vector})) - len(bson.encode({"embedding": []}))
+
+
+def bson_binary_bytes(dim: int) -> int:
+    import bson
+
+    vector = pack_bson_vector(np.zeros(dim, dtype=np.float32))
+    return len(bson.encode({"embedding": vector})) - len(
+        bson.encode({"embedding": b""})
+    )
+
+
+def int8_encode(matrix: np.ndarray) -> Dict[str, Any]:
+    sample = matrix[
+        np.random.default_rng(0).choice(len(matrix), min(len(matrix), 100000), False)
+    ]
+    scale = float(np.quantile(np.abs(sample), 0.99)) / 127
+    codes = np.empty(matrix.shape, dtype=np.int8)
+    for start in range(0, len(matrix), BLOCK):
+        block = matrix[start : start + BLOCK] / scale
+        codes[start : start + BLOCK] = np.clip(np.rint(block), -127, 127)
+    return {"codes": codes, "scale": scale}
+
+
+def int8_scores(index: Dict[str, Any], query: np.ndarray) -> np.ndarray:
+    codes = index["codes"]
+    scores = np.empty(len(codes), dtype=np.float32)
+    for start in range(0, len(codes), BLOCK):
+        scores[start : start + BLOCK] = (
+            codes[start : start + BLOCK].astype(np.float32) @ query
+        )
+    return scores
+
+
+def binary_encode(matrix: np.ndarray) -> Dict[str, Any]:
+    codes = np.empty((len(matrix), math.ceil(matrix.shape[1] / 8)), dtype=np.uint8)
+    for start in range(0, len(matrix), BLOCK):
+        codes[start : start + BLOCK] = np.packbits(
+            matrix[start : start + BLOCK] > 0, axis=1
+        )
+    return {"codes": codes}
+
+
+def binary_scores(index: Dict[str, Any], query: np.ndarray) -> np.ndarray:
+    codes = index["codes"]
+    packed = np.packbits(query > 0)
+    scores = np.empty(len(codes), dtype=np.float32)
+    for start in range(0, len(codes), BLOCK):
+        distance = POPCOUNT[codes[start : start + BLOCK] ^ packed].sum(
+            axis=1, dtype=np.int32
+        )
+        scores[start : start + BLOCK] = -distance
+    return scores
+
+
+def evaluate(
+    name: str,
+    scorer: Callable[[np.ndarray], np.ndarray],
+    matrix: np.ndarray,
+    queries: np.ndarray,
+    truths: List[set],
+    k: int,
+    oversampling: List[float],
+) -> Dict[str, Any]:
+    times: Dict[float, List[float]] = {factor: [] for factor in oversampling}
+    recalls: Dict[float, List[float]] = {factor: [] for factor in oversampling}
+    for query, truth in zip(queries, truths):
+        t0 = time.perf_counter()
+        scores = scorer(query)
+        scan = time.perf_counter() - t0
+        for factor in oversampling:
+            t0 = time.perf_counter()
+            candidates = top_k(scores, math.ceil(k * factor))
+            if factor > 1:
+                # Rescore candidates with their full-precision vectors
+                exact = matrix[candidates] @ query
+                found = candidates[top_k(exact, k)]
+            else:
+                found = candidates[:k]
+            times[factor].append(scan + time.perf_counter() - t0)
+            recalls[factor].append(len(truth.intersection(found.tolist())) / k)
+
+    return {
+        f"{name}" if factor == 1 else f"{name}+rescore x{factor:g}": {
+            "p50_ms": percentile(times[factor], 50),
+            "p95_ms": percentile(times[factor], 95),
+            f"recall@{k}": round(float(np.mean(recalls[factor])), 4),
+        }
+        for factor in oversampling
+    }
+
+
+def make_queries(
+    matrix: np.ndarray, n: int, noise: float = 0.5, seed: int = 1
+) -> np.ndarray:
+    """Perturbed copies of stored vectors, so queries land near real neighbours"""
+    rng = np.random.default_rng(seed)
+    dim = matrix.shape[1]
+    base = matrix[rng.choice(len(matrix), n, replace=False)]
+    return normalize_rows(base + rng.normal(size=base.shape) * noise / math.sqrt(dim))
+
+
+def run(
+    n: int, dim: int, queries: int, k: int, oversampling: List[float]
+) -> Dict[str, Any]:
+    matrix = make_vectors(n, dim)
+    query_vectors = make_queries(matrix, queries)
+
+    exact_times, truths = [], []
+    for query in query_vectors:
+        t0 = time.perf_counter()
+        truths.append(set(top_k(matrix @ query, k).tolist()))
+        exact_times.append(time.perf_counter() - t0)
+
+    int8_index = int8_encode(matrix)
+    binary_index = binary_encode(matrix)
+
+    report: Dict[str, Any] = {
+        "vectors": n,
+        "dim": dim,
+        "bytes_per_vector": {
+            "bson_float64_array": bson_array_bytes(dim),
+            "bson_float32_binary": bson_binary_bytes(dim),
+            "float32": dim * 4,
+            "int8": dim,
+            "binary": math.ceil(dim / 8),
+        },
+        "index_ram_mb": {
+            "float32": round(matrix.nbytes / 2**20, 1),
+            "int8": round(int8_index["codes"].nbytes / 2**20, 1),
+            "binary": round(binary_index["codes"].nbytes / 2**20, 1),
+        },
+        "search": {
+            "float32": {
+                "p50_ms": percentile(exact_times, 50),
+                "p95_ms": percentile(exact_times, 95),
+                f"recall@{k}": 1.0,
+            }
+        },
+    }
+    factors = [1.0] + oversampling
+    report["search"].update(
+        evaluate(
+            "int8",
+            lambda q: int8_scores(int8_index, q),
+            matrix,
+            query_vectors,
+            truths,
+            k,
+            factors,
+        )
+    )
+    report["search"].update(
+        evaluate(
+            "binary",
+            lambda q: binary_scores(binary_index, q),
+            matrix,
+            query_vectors,
+            truths,
+            k,
+            factors,
+        )
+    )
+    return report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--vectors", type=int, default=1000000)
+    parser.add_argument("--dim", type=int, default=256)
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument(
+        "--oversampling", type=float, nargs="+", default=[2.0, 3.0, 5.0, 10.0]
+    )
+    args = parser.parse_args()
+
+    report = run(args.vectors, args.dim, args.queries, args.k, args.oversampling)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
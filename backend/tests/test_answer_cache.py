@@ -0,0 +1,102 @@
+from types import SimpleNamespace
+
+import pytest
+
+from app.ai.answer_cache import SemanticAnswerCache
+from app.ai.rag import RAGService
+from app.ai.vector_store import SearchFilter
+
+SCOPE = "owner=1|k=5"
+
+
+@pytest.fixture
+def cache():
+    return SemanticAnswerCache(threshold=0.95, ttl=3600, max_entries_per_scope=10)
+
+
+def _store(
+    cache, embedding, answer, vector_ids=(), document_id=None, scope=SCOPE, **kwargs
+):
+    relevant = [{"id": v, "metadata": {"document_id": document_id}} for v in vector_ids]
+    sources = [{"document_id": document_id}] if vector_ids else []
+    cache.store(scope, embedding, "question", answer, sources, relevant, 1.5, **kwargs)
+
+
+def test_lookup_requires_similarity_above_threshold(cache):
+    _store(cache, [1.0, 0.0, 0.0], "cached", ["v1"])
+
+    assert cache.lookup(SCOPE, [0.99, 0.05, 0.0]).answer == "cached"
+    assert cache.lookup(SCOPE, [0.7, 0.7, 0.0]) is None
+
+
+def test_scopes_never_share_answers(cache):
+    _store(cache, [1.0, 0.0], "owner one", ["v1"])
+
+    other = SemanticAnswerCache.scope_key(SearchFilter(owner_id=2), 5)
+    assert other != SemanticAnswerCache.scope_key(SearchFilter(owner_id=1), 5)
+    assert cache.lookup(other, [1.0, 0.0]) is None
+
+
+async def test_invalidate_by_vector_and_document(cache):
+    _store(cache, [1.0, 0.0, 0.0], "from v1", ["v1"], document_id=10)
+    _store(cache, [0.0, 1.0, 0.0], "from v2", ["v2"], document_id=20)
+    _store(cache, [0.0, 0.0, 1.0], "from v3", ["v3"], document_id=30)
+
+    assert await cache.invalidate(vector_ids=["v1"]) == 1
+    assert cache.lookup(SCOPE, [1.0, 0.0, 0.0]) is None
+
+    assert await cache.invalidate(document_ids=[20]) == 1
+    assert cache.lookup(SCOPE, [0.0, 1.0, 0.0]) is None
+
+    assert cache.lookup(SCOPE, [0.0, 0.0, 1.0]).answer == "from v3"
+
+
+async def test_unsourced_answers_are_dropped_when_content_changes(cache):
+    _store(cache, [1.0, 0.0], "no sources found")
+    _store(cache, [0.0, 1.0], "sourced", ["v1"], document_id=10)
+
+    assert await cache.invalidate(document_ids=[99]) == 0
+    assert await cache.invalidate(document_ids=[99], unsourced=True) == 1
+
+    assert cache.lookup(SCOPE, [1.0, 0.0]) is None
+    assert cache.lookup(SCOPE, [0.0, 1.0]).answer == "sourced"
+
+
+async def test_answer_computed_across_an_invalidation_is_not_stored(cache):
+    epoch = cache.epoch
+    await cache.invalidate(document_ids=[10])
+
+    _store(cache, [1.0, 0.0], "stale", ["v1"], document_id=10, epoch=epoch)
+    assert cache.lookup(SCOPE, [1.0, 0.0]) is None
+
+    _store(cache, [1.0, 0.0], "fresh", ["v1"], document_id=10, epoch=cache.epoch)
+    assert cache.lookup(SCOPE, [1.0, 0.0]).answer == "fresh"
+
+
+def test_scope_keeps_only_the_newest_entries(cache):
+    for i in range(12):
+        embedding = [0.0] * 12
+        embedding[i] = 1.0
+        _store(cache, embedding, f"answer {i}", [f"v{i}"])
+
+    first = [1.0] + [0.0] * 11
+    last = [0.0] * 11 + [1.0]
+    assert cache.lookup(SCOPE, first) is None
+    assert cache.lookup(SCOPE, last).answer == "answer 11"
+
+
+async def test_deleted_vectors_are_invalidated_after_the_delete():
+    events = []
+
+    class Store:
+        async def delete_documents(self, ids):
+            events.append("delete")
+            return True
+
+    class Cache:
+        async def invalidate(self, **kwargs):
+            events.append("invalidate")
+
+    rag = SimpleNamespace(vector_store=Store(), answer_cache=Cache())
+    assert await RAGService.delete_document_embeddings(rag, ["v1"])
+    assert events == ["delete", "invalidate"]
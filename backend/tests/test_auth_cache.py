@@ -0,0 +1,151 @@
+import asyncio
+import hashlib
+from datetime import timedelta
+
+import pytest
+from fastapi import HTTPException
+from jose import JWTError
+
+from app.core import auth
+from app.core.auth import AuthCache, CurrentUser, TTLCache, authenticate
+from app.core.security import create_access_token
+from app.models.user import UserRole
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(auth.time, "monotonic", clock)
+    return clock
+
+
+def _user(user_id, is_active=True):
+    return CurrentUser(
+        id=user_id,
+        email=f"user{user_id}@example.com",
+        full_name=None,
+        role=UserRole.USER,
+        is_active=is_active,
+    )
+
+
+class Loader:
+    """User loader that counts reads and can hold them until `release` is set"""
+
+    def __init__(self, *users):
+        self.users = {user.id: user for user in users}
+        self.loads = 0
+        self.release = asyncio.Event()
+        self.release.set()
+
+    async def __call__(self, user_id):
+        self.loads += 1
+        await self.release.wait()
+        return self.users.get(user_id)
+
+
+def test_ttl_cache_expires_entries(clock):
+    cache = TTLCache(max_entries=10, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2, ttl=5)  # Shorter per-entry TTL wins
+
+    clock.now += 10
+    assert cache.get("a") == 1
+    assert cache.get("b") is None
+
+    clock.now += 60
+    assert cache.get("a") is None
+    assert len(cache) == 0
+
+
+def test_ttl_cache_evicts_least_recently_used(clock):
+    cache = TTLCache(max_entries=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    assert (cache.get("a"), cache.get("c")) == (1, 3)
+
+
+def test_claims_are_cached_until_the_token_expires(clock):
+    cache = AuthCache(ttl=60, max_entries=10)
+    token = create_access_token(1)
+
+    assert cache.decode(token)["sub"] == "1"
+    assert len(cache.claims) == 1
+    assert cache.decode(token)["sub"] == "1"
+
+    short_lived = create_access_token(2, expires_delta=timedelta(seconds=5))
+    cache.decode(short_lived)
+    clock.now += 10
+    assert cache.claims.get(hashlib.sha256(short_lived.encode()).digest()) is None
+    assert cache.claims.get(hashlib.sha256(token.encode()).digest()) is not None
+
+
+def test_invalid_tokens_are_rejected_and_not_cached():
+    cache = AuthCache(ttl=60, max_entries=10)
+
+    with pytest.raises(JWTError):
+        cache.decode("not-a-token")
+    with pytest.raises(JWTError):
+        cache.decode(create_access_token(1, expires_delta=timedelta(seconds=-1)))
+    assert len(cache.claims) == 0
+
+
+async def test_concurrent_requests_load_the_user_once():
+    cache = AuthCache(ttl=60, max_entries=10)
+    loader = Loader(_user(1))
+    loader.release.clear()
+
+    pending = [asyncio.create_task(cache.get_user(1, loader)) for _ in range(10)]
+    await asyncio.sleep(0)
+    loader.release.set()
+    users = await asyncio.gather(*pending)
+
+    assert loader.loads == 1
+    assert {user.id for user in users} == {1}
+    assert await cache.get_user(1, loader) == _user(1)
+    assert loader.loads == 1
+
+
+async def test_invalidation_during_a_load_skips_caching_it():
+    cache = AuthCache(ttl=60, max_entries=10)
+    loader = Loader(_user(1))
+    loader.release.clear()
+
+    pending = asyncio.create_task(cache.get_user(1, loader))
+    while not loader.loads:
+        await asyncio.sleep(0)
+    await cache.invalidate_user(1)  # e.g. deactivated while the old row was being read
+    loader.release.set()
+    await pending
+
+    loader.users[1] = _user(1, is_active=False)
+    assert (await cache.get_user(1, loader)).is_active is False
+    assert loader.loads == 2
+
+
+async def test_authenticate_rejects_unknown_and_inactive_users():
+    cache = AuthCache(ttl=60, max_entries=10)
+    loader = Loader(_user(1), _user(2, is_active=False))
+
+    assert (await authenticate(create_access_token(1), loader, cache)).id == 1
+
+    with pytest.raises(HTTPException) as error:
+        await authenticate(create_access_token(2), loader, cache)
+    assert error.value.status_code == 403
+
+    for token in (create_access_token(3), "garbage"):
+        with pytest.raises(HTTPException) as error:
+            await authenticate(token, loader, cache)
+        assert error.value.status_code == 401
@@ -0,0 +1,131 @@
+import asyncio
+import json
+
+import pytest
+from fastapi import FastAPI, WebSocketDisconnect
+from fastapi.testclient import TestClient
+
+from app.api.routes import chat
+from app.core.auth import AuthCache, CurrentUser, get_auth_cache, get_user_loader
+from app.core.security import create_access_token
+from app.models.user import UserRole
+
+USER = CurrentUser(
+    id=1, email="user1@example.com", full_name=None, role=UserRole.USER, is_active=True
+)
+SOURCE = {"text": "Refunds within 30 days...", "metadata": {}, "score": 0.9}
+
+
+class FakeGateway:
+    def check_capacity(self, priority):
+        pass
+
+
+class FakeRAG:
+    """Streams the answer word by word; "slow" questions stall after the sources"""
+
+    def __init__(self):
+        self.gateway = FakeGateway()
+        self.closed = []  # Questions whose stream was closed
+
+    async def query(self, question, **kwargs):
+        return {"answer": f"answer to {question}", "sources": [SOURCE], "extra": 1}
+
+    async def stream_query(self, question, **kwargs):
+        try:
+            yield {"type": "sources", "sources": [SOURCE], "cached": False}
+            if question == "slow":
+                await asyncio.sleep(60)
+            for word in ("Thirty", "days"):
+                yield {"type": "token", "content": word}
+            yield {"type": "done", "cached": False}
+        finally:
+            self.closed.append(question)
+
+
+@pytest.fixture
+def client():
+    app = FastAPI()
+    app.include_router(chat.router, prefix="/api/chat")
+    app.state.rag_service = FakeRAG()
+
+    async def load(user_id):
+        return USER if user_id == USER.id else None
+
+    app.dependency_overrides[get_user_loader] = lambda: load
+    app.dependency_overrides[get_auth_cache] = lambda: AuthCache(ttl=0)
+    with TestClient(app) as client:
+        client.headers["Authorization"] = f"Bearer {_token()}"
+        yield client
+
+
+def _token():
+    return create_access_token(str(USER.id))
+
+
+def _sse(body):
+    """(event, data) pairs of a Server-Sent Events body"""
+    events = []
+    for block in body.strip().split("\n\n"):
+        name, data = block.split("\n")
+        events.append((name.removeprefix("event: "), json.loads(data[len("data: ") :])))
+    return events
+
+
+def test_query_response_follows_the_schema(client):
+    response = client.post("/api/chat/query", json={"question": "Refunds?"})
+
+    assert response.status_code == 200
+    assert response.json() == {
+        "answer": "answer to Refunds?",
+        "sources": [SOURCE],
+        "cached": False,
+        "usage": None,
+        "search_query": None,
+        "session_id": None,
+    }
+
+
+def test_query_streams_server_sent_events(client):
+    response = client.post(
+        "/api/chat/query", json={"question": "Refunds?", "stream": True}
+    )
+
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = _sse(response.text)
+    assert [name for name, _ in events] == ["sources", "token", "token", "done"]
+    assert "".join(data.get("content", "") for _, data in events) == "Thirtydays"
+
+
+def test_websocket_requires_a_token(client):
+    with pytest.raises(WebSocketDisconnect):
+        with client.websocket_connect("/api/chat/ws?token=invalid") as websocket:
+            websocket.receive_json()
+
+
+def test_websocket_streams_an_answer(client):
+    with client.websocket_connect(f"/api/chat/ws?token={_token()}") as websocket:
+        websocket.send_text("Refunds?")
+
+        types = [websocket.receive_json()["type"] for _ in range(4)]
+
+    assert types == ["sources", "token", "token", "done"]
+
+
+def test_websocket_is_busy_until_cancelled(client):
+    rag = client.app.state.rag_service
+    with client.websocket_connect(f"/api/chat/ws?token={_token()}") as websocket:
+        websocket.send_json({"question": "slow"})
+        assert websocket.receive_json()["type"] == "sources"
+
+        # A second question during a stream is refused, not silently dropped
+        websocket.send_json({"question": "Refunds?"})
+        assert websocket.receive_json() == {"type": "error", "detail": "busy"}
+
+        websocket.send_json({"type": "cancel"})
+        assert websocket.receive_json() == {"type": "cancelled"}
+
+        # The socket takes the next question once the stream is over
+        websocket.send_text("Refunds?")
+        assert websocket.receive_json()["type"] == "sources"
+        assert rag.closed[0] == "slow"
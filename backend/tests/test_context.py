@@ -0,0 +1,102 @@
+import pytest
+
+from app.ai.context import ContextBuilder, Passage, context_window
+from app.core.config import settings
+
+
+def _doc(text, index=None, document_id=1, score=0.5):
+    metadata = (
+        {} if index is None else {"document_id": document_id, "chunk_index": index}
+    )
+    return {
+        "id": f"{document_id}-{index}",
+        "text": text,
+        "score": score,
+        "metadata": metadata,
+    }
+
+
+@pytest.fixture
+def builder(monkeypatch):
+    monkeypatch.setattr(settings, "CONTEXT_MIN_PASSAGE_TOKENS", 3)
+    builder = ContextBuilder(
+        model="gpt-4", max_tokens=20, reserved_tokens=100, rerank=False
+    )
+    builder.count_tokens = lambda text: len(text.split())
+    return builder
+
+
+def test_budget_is_capped_by_the_model_window():
+    assert context_window("gpt-4o-mini") == 128000
+    assert context_window("unknown-model") == 8192
+    builder = ContextBuilder(model="gpt-4", max_tokens=100000, reserved_tokens=1000)
+    assert builder.budget == 8192 - 1000
+
+
+def test_consecutive_chunks_merge_without_the_splitter_overlap(builder):
+    docs = [
+        _doc("beta gamma delta", 1, score=0.9),
+        _doc("alpha beta gamma", 0, score=0.4),
+        _doc("beta gamma delta", 1, score=0.9),  # Same chunk twice
+        _doc("far away", 5, score=0.2),
+        _doc("no position", score=0.7),
+    ]
+
+    passages = builder.merge(docs)
+
+    assert [(p.text, p.score) for p in passages] == [
+        ("alpha beta gamma delta", 0.9),
+        ("no position", 0.7),
+        ("far away", 0.2),
+    ]
+    assert [d["id"] for d in passages[0].docs] == ["1-0", "1-1"]
+
+
+def test_passages_mostly_contained_in_a_better_one_are_dropped(builder):
+    best = "the refund window for annual plans is thirty days from purchase"
+    passages = [
+        Passage(best, 0.9),
+        Passage("refund window for annual plans is thirty days", 0.8),
+        Passage("monthly plans renew on the first day of each month", 0.7),
+    ]
+
+    kept = builder.deduplicate(passages)
+
+    assert [p.score for p in kept] == [0.9, 0.7]
+
+
+def test_pack_fills_the_budget_in_rank_order(builder):
+    passages = [
+        Passage("one two three four five six seven eight", 0.9),  # 10 with separator
+        Passage("a b c d e f g h i j k l m n o p q r s t", 0.8),  # Too long: truncated
+        Passage("never reached", 0.1),
+    ]
+
+    packed = builder.pack(passages)
+
+    assert [p.score for p in packed] == [0.9, 0.8]
+    assert packed[0].text == passages[0].text
+    assert passages[1].text.startswith(packed[1].text)
+    assert len(packed[1].text) < len(passages[1].text)
+
+
+def test_pack_honours_a_lower_budget_for_chat_history(builder):
+    passages = [Passage("one two three", 0.9), Passage("four five six", 0.8)]
+
+    assert [p.text for p in builder.pack(passages, budget=5)] == ["one two three"]
+
+
+async def test_build_reports_the_tokens_saved(builder):
+    docs = [
+        _doc("alpha beta gamma", 0),
+        _doc("beta gamma delta", 1),
+        _doc("alpha beta gamma", 0, document_id=2),
+    ]
+
+    context = await builder.build("question", docs)
+
+    assert context.text == "alpha beta gamma delta\n\nalpha beta gamma"
+    assert len(context.docs) == 3
+    assert context.naive_tokens == 9
+    assert context.tokens == 7
+    assert context.tokens_saved == 2
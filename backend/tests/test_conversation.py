@@ -0,0 +1,134 @@
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app.ai.conversation import (
+    MESSAGE_OVERHEAD_TOKENS,
+    ConversationContext,
+    ConversationMemory,
+)
+from app.core.config import settings
+from app.db.session import Base
+from app.models.chat import ChatMessage, ChatSession
+from app.models.user import User
+from app.services import chat_sessions
+
+
+class FakeLLM:
+    def __init__(self, reply):
+        self.reply = reply
+        self.prompts = []
+
+    async def ainvoke(self, messages):
+        self.prompts.append(messages)
+        return SimpleNamespace(content=self.reply, usage_metadata={"total_tokens": 7})
+
+
+def _message(i, tokens=10):
+    role = "user" if i % 2 == 0 else "assistant"
+    return {"id": i + 1, "role": role, "content": f"message {i}", "tokens": tokens}
+
+
+def _memory(**options):
+    options = {"history_tokens": 140, "summary_tokens": 50, "max_messages": 10}
+    return ConversationMemory(FakeLLM("summary"), rewrite=True, **options)
+
+
+def test_fit_keeps_the_newest_messages_within_budget():
+    memory = _memory()
+    messages = [_message(i) for i in range(20)]  # 14 tokens each with overhead
+
+    context = memory.fit("earlier", messages)
+
+    assert [m["id"] for m in context.messages] == list(range(11, 21))
+    assert context.history_tokens == 140
+    assert context.summary == "earlier"
+
+
+def test_fit_cuts_a_lone_oversized_message():
+    memory = _memory()
+    huge = {"role": "user", "content": "word " * 2000, "tokens": 2000}
+
+    context = memory.fit(None, [huge])
+
+    assert len(context.messages) == 1
+    assert context.messages[0]["tokens"] == 140 - MESSAGE_OVERHEAD_TOKENS
+    assert context.history_tokens == 140
+
+
+def test_nothing_is_folded_under_both_limits():
+    assert _memory().to_fold([_message(i) for i in range(9)]) == []
+
+
+def test_folding_over_the_token_budget_gets_back_to_half():
+    memory = _memory()
+    messages = [_message(i, tokens=30) for i in range(6)]  # 34 each, 204 total
+
+    fold = memory.to_fold(messages)
+
+    assert [m["id"] for m in fold] == [1, 2, 3, 4]
+    remaining = sum(memory.message_tokens(m) for m in messages[len(fold) :])
+    assert remaining <= 140 // 2
+
+
+def test_many_short_turns_are_folded_at_the_message_limit():
+    memory = _memory()
+    messages = [_message(i, tokens=1) for i in range(10)]  # Well under the budget
+
+    fold = memory.to_fold(messages)
+
+    assert [m["id"] for m in fold] == [1, 2, 3, 4, 5]
+
+
+async def test_follow_up_questions_are_rewritten_with_history():
+    memory = _memory()
+    memory.llm = FakeLLM('"What is the refund window for annual plans?"')
+    conversation = ConversationContext("Discussed refunds", [_message(0)], 5, 14)
+
+    question, tokens = await memory.rewrite_query("And for annual?", conversation)
+
+    assert question == "What is the refund window for annual plans?"
+    assert tokens == 7
+    assert "Discussed refunds" in memory.llm.prompts[0][1].content
+    assert await memory.rewrite_query("Hi", ConversationContext()) == ("Hi", None)
+
+
+@pytest.fixture
+async def sessionmaker(tmp_path, monkeypatch):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'chat.db'}")
+    async with engine.begin() as conn:
+        tables = [User.__table__, ChatSession.__table__, ChatMessage.__table__]
+        await conn.run_sync(Base.metadata.create_all, tables=tables)
+        await conn.execute(
+            insert(User),
+            [{"id": 1, "email": "a@example.com", "hashed_password": "x"}],
+        )
+    factory = async_sessionmaker(engine, expire_on_commit=False)
+    monkeypatch.setattr(chat_sessions, "AsyncSessionLocal", factory)
+    monkeypatch.setattr(settings, "CHAT_HISTORY_MAX_MESSAGES", 10)
+    yield factory
+    await engine.dispose()
+
+
+async def test_refresh_summary_advances_past_many_short_turns(sessionmaker):
+    memory = _memory()
+    async with sessionmaker() as db:
+        session = await chat_sessions.create_session(db, owner_id=1)
+    # Short turns never reach the token budget, only the message limit
+    for turn in range(12):
+        async with sessionmaker() as db:
+            await chat_sessions.append_turn(
+                db, session.id, f"question {turn}", f"answer {turn}", [], memory
+            )
+        await chat_sessions.refresh_summary(session.id, memory)
+
+    async with sessionmaker() as db:
+        session = await db.get(ChatSession, session.id)
+        history = await chat_sessions.load_history(db, session)
+    assert session.summary == "summary"
+    assert session.summarized_through > 0
+    # Every message is either in the summary or still in the history
+    ids = [m["id"] for m in history]
+    assert ids == list(range(session.summarized_through + 1, 25))
@@ -0,0 +1,54 @@
+import pytest
+from sqlalchemy import exc, text
+
+from app.core.config import settings
+from app.db import session as db_session
+from app.db.session import (
+    POOL_CHECKED_OUT,
+    POOL_OVERFLOW_CONNECTIONS,
+    POOL_TIMEOUTS,
+    POOL_WAIT,
+    InstrumentedPool,
+)
+
+
+@pytest.fixture
+async def engine(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "DB_POOL_SIZE", 1)
+    monkeypatch.setattr(settings, "DB_MAX_OVERFLOW", 1)
+    monkeypatch.setattr(settings, "DB_POOL_TIMEOUT", 0.1)
+    monkeypatch.setattr(settings, "DB_POOL_PRE_PING", False)
+    url = f"sqlite+aiosqlite:///{tmp_path / 'pool.db'}"
+    engine = db_session._create_engine(url, "test")
+    yield engine
+    await engine.dispose()
+
+
+def test_pool_options_come_from_settings(engine):
+    pool = engine.pool
+    assert isinstance(pool, InstrumentedPool)
+    assert pool.size() == 1
+    assert pool._max_overflow == 1
+    assert pool._timeout == 0.1
+    assert engine.echo is settings.DB_ECHO
+
+
+async def test_checkouts_overflow_and_timeouts_are_reported(engine):
+    overflowed = POOL_OVERFLOW_CONNECTIONS.value(pool="test")
+    timeouts = POOL_TIMEOUTS.value(pool="test")
+    waits = POOL_WAIT.count(pool="test")
+
+    first = await engine.connect()
+    second = await engine.connect()  # Beyond DB_POOL_SIZE
+    await second.execute(text("select 1"))
+    assert POOL_CHECKED_OUT.value(pool="test") == 2
+    assert POOL_OVERFLOW_CONNECTIONS.value(pool="test") == overflowed + 1
+
+    with pytest.raises(exc.TimeoutError):
+        await engine.connect()
+    assert POOL_TIMEOUTS.value(pool="test") == timeouts + 1
+
+    await first.close()
+    await second.close()
+    assert POOL_CHECKED_OUT.value(pool="test") == 0
+    assert POOL_WAIT.count(pool="test") == waits + 3
@@ -0,0 +1,112 @@
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from app.db.session import Base
+from app.models.document import Document, DocumentType
+from app.models.user import User, UserRole
+from app.services.documents import (
+    decode_cursor,
+    encode_cursor,
+    list_documents,
+    page_results,
+)
+
+START = datetime(2024, 1, 1)
+
+
+def test_cursor_round_trips():
+    created_at = datetime(2024, 5, 17, 8, 30, 12, 123456)
+    cursor = encode_cursor(created_at, 42)
+
+    assert "=" not in cursor  # URL-safe without padding
+    assert decode_cursor(cursor) == (created_at, 42)
+
+
+@pytest.mark.parametrize(
+    "cursor", ["", "not-a-cursor", encode_cursor(START, 1)[:-3], "WzFd"]
+)
+def test_malformed_cursor_is_rejected(cursor):
+    with pytest.raises(ValueError, match="Invalid cursor"):
+        decode_cursor(cursor)
+
+
+def test_page_results_trims_the_lookahead_row():
+    rows = [
+        SimpleNamespace(created_at=START - timedelta(seconds=i), id=10 - i)
+        for i in range(4)
+    ]
+
+    items, next_cursor = page_results(rows, limit=3)
+    assert items == rows[:3]
+    assert decode_cursor(next_cursor) == (rows[2].created_at, rows[2].id)
+
+    items, next_cursor = page_results(rows[:3], limit=3)
+    assert items == rows[:3]
+    assert next_cursor is None
+
+
+@pytest.fixture
+async def db():
+    engine = create_async_engine("sqlite+aiosqlite://")
+    async with engine.begin() as conn:
+        await conn.run_sync(
+            Base.metadata.create_all, tables=[User.__table__, Document.__table__]
+        )
+        await conn.execute(
+            insert(User),
+            [
+                {
+                    "id": owner,
+                    "email": f"owner{owner}@example.com",
+                    "hashed_password": "x",
+                    "role": UserRole.USER,
+                }
+                for owner in (1, 2)
+            ],
+        )
+        await conn.execute(
+            insert(Document),
+            [
+                {
+                    "id": i,
+                    "title": f"Document {i}",
+                    "file_name": f"doc{i}.txt",
+                    "file_path": f"/uploads/doc{i}.txt",
+                    "file_type": DocumentType.TXT,
+                    "owner_id": 1 if i % 3 else 2,
+                    # Pairs of rows share a timestamp, so id has to break ties
+                    "created_at": START + timedelta(seconds=i // 2),
+                }
+                for i in range(1, 31)
+            ],
+        )
+    async with AsyncSession(engine) as session:
+        yield session
+    await engine.dispose()
+
+
+async def test_keyset_pages_cover_every_row_once_in_order(db):
+    seen = []
+    cursor = None
+    while True:
+        page = await list_documents(db, owner_id=1, limit=7, cursor=cursor)
+        seen.extend(document.id for document in page["items"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+
+    expected = sorted(
+        (i for i in range(1, 31) if i % 3), key=lambda i: (i // 2, i), reverse=True
+    )
+    assert seen == expected
+
+
+async def test_pages_are_scoped_to_the_owner(db):
+    page = await list_documents(db, owner_id=2, limit=100)
+    assert {document.owner_id for document in page["items"]} == {2}
+    assert len(page["items"]) == 10
+    assert page["next_cursor"] is None
@@ -0,0 +1,111 @@
+from app.ai.embedding_cache import CachedEmbeddings, EmbeddingCache, cache_key
+
+
+class FakeProvider:
+    def __init__(self, name="openai", model="text-embedding-3-small", dimensions=3):
+        self.name = name
+        self.model = model
+        self.dimensions = dimensions
+        self.embedded = []
+
+    async def get_dimensions(self):
+        return self.dimensions
+
+    async def aembed_documents(self, texts):
+        self.embedded.extend(texts)
+        return [[float(len(text))] * self.dimensions for text in texts]
+
+    async def aembed_query(self, text):
+        return (await self.aembed_documents([text]))[0]
+
+
+class FakeRedis:
+    def __init__(self):
+        self.data = {}
+
+    async def mget(self, keys):
+        return [self.data.get(key) for key in keys]
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+
+class FakePipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.pending = {}
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    def set(self, key, value, ex=None):
+        self.pending[key] = value
+
+    async def execute(self):
+        self.redis.data.update(self.pending)
+
+
+async def test_vector_size_and_provider_namespace_the_cache():
+    cache = EmbeddingCache(max_bytes=1 << 20)
+    full = FakeProvider(dimensions=3)
+    await CachedEmbeddings(full, cache).aembed_documents(["hello"])
+
+    # Shortened vectors (EMBEDDING_DIMENSIONS) or another provider must miss
+    for provider in (FakeProvider(dimensions=2), FakeProvider(name="local")):
+        vectors = await CachedEmbeddings(provider, cache).aembed_documents(["hello"])
+        assert len(vectors[0]) == provider.dimensions
+        assert provider.embedded == ["hello"]
+
+    same = FakeProvider(dimensions=3)
+    assert await CachedEmbeddings(same, cache).aembed_query("hello") == [5.0] * 3
+    assert same.embedded == []
+    assert cache_key("openai:m:3", "x") != cache_key("openai:m:2", "x")
+
+
+def test_keys_ignore_whitespace_and_unicode_form():
+    assert cache_key("ns", "  café\n\tmenu ") == cache_key("ns", "café menu")
+    assert cache_key("ns", "menu") != cache_key("ns", "Menu")
+
+
+async def test_lru_is_bounded_by_bytes():
+    # Three float32 values per vector: 12 bytes each
+    cache = EmbeddingCache(max_bytes=24)
+    await cache.set_many("ns", ["a", "b"], [[1.0] * 3, [2.0] * 3])
+    await cache.get("ns", "a")  # Now most recently used
+    await cache.set("ns", "c", [3.0] * 3)
+
+    assert await cache.get("ns", "b") is None
+    assert await cache.get("ns", "a") == [1.0] * 3
+    assert cache.stats()["evictions"] == 1
+    assert cache.stats()["bytes"] == 24
+
+
+async def test_redis_tier_is_shared_between_processes():
+    redis = FakeRedis()
+    writer = EmbeddingCache(max_bytes=1 << 20)
+    reader = EmbeddingCache(max_bytes=1 << 20)
+    writer._redis = reader._redis = redis
+
+    await writer.set("ns", "shared text", [0.5, 0.25])
+
+    assert await reader.get("ns", "shared text") == [0.5, 0.25]
+    assert reader.stats()["redis_hits"] == 1
+    # Promoted into the local tier
+    assert await reader.get("ns", "shared text") == [0.5, 0.25]
+    assert reader.stats()["hits"] == 1
+
+
+async def test_only_distinct_misses_are_embedded():
+    cache = EmbeddingCache(max_bytes=1 << 20)
+    provider = FakeProvider()
+    embeddings = CachedEmbeddings(provider, cache)
+    await embeddings.aembed_documents(["cached"])
+    provider.embedded.clear()
+
+    vectors = await embeddings.aembed_documents(["new", "cached", "new ", "other"])
+
+    assert provider.embedded == ["new", "other"]
+    assert [v[0] for v in vectors] == [3.0, 6.0, 3.0, 5.0]
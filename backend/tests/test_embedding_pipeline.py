@@ -0,0 +1,161 @@
+import asyncio
+
+import pytest
+
+from app.ai import ingestion
+from app.ai.ingestion import EmbeddingPipeline, chunk_hash
+
+
+class FakeEmbeddings:
+    """Embeds a text as [len(text)], tracking how many batches run at once"""
+
+    def __init__(self, failures=0, delay=0.0):
+        self.failures = failures
+        self.delay = delay
+        self.batches = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def aembed_documents(self, texts):
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            if self.delay:
+                await asyncio.sleep(self.delay)
+            if self.failures:
+                self.failures -= 1
+                raise ConnectionError("provider unavailable")
+            self.batches.append(list(texts))
+            return [[float(len(text))] for text in texts]
+        finally:
+            self.in_flight -= 1
+
+
+class FakeVectorStore:
+    def __init__(self):
+        self.writes = []
+
+    async def add_documents(self, documents):
+        self.writes.append(documents)
+        return [doc.get("id", f"id-{doc['text']}") for doc in documents]
+
+
+def _pipeline(embeddings, vector_store=None, **options):
+    options = {
+        "max_batch_tokens": 10,
+        "max_batch_size": 3,
+        "max_concurrency": 2,
+        "max_retries": 0,
+        "retry_base_delay": 0.5,
+        "token_counter": len,
+        **options,
+    }
+    return EmbeddingPipeline(embeddings, vector_store or FakeVectorStore(), **options)
+
+
+def test_batches_respect_token_budget_and_size():
+    pipeline = _pipeline(FakeEmbeddings())
+
+    chunks = ["aaaa", "bbbb", "cc", "d", "e", "f", "g", "hhhhhhhhhhhh", "i"]
+
+    # An oversized chunk still gets a batch of its own
+    assert pipeline.make_batches(chunks) == [[0, 1, 2], [3, 4, 5], [6], [7], [8]]
+
+
+async def test_embed_keeps_chunk_order_and_bounds_concurrency():
+    embeddings = FakeEmbeddings(delay=0.01)
+    pipeline = _pipeline(embeddings, max_batch_size=1, max_concurrency=2)
+    chunks = ["a" * n for n in range(1, 9)]
+
+    vectors = await pipeline.embed(chunks)
+
+    assert vectors == [[float(n)] for n in range(1, 9)]
+    assert len(embeddings.batches) == 8
+    assert embeddings.max_in_flight == 2
+
+
+async def test_failed_batches_are_retried_with_jittered_backoff(monkeypatch):
+    sleeps = []
+
+    async def record_sleep(seconds):
+        sleeps.append(seconds)
+
+    monkeypatch.setattr(ingestion.asyncio, "sleep", record_sleep)
+    monkeypatch.setattr(ingestion.random, "uniform", lambda low, high: high)
+    embeddings = FakeEmbeddings(failures=2)
+    pipeline = _pipeline(embeddings, max_retries=3, retry_base_delay=0.5)
+
+    assert await pipeline.embed(["abc"]) == [[3.0]]
+    # Exponential delay plus up to one base delay of jitter
+    assert sleeps == [0.5 + 0.5, 1.0 + 0.5]
+
+
+async def test_retries_give_up_after_max_retries(monkeypatch):
+    async def no_sleep(seconds):
+        pass
+
+    monkeypatch.setattr(ingestion.asyncio, "sleep", no_sleep)
+    pipeline = _pipeline(FakeEmbeddings(failures=3), max_retries=2)
+
+    with pytest.raises(ConnectionError):
+        await pipeline.embed(["abc"])
+
+
+async def test_run_stores_batches_with_positions_and_deterministic_ids():
+    store = FakeVectorStore()
+    pipeline = _pipeline(FakeEmbeddings(), store, max_batch_size=2)
+    chunks = ["alpha", "beta", "gamma", "delta", "epsilon"]
+
+    ids = await pipeline.run(chunks, {"document_id": 7, "owner_id": 1})
+
+    assert len(store.writes) == 3
+    stored = sorted(
+        (doc for batch in store.writes for doc in batch),
+        key=lambda doc: doc["metadata"]["chunk_index"],
+    )
+    assert [doc["text"] for doc in stored] == chunks
+    assert ids == [doc["id"] for doc in stored]
+    for doc in stored:
+        assert doc["metadata"]["total_chunks"] == 5
+        assert doc["metadata"]["chunk_hash"] == chunk_hash(doc["text"])
+        assert doc["metadata"]["owner_id"] == 1
+
+    # A retried ingestion of the same document overwrites the same ids
+    assert await pipeline.run(chunks, {"document_id": 7, "owner_id": 1}) == ids
+
+
+async def test_run_writes_finished_batches_while_others_embed():
+    release = asyncio.Event()
+
+    class SlowLastBatch(FakeEmbeddings):
+        async def aembed_documents(self, texts):
+            if "last" in texts:
+                await release.wait()
+            return await super().aembed_documents(texts)
+
+    store = FakeVectorStore()
+    pipeline = _pipeline(SlowLastBatch(), store, max_batch_size=1)
+    run = asyncio.create_task(pipeline.run(["first", "second", "last"], {}))
+
+    while len(store.writes) < 2:
+        await asyncio.sleep(0)
+    assert not run.done()
+
+    release.set()
+    assert await run == ["id-first", "id-second", "id-last"]
+
+
+async def test_run_cancels_pending_batches_when_one_fails():
+    class FailingSecondBatch(FakeEmbeddings):
+        async def aembed_documents(self, texts):
+            if texts == ["bad"]:
+                raise ValueError("rejected input")
+            await asyncio.sleep(10)
+            return await super().aembed_documents(texts)
+
+    store = FakeVectorStore()
+    pipeline = _pipeline(FailingSecondBatch(), store, max_batch_size=1)
+
+    with pytest.raises(ValueError):
+        await asyncio.wait_for(pipeline.run(["slow", "bad"], {}), timeout=5)
+    assert store.writes == []
@@ -0,0 +1,88 @@
+import zipfile
+
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+
+from app.models.document import DocumentType
+from app.services import extraction
+from app.services.extraction import (
+    extract_text,
+    extract_to_file,
+    iter_segments,
+    split_stream,
+)
+
+WORD_XML = (
+    '<w:document xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/'
+    'main"><w:body>{}</w:body></w:document>'
+)
+
+
+def _write_docx(path, paragraphs):
+    body = "".join(
+        f"<w:p><w:r><w:t>{text[:3]}</w:t></w:r><w:r><w:t>{text[3:]}</w:t></w:r></w:p>"
+        for text in paragraphs
+    )
+    with zipfile.ZipFile(path, "w") as archive:
+        archive.writestr("word/document.xml", WORD_XML.format(body))
+
+
+def test_text_is_read_in_bounded_blocks(tmp_path, monkeypatch):
+    monkeypatch.setattr(extraction, "READ_BLOCK_SIZE", 10)
+    path = tmp_path / "notes.txt"
+    path.write_text("x" * 35)
+
+    segments = list(iter_segments(str(path), DocumentType.TXT))
+
+    assert [len(segment) for segment in segments] == [10, 10, 10, 5]
+
+
+def test_rows_are_grouped_into_segments(tmp_path, monkeypatch):
+    monkeypatch.setattr(extraction, "SEGMENT_CHARS", 20)
+    path = tmp_path / "table.csv"
+    path.write_text("".join(f"row{i},value{i}\n" for i in range(6)))
+
+    segments = list(iter_segments(str(path), DocumentType.CSV))
+
+    assert len(segments) == 3
+    assert "".join(segments).splitlines() == [f"row{i}, value{i}" for i in range(6)]
+
+
+def test_docx_paragraphs_are_streamed_from_the_xml(tmp_path):
+    path = tmp_path / "policy.docx"
+    _write_docx(path, ["Refund policy", "Thirty days"])
+
+    assert extract_text(str(path), DocumentType.DOCX) == "Refund policy\nThirty days\n"
+
+
+def test_extraction_stops_at_max_chars(tmp_path, monkeypatch):
+    monkeypatch.setattr(extraction, "READ_BLOCK_SIZE", 10)
+    path = tmp_path / "long.txt"
+    path.write_text("abcdefghij" * 100)
+
+    assert (
+        extract_text(str(path), DocumentType.TXT, max_chars=25)
+        == ("abcdefghij" * 3)[:25]
+    )
+
+
+def test_extract_to_file_counts_characters(tmp_path):
+    source = tmp_path / "notes.md"
+    source.write_text("# Title\n\nBody")
+    out = tmp_path / "out.txt"
+
+    assert extract_to_file(str(source), DocumentType.MD, str(out)) == 13
+    assert out.read_text() == "# Title\n\nBody"
+    assert not (tmp_path / "out.txt.tmp").exists()
+
+
+def test_streamed_split_matches_splitting_the_whole_text():
+    splitter = RecursiveCharacterTextSplitter(chunk_size=50, chunk_overlap=0)
+    text = "\n\n".join(f"Paragraph {i} " + "word " * (i % 7 + 3) for i in range(60))
+    # Segment boundaries fall mid-word
+    segments = [text[i : i + 37] for i in range(0, len(text), 37)]
+
+    chunks = list(split_stream(segments, splitter, window=3))
+
+    assert "".join(chunks).replace(" ", "") == text.replace(" ", "").replace("\n", "")
+    assert all(len(chunk) <= 50 for chunk in chunks)
+    assert len(chunks) == len(splitter.split_text(text))
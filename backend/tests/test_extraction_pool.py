@@ -0,0 +1,81 @@
+import asyncio
+import time
+
+import pytest
+
+from app.models.document import DocumentType
+from app.services.extraction_pool import (
+    ExtractionError,
+    ExtractionPool,
+    ExtractionTimeout,
+)
+
+
+@pytest.fixture
+def pool():
+    pool = ExtractionPool(max_workers=2, timeout=30, max_tasks_per_worker=2)
+    yield pool
+    pool.close()
+
+
+async def test_tasks_run_in_reused_worker_processes(pool):
+    assert await pool.run(pow, 2, 10) == 1024
+    worker = pool._idle[0]
+
+    assert await pool.run(divmod, 7, 2) == (3, 1)
+    # Recycled after max_tasks_per_worker tasks
+    assert pool._idle == []
+    assert not worker.process.is_alive()
+
+
+async def test_parser_errors_are_reported_and_the_worker_kept(pool):
+    with pytest.raises(ExtractionError, match="ValueError"):
+        await pool.run(int, "not a number")
+
+    assert len(pool._idle) == 1
+    assert await pool.run(int, "42") == 42
+
+
+async def test_overrunning_workers_are_killed_and_replaced(pool):
+    start = time.monotonic()
+    with pytest.raises(ExtractionTimeout):
+        await pool.run(time.sleep, 30, timeout=0.5)
+
+    assert time.monotonic() - start < 10
+    assert pool._idle == []
+    assert await pool.run(abs, -3) == 3
+
+
+async def test_concurrent_jobs_are_bounded_by_the_worker_count(pool):
+    results = await asyncio.gather(*(pool.run(abs, -n) for n in range(5)))
+
+    assert results == [0, 1, 2, 3, 4]
+    assert len(pool._idle) <= 2
+
+
+async def test_documents_are_extracted_out_of_process(pool, tmp_path):
+    source = tmp_path / "notes.txt"
+    source.write_text("Refunds within thirty days")
+    out = tmp_path / "out.txt"
+
+    text = await pool.extract_text(str(source), DocumentType.TXT, max_chars=7)
+    count = await pool.extract_to_file(str(source), DocumentType.TXT, str(out))
+
+    assert text == "Refunds"
+    assert count == 26
+    assert out.read_text() == "Refunds within thirty days"
+
+
+def test_pdf_page_ranges_are_split_across_workers():
+    pool = ExtractionPool(max_workers=4, pdf_pages_per_task=50)
+
+    assert pool._page_ranges(40) == [(0, 40)]
+    assert pool._page_ranges(120) == [(0, 50), (50, 100), (100, 120)]
+    assert pool._page_ranges(400) == [(0, 100), (100, 200), (200, 300), (300, 400)]
+
+
+async def test_closed_pool_refuses_work(pool):
+    pool.close()
+
+    with pytest.raises(RuntimeError):
+        await pool.run(abs, 1)
@@ -0,0 +1,187 @@
+import hashlib
+from types import SimpleNamespace
+
+import pytest
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+
+from app.ai.answer_cache import SemanticAnswerCache
+from app.ai.ingestion import ChunkMatcher, chunk_hash
+from app.ai.local_vector_store import LocalVectorStore
+from app.core.config import settings
+from app.services import ingestion
+from app.services.jobs import InMemoryJobStore, InMemoryTenantLimiter
+
+DOCUMENT_ID = 7
+PARAGRAPHS = [
+    f"Paragraph {i}: " + " ".join([f"section {i} of the handbook."] * 3)
+    for i in range(6)
+]
+
+
+class FakeEmbeddings:
+    """Deterministic embeddings that record every text they were asked for"""
+
+    def __init__(self):
+        self.embedded = []
+
+    async def aembed_documents(self, texts):
+        self.embedded.extend(texts)
+        return [self.vector(text) for text in texts]
+
+    @staticmethod
+    def vector(text):
+        digest = hashlib.sha256(text.encode()).digest()
+        return [b / 255 + 0.01 for b in digest[:8]]
+
+
+def _stored(id, text, index):
+    return {
+        "id": id,
+        "metadata": {"chunk_hash": chunk_hash(text), "chunk_index": index},
+    }
+
+
+def test_chunk_matcher_claims_each_stored_chunk_once():
+    existing = [
+        _stored("b", "same", 1),
+        _stored("a", "same", 0),
+        _stored("c", "gone", 2),
+    ]
+    matcher = ChunkMatcher(existing)
+
+    assert matcher.match(chunk_hash("same"))["id"] == "a"
+    assert matcher.match(chunk_hash("same"))["id"] == "b"
+    assert matcher.match(chunk_hash("same")) is None
+    assert matcher.match(chunk_hash("new")) is None
+    assert [chunk["id"] for chunk in matcher.unmatched()] == ["c"]
+
+
+def test_chunk_matcher_never_reuses_unhashed_chunks():
+    matcher = ChunkMatcher([{"id": "old", "metadata": {"chunk_index": 0}}])
+
+    assert matcher.match(chunk_hash("anything")) is None
+    assert [chunk["id"] for chunk in matcher.unmatched()] == ["old"]
+
+
+@pytest.fixture
+async def rag(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "UPLOAD_DIR", str(tmp_path / "uploads"))
+    monkeypatch.setattr(settings, "EXTRACTION_WORKERS", 0)
+    monkeypatch.setattr(
+        ingestion, "get_job_store", lambda store=InMemoryJobStore(): store
+    )
+    monkeypatch.setattr(
+        ingestion,
+        "get_tenant_limiter",
+        lambda limiter=InMemoryTenantLimiter(2): limiter,
+    )
+
+    embeddings = FakeEmbeddings()
+    rag = SimpleNamespace(
+        embeddings=embeddings,
+        vector_store=LocalVectorStore(embeddings, path=str(tmp_path / "vectors")),
+        answer_cache=SemanticAnswerCache(threshold=0.95),
+        text_splitter=RecursiveCharacterTextSplitter(chunk_size=100, chunk_overlap=0),
+    )
+    yield rag
+    await rag.vector_store.close()
+
+
+async def _ingest(rag, tmp_path, paragraphs):
+    path = tmp_path / "handbook.txt"
+    path.write_text("\n\n".join(paragraphs))
+    job = await ingestion.get_job_store().create(
+        file_path=str(path), file_type="txt", owner_id=1, document_id=DOCUMENT_ID
+    )
+    # Summarize needs the database; the chunk stages are what re-ingest changes
+    for stage in ("extract", "chunk", "embed", "upsert"):
+        assert await ingestion.run_stage(job["job_id"], stage, rag)
+    return await ingestion.get_job_store().get(job["job_id"])
+
+
+async def test_reingest_embeds_only_changed_chunks(rag, tmp_path):
+    first = await _ingest(rag, tmp_path, PARAGRAPHS)
+    assert first["chunks_added"] == len(PARAGRAPHS)
+    ids_by_text = {
+        chunk["text"]: chunk["id"]
+        for chunk in await rag.vector_store.similarity_search(
+            "", k=20, query_embedding=FakeEmbeddings.vector("x")
+        )
+    }
+    assert set(ids_by_text) == set(PARAGRAPHS)
+
+    # An answer sourced from a paragraph that is about to be removed
+    removed_text = PARAGRAPHS[2]
+    rag.answer_cache.store(
+        "all|k=5",
+        [1.0, 0.0],
+        "q",
+        "a",
+        [{"id": 1}],
+        [{"id": ids_by_text[removed_text], "metadata": {}}],
+        0.5,
+    )
+
+    edited = "Paragraph 4: rewritten for the new policy year."
+    revised = PARAGRAPHS[:2] + PARAGRAPHS[3:4] + [edited] + PARAGRAPHS[5:]
+    rag.embeddings.embedded.clear()
+    second = await _ingest(rag, tmp_path, revised)
+
+    assert rag.embeddings.embedded == [edited]
+    counts = (second["chunks_added"], second["chunks_reused"], second["chunks_removed"])
+    assert counts == (1, 4, 2)
+    for text in revised:
+        if text != edited:
+            assert ids_by_text[text] in second["vector_ids"]
+
+    chunks = await rag.vector_store.get_document_chunks(DOCUMENT_ID)
+    assert len(chunks) == len(revised)
+    positions = sorted(
+        (chunk["metadata"]["chunk_index"], chunk["metadata"]["chunk_hash"])
+        for chunk in chunks
+    )
+    assert positions == [(i, chunk_hash(text)) for i, text in enumerate(revised)]
+    assert all(chunk["metadata"]["total_chunks"] == len(revised) for chunk in chunks)
+
+    assert rag.answer_cache.lookup("all|k=5", [1.0, 0.0]) is None
+
+
+async def test_unchanged_reingest_embeds_nothing(rag, tmp_path):
+    await _ingest(rag, tmp_path, PARAGRAPHS)
+    rag.embeddings.embedded.clear()
+
+    job = await _ingest(rag, tmp_path, PARAGRAPHS)
+
+    assert rag.embeddings.embedded == []
+    counts = (job["chunks_added"], job["chunks_reused"], job["chunks_removed"])
+    assert counts == (0, 6, 0)
+    assert job["status"] == "running"  # Only summarize is left
+
+
+async def test_previous_upload_is_removed_once_the_new_version_succeeds(
+    rag, tmp_path, monkeypatch
+):
+    async def summarize(job, rag_service):
+        return {"summary": ""}
+
+    monkeypatch.setitem(ingestion.STAGE_HANDLERS, "summarize", summarize)
+    previous = tmp_path / "v1.txt"
+    previous.write_text("\n\n".join(PARAGRAPHS))
+    current = tmp_path / "v2.txt"
+    current.write_text("\n\n".join(PARAGRAPHS[:3]))
+    job = await ingestion.get_job_store().create(
+        file_path=str(current),
+        file_type="txt",
+        owner_id=1,
+        document_id=DOCUMENT_ID,
+        superseded_path=str(previous),
+    )
+
+    for stage in ingestion.STAGES[:-1]:
+        await ingestion.run_stage(job["job_id"], stage, rag)
+        # A queued job for the previous version may still need it
+        assert previous.exists()
+    await ingestion.run_stage(job["job_id"], "summarize", rag)
+
+    assert not previous.exists()
+    assert current.exists()
@@ -0,0 +1,112 @@
+import os
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from app.core.config import settings
+from app.services import ingestion
+from app.services.jobs import InMemoryJobStore, InMemoryTenantLimiter
+from app.worker import tasks
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    store = InMemoryJobStore()
+    monkeypatch.setattr(settings, "UPLOAD_DIR", str(tmp_path))
+    monkeypatch.setattr(ingestion, "get_job_store", lambda: store)
+    return store
+
+
+@pytest.fixture
+def limiter(monkeypatch):
+    limiter = InMemoryTenantLimiter(1)
+    monkeypatch.setattr(ingestion, "get_tenant_limiter", lambda: limiter)
+    return limiter
+
+
+@pytest.fixture
+def calls(monkeypatch):
+    """Stage handlers that record their runs; "embed" fails while `fail` is set"""
+    calls = SimpleNamespace(stages=[], fail=True)
+
+    def handler(stage):
+        async def run(job, rag_service):
+            calls.stages.append(stage)
+            ingestion.job_dir(job["job_id"])
+            if stage == "embed" and calls.fail:
+                raise ConnectionError("provider unavailable")
+            return {f"{stage}_done": True}
+
+        return run
+
+    for stage in ingestion.STAGES:
+        monkeypatch.setitem(ingestion.STAGE_HANDLERS, stage, handler(stage))
+    return calls
+
+
+async def test_failed_stages_keep_artifacts_and_resume(store, limiter, calls):
+    job = await store.create(file_path="upload.txt", file_type="txt", owner_id=1)
+    job_id = job["job_id"]
+
+    for stage in ("extract", "chunk"):
+        assert await ingestion.run_stage(job_id, stage, None)
+    with pytest.raises(ConnectionError):
+        await ingestion.run_stage(job_id, "embed", None)
+    failed = await store.get(job_id)
+    assert (failed["status"], failed["error"]) == ("failed", "provider unavailable")
+    assert os.path.isdir(ingestion.job_dir(job_id))
+
+    # A retried chain skips the stages that are already done
+    calls.fail = False
+    for stage in ingestion.STAGES:
+        assert await ingestion.run_stage(job_id, stage, None)
+
+    assert calls.stages == ["extract", "chunk", "embed", "embed", "upsert", "summarize"]
+    done = await store.get(job_id)
+    assert done["status"] == "succeeded"
+    assert done["progress"] == 1.0
+    assert done["upsert_done"]
+    assert not os.path.exists(os.path.join(settings.UPLOAD_DIR, "jobs", job_id))
+
+
+async def test_stages_wait_while_the_tenant_is_at_its_limit(store, limiter, calls):
+    job = await store.create(file_path="upload.txt", file_type="txt", owner_id=1)
+    await limiter.acquire(1, "other-job:embed")
+
+    assert not await ingestion.run_stage(job["job_id"], "extract", None)
+    assert calls.stages == []
+    assert (await store.get(job["job_id"]))["status"] == "queued"
+
+    await limiter.release(1, "other-job:embed")
+    assert await ingestion.run_stage(job["job_id"], "extract", None)
+
+
+def test_sweep_removes_only_stale_job_dirs(store):
+    stale = ingestion.job_dir("stale")
+    fresh = ingestion.job_dir("fresh")
+    old = time.time() - 3600
+    os.utime(stale, (old, old))
+
+    assert ingestion.sweep_job_dirs(max_age=60) == 1
+    assert not os.path.exists(stale)
+    assert os.path.exists(fresh)
+
+
+async def test_jobs_are_enqueued_as_a_stage_chain(store, monkeypatch):
+    queued = []
+    monkeypatch.setattr(settings, "INGESTION_EAGER", False)
+    monkeypatch.setattr(
+        tasks, "enqueue_ingestion", lambda job_id, priority: queued.append(priority)
+    )
+
+    job = await ingestion.submit_ingestion(
+        "upload.txt", "txt", owner_id=1, priority="high"
+    )
+
+    assert queued == ["high"]
+    status = await ingestion.get_job_status(job["job_id"])
+    assert status["status"] == "queued"
+    assert "file_path" not in status
+    with pytest.raises(ValueError):
+        await ingestion.submit_ingestion("upload.txt", "txt", priority="urgent")
@@ -0,0 +1,117 @@
+import math
+
+import pytest
+
+from app.ai.lexical_index import BM25Index, reciprocal_rank_fusion, tokenize
+from app.ai.vector_store import SearchFilter
+
+
+def _doc(id, score=0.0, **metadata):
+    return {"id": id, "text": id, "metadata": metadata, "score": score}
+
+
+@pytest.fixture
+async def index(tmp_path):
+    index = BM25Index(path=str(tmp_path), k1=1.2, b=0.75)
+    yield index
+    await index.close()  # Deletes start a background compaction
+
+
+def test_tokenize_keeps_identifiers_and_their_parts():
+    assert tokenize("What is POL-2023-0042?") == [
+        "pol-2023-0042",
+        "pol",
+        "2023",
+        "0042",
+    ]
+
+
+def test_rrf_sums_reciprocal_ranks_across_lists():
+    vector = [_doc("a", 0.9), _doc("b", 0.8), _doc("c", 0.7)]
+    lexical = [_doc("c", 12.0), _doc("a", 3.0)]
+
+    fused = reciprocal_rank_fusion([vector, lexical], limit=10, k=60)
+
+    assert [doc["id"] for doc in fused] == ["a", "c", "b"]
+    assert fused[0]["score"] == pytest.approx(1 / 61 + 1 / 62)
+    assert fused[1]["score"] == pytest.approx(1 / 63 + 1 / 61)
+    assert fused[2]["score"] == pytest.approx(1 / 62)
+
+
+def test_rrf_ignores_raw_scores_and_applies_limit():
+    # Wildly different score scales must not matter, only ranks
+    fused = reciprocal_rank_fusion(
+        [[_doc("a", 1000.0), _doc("b", 999.0)], [_doc("b", 0.01), _doc("a", 0.001)]],
+        limit=1,
+        k=60,
+    )
+    assert len(fused) == 1
+    assert fused[0]["score"] == pytest.approx(1 / 61 + 1 / 62)
+
+
+async def test_bm25_scores_match_okapi_formula(index):
+    await index.add(
+        [
+            {"id": "1", "text": "refund policy for annual plans", "metadata": {}},
+            {"id": "2", "text": "refund refund refund", "metadata": {}},
+            {"id": "3", "text": "shipping times", "metadata": {}},
+        ]
+    )
+
+    results = await index.search("refund", k=3)
+
+    lengths = {"1": 4, "2": 3, "3": 2}
+    avgdl = sum(lengths.values()) / 3
+    idf = math.log(1 + (3 - 2 + 0.5) / (2 + 0.5))
+
+    def expected(tf, length):
+        return idf * tf * 2.2 / (tf + 1.2 * (1 - 0.75 + 0.75 * length / avgdl))
+
+    assert [r["id"] for r in results] == ["2", "1"]
+    assert results[0]["score"] == pytest.approx(expected(3, 3), rel=1e-5)
+    assert results[1]["score"] == pytest.approx(expected(1, 4), rel=1e-5)
+
+
+async def test_bm25_rare_terms_outweigh_common_ones(index):
+    await index.add(
+        [
+            {"id": "common", "text": "invoice invoice", "metadata": {}},
+            {"id": "rare", "text": "invoice sku_88-a", "metadata": {}},
+            {"id": "other", "text": "invoice totals", "metadata": {}},
+        ]
+    )
+    results = await index.search("invoice SKU_88-A", k=1)
+    assert results[0]["id"] == "rare"
+
+
+async def test_bm25_deletes_and_filters(index):
+    await index.add(
+        [
+            {
+                "id": "a",
+                "text": "quarterly report",
+                "metadata": {"owner_id": 1, "document_id": 10},
+            },
+            {
+                "id": "b",
+                "text": "quarterly report",
+                "metadata": {"owner_id": 2, "document_id": 20},
+            },
+        ]
+    )
+
+    owned = await index.search("quarterly", k=5, search_filter=SearchFilter(owner_id=2))
+    assert [r["id"] for r in owned] == ["b"]
+
+    await index.delete(["b"])
+    assert [r["id"] for r in await index.search("quarterly", k=5)] == ["a"]
+    assert len(index) == 1
+
+
+async def test_bm25_sees_writes_from_another_process(tmp_path):
+    writer = BM25Index(path=str(tmp_path))
+    reader = BM25Index(path=str(tmp_path))
+
+    await writer.add([{"id": "a", "text": "onboarding checklist", "metadata": {}}])
+
+    assert [r["id"] for r in await reader.search("checklist")] == ["a"]
@@ -0,0 +1,166 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from app.ai.llm_gateway import (
+    BACKGROUND,
+    INTERACTIVE,
+    LLMGateway,
+    LLMOverloadedError,
+    TokenBucket,
+)
+
+
+class FakeLLM:
+    """Chat model whose calls block until `release` is set"""
+
+    model_name = "fake-model"
+    temperature = 0
+    max_tokens = 10
+
+    def __init__(self):
+        self.calls = []
+        self.release = asyncio.Event()
+
+    async def ainvoke(self, messages):
+        self.calls.append(messages[0])
+        await self.release.wait()
+        return SimpleNamespace(
+            content=f"answer to {messages[0]}", usage_metadata={"total_tokens": 5}
+        )
+
+
+class RateLimited(Exception):
+    status_code = 429
+    response = SimpleNamespace(headers={"retry-after": "7"})
+
+
+def _gateway(**overrides):
+    options = {
+        "requests_per_minute": 0,
+        "tokens_per_minute": 0,
+        "max_concurrency": 4,
+        "background_max_concurrency": 2,
+        "max_queue": {INTERACTIVE: 10, BACKGROUND: 10},
+        "queue_timeout": {INTERACTIVE: 5, BACKGROUND: 5},
+        "coalesce": True,
+        **overrides,
+    }
+    return LLMGateway(**options)
+
+
+def test_token_bucket_waits_for_refill():
+    bucket = TokenBucket(60)  # One per second
+    now = bucket.updated
+
+    assert bucket.delay(60, now) == 0
+    bucket.take(60)
+    assert bucket.delay(1, now) == pytest.approx(1.0)
+    assert bucket.delay(1, now + 0.5) == pytest.approx(0.5)
+    # Larger than the bucket: admitted once it is full rather than never
+    assert bucket.delay(1000, now + 60) == 0
+
+
+def test_token_bucket_refund_and_pause():
+    bucket = TokenBucket(60)
+    now = bucket.updated
+    bucket.take(60)
+
+    bucket.refund(30)
+    assert bucket.delay(30, now) == 0
+    bucket.refund(-30)  # Usage above the estimate is charged afterwards
+    assert bucket.delay(1, now) == pytest.approx(1.0)
+
+    bucket.pause(10)
+    assert bucket.delay(1, time.monotonic()) > 9
+
+
+def test_zero_rate_disables_the_bucket():
+    bucket = TokenBucket(0)
+    bucket.take(1_000_000)
+    assert bucket.delay(1_000_000, time.monotonic()) == 0
+
+
+async def test_identical_prompts_are_coalesced():
+    gateway = _gateway()
+    llm = FakeLLM()
+
+    calls = [asyncio.create_task(gateway.ainvoke(llm, ["same"])) for _ in range(5)]
+    other = asyncio.create_task(gateway.ainvoke(llm, ["different"]))
+    await asyncio.sleep(0)
+    llm.release.set()
+    results = await asyncio.gather(*calls, other)
+
+    assert sorted(llm.calls) == ["different", "same"]
+    assert {r.content for r in results[:5]} == {"answer to same"}
+
+
+async def test_full_queue_sheds_with_retry_after():
+    gateway = _gateway(
+        max_concurrency=1, max_queue={INTERACTIVE: 1, BACKGROUND: 1}, coalesce=False
+    )
+    llm = FakeLLM()
+
+    running = asyncio.create_task(gateway.ainvoke(llm, ["one"]))
+    queued = asyncio.create_task(gateway.ainvoke(llm, ["two"]))
+    await asyncio.sleep(0)
+
+    with pytest.raises(LLMOverloadedError) as error:
+        await gateway.ainvoke(llm, ["three"])
+    assert error.value.reason == "queue_full"
+    assert error.value.retry_after >= 1
+
+    llm.release.set()
+    await asyncio.gather(running, queued)
+
+
+async def test_queue_timeout_sheds_the_waiting_call():
+    gateway = _gateway(
+        max_concurrency=1, queue_timeout={INTERACTIVE: 0.05, BACKGROUND: 0.05}
+    )
+    llm = FakeLLM()
+
+    running = asyncio.create_task(gateway.ainvoke(llm, ["one"]))
+    await asyncio.sleep(0)
+    with pytest.raises(LLMOverloadedError) as error:
+        await gateway.ainvoke(llm, ["two"])
+    assert error.value.reason == "timeout"
+
+    llm.release.set()
+    await running
+    assert llm.calls == ["one"]
+
+
+async def test_interactive_calls_are_admitted_before_background():
+    gateway = _gateway(max_concurrency=1, coalesce=False)
+    llm = FakeLLM()
+
+    first = asyncio.create_task(gateway.ainvoke(llm, ["first"], BACKGROUND))
+    await asyncio.sleep(0)
+    background = asyncio.create_task(gateway.ainvoke(llm, ["background"], BACKGROUND))
+    await asyncio.sleep(0)
+    interactive = asyncio.create_task(
+        gateway.ainvoke(llm, ["interactive"], INTERACTIVE)
+    )
+    await asyncio.sleep(0)
+
+    llm.release.set()
+    await asyncio.gather(first, background, interactive)
+    assert llm.calls == ["first", "interactive", "background"]
+
+
+async def test_provider_429_pauses_the_model():
+    gateway = _gateway(requests_per_minute=600, coalesce=False)
+
+    class FailingLLM(FakeLLM):
+        async def ainvoke(self, messages):
+            raise RateLimited()
+
+    llm = FailingLLM()
+    with pytest.raises(RateLimited):
+        await gateway.ainvoke(llm, ["hello"])
+
+    limits = gateway._limits_for(llm)
+    assert limits.delay(1, time.monotonic()) > 6
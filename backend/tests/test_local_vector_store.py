@@ -0,0 +1,90 @@
+import pytest
+
+from app.ai.local_vector_store import LocalVectorStore
+from app.ai.vector_store import SearchFilter
+
+
+def _chunk(id, embedding, owner_id=1, document_id=1):
+    return {
+        "id": id,
+        "text": f"text of {id}",
+        "embedding": embedding,
+        "metadata": {"owner_id": owner_id, "document_id": document_id},
+    }
+
+
+@pytest.fixture
+async def stores(tmp_path):
+    # Two instances on one directory stand in for the API and a Celery worker
+    writer = LocalVectorStore(path=str(tmp_path))
+    reader = LocalVectorStore(path=str(tmp_path))
+    yield writer, reader
+    await writer.close()
+    await reader.close()
+
+
+async def test_exact_search_ranks_by_cosine_and_filters(stores):
+    writer, _ = stores
+    await writer.add_documents(
+        [
+            _chunk("a", [1.0, 0.0]),
+            _chunk("b", [0.6, 0.8]),
+            _chunk("c", [1.0, 0.1], owner_id=2),
+        ]
+    )
+
+    results = await writer.similarity_search("", k=2, query_embedding=[1.0, 0.0])
+    assert [r["id"] for r in results] == ["a", "c"]
+    assert results[0]["score"] == pytest.approx(1.0)
+    assert results[0]["text"] == "text of a"
+
+    owned = await writer.similarity_search(
+        "", k=5, query_embedding=[1.0, 0.0], search_filter=SearchFilter(owner_id=1)
+    )
+    assert [r["id"] for r in owned] == ["a", "b"]
+
+
+async def test_writes_and_deletes_reach_other_instances(stores):
+    writer, reader = stores
+    await writer.add_documents(
+        [_chunk("a", [1.0, 0.0]), _chunk("b", [0.0, 1.0], document_id=2)]
+    )
+
+    results = await reader.similarity_search("", k=5, query_embedding=[1.0, 0.0])
+    assert [r["id"] for r in results] == ["a", "b"]
+
+    assert await reader.delete_by_document(2) == 1
+    results = await writer.similarity_search("", k=5, query_embedding=[0.0, 1.0])
+    assert [r["id"] for r in results] == ["a"]
+
+
+async def test_compaction_keeps_live_rows_for_every_instance(stores):
+    writer, reader = stores
+    await writer.add_documents([_chunk(str(i), [1.0, float(i)]) for i in range(10)])
+    await writer.delete_documents([str(i) for i in range(8)])
+
+    await writer.compact()
+
+    for store in (writer, reader):
+        results = await store.similarity_search("", k=10, query_embedding=[1.0, 9.0])
+        assert [r["id"] for r in results] == ["9", "8"]
+        assert results[0]["text"] == "text of 9"
+
+
+async def test_replaced_log_files_are_closed(stores):
+    writer, reader = stores
+    await writer.add_documents([_chunk(str(i), [1.0, float(i)]) for i in range(4)])
+    await reader.sync()
+    old_logs = [writer._reader, reader._reader]
+
+    await writer.delete_documents(["0", "1", "2"])
+    await writer.compact()
+    await reader.sync()
+
+    assert all(log.closed for log in old_logs)
+    current = [writer._reader, reader._reader]
+    assert not any(log.closed for log in current)
+
+    await writer.close()
+    await reader.close()
+    assert all(log.closed for log in current)
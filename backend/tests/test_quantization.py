@@ -0,0 +1,77 @@
+import numpy as np
+import pytest
+
+from app.ai import quantization
+from app.ai.quantization import (
+    BSON_INT8,
+    BSON_PACKED_BIT,
+    BSON_VECTOR_SUBTYPE,
+    oversampled_limit,
+    pack_bson_vector,
+    rescore,
+    unpack_bson_vector,
+)
+from app.ai.vector_store import MongoDBVectorStore
+from app.core.config import settings
+
+
+def test_float32_vectors_round_trip_through_bson():
+    vector = [0.25, -1.5, 3.0]
+
+    packed = pack_bson_vector(vector)
+
+    assert packed.subtype == BSON_VECTOR_SUBTYPE
+    assert len(packed) == 2 + 4 * len(vector)
+    assert unpack_bson_vector(packed).tolist() == vector
+    assert unpack_bson_vector(vector).tolist() == vector
+
+
+def test_int8_and_packed_bit_vectors_decode():
+    int8 = bytes([BSON_INT8, 0]) + np.array([-3, 7], dtype=np.int8).tobytes()
+    # 0b1010_0000 with 5 padding bits leaves three dimensions
+    bits = bytes([BSON_PACKED_BIT, 5, 0b10100000])
+
+    assert unpack_bson_vector(int8).tolist() == [-3.0, 7.0]
+    assert unpack_bson_vector(bits).tolist() == [1.0, -1.0, 1.0]
+    with pytest.raises(ValueError):
+        unpack_bson_vector(bytes([0x01, 0]))
+
+
+def test_oversampling_applies_only_when_quantized(monkeypatch):
+    monkeypatch.setattr(settings, "VECTOR_QUANTIZATION_OVERSAMPLING", 2.5)
+    monkeypatch.setattr(settings, "VECTOR_QUANTIZATION", "none")
+    assert oversampled_limit(4) == 4
+
+    monkeypatch.setattr(settings, "VECTOR_QUANTIZATION", "int8")
+    assert oversampled_limit(4) == 10
+
+    monkeypatch.setattr(settings, "VECTOR_QUANTIZATION", "fp4")
+    with pytest.raises(ValueError):
+        quantization.quantization_mode()
+
+
+def test_rescore_ranks_candidates_by_exact_cosine():
+    candidates = [
+        {"id": "orthogonal", "embedding": [0.0, 1.0], "score": 0.99},
+        {"id": "same", "embedding": pack_bson_vector([2.0, 0.0]), "score": 0.5},
+        {"id": "opposite", "embedding": [-1.0, 0.0], "score": 0.7},
+    ]
+
+    top = rescore(candidates, [1.0, 0.0], k=2)
+
+    assert [(doc["id"], doc["score"]) for doc in top] == [
+        ("same", 1.0),
+        ("orthogonal", 0.5),
+    ]
+    assert all("embedding" not in doc for doc in top)
+
+
+def test_mongo_documents_are_packed_as_copies(monkeypatch):
+    monkeypatch.setattr(settings, "MONGODB_BINARY_VECTORS", True)
+    doc = {"id": "a", "text": "t", "embedding": [1.0, 2.0], "metadata": {}}
+
+    stored = MongoDBVectorStore._to_mongo(doc)
+
+    assert "id" not in stored
+    assert unpack_bson_vector(stored["embedding"]).tolist() == [1.0, 2.0]
+    assert doc["embedding"] == [1.0, 2.0]
@@ -0,0 +1,115 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from app.ai import summarizer
+from app.ai.summarizer import MapReduceSummarizer, SummaryCache
+
+
+class FakeLLM:
+    """Replies "<prompt kind> <n>" and tracks how many calls run at once"""
+
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.calls = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def ainvoke(self, messages):
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(0)
+            if self.fail:
+                raise RuntimeError("LLM unavailable")
+            system = messages[0].content
+            kind = "section" if "section of" in system else "merge"
+            if system.startswith("Summarize the following document"):
+                kind = "document"
+            self.calls.append(kind)
+            return SimpleNamespace(content=f"{kind} {len(self.calls)}")
+        finally:
+            self.in_flight -= 1
+
+
+@pytest.fixture(autouse=True)
+def word_tokens(monkeypatch):
+    monkeypatch.setattr(
+        summarizer, "count_tokens", lambda text, model=None: len(text.split())
+    )
+
+
+def _summarizer(llm, cache=None):
+    return MapReduceSummarizer(
+        llm, cache=cache, chunk_tokens=10, max_concurrency=3, section_words=20
+    )
+
+
+def _long_text(sections=12):
+    return "\n\n".join(
+        " ".join(f"s{i}w{j}" for j in range(10)) for i in range(sections)
+    )
+
+
+async def test_short_text_takes_one_call():
+    llm = FakeLLM()
+
+    summary = await _summarizer(llm).summarize("a short note", max_length=50)
+
+    assert summary == "document 1"
+    assert llm.calls == ["document"]
+
+
+async def test_long_text_is_mapped_then_reduced_in_a_tree():
+    llm = FakeLLM()
+    events = []
+
+    async def on_progress(event):
+        events.append(event)
+
+    await _summarizer(llm).summarize(_long_text(), on_progress=on_progress)
+
+    # 12 sections; two-word summaries merge five at a time, then a final pass
+    assert llm.calls.count("section") == 12
+    assert llm.calls.count("merge") == 3 + 1
+    assert llm.max_in_flight == 3
+    stages = [(e["stage"], e.get("level")) for e in events if e["done"] == e["total"]]
+    assert stages == [("map", 0), ("reduce", 1), ("final", 2)]
+
+
+async def test_unchanged_sections_come_from_the_cache():
+    cache = SummaryCache(max_entries=100)
+    await _summarizer(FakeLLM(), cache).summarize(_long_text())
+
+    llm = FakeLLM()
+    await _summarizer(llm, cache).summarize(_long_text())
+
+    assert llm.calls == []
+    assert cache.hits > 0
+
+
+async def test_cache_evicts_the_least_recently_used():
+    cache = SummaryCache(max_entries=2)
+    await cache.set("a", "A")
+    await cache.set("b", "B")
+    await cache.get("a")
+    await cache.set("c", "C")
+
+    assert await cache.get("b") is None
+    assert await cache.get("a") == "A"
+
+
+async def test_stream_reports_progress_then_the_summary():
+    events = [
+        event async for event in _summarizer(FakeLLM()).stream("a short note", 50)
+    ]
+
+    assert [event["type"] for event in events] == ["progress", "progress", "summary"]
+    assert events[-1]["summary"] == "document 1"
+
+
+async def test_stream_ends_with_an_error_event():
+    events = [event async for event in _summarizer(FakeLLM(fail=True)).stream("x")]
+
+    assert events[-1] == {"type": "error", "detail": "LLM unavailable"}
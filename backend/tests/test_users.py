@@ -0,0 +1,20 @@
+import pytest
+from pydantic import ValidationError
+
+from app.models.user import UserRole
+from app.schemas.user import UserUpdate
+
+
+def test_update_keeps_only_fields_that_were_sent():
+    body = UserUpdate.model_validate({"full_name": None, "role": "admin"})
+
+    assert body.model_dump(exclude_unset=True) == {
+        "full_name": None,
+        "role": UserRole.ADMIN,
+    }
+
+
+@pytest.mark.parametrize("field", ["role", "is_active"])
+def test_update_rejects_null_for_required_columns(field):
+    with pytest.raises(ValidationError):
+        UserUpdate.model_validate({field: None})